@@ -0,0 +1,110 @@
+"""
+Benchmark das expressões regulares com entradas adversariais.
+
+Para cada plano gera páginas que provocam backtracking excessivo nos padrões
+(linhas que quase fecham um registro) e mede, com tamanhos crescentes:
+
+- a busca sem limite, que cresce de forma polinomial ou exponencial (e é
+  cortada em --teto segundos para o benchmark terminar);
+- a extração do plano com o orçamento por página (utilitarios.fluxo), cujo
+  tempo deve ficar limitado ao orçamento mais uma folga, com os trechos
+  mandados para a quarentena.
+
+Sai com código 1 se alguma página passar do orçamento mais a folga.
+
+Uso:
+    python -m benchmarks.bench_adversarial [--planos amil samp] [--orcamento 0.5]
+        [--folga 0.25] [--teto 10]
+"""
+import os
+import re
+import sys
+import time
+import logging
+import argparse
+import tempfile
+
+from utilitarios.logger_config import logger
+from utilitarios.padroes import PADROES
+
+# Padrão de procedimentos do Amil antes da reescrita em utilitarios.padroes,
+# exponencial com a entrada de _amil
+AMIL_ORIGINAL = re.compile(r"([A-ZÀ-Ü0-9()/ ]+(?: [A-ZÀ-Ü0-9()/ ]+)*?)\s+(\d{2}/\d{2}/\d{4})\s*([A-ZÀ-Ü()/\-]+)?\s+([\d.,]+)\s+([A-Z\d]+)\s+(\d{1,2})\s+(\d{8})\s+([\d.,]{1,5})\s*([\d.,]{1,4})\s+([\d.,]+)\s*([\d.,]+)")
+
+def _amil(tamanho:int):
+    # Descrição seguida de data, sem os valores do procedimento
+    return "A " * tamanho + "01/08/2024 "
+
+def _rede_unna(tamanho:int):
+    # Nome sem o "12 - Nome Civil" que fecha o beneficiário
+    return "a" * (tamanho * 500)
+
+def _samp(tamanho:int):
+    # Médico e paciente longos, sem o procedimento
+    return "01/08/2024DR(A). JOSE SILVA123456789 - " + "AB " * (tamanho * 40) + "12345678 -X [1] "
+
+# plano -> (padrão medido sem limite, gerador da página, tamanhos)
+CASOS = {
+    "amil": (AMIL_ORIGINAL, _amil, [12, 14, 16, 18, 20]),
+    "rede_unna": (PADROES["rede_unna"]["beneficiario"], _rede_unna, [4, 8, 16, 32]),
+    "samp": (PADROES["samp"]["procedimento"], _samp, [10, 20, 40, 80]),
+}
+
+def medir_sem_limite(padrao:re.Pattern, texto:str, teto:float):
+    """Tempo da busca completa, ou None se passar de `teto` segundos."""
+
+    from utilitarios.fluxo import TempoEsgotado, orcamento_tempo
+
+    inicio = time.perf_counter()
+    try:
+        with orcamento_tempo(teto):
+            for _ in padrao.finditer(texto):
+                pass
+    except TempoEsgotado:
+        return None
+    return time.perf_counter() - inicio
+
+def medir_extracao(plano:str, texto:str):
+    """Extrai a página com o orçamento; retorna (segundos, trechos em quarentena)."""
+
+    from utilitarios.extratores import ExtratorPDF
+
+    extrator = ExtratorPDF(f"adversarial_{plano}.pdf", plano, cache=None)
+    inicio = time.perf_counter()
+    list(extrator.iterar_dados(iter([texto])))
+    return time.perf_counter() - inicio, extrator.metricas.trechos_em_quarentena
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--planos", nargs="+", default=list(CASOS), choices=list(CASOS))
+    parser.add_argument("--orcamento", type=float, default=0.5, help="segundos por padrão e página")
+    parser.add_argument("--folga", type=float, default=0.25, help="tempo tolerado além do orçamento")
+    parser.add_argument("--teto", type=float, default=10, help="corte da busca sem limite, em segundos")
+    args = parser.parse_args()
+
+    logger.setLevel(logging.ERROR)
+    # Lidos na importação de utilitarios.fluxo e utilitarios.quarentena
+    os.environ["PDF_ORCAMENTO_REGEX"] = str(args.orcamento)
+    os.environ["PDF_QUARENTENA"] = pasta_quarentena = tempfile.mkdtemp(prefix="quarentena_")
+
+    print(f"{'plano':<10} {'tamanho':>8} {'sem limite (s)':>15} {'com orçamento (s)':>18} {'quarentena':>11}")
+    estourou = False
+    for plano in args.planos:
+        padrao, gerar, tamanhos = CASOS[plano]
+        for tamanho in tamanhos:
+            texto = gerar(tamanho)
+            sem_limite = medir_sem_limite(padrao, texto, args.teto)
+            com_orcamento, trechos = medir_extracao(plano, texto)
+            estourou |= com_orcamento > args.orcamento + args.folga
+
+            sem_limite = f">{args.teto:.0f}" if sem_limite is None else f"{sem_limite:.3f}"
+            print(f"{plano:<10} {len(texto):>8} {sem_limite:>15} {com_orcamento:>18.3f} {trechos:>11}")
+
+    print(f"\nTrechos gravados em {pasta_quarentena}")
+    if estourou:
+        print(f"Alguma página passou de {args.orcamento + args.folga:.2f}s.")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
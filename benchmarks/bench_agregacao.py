@@ -0,0 +1,94 @@
+"""
+Benchmark dos totais calculados no processo (utilitarios.agregacao).
+
+Soma valor pago, glosa e repasse por plano, beneficiário, procedimento e
+mês de procedimentos sintéticos (benchmarks/bench_registros.py), já
+normalizados, com o Agregador (somas vetorizadas do pandas) e com um laço
+registro a registro em Python, e confere que os totais em centavos são os
+mesmos e que os repasses de cada dimensão somam o total geral. O Agregador
+recebe os dados em lotes, como no relatório.
+
+Uso:
+    python -m benchmarks.bench_agregacao [--registros 500000] [--planos 2] [--lotes 10]
+"""
+import time
+import logging
+import argparse
+from decimal import ROUND_HALF_UP, Decimal
+from collections import defaultdict
+
+import pandas as pd
+
+from benchmarks.bench_registros import gerar_registros
+from utilitarios.agregacao import DIMENSOES, TAXA_REPASSE, Agregador
+from utilitarios.logger_config import logger
+from utilitarios.normalizacao import normalizar_dados
+from utilitarios.registros import TabelaRegistros
+
+def somar_em_laco(dados:dict):
+    """Totais em centavos por dimensão, registro a registro."""
+
+    totais = {dimensao: defaultdict(lambda: [0, 0, 0, 0]) for dimensao in DIMENSOES}
+    for plano, df in dados.items():
+        for data, nome, procedimento, glosa, pago in zip(
+            df["Data de Realização"], df["Nome do Beneficiário"], df["Código Procedimento"],
+            df["Valor Glosa"], df["Valor Processado"],
+        ):
+            mes = None if pd.isna(data) else data.strftime("%Y-%m")
+            pago = 0 if pd.isna(pago) else round(pago * 100)
+            glosa = 0 if pd.isna(glosa) else round(glosa * 100)
+            repasse = int((Decimal(pago) * Decimal(str(TAXA_REPASSE)) / 100).quantize(Decimal(1), ROUND_HALF_UP))
+            for dimensao, chave in zip(DIMENSOES, (plano, nome, procedimento, mes)):
+                total = totais[dimensao][chave]
+                total[0] += 1
+                total[1] += pago
+                total[2] += glosa
+                total[3] += repasse
+    return totais
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--registros", type=int, default=500000, help="total de procedimentos, divididos entre os planos")
+    parser.add_argument("--planos", type=int, default=2)
+    parser.add_argument("--lotes", type=int, default=10, help="lotes em que os dados de cada plano chegam ao Agregador")
+    args = parser.parse_args()
+
+    logger.setLevel(logging.ERROR)
+    dados = {}
+    for indice in range(args.planos):
+        tabela = TabelaRegistros(f"plano_{indice + 1}")
+        tabela.estender(gerar_registros(args.registros // args.planos, semente=indice))
+        dados[tabela.plano] = normalizar_dados(tabela, tabela.plano)
+
+    inicio = time.perf_counter()
+    agregador = Agregador()
+    for plano, df in dados.items():
+        tamanho = -(-len(df) // args.lotes)
+        for lote in range(0, len(df), tamanho):
+            agregador.adicionar(df.iloc[lote:lote + tamanho], plano)
+    resumo = agregador.resumo()
+    vetorizado = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    esperados = somar_em_laco(dados)
+    laco = time.perf_counter() - inicio
+
+    total = resumo["total"]
+    divergencias = 0
+    for dimensao in DIMENSOES:
+        obtidos = {
+            linha[dimensao]: [linha["registros"], round(linha["pago"] * 100), round(linha["glosa"] * 100), round(linha["repasse"] * 100)]
+            for linha in resumo[f"por_{dimensao}"]
+        }
+        divergencias += obtidos != dict(esperados[dimensao])
+        divergencias += sum(obtido[3] for obtido in obtidos.values()) != round(total["repasse"] * 100)
+
+    print(f"{args.registros} registros, {args.planos} plano(s), {args.lotes} lote(s) por plano:")
+    print(f"  Agregador (vetorizado)  {vetorizado:7.3f}s  ({args.registros / vetorizado:,.0f} registros/s)")
+    print(f"  laço em Python          {laco:7.3f}s  ({args.registros / laco:,.0f} registros/s)  ganho {laco / vetorizado:.1f}x")
+    print(f"  pago {total['pago']:,.2f}, glosa {total['glosa']:,.2f}, repasse de {TAXA_REPASSE:g}% {total['repasse']:,.2f}")
+    print("  grupos: " + ", ".join(f"{len(resumo[f'por_{dimensao}'])} {dimensao}" for dimensao in DIMENSOES))
+    print(f"  totais iguais aos do laço: {'sim' if not divergencias else f'NÃO ({divergencias} dimensão(ões))'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark do histórico em SQLite (utilitarios.banco).
+
+Grava procedimentos sintéticos (benchmarks/bench_registros.py) de vários
+"meses", como se viessem de um PDF por mês, e mede a inserção em lote e a
+consulta das glosas de um beneficiário em um ano, com e sem os índices.
+
+Uso:
+    python -m benchmarks.bench_banco [--registros 500000] [--meses 12] [--repeticoes 20]
+"""
+import os
+import time
+import logging
+import argparse
+import tempfile
+
+from benchmarks.bench_registros import gerar_registros
+from utilitarios.banco import BancoHistorico
+from utilitarios.logger_config import logger
+from utilitarios.normalizacao import normalizar_dados
+from utilitarios.registros import TabelaRegistros
+
+def gerar_meses(registros:int, meses:int):
+    """DataFrames normalizados de cada mês, com datas e glosas variadas."""
+
+    por_mes = max(1, registros // meses)
+    for mes in range(meses):
+        tabela = TabelaRegistros("unimed")
+        tabela.estender(gerar_registros(por_mes, semente=mes))
+        df = normalizar_dados(tabela, "unimed")
+        df["Data de Realização"] = df["Data de Realização"].map(lambda data: data.replace(month=mes % 12 + 1))
+        df.loc[df.index % 7 == 0, "Valor Glosa"] = 15.0
+        yield df
+
+def medir_consulta(banco:BancoHistorico, beneficiario:str, repeticoes:int):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        linhas = banco.glosas(beneficiario, ano=2024)
+    return len(linhas), (time.perf_counter() - inicio) / repeticoes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--registros", type=int, default=500000)
+    parser.add_argument("--meses", type=int, default=12)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    logger.setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as pasta:
+        pdf = os.path.join(pasta, "extrato.pdf")
+        with BancoHistorico(os.path.join(pasta, "historico.db")) as banco:
+            segundos = 0
+            total = 0
+            for mes, df in enumerate(gerar_meses(args.registros, args.meses), start=1):
+                inicio = time.perf_counter()
+                total += banco.gravar(df, "unimed", [(f"{pdf}.{mes:02d}", len(df))])
+                segundos += time.perf_counter() - inicio
+            print(f"gravação: {total} registros em {segundos:.2f}s ({total / segundos:,.0f} registros/s)")
+
+            beneficiario = banco.consultar("SELECT nome_beneficiario FROM procedimentos LIMIT 1")[0][0]
+            linhas, com_indice = medir_consulta(banco, beneficiario, args.repeticoes)
+            plano = " / ".join(linha["detail"] for linha in banco.consultar(
+                "EXPLAIN QUERY PLAN SELECT * FROM procedimentos WHERE nome_beneficiario = ? AND data_realizacao BETWEEN ? AND ?",
+                (beneficiario, "2024-01-01", "2024-12-31"),
+            ))
+
+            for nome, in banco.consultar("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_procedimentos_%'"):
+                banco.conexao.execute(f"DROP INDEX {nome}")
+            _, sem_indice = medir_consulta(banco, beneficiario, max(1, args.repeticoes // 10))
+
+    print(f"glosas de um beneficiário em 2024: {linhas} linhas")
+    print(f"  com índices  {com_indice * 1000:8.2f} ms  ({plano})")
+    print(f"  sem índices  {sem_indice * 1000:8.2f} ms  ({sem_indice / com_indice:.0f}x mais lento)")
+
+if __name__ == "__main__":
+    main()
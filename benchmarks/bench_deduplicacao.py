@@ -0,0 +1,72 @@
+"""
+Benchmark da desduplicação (utilitarios.deduplicacao).
+
+Monta um lote de PDFs sintéticos (benchmarks/bench_registros.py) em que
+parte dos "arquivos" repete um anterior, e mede o custo por registro do
+filtro: com o índice vazio, com o índice já preenchido por uma execução
+anterior e apenas em memória. Confere que as duplicatas encontradas são
+exatamente as repetidas.
+
+Uso:
+    python -m benchmarks.bench_deduplicacao [--registros 200000] [--arquivos 20] [--repetidos 5]
+"""
+import os
+import time
+import logging
+import argparse
+import tempfile
+
+from benchmarks.bench_registros import gerar_registros
+from utilitarios.deduplicacao import Deduplicador
+from utilitarios.logger_config import logger
+from utilitarios.registros import TabelaRegistros
+
+def montar_lote(registros:int, arquivos:int, repetidos:int):
+    """Tabelas de `arquivos` PDFs; os `repetidos` últimos repetem os primeiros."""
+
+    por_arquivo = max(1, registros // arquivos)
+    tabelas = []
+    for indice in range(arquivos - repetidos):
+        tabela = TabelaRegistros("unimed")
+        for registro in gerar_registros(por_arquivo, semente=indice):
+            # GTOs distintos entre os arquivos
+            registro.gto = f"{indice:03d}{registro.gto}"
+            tabela.adicionar(registro)
+        tabelas.append(tabela)
+    tabelas += tabelas[:repetidos]
+    return [(f"pdfs/unimed/extrato_{indice:03d}.pdf", "unimed", tabela) for indice, tabela in enumerate(tabelas)]
+
+def medir(deduplicador:Deduplicador, lote:list):
+    inicio = time.perf_counter()
+    _, duplicatas = deduplicador.filtrar(lote)
+    return duplicatas, time.perf_counter() - inicio
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--registros", type=int, default=200000)
+    parser.add_argument("--arquivos", type=int, default=20)
+    parser.add_argument("--repetidos", type=int, default=5)
+    args = parser.parse_args()
+
+    logger.setLevel(logging.ERROR)
+    lote = montar_lote(args.registros, args.arquivos, args.repetidos)
+    total = sum(len(tabela) for _, _, tabela in lote)
+    esperadas = sum(len(tabela) for _, _, tabela in lote[args.arquivos - args.repetidos:])
+
+    with tempfile.TemporaryDirectory() as pasta:
+        deduplicador = Deduplicador(os.path.join(pasta, "relatorio.duplicatas.db"))
+        medicoes = [("índice vazio", *medir(deduplicador, lote))]
+
+        # Execução seguinte: os mesmos PDFs, agora com o índice preenchido
+        medicoes.append(("índice preenchido", *medir(deduplicador, lote)))
+        deduplicador.fechar()
+    medicoes.append(("só em memória", *medir(Deduplicador(), lote)))
+
+    print(f"{total} registros em {len(lote)} arquivos ({esperadas} repetidos)")
+    for nome, duplicatas, segundos in medicoes:
+        situacao = "ok" if len(duplicatas) == esperadas else "DIVERGENTE"
+        print(f"  {nome:<18} {segundos:7.2f}s  {segundos / total * 1e6:6.1f} µs/registro"
+              f"  {len(duplicatas)} duplicatas  {situacao}")
+
+if __name__ == "__main__":
+    main()
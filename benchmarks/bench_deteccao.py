@@ -0,0 +1,67 @@
+"""
+Benchmark da identificação do plano pelo layout (utilitarios.layouts).
+
+Grava um extrato sintético de cada plano (benchmarks/sinteticos.py) em PDF
+e, com os PDFs de amostra em ./pdfs, compara o tempo de detectar_plano
+(primeiras páginas) com o da leitura do PDF inteiro, e confere que cada
+extrato é identificado como o próprio plano. Um PDF sem layout conhecido
+deve ficar sem plano.
+
+Uso:
+    python -m benchmarks.bench_deteccao [--paginas 200] [--repeticoes 5]
+"""
+import os
+import glob
+import time
+import logging
+import argparse
+import tempfile
+
+from benchmarks.sinteticos import PLANOS, escrever_pdf, gerar_paginas
+from utilitarios.logger_config import logger
+from utilitarios.extratores import ExtratorPDF
+from utilitarios.layouts import PAGINAS_DETECCAO, detectar_plano
+
+def menor_tempo(funcao, repeticoes:int):
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        segundos = time.perf_counter() - inicio
+        melhor = segundos if melhor is None else min(melhor, segundos)
+    return resultado, melhor
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--paginas", type=int, default=200, help="páginas de cada extrato sintético")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    logger.setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as pasta:
+        extratos = []
+        for plano in PLANOS:
+            caminho = os.path.join(pasta, f"{plano}.pdf")
+            escrever_pdf(gerar_paginas(plano, args.paginas)[0], caminho)
+            extratos.append((plano, caminho))
+        for caminho in sorted(glob.glob(os.path.join("pdfs", "*", "*.pdf"))):
+            extratos.append((os.path.basename(os.path.dirname(caminho)), caminho))
+        desconhecido = os.path.join(pasta, "carta.pdf")
+        escrever_pdf(["Carta de apresentação\nPrezados, segue em anexo o demonstrativo."] * 3, desconhecido)
+        extratos.append((None, desconhecido))
+
+        print(f"identificação pelas primeiras {PAGINAS_DETECCAO} página(s) x leitura do PDF inteiro:")
+        print(f"{'esperado':<16} {'extrato':<28} {'identificado':<16} {'detecção (ms)':>14} {'leitura (ms)':>13} {'razão':>7}")
+        erros = 0
+        for esperado, caminho in extratos:
+            detectado, deteccao = menor_tempo(lambda: detectar_plano(caminho), args.repeticoes)
+            extrator = ExtratorPDF(caminho, esperado or "entrada", cache=None)
+            _, leitura = menor_tempo(lambda: sum(1 for _ in extrator.ler_paginas()), args.repeticoes)
+            erros += detectado != esperado
+            print(f"{str(esperado):<16} {os.path.basename(caminho)[:28]:<28} {str(detectado):<16}"
+                  f" {deteccao * 1e3:14.2f} {leitura * 1e3:13.2f} {leitura / deteccao:6.0f}x")
+
+    print(f"identificações corretas: {len(extratos) - erros} de {len(extratos)}")
+
+if __name__ == "__main__":
+    main()
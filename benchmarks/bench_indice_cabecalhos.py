@@ -0,0 +1,59 @@
+"""
+Micro-benchmark da associação de procedimentos aos cabeçalhos (GTO/beneficiário).
+
+Compara a busca linear de find_previous_gto sobre a lista de matches com a
+busca binária do IndiceCabecalhos, conferindo que as duas dão o mesmo resultado.
+
+Uso:
+    python -m benchmarks.bench_indice_cabecalhos [quantidade_de_cabecalhos ...]
+"""
+import re
+import sys
+import time
+
+from utilitarios.helper import IndiceCabecalhos, find_previous_gto
+
+GTO_PATTERN = r"GTO: CÓDIGO E NOME DO BENEFICIÁRIO: (\d{8}) \d{17} - ([A-Z ]+)"
+PROCEDURE_PATTERN = r"(\d{8}) PROCEDIMENTO (\d{1,2},\d{2})"
+
+def gerar_texto(quantidade_gtos:int, procedimentos_por_gto:int = 3):
+    """Gera um texto sintético com GTOs seguidos de alguns procedimentos."""
+
+    linhas = []
+    for i in range(quantidade_gtos):
+        linhas.append(f"GTO: CÓDIGO E NOME DO BENEFICIÁRIO: {i:08d} {i:017d} - BENEFICIARIO TESTE\n")
+        for j in range(procedimentos_por_gto):
+            linhas.append(f"{81000000 + j:08d} PROCEDIMENTO {j + 10},00\n")
+    return "".join(linhas)
+
+def medir(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, time.perf_counter() - inicio
+
+def executar(quantidade_gtos:int):
+    texto = gerar_texto(quantidade_gtos)
+    gto_matches = list(re.finditer(GTO_PATTERN, texto))
+    procedure_matches = list(re.finditer(PROCEDURE_PATTERN, texto))
+
+    linear, tempo_linear = medir(lambda: [find_previous_gto(p.start(), gto_matches) for p in procedure_matches])
+
+    def _indice():
+        indice = IndiceCabecalhos.de_ocorrencias(gto_matches)
+        return [find_previous_gto(p.start(), indice) for p in procedure_matches]
+
+    binaria, tempo_indice = medir(_indice)
+
+    if linear != binaria:
+        raise AssertionError("IndiceCabecalhos divergiu da busca linear")
+
+    print(
+        f"{quantidade_gtos:>7} cabeçalhos, {len(procedure_matches):>7} procedimentos: "
+        f"linear {tempo_linear:8.3f}s | índice {tempo_indice:8.3f}s | "
+        f"{tempo_linear / tempo_indice:8.1f}x"
+    )
+
+if __name__ == "__main__":
+    quantidades = [int(valor) for valor in sys.argv[1:]] or [1000, 10000, 20000]
+    for quantidade in quantidades:
+        executar(quantidade)
@@ -0,0 +1,74 @@
+"""
+Benchmark da extração isolada (utilitarios.isolamento).
+
+Executa um lote de tarefas boas sozinho e misturado com tarefas que travam,
+derrubam o processo (falha de segmentação), esgotam a memória ou levantam
+exceção, e compara quando cada tarefa boa termina: as ruins não devem
+atrasar nem derrubar as demais, e o lote termina em cerca do tempo limite
+das que travam (mais as novas tentativas).
+
+Uso:
+    python -m benchmarks.bench_isolamento [--boas 8] [--workers 2] [--tempo 2] [--tentativas 2]
+"""
+import os
+import time
+import ctypes
+import argparse
+
+from utilitarios.isolamento import executar_isolado
+
+def tarefa(nome:str, modo:str, segundos:float):
+    """Executada em um processo isolado."""
+
+    if modo == "trava":
+        time.sleep(3600)
+    elif modo == "segfault":
+        ctypes.string_at(0)
+    elif modo == "memoria":
+        bytearray(64 * 2**30)
+    elif modo == "excecao":
+        raise ValueError("PDF inválido")
+    elif modo == "encerra":
+        os._exit(3)
+
+    # Simula a extração: ocupa a CPU por `segundos`
+    fim = time.process_time() + segundos
+    while time.process_time() < fim:
+        pass
+    return nome
+
+def executar(tarefas:list[tuple], workers:int, tempo:float, tentativas:int):
+    inicio = time.perf_counter()
+    execucoes = executar_isolado(tarefa, tarefas, workers, tempo=tempo, memoria_mb=256,
+                                 tentativas=tentativas, espera=0.1)
+    return time.perf_counter() - inicio, execucoes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--boas", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--tempo", type=float, default=2.0)
+    parser.add_argument("--tentativas", type=int, default=2)
+    parser.add_argument("--segundos", type=float, default=0.1, help="CPU de cada tarefa boa")
+    args = parser.parse_args()
+
+    boas = [(f"boa_{indice}", "ok", args.segundos) for indice in range(args.boas)]
+    ruins = [(f"ruim_{modo}", modo, args.segundos) for modo in ("trava", "segfault", "memoria", "excecao", "encerra")]
+    # As ruins no início da fila, o pior caso para as boas
+    misturadas = ruins + boas
+
+    segundos_boas, execucoes_boas = executar(boas, args.workers, args.tempo, args.tentativas)
+    print(f"{args.boas} tarefas boas sozinhas: {segundos_boas:.2f}s")
+
+    segundos, execucoes = executar(misturadas, args.workers, args.tempo, args.tentativas)
+    print(f"com {len(ruins)} ruins na frente: {segundos:.2f}s (limite de {args.tempo:g}s, {args.tentativas} tentativa(s))")
+    for (nome, _, _), execucao in zip(misturadas, execucoes):
+        situacao = "ok" if execucao.motivo is None else execucao.motivo
+        print(f"  {nome:<14} {execucao.tentativas} tentativa(s) {execucao.segundos:6.2f}s  {situacao}")
+
+    corretas = all(execucao.resultado == nome for (nome, _, _), execucao in zip(misturadas, execucoes) if nome.startswith("boa_"))
+    falhas = sum(execucao.motivo is not None for execucao in execucoes)
+    print(f"tarefas boas corretas: {'sim' if corretas else 'NÃO'}; falhas: {falhas} de {len(ruins)} ruins")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark do log (utilitarios.logger_config).
+
+Mede o custo de uma mensagem de depuração com o nível acima de DEBUG (com
+argumentos adiados e com f-string) e o de uma mensagem gravada direto no
+arquivo e pela fila com o QueueListener (que, com uma única CPU, disputa o
+GIL com quem registra). Com vários processos registrando ao mesmo tempo
+pela fila, confere que cada linha JSON do arquivo chega inteira.
+
+Uso:
+    python -m benchmarks.bench_log [--mensagens 50000] [--processos 4]
+"""
+import os
+import json
+import time
+import logging
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from utilitarios.logger_config import configurar_processo, contexto_log, encerrar_logger, fila_log, setup_logger
+
+def por_chamada(funcao, mensagens:int):
+    inicio = time.perf_counter()
+    for indice in range(mensagens):
+        funcao(indice)
+    return (time.perf_counter() - inicio) / mensagens
+
+def registrar(processo:int, mensagens:int):
+    """Executado nos processos do pool."""
+
+    logger = logging.getLogger("logger")
+    with contexto_log(f"extrato_{processo}.pdf", "unimed", "extrair_texto"):
+        for indice in range(mensagens):
+            logger.debug("Página %d do processo %d: %s", indice, processo, "x" * 200)
+    return mensagens
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mensagens", type=int, default=50000)
+    parser.add_argument("--processos", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        arquivo = os.path.join(pasta, "app.log")
+
+        logger = setup_logger(arquivo, nivel="INFO", em_fila=False)
+        caminho = "pdfs/unimed/extrato.pdf"
+        adiada = por_chamada(lambda indice: logger.debug("Lendo página %d de %s", indice, caminho), args.mensagens)
+        formatada = por_chamada(lambda indice: logger.debug(f"Lendo página {indice} de {caminho}"), args.mensagens)
+        print("depuração desativada (nível INFO):")
+        print(f"  argumentos adiados  {adiada * 1e9:8.0f} ns/mensagem")
+        print(f"  f-string            {formatada * 1e9:8.0f} ns/mensagem")
+
+        print("depuração ativada: custo para quem registra e até a gravação de todas as mensagens:")
+        for descricao, em_fila in (("direto no arquivo", False), ("pela fila", True)):
+            for formato in ("texto", "json"):
+                logger = setup_logger(arquivo, nivel="DEBUG", formato=formato, em_fila=em_fila)
+                inicio = time.perf_counter()
+                with contexto_log(caminho, "unimed", "extrair_texto"):
+                    segundos = por_chamada(lambda indice: logger.debug("Lendo página %d de %s", indice, caminho), args.mensagens)
+                encerrar_logger()
+                total = (time.perf_counter() - inicio) / args.mensagens
+                print(f"  {descricao:<18} {formato:<6} {segundos * 1e6:8.2f} µs/mensagem  ({total * 1e6:.2f} µs com a gravação)")
+
+        os.remove(arquivo)
+        logger = setup_logger(arquivo, nivel="DEBUG", formato="json", em_fila=True)
+        por_processo = max(1, args.mensagens // args.processos)
+        inicio = time.perf_counter()
+        with ProcessPoolExecutor(args.processos, initializer=configurar_processo, initargs=(fila_log(), logger.level)) as executor:
+            total = sum(executor.map(registrar, range(args.processos), [por_processo] * args.processos))
+        encerrar_logger()
+        segundos = time.perf_counter() - inicio
+
+        with open(arquivo, encoding="utf-8") as log:
+            linhas = log.read().splitlines()
+        inteiras = 0
+        for linha in linhas:
+            try:
+                dados = json.loads(linha)
+            except ValueError:
+                continue
+            inteiras += dados["etapa"] == "extrair_texto" and dados["arquivo"].startswith("extrato_")
+
+    situacao = "ok" if inteiras == len(linhas) == total else "DIVERGENTE"
+    print(f"{args.processos} processos pela fila: {total} mensagens em {segundos:.2f}s,"
+          f" {inteiras} de {len(linhas)} linhas JSON inteiras e com contexto: {situacao}")
+
+if __name__ == "__main__":
+    main()
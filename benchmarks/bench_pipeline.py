@@ -0,0 +1,199 @@
+"""
+Benchmark das etapas do processamento com extratos sintéticos, sem depender
+dos PDFs de ./pdfs.
+
+Para cada plano gera um PDF no layout correspondente (ver
+benchmarks/sinteticos.py) e mede separadamente a leitura (ler_pdf), a
+extração (_extrair_dados_<plano>), a normalização e a gravação
+(salvar_dados_planilha, RelatorioPlanilha e salvar_dados), em páginas/s,
+linhas/s e pico de memória residente. A extração também é conferida contra
+a quantidade de procedimentos gerados.
+
+Os resultados podem ser gravados como baseline em JSON e comparados em
+execuções futuras; a comparação sai com código 1 se alguma etapa ficar mais
+lenta que a tolerância.
+
+Uso:
+    python -m benchmarks.bench_pipeline [--planos unimed amil] [--paginas 200]
+        [--procedimentos-por-pagina 30] [--salvar-baseline arquivo.json]
+        [--baseline arquivo.json] [--tolerancia 0.25]
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+
+from benchmarks.sinteticos import PLANOS, gerar_paginas, escrever_pdf
+from utilitarios.logger_config import logger
+from utilitarios.extratores import ExtratorPDF
+from utilitarios.helper import criar_planilha_inicial, salvar_dados_planilha, salvar_dados
+from utilitarios.metricas import pico_memoria_mb
+from utilitarios.normalizacao import normalizar_dados
+from utilitarios.registros import TabelaRegistros
+from utilitarios.relatorio import RelatorioPlanilha
+
+def _zerar_pico_rss():
+    """Reinicia o pico de memória do processo (Linux); nos demais sistemas o pico é acumulado."""
+
+    try:
+        with open("/proc/self/clear_refs", "w") as arquivo:
+            arquivo.write("5")
+    except OSError:
+        pass
+
+def _pico_rss_mb():
+    try:
+        with open("/proc/self/status") as arquivo:
+            for linha in arquivo:
+                if linha.startswith("VmHWM:"):
+                    return round(int(linha.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return pico_memoria_mb()
+
+def _formatar_mb(mb:float):
+    return f"{mb:7.1f} MB" if mb is not None else "      - MB"
+
+def medir_etapa(funcao, paginas:int = None, linhas:int = None):
+    """
+    Executa uma etapa e mede tempo, vazão e pico de memória.
+
+    Returns:
+        tuple: (resultado da etapa, dicionário de métricas)
+    """
+
+    _zerar_pico_rss()
+    inicio = time.perf_counter()
+    resultado = funcao()
+    segundos = time.perf_counter() - inicio
+
+    metricas = {"segundos": round(segundos, 4), "pico_rss_mb": _pico_rss_mb()}
+    if paginas:
+        metricas["paginas_s"] = round(paginas / segundos, 1)
+    if linhas:
+        metricas["linhas_s"] = round(linhas / segundos, 1)
+    return resultado, metricas
+
+def executar_plano(plano:str, paginas:int, procedimentos_por_pagina:int, pasta:str):
+    """Mede todas as etapas de um plano, gerando os arquivos em `pasta`."""
+
+    textos, esperados = gerar_paginas(plano, paginas, procedimentos_por_pagina)
+    caminho_pdf = os.path.join(pasta, f"{plano}.pdf")
+    escrever_pdf(textos, caminho_pdf)
+
+    extrator = ExtratorPDF(caminho_pdf, plano, cache=None)
+    etapas = {}
+
+    _, etapas["ler_pdf"] = medir_etapa(extrator.ler_pdf, paginas=paginas)
+
+    # A extração consome o texto já lido, para não medir o PyPDF2 de novo
+    paginas_lidas = list(extrator.ler_paginas())
+
+    def _extrair():
+        tabela = TabelaRegistros(plano)
+        tabela.estender(extrator.iterar_dados(iter(paginas_lidas)))
+        return tabela
+
+    tabela, etapas[f"_extrair_dados_{plano}"] = medir_etapa(_extrair, paginas=paginas, linhas=esperados)
+    if len(tabela) != esperados:
+        raise AssertionError(f"{plano}: {len(tabela)} procedimentos extraídos, {esperados} esperados")
+
+    df, etapas["normalizacao"] = medir_etapa(lambda: normalizar_dados(tabela, plano), linhas=len(tabela))
+
+    arquivo_planilha = os.path.join(pasta, f"{plano}_planilha.xlsx")
+    criar_planilha_inicial(arquivo_planilha)
+    _, etapas["salvar_dados_planilha"] = medir_etapa(lambda: salvar_dados_planilha(df, plano, arquivo_planilha), linhas=len(df))
+
+    def _relatorio():
+        relatorio = RelatorioPlanilha(os.path.join(pasta, f"{plano}_relatorio.xlsx"))
+        relatorio.adicionar(df, plano)
+        relatorio.salvar()
+
+    _, etapas["RelatorioPlanilha"] = medir_etapa(_relatorio, linhas=len(df))
+
+    # salvar_dados grava no diretório atual
+    diretorio_atual = os.getcwd()
+    os.chdir(pasta)
+    try:
+        _, etapas["salvar_dados"] = medir_etapa(lambda: salvar_dados(df, plano, "csv"), linhas=len(df))
+    finally:
+        os.chdir(diretorio_atual)
+
+    return {"paginas": paginas, "linhas": esperados, "etapas": etapas}
+
+def comparar(resultados:dict, baseline:dict, tolerancia:float):
+    """
+    Compara o tempo de cada etapa com o baseline.
+
+    Returns:
+        list: Descrição das etapas que ficaram mais lentas que a tolerância.
+    """
+
+    regressoes = []
+    for plano, resultado in resultados.items():
+        anteriores = baseline.get("planos", {}).get(plano, {}).get("etapas", {})
+        for etapa, metricas in resultado["etapas"].items():
+            anterior = anteriores.get(etapa)
+            if not anterior or not anterior["segundos"]:
+                continue
+            razao = metricas["segundos"] / anterior["segundos"]
+            print(f"  {plano:16} {etapa:32} {razao:6.2f}x o baseline")
+            if razao > 1 + tolerancia:
+                regressoes.append(f"{plano}/{etapa}: {anterior['segundos']}s -> {metricas['segundos']}s")
+    return regressoes
+
+def imprimir(resultados:dict):
+    for plano, resultado in resultados.items():
+        print(f"{plano}: {resultado['paginas']} páginas, {resultado['linhas']} procedimentos")
+        for etapa, metricas in resultado["etapas"].items():
+            vazao = "  ".join(f"{metricas[chave]:>10} {chave.replace('_s', '/s')}" for chave in ("paginas_s", "linhas_s") if chave in metricas)
+            print(f"  {etapa:32} {metricas['segundos']:8.3f}s  {_formatar_mb(metricas['pico_rss_mb'])}  {vazao}")
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Benchmark das etapas de processamento com extratos sintéticos.")
+    parser.add_argument("--planos", nargs="+", choices=PLANOS, default=PLANOS)
+    parser.add_argument("--paginas", type=int, default=100)
+    parser.add_argument("--procedimentos-por-pagina", type=int, default=30)
+    parser.add_argument("--salvar-baseline", metavar="ARQUIVO", help="grava os resultados como baseline")
+    parser.add_argument("--baseline", metavar="ARQUIVO", help="compara os resultados com um baseline gravado")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="aumento de tempo aceito por etapa (padrão: 0.25 = 25%%)")
+    args = parser.parse_args(argumentos)
+
+    # Apenas avisos e erros do processamento, para não poluir a saída
+    logger.setLevel(logging.WARNING)
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as pasta:
+        for plano in args.planos:
+            resultados[plano] = executar_plano(plano, args.paginas, args.procedimentos_por_pagina, pasta)
+    imprimir(resultados)
+
+    relatorio = {
+        "parametros": {"paginas": args.paginas, "procedimentos_por_pagina": args.procedimentos_por_pagina},
+        "planos": resultados,
+    }
+
+    if args.salvar_baseline:
+        with open(args.salvar_baseline, "w", encoding="utf-8") as arquivo:
+            json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+        print(f"Baseline gravado em {args.salvar_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as arquivo:
+            baseline = json.load(arquivo)
+        if baseline.get("parametros") != relatorio["parametros"]:
+            print(f"Aviso: baseline gerado com outros parâmetros: {baseline.get('parametros')}")
+        print(f"Comparação com {args.baseline}:")
+        regressoes = comparar(resultados, baseline, args.tolerancia)
+        if regressoes:
+            print("Etapas mais lentas que o baseline:")
+            for regressao in regressoes:
+                print(f"  {regressao}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
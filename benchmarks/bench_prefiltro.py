@@ -0,0 +1,75 @@
+"""
+Benchmark do pré-filtro de páginas (utilitarios.prefiltro).
+
+Para cada plano monta um extrato sintético com páginas de procedimentos
+(benchmarks/sinteticos.py) entre blocos de capa, resumo e texto legal, e
+mede a extração com e sem o pré-filtro, conferindo que os registros são os
+mesmos e quantas páginas foram ignoradas.
+
+Uso:
+    python -m benchmarks.bench_prefiltro [--planos unimed amil] [--paginas 100]
+        [--paginas-sem-registros 200]
+"""
+import sys
+import time
+import random
+import logging
+import argparse
+
+from benchmarks.sinteticos import PLANOS, gerar_paginas
+from utilitarios.logger_config import logger
+from utilitarios.extratores import ExtratorPDF
+
+CLAUSULAS = [
+    "Art. 5º - O prestador obriga-se a manter os dados cadastrais atualizados, nos termos do § 2º.",
+    "Cláusula 12.3: a vigência do contrato é de 12 (doze) meses, renovável automaticamente.",
+    "Glossário - Glosa: valor não reconhecido pela operadora, conforme a tabela vigente;",
+    "RESUMO DO PERÍODO - Quantidade de guias, valores apresentados, processados e liberados.",
+    "Em caso de divergência, o prestador poderá recorrer em até 30 (trinta) dias corridos.",
+]
+
+def pagina_sem_registros(aleatorio:random.Random, linhas:int = 40):
+    return "\n".join(aleatorio.choice(CLAUSULAS) for _ in range(linhas)) + "\n"
+
+def montar_extrato(plano:str, paginas:int, paginas_sem_registros:int, semente:int = 0):
+    """Intercala as páginas de procedimentos com blocos de páginas sem registros."""
+
+    aleatorio = random.Random(semente)
+    com_registros, _ = gerar_paginas(plano, paginas, semente=semente)
+    blocos = 4
+    extrato = []
+    for bloco in range(blocos):
+        extrato.extend(pagina_sem_registros(aleatorio) for _ in range(paginas_sem_registros // blocos))
+        extrato.extend(com_registros[bloco * paginas // blocos:(bloco + 1) * paginas // blocos])
+    return extrato
+
+def medir(plano:str, paginas:list[str], prefiltro:bool):
+    extrator = ExtratorPDF(f"sintetico_{plano}.pdf", plano, cache=None)
+    inicio = time.perf_counter()
+    registros = list(extrator.iterar_dados(iter(paginas), prefiltro=prefiltro))
+    return registros, time.perf_counter() - inicio, extrator.metricas
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--planos", nargs="+", default=PLANOS, choices=PLANOS)
+    parser.add_argument("--paginas", type=int, default=100, help="páginas com procedimentos")
+    parser.add_argument("--paginas-sem-registros", type=int, default=200, help="páginas de capa, resumo e texto legal")
+    args = parser.parse_args()
+
+    logger.setLevel(logging.ERROR)
+    print(f"{'plano':<16} {'páginas':>8} {'ignoradas':>10} {'sem filtro (s)':>15} {'com filtro (s)':>15} {'registros':>10}")
+    divergente = False
+    for plano in args.planos:
+        paginas = montar_extrato(plano, args.paginas, args.paginas_sem_registros)
+        sem_filtro, segundos_sem, _ = medir(plano, paginas, prefiltro=False)
+        com_filtro, segundos_com, metricas = medir(plano, paginas, prefiltro=True)
+        divergente |= sem_filtro != com_filtro
+
+        situacao = "" if sem_filtro == com_filtro else "  DIVERGENTE"
+        print(f"{plano:<16} {len(paginas):>8} {metricas.paginas_ignoradas:>10} {segundos_sem:>15.3f}"
+              f" {segundos_com:>15.3f} {len(com_filtro):>10}{situacao}")
+
+    return 1 if divergente else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
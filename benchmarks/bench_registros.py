@@ -0,0 +1,72 @@
+"""
+Compara a memória ocupada pelos registros extraídos em três formatos: lista
+de dicionários (formato antigo), lista de Procedimento (__slots__) e
+TabelaRegistros (colunas codificadas por dicionário). Mede também a
+conversão da tabela em DataFrame e confere que a tabela continua aceitando
+registros depois dela.
+
+Uso:
+    python -m benchmarks.bench_registros [quantidade_de_registros]
+"""
+import sys
+import time
+import random
+import tracemalloc
+
+from utilitarios.registros import Procedimento, TabelaRegistros
+
+def gerar_registros(quantidade:int, semente:int = 0):
+    """Gera procedimentos sintéticos com a repetição típica de um extrato."""
+
+    aleatorio = random.Random(semente)
+    beneficiarios = [f"BENEFICIARIO {i:05d} DA SILVA" for i in range(max(1, quantidade // 8))]
+    procedimentos = ["CONSULTA ODONTOLOGICA INICIAL", "PROFILAXIA", "RESTAURACAO EM RESINA", "RASPAGEM SUPRA-GENGIVAL"]
+    for i in range(quantidade):
+        # Strings novas a cada registro, como saem dos grupos do regex
+        yield Procedimento(
+            gto=str(35000000 + i // 4),
+            nome_beneficiario="".join(aleatorio.choice(beneficiarios)),
+            codigo_procedimento=str(81000000 + aleatorio.randrange(40)),
+            nome_procedimento="".join(aleatorio.choice(procedimentos)),
+            dente_regiao=str(aleatorio.randrange(11, 49)),
+            status="".join("Pago"),
+            valor_apresentado=f"{aleatorio.randrange(10, 300)},00",
+            valor_glosa="0,00",
+            valor_processado=f"{aleatorio.randrange(10, 300)},00",
+            data_realizacao=f"{aleatorio.randrange(1, 29):02d}/08/2024",
+        )
+
+def medir(construir):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = construir()
+    tempo = time.perf_counter() - inicio
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return resultado, memoria, tempo
+
+def executar(quantidade:int):
+    _, memoria_dicts, tempo_dicts = medir(lambda: [registro.como_dict() for registro in gerar_registros(quantidade)])
+    _, memoria_slots, tempo_slots = medir(lambda: list(gerar_registros(quantidade)))
+
+    def _tabela():
+        tabela = TabelaRegistros("unimed")
+        tabela.estender(gerar_registros(quantidade))
+        return tabela
+
+    tabela, memoria_tabela, tempo_tabela = medir(_tabela)
+
+    inicio = time.perf_counter()
+    df = tabela.para_dataframe()
+    tempo_df = time.perf_counter() - inicio
+    tabela.estender(gerar_registros(1, semente=1))
+    independente = len(df) == len(tabela) - 1
+
+    print(f"{quantidade} registros")
+    print(f"  lista de dicts      {memoria_dicts / 2**20:8.1f} MB  {tempo_dicts:6.2f}s")
+    print(f"  lista de slots      {memoria_slots / 2**20:8.1f} MB  {tempo_slots:6.2f}s")
+    print(f"  TabelaRegistros     {memoria_tabela / 2**20:8.1f} MB  {tempo_tabela:6.2f}s  ({memoria_dicts / memoria_tabela:.1f}x menor)")
+    print(f"  para_dataframe      {tempo_df * 1000:8.1f} ms  tabela segue aceitando registros: {independente}")
+
+if __name__ == "__main__":
+    executar(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,78 @@
+"""
+Benchmark do relatório em passada única (utilitarios.relatorio.RelatorioPlanilha).
+
+Escreve procedimentos sintéticos (benchmarks/bench_registros.py) de vários
+planos em um relatório, com uma planilha por plano e virada para planilhas
+de continuação, e mede o tempo, as linhas/s e o pico de memória. Confere
+também que o resumo e os totais cobrem exatamente as linhas escritas.
+
+Referência (append do modo write-only do openpyxl, com as células
+estilizadas reaproveitadas, ver RelatorioPlanilha): 100 mil linhas em
+12,2s (cerca de 8 mil linhas/s) e 133 MB de pico de memória. Quase todo o
+tempo fica na conversão e serialização das células pelo próprio openpyxl.
+
+Uso:
+    python -m benchmarks.bench_relatorio [--registros 100000 500000] [--planos 2]
+        [--linhas-por-planilha 200000]
+"""
+import os
+import time
+import logging
+import argparse
+import tempfile
+
+from benchmarks.bench_registros import gerar_registros
+from utilitarios.logger_config import logger
+from utilitarios.metricas import pico_memoria_mb
+from utilitarios.normalizacao import normalizar_dados
+from utilitarios.registros import TabelaRegistros
+from utilitarios.relatorio import LINHAS_POR_PLANILHA, PLANILHA_RESUMO, RelatorioPlanilha
+
+def medir(registros:int, planos:int, linhas_por_planilha:int):
+    """Escreve `registros` procedimentos divididos entre `planos` planos e imprime o tempo e a conferência."""
+
+    dados = {}
+    for indice in range(planos):
+        tabela = TabelaRegistros(f"plano_{indice + 1}")
+        tabela.estender(gerar_registros(registros // planos, semente=indice))
+        dados[tabela.plano] = normalizar_dados(tabela, tabela.plano)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        arquivo = os.path.join(pasta, "relatorio.xlsx")
+        inicio = time.perf_counter()
+        relatorio = RelatorioPlanilha(arquivo, linhas_por_planilha)
+        trechos = {plano: relatorio.adicionar(df, plano) for plano, df in dados.items()}
+        relatorio.salvar()
+        segundos = time.perf_counter() - inicio
+        tamanho = os.path.getsize(arquivo)
+
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(arquivo, read_only=True)
+        linhas_resumo = [linha for linha in workbook[PLANILHA_RESUMO].iter_rows(min_row=2, values_only=True) if linha[0] != "TOTAL"]
+        workbook.close()
+
+    total = sum(len(df) for df in dados.values())
+    escritas = sum(linhas for trechos_plano in trechos.values() for _, _, linhas in trechos_plano)
+    no_resumo = sum(linha[2] for linha in linhas_resumo)
+    pico = pico_memoria_mb()
+    print(f"{total} linhas em {len(relatorio.partes)} planilhas: {segundos:.2f}s ({total / segundos:,.0f} linhas/s),"
+          f" {tamanho / 2**20:.1f} MB, pico de memória {f'{pico:.0f} MB' if pico is not None else 'indisponível'}")
+    for plano, trechos_plano in trechos.items():
+        print(f"  {plano}: {', '.join(f'{planilha} ({linhas})' for planilha, _, linhas in trechos_plano)}")
+    print(f"  linhas escritas {escritas}, no resumo {no_resumo}: {'ok' if escritas == no_resumo == total else 'DIVERGENTE'}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--registros", type=int, nargs="+", default=[100000, 500000],
+                        help="total de procedimentos de cada relatório, divididos entre os planos")
+    parser.add_argument("--planos", type=int, default=2)
+    parser.add_argument("--linhas-por-planilha", type=int, default=LINHAS_POR_PLANILHA)
+    args = parser.parse_args()
+
+    logger.setLevel(logging.ERROR)
+    for registros in args.registros:
+        medir(registros, args.planos, args.linhas_por_planilha)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark do tokenizador de linhas (utilitarios.tokenizador).
+
+Para cada plano com tokenizador, extrai um extrato sintético
+(benchmarks/sinteticos.py) e os PDFs de amostra em ./pdfs pelos padrões
+sobre o texto inteiro e pelo tokenizador, e mede o tempo e os registros/s
+de cada caminho, conferindo que os registros são os mesmos. O texto também
+é recortado em "páginas" de tamanhos arbitrários, para conferir os nomes e
+procedimentos que atravessam a quebra de página, e quebrado antes da data
+de cada procedimento, como as descrições longas que continuam na linha
+seguinte.
+
+Uso:
+    python -m benchmarks.bench_tokenizador [--planos rede_unna amil] [--paginas 2000]
+        [--recortes 1000 7919]
+"""
+import os
+import re
+import sys
+import glob
+import time
+import logging
+import argparse
+
+from benchmarks.sinteticos import gerar_paginas
+from utilitarios.logger_config import logger
+from utilitarios.extratores import ExtratorPDF
+from utilitarios.tokenizador import PLANOS_TOKENIZADOS
+
+def recortar(paginas:list[str], tamanho:int):
+    texto = "".join(paginas)
+    return [texto[inicio:inicio + tamanho] for inicio in range(0, len(texto), tamanho)]
+
+def quebrar_linhas(paginas:list[str]):
+    return [re.sub(r" (\d{2}/\d{2}/\d{4} )", r"\n\1", pagina) for pagina in paginas]
+
+def medir(plano:str, paginas:list[str], tokenizar:bool):
+    extrator = ExtratorPDF(f"sintetico_{plano}.pdf", plano, cache=None, tokenizar=tokenizar)
+    inicio = time.perf_counter()
+    registros = list(extrator.iterar_dados(iter(paginas), prefiltro=False))
+    return registros, time.perf_counter() - inicio
+
+def extratos(plano:str, paginas:int, recortes:list[int]):
+    """Extratos (descrição, páginas) de um plano: sintético, amostras e os recortes de cada um."""
+
+    sintetico, _ = gerar_paginas(plano, paginas)
+    originais = [("sintético", sintetico)]
+    for caminho in sorted(glob.glob(os.path.join("pdfs", plano, "*.pdf"))):
+        originais.append((os.path.basename(caminho), list(ExtratorPDF(caminho, plano, cache=None).ler_paginas())))
+
+    for nome, paginas_extrato in originais:
+        yield nome, paginas_extrato
+        yield f"{nome} em linhas quebradas", quebrar_linhas(paginas_extrato)
+        for tamanho in recortes:
+            yield f"{nome} em recortes de {tamanho}", recortar(paginas_extrato, tamanho)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--planos", nargs="+", default=sorted(PLANOS_TOKENIZADOS), choices=sorted(PLANOS_TOKENIZADOS))
+    parser.add_argument("--paginas", type=int, default=2000, help="páginas do extrato sintético")
+    parser.add_argument("--recortes", type=int, nargs="*", default=[1000, 7919], help="tamanhos das páginas recortadas")
+    args = parser.parse_args()
+
+    logger.setLevel(logging.ERROR)
+    print(f"{'plano':<10} {'extrato':<36} {'registros':>10} {'padrões (s)':>12} {'tokenizador (s)':>16} {'registros/s':>12} {'ganho':>6}")
+    divergente = False
+    for plano in args.planos:
+        for nome, paginas in extratos(plano, args.paginas, args.recortes):
+            esperados, segundos_padroes = medir(plano, paginas, tokenizar=False)
+            obtidos, segundos_tokenizador = medir(plano, paginas, tokenizar=True)
+            divergente |= esperados != obtidos
+
+            situacao = "" if esperados == obtidos else f"  DIVERGENTE ({len(esperados)} pelos padrões)"
+            print(f"{plano:<10} {nome[:36]:<36} {len(obtidos):>10} {segundos_padroes:>12.3f} {segundos_tokenizador:>16.3f}"
+                  f" {len(obtidos) / max(segundos_tokenizador, 1e-9):>12,.0f} {segundos_padroes / max(segundos_tokenizador, 1e-9):>5.1f}x{situacao}")
+
+    return 1 if divergente else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
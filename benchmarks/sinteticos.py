@@ -0,0 +1,187 @@
+"""
+Geradores de extratos sintéticos nos layouts de cada plano suportado.
+
+O texto de cada página imita o que o PyPDF2 extrai dos PDFs reais (ou, para
+os planos sem amostra em ./pdfs, o que as expressões de extratores.py
+esperam), com nomes, códigos e valores aleatórios a partir de uma semente
+fixa. escrever_pdf grava as páginas em um PDF simples, para medir também a
+leitura do arquivo.
+"""
+import random
+
+PLANOS = ["odonto_empresas", "unimed", "rede_unna", "amil", "samp"]
+
+NOMES = ["ALICIA", "BRUNO", "CARLA", "DANIEL", "EDUARDA", "FELIPE", "GABRIELA", "HEITOR", "ISABELA", "JOAO", "LARA", "MATEUS"]
+SOBRENOMES = ["SILVA", "SOUZA", "OLIVEIRA", "PEREIRA", "COSTA", "RODRIGUES", "ALMEIDA", "NASCIMENTO", "CARVALHO", "FERREIRA"]
+PROCEDIMENTOS = [
+    ("81000065", "CONSULTA ODONTOLOGICA INICIAL"),
+    ("84000198", "PROFILAXIA: POLIMENTO CORONARIO"),
+    ("84000112", "APLICAÇÃO TÓPICA DE VERNIZ"),
+    ("85100099", "RESTAURACAO EM RESINA FOTOPOLIMERIZAVEL"),
+    ("91000076", "PACOTE PERIODONTAL BASICO"),
+    ("85300020", "RASPAGEM SUPRA GENGIVAL"),
+]
+DENTES = ["11", "12", "21", "22", "36", "46", "AS", "AI", "ASAI"]
+FACES = ["O", "M", "D", "V", "L", "MO", "OD"]
+
+class GeradorExtrato:
+    """
+    Gera páginas de texto de um plano e conta quantos procedimentos foram
+    escritos, para conferir a extração.
+    """
+
+    def __init__(self, plano:str, semente:int = 0):
+        if plano not in PLANOS:
+            raise ValueError(f"Plano de saúde desconhecido: {plano}")
+        self.plano = plano
+        self.aleatorio = random.Random(semente)
+        self.procedimentos = 0
+
+    def _nome(self):
+        escolha = self.aleatorio.choice
+        return f"{escolha(NOMES)} {escolha(SOBRENOMES)} {escolha(SOBRENOMES)}"
+
+    def _data(self):
+        return f"{self.aleatorio.randrange(1, 29):02d}/08/2024"
+
+    def _valor(self, separador:str = ","):
+        # Valores abaixo de 100 cabem nos campos de largura fixa do Amil
+        return f"{self.aleatorio.randrange(10, 99)}{separador}{self.aleatorio.randrange(100):02d}"
+
+    def paginas(self, quantidade:int, procedimentos_por_pagina:int = 30):
+        """Gera o texto de `quantidade` páginas."""
+
+        gerar = getattr(self, f"_pagina_{self.plano}")
+        for numero in range(1, quantidade + 1):
+            yield gerar(numero, quantidade, procedimentos_por_pagina)
+
+    def _pagina_odonto_empresas(self, numero, total, quantidade):
+        linhas = [
+            "DEMONSTRATIVO DE PAGAMENTO ODONTO EMPRESAS",
+            f"Página {numero} de {total}",
+            "Data Procedimento Informado Processado Liberado Glosa Lote",
+        ]
+        for _ in range(quantidade):
+            valor = self._valor()
+            codigo, _ = self.aleatorio.choice(PROCEDIMENTOS)
+            linhas.append(f"{self._data()} {codigo} {valor} {valor} {valor} 0,00 {self.aleatorio.randrange(10**6, 10**7)}")
+            self.procedimentos += 1
+        return "\n".join(linhas)
+
+    def _pagina_unimed(self, numero, total, quantidade):
+        linhas = [
+            "103397159 - ODONTORISOS Pessoa Jurídica 09/2024 COMPETÊNCIA: PRESTADOR:Emissão:",
+            f"Página:18/12/2024\nDEMONSTRATIVO ANALÍTICO DE PAGAMENTO DE PRESTADOR{numero}   de{total}",
+        ]
+        while quantidade > 0:
+            gto = self.aleatorio.randrange(35000000, 36000000)
+            linhas.append(f"GTO: CÓDIGO E NOME DO BENEFICIÁRIO: {gto} {self.aleatorio.randrange(10**16, 10**17):017d} - {self._nome()}")
+            linhas.append("CÓDIGO DESCRIÇÃO DO PROCEDIMENTO DT / AREA FACE STATUSVALOR\nAPRESENTADO\nCONTAVALOR\nGLOSADO\nCONTAVALOR\nPAGO\nCONTADATA DE\nATENDIMENTO")
+            for _ in range(min(quantidade, self.aleatorio.randrange(1, 4))):
+                codigo, descricao = self.aleatorio.choice(PROCEDIMENTOS)
+                valor = self._valor()
+                if self.aleatorio.random() < 0.1:
+                    linhas.append(f"{codigo} {descricao} Não autorizado 0,00 0,00 0,00 {self.aleatorio.choice(DENTES)}")
+                else:
+                    linhas.append(f"{codigo} {descricao} Pago {valor} 0,00 {valor} {self._data()} {self.aleatorio.choice(DENTES)}")
+                self.procedimentos += 1
+                quantidade -= 1
+            linhas.append("TOTAL DA FICHA 0,00 0,00 0,00\nOBSERVAÇÕES PARA O PRESTADOR:")
+        return "\n".join(linhas)
+
+    def _pagina_rede_unna(self, numero, total, quantidade):
+        linhas = [
+            "DEMONSTRATIVO DE PAGAMENTO - TRATAMENTO ODONTOLÓGICO 2 - Nº 20240900000000376052",
+            f"Página {numero} de {total}",
+        ]
+        while quantidade > 0:
+            nome = self._nome()
+            linhas.append("Dados do Pagamento")
+            linhas.append(f"{self.aleatorio.randrange(10**8, 10**9)} {self.aleatorio.randrange(10**13, 10**14)} {nome} 9 - Número do Documento Fiscal 13 - Número da Guia")
+            linhas.append(f"14 - Tabela 15 - Código do Procedimento 16 - Descrição 26 - Código da GlosaDt. Pagto. 02/09/2024{nome}12 - Nome Civil")
+            for _ in range(min(quantidade, self.aleatorio.randrange(1, 5))):
+                valor = self._valor(".")
+                codigo = self.aleatorio.choice(["83.000.089", "00.900.020", "00.900.031", "85.100.099"])
+                descricao = self.aleatorio.choice(["Exo Decíduo", "Rasp.Supra/cons", "Orien.Hig.Bucal", "Restauração Resina"])
+                linhas.append(f"22 {codigo} {descricao} {self.aleatorio.choice(DENTES)} {self._data()} 1 {valor} {valor} 0.00 0.00 {valor}")
+                self.procedimentos += 1
+                quantidade -= 1
+            linhas.append("27 - Observação / Justificativa\n     Total de Pontos: 2")
+        return "\n".join(linhas)
+
+    def _pagina_amil(self, numero, total, quantidade):
+        linhas = [
+            "Demonstrativo de Análise de Conta - Amil Dental",
+            f"Página {numero} de {total}",
+        ]
+        while quantidade > 0:
+            linhas.append(f"Nome do Beneficiário {self._nome()}")
+            linhas.append("Descrição Data Face Valor Informado Dente Qtd Código Liberado Glosa Processado Franquia")
+            for _ in range(min(quantidade, self.aleatorio.randrange(1, 5))):
+                codigo, descricao = self.aleatorio.choice(PROCEDIMENTOS)
+                descricao = descricao.replace(":", "")
+                valor = self._valor()
+                linhas.append(f"{descricao} {self._data()} {self.aleatorio.choice(FACES)} {valor} {self.aleatorio.choice(DENTES)} 1 {codigo} {valor} 0,00 {valor} 0,0022")
+                self.procedimentos += 1
+                quantidade -= 1
+        return "\n".join(linhas)
+
+    def _pagina_samp(self, numero, total, quantidade):
+        linhas = [
+            "SAMP - RELATÓRIO DE PRODUÇÃO",
+            f"Página {numero} de {total}",
+        ]
+        for _ in range(quantidade):
+            codigo, descricao = self.aleatorio.choice(PROCEDIMENTOS)
+            escolha = self.aleatorio.choice
+            linhas.append(f"{self._data()}DR(A). BRUNA ESTEVES NUNES{self.aleatorio.randrange(10**8, 10**9)} - {escolha(NOMES)} /")
+            linhas.append(f"{escolha(SOBRENOMES)} {codigo} -{descricao} ({escolha(FACES)}) [GTO {self.aleatorio.randrange(35000000, 36000000)}] Valor: R$ {self._valor()}")
+            self.procedimentos += 1
+        return "\n".join(linhas)
+
+def gerar_paginas(plano:str, paginas:int, procedimentos_por_pagina:int = 30, semente:int = 0):
+    """
+    Gera as páginas de um extrato sintético.
+
+    Returns:
+        tuple: (lista com o texto das páginas, quantidade de procedimentos gerados)
+    """
+
+    gerador = GeradorExtrato(plano, semente)
+    textos = list(gerador.paginas(paginas, procedimentos_por_pagina))
+    return textos, gerador.procedimentos
+
+def _escapar(linha:str):
+    texto = linha.encode("cp1252", "replace")
+    return texto.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+def escrever_pdf(paginas:list[str], caminho:str):
+    """
+    Grava as páginas em um PDF mínimo (Helvetica, uma linha de texto por
+    linha da página), sem depender de bibliotecas de geração de PDF.
+    """
+
+    objetos = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    folhas = []
+    for texto in paginas:
+        linhas = b"".join(b"(" + _escapar(linha) + b") Tj T*\n" for linha in texto.split("\n"))
+        conteudo = b"BT /F1 6 Tf 8 TL 20 820 Td\n" + linhas + b"ET"
+        objetos.append(b"<< /Length %d >>\nstream\n" % len(conteudo) + conteudo + b"\nendstream")
+        objetos.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objetos)))
+        folhas.append(len(objetos))
+    objetos[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % folha for folha in folhas), len(folhas))
+
+    with open(caminho, "wb") as arquivo:
+        arquivo.write(b"%PDF-1.4\n")
+        posicoes = []
+        for numero, objeto in enumerate(objetos, start=1):
+            posicoes.append(arquivo.tell())
+            arquivo.write(b"%d 0 obj\n" % numero + objeto + b"\nendobj\n")
+        inicio_xref = arquivo.tell()
+        arquivo.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1))
+        arquivo.write(b"".join(b"%010d 00000 n \n" % posicao for posicao in posicoes))
+        arquivo.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, inicio_xref))
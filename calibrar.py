@@ -0,0 +1,149 @@
+"""
+Calibra os leitores de texto de PDF (utilitarios.leitores) para cada plano.
+
+Cada leitor disponível extrai os registros de alguns PDFs de amostra do plano.
+Os leitores cujos registros diferem dos do leitor padrão são descartados, e
+o mais rápido entre os demais é gravado na seção [leitores] do arquivo de
+configuração, passando a ser usado nas próximas execuções.
+
+Os PDFs fora da pasta de um plano (como a caixa de entrada) entram no plano
+identificado pelo layout (ver utilitarios.layouts). Um plano do qual nenhum
+leitor extraiu registros não é gravado.
+
+Uso:
+    python calibrar.py [pastas ou PDFs ...] [-p unimed amil] [--amostras 3]
+        [--repeticoes 3] [--config config.ini] [--nao-gravar]
+"""
+import sys
+import time
+import logging
+import argparse
+
+from main import PASTA_PDFS, coletar_pdfs
+from utilitarios.logger_config import logger
+from utilitarios.layouts import LAYOUTS, detectar_plano
+from utilitarios.leitores import CAMINHO_CONFIG, LEITOR_PADRAO, gravar_leitor_do_plano, leitores_disponiveis, obter_leitor
+
+def agrupar_por_layout(arquivos_por_plano:dict, planos:list[str] = None):
+    """
+    Leva os PDFs de pastas que não são de um plano para o plano identificado
+    pelo layout; os de layout desconhecido (ou de um plano não selecionado)
+    ficam de fora.
+
+    Returns:
+        dict: {plano: [caminhos dos PDFs]}, apenas com planos conhecidos.
+    """
+
+    agrupados = {}
+    for plano, arquivos_pdf in arquivos_por_plano.items():
+        if plano in LAYOUTS:
+            agrupados.setdefault(plano, []).extend(arquivos_pdf)
+            continue
+        for caminho_pdf in arquivos_pdf:
+            detectado = detectar_plano(caminho_pdf)
+            if detectado and (not planos or detectado in planos):
+                agrupados.setdefault(detectado, []).append(caminho_pdf)
+            else:
+                motivo = f"plano {detectado} não selecionado" if detectado else "layout não reconhecido"
+                logger.warning(f"{caminho_pdf} ignorado: {motivo}.")
+    return agrupados
+
+def medir_leitor(leitor, arquivos_pdf:list[str], plano:str, repeticoes:int = 1):
+    """
+    Extrai os registros dos PDFs com o leitor, sem cache.
+
+    Returns:
+        tuple: (registros de cada PDF, melhor tempo total em segundos, páginas lidas)
+    """
+
+    from utilitarios.extratores import ExtratorPDF
+
+    melhor = None
+    for _ in range(max(1, repeticoes)):
+        registros = []
+        paginas = 0
+        inicio = time.perf_counter()
+        for caminho_pdf in arquivos_pdf:
+            extrator = ExtratorPDF(caminho_pdf, plano, cache=None, leitor=leitor)
+            registros.append(list(extrator.extrair_dados() or []))
+            paginas += extrator.metricas.paginas
+        segundos = time.perf_counter() - inicio
+        melhor = segundos if melhor is None else min(melhor, segundos)
+    return registros, melhor, paginas
+
+def calibrar_plano(plano:str, arquivos_pdf:list[str], repeticoes:int = 1):
+    """
+    Mede todos os leitores disponíveis nos PDFs do plano.
+
+    Returns:
+        list: Um dicionário por leitor (leitor, segundos, paginas_s,
+        registros, identico), do mais rápido ao mais lento.
+    """
+
+    referencia, _, _ = medir_leitor(obter_leitor(LEITOR_PADRAO), arquivos_pdf, plano)
+    resultados = []
+    for leitor in leitores_disponiveis():
+        try:
+            registros, segundos, paginas = medir_leitor(leitor, arquivos_pdf, plano, repeticoes)
+        except Exception as e:
+            logger.error(f"Erro ao calibrar o leitor {leitor.nome} no plano {plano}: {e}")
+            continue
+        resultados.append({
+            "leitor": leitor.nome,
+            "segundos": segundos,
+            "paginas_s": paginas / segundos if segundos else None,
+            "registros": sum(map(len, registros)),
+            "identico": registros == referencia,
+        })
+    return sorted(resultados, key=lambda resultado: resultado["segundos"])
+
+def main(argumentos:list[str] = None):
+    parser = argparse.ArgumentParser(description="Escolhe, para cada plano, o leitor de PDF mais rápido que extrai os mesmos registros.")
+    parser.add_argument("entradas", nargs="*", default=[PASTA_PDFS],
+                        help=f"pastas com uma subpasta por plano, ou PDFs avulsos (padrão: {PASTA_PDFS})")
+    parser.add_argument("-p", "--planos", nargs="+", help="planos a calibrar (padrão: todos os encontrados)")
+    parser.add_argument("--amostras", type=int, default=3, help="PDFs de cada plano usados na calibração (padrão: 3)")
+    parser.add_argument("--repeticoes", type=int, default=3, help="execuções de cada leitor; vale a mais rápida (padrão: 3)")
+    parser.add_argument("--config", default=CAMINHO_CONFIG, help=f"arquivo de configuração gravado (padrão: {CAMINHO_CONFIG})")
+    parser.add_argument("--nao-gravar", action="store_true", help="apenas mostra os resultados")
+    args = parser.parse_args(argumentos)
+
+    arquivos_por_plano = agrupar_por_layout(coletar_pdfs(args.entradas, args.planos), args.planos)
+    disponiveis = [leitor.nome for leitor in leitores_disponiveis()]
+    print(f"Leitores disponíveis: {', '.join(disponiveis)}")
+
+    nivel = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        for plano, arquivos_pdf in arquivos_por_plano.items():
+            amostras = arquivos_pdf[:max(1, args.amostras)]
+            if not amostras:
+                logger.warning(f"Nenhum PDF para calibrar o plano {plano}.")
+                continue
+
+            print(f"\n{plano} ({len(amostras)} PDF(s)):")
+            resultados = calibrar_plano(plano, amostras, args.repeticoes)
+            for resultado in resultados:
+                paginas_s = f"{resultado['paginas_s']:.1f}" if resultado["paginas_s"] else "-"
+                situacao = "idêntico" if resultado["identico"] else "registros diferentes"
+                print(f"  {resultado['leitor']:<15} {resultado['segundos']:>8.3f}s {paginas_s:>10} páginas/s"
+                      f" {resultado['registros']:>7} registros  {situacao}")
+
+            if not any(resultado["registros"] for resultado in resultados):
+                # Sem registros, todos os leitores seriam "idênticos"
+                print("  -> nenhum registro extraído; nada gravado")
+                continue
+
+            escolhido = next((resultado["leitor"] for resultado in resultados if resultado["identico"]), LEITOR_PADRAO)
+            print(f"  -> {escolhido}")
+            if not args.nao_gravar:
+                gravar_leitor_do_plano(plano, escolhido, args.config)
+    finally:
+        logger.setLevel(nivel)
+
+    if not args.nao_gravar:
+        print(f"\nLeitores gravados em {args.config}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
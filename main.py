@@ -1,58 +1,639 @@
 import os
+import sys
+import argparse
+from collections import Counter
+from typing import TYPE_CHECKING
+from concurrent.futures import ProcessPoolExecutor
 
-from utilitarios.extratores import ExtratorPDF
-from utilitarios.logger_config import logger
+from utilitarios.logger_config import contexto_log, fila_log, logger
 from utilitarios.helper import *
+from utilitarios.banco import CAMINHO_BANCO, BancoHistorico
+from utilitarios.deduplicacao import DEDUPLICAR, Deduplicador
+from utilitarios.isolamento import ISOLAR, MEMORIA_ARQUIVO_MB, TEMPO_ARQUIVO
+from utilitarios.layouts import DETECTAR_PLANO, LAYOUTS, PLANO_A_DETECTAR, detectar_plano
+from utilitarios.manifesto import Manifesto
+from utilitarios.metricas import MetricasArquivo, RelatorioMetricas, pico_memoria_mb
+from utilitarios.registros import TabelaRegistros
 
-def processa_pdfs(caminho_pasta:str, plano:str, formato_arquivo: str):
-    """Processa os PDFs dentro da subpasta de um plano específico."""
+# Leitor de PDF, pandas e openpyxl são importados apenas quando usados, para
+# que --help e execuções pequenas iniciem rápido
+if TYPE_CHECKING:
+    from utilitarios.relatorio import RelatorioPlanilha
 
-    logger.info(f"Processando dados da plataforma {plano}")
-    results = []
+ARQUIVO_RELATORIO = 'Relatório Produção Mensal.xlsx'
+
+# Pasta padrão dos PDFs, com uma subpasta por plano
+PASTA_PDFS = './pdfs'
+
+# Formatos extras em que os dados de cada plano podem ser exportados (ver salvar_dados)
+FORMATOS = ['csv', 'xlsx', 'json', 'xml', 'html']
+
+# Quantidade de processos usados na extração (1 = sequencial)
+NUM_WORKERS = int(os.environ.get("PDF_WORKERS", os.cpu_count() or 1))
+
+# Modo incremental: processa apenas PDFs novos ou alterados desde a última execução
+INCREMENTAL = os.environ.get("PDF_INCREMENTAL", "0") == "1"
+
+# Métricas de cada execução (tempos por arquivo e etapa), gravadas em .json e .csv
+ARQUIVO_METRICAS = os.environ.get("PDF_METRICAS", "metricas_execucao")
+
+def listar_pdfs(caminho_pasta:str, plano:str):
+    """Lista, em ordem alfabética, os PDFs da subpasta de um plano."""
 
     caminho_subpasta = os.path.join(caminho_pasta, plano)
-    arquivos_pdf = [
-        arquivo for arquivo in os.listdir(caminho_subpasta)
+    return [
+        os.path.join(caminho_subpasta, arquivo)
+        for arquivo in sorted(os.listdir(caminho_subpasta))
         if arquivo.endswith('.pdf')
     ]
-    logger.info(f"{len(arquivos_pdf)} Arquivos encontrados.")
-
-    for i, arquivo in enumerate(arquivos_pdf):
-        logger.info(f"Processando arquivo {arquivo} ({i+1}/{len(arquivos_pdf)})")
-        caminho_pdf = os.path.join(caminho_subpasta, arquivo)
-        extrator = ExtratorPDF(caminho_pdf, plano)
-        dados = extrator.extrair_dados()
-        if dados:
-            results.extend(dados)
-
-    # Salvando dados em um arquivo
-    if results:
-        # salvar_dados(results, plano, formato_arquivo)
-        salvar_dados_planilha(results, plano, 'Relatório Produção Mensal.xlsx')
-
-def main():
-    caminho_pasta = './pdfs'
-    tipos_arquivos = ['csv', 'xlsx', 'json', 'xml', 'html']
-    print(f"Qual o formato do arquivo que deseja extrair os dados? ")
-    for i, tipo in enumerate(tipos_arquivos):
-        print(f"{i+1} - {tipo}")
-    
-    escolha_formato = int(input("Escolha o número do formato: "))
-    if escolha_formato - 1 < len(tipos_arquivos):
-        formato_arquivo = tipos_arquivos[escolha_formato - 1]
-        logger.info(f"Formato escolhido: {formato_arquivo}")
+
+def coletar_pdfs(entradas:list[str], planos:list[str] = None):
+    """
+    Reúne os PDFs das entradas, agrupados por plano.
+
+    Cada entrada pode ser uma pasta com uma subpasta por plano (como ./pdfs)
+    ou um PDF avulso, cujo plano é o nome da pasta em que ele está (ou o único
+    plano informado). Os PDFs soltos na raiz de uma pasta (a caixa de
+    entrada) ficam no plano PLANO_A_DETECTAR, e o plano deles é identificado
+    pelo layout na extração (ver extrair_arquivo).
+
+    Returns:
+        dict: {plano: [caminhos dos PDFs]}, com os planos em ordem alfabética
+        (ou na ordem informada).
+    """
+
+    arquivos_por_plano = {plano: [] for plano in planos or []}
+    for entrada in entradas:
+        if os.path.isfile(entrada):
+            if planos and len(planos) == 1:
+                plano = planos[0]
+            else:
+                plano = os.path.basename(os.path.dirname(os.path.abspath(entrada)))
+            if planos and plano not in planos:
+                logger.warning(f"Arquivo {entrada} ignorado: plano {plano} não selecionado.")
+                continue
+            arquivos_por_plano.setdefault(plano, []).append(entrada)
+            continue
+
+        for plano in sorted(listar_subpastas(entrada)):
+            if planos and plano not in planos:
+                continue
+            arquivos_por_plano.setdefault(plano, []).extend(listar_pdfs(entrada, plano))
+
+        if not planos or PLANO_A_DETECTAR in planos:
+            soltos = listar_pdfs(entrada, "")
+            if soltos:
+                arquivos_por_plano.setdefault(PLANO_A_DETECTAR, []).extend(soltos)
+
+    if not planos:
+        arquivos_por_plano = dict(sorted(arquivos_por_plano.items()))
+    return arquivos_por_plano
+
+def extrair_arquivo(caminho_pdf:str, plano:str, executor:ProcessPoolExecutor = None, intervalos:list[tuple[int, int]] = None,
+                    tempo:float = TEMPO_ARQUIVO):
+    """
+    Extrai os dados de um único PDF. Executado dentro dos processos do pool
+    ou, para PDFs divididos em intervalos de páginas, no processo principal,
+    que distribui os intervalos entre os processos do `executor`, com até
+    `tempo` segundos para cada um (ver utilitarios.paralelo.LeituraParalela).
+
+    Os PDFs fora da pasta de um plano têm o plano identificado pelo layout
+    das primeiras páginas (ver utilitarios.layouts), e os de layout
+    desconhecido não são lidos por inteiro. Um PDF na pasta de um plano do
+    qual nenhum procedimento foi extraído tem o layout identificado e, se
+    for o de outro plano, é extraído por ele, com um aviso. Com
+    DETECTAR_PLANO, o layout é conferido antes, e o PDF só é extraído por
+    outro plano se não tiver nenhum padrão da impressão digital do plano da
+    pasta. O plano usado fica nas métricas.
+
+    Returns:
+        tuple: (TabelaRegistros, MetricasArquivo) do PDF.
+    """
+
+    from utilitarios.extratores import ExtratorPDF
+
+    deteccao = MetricasArquivo(caminho_pdf, plano)
+    detectar = DETECTAR_PLANO or plano not in LAYOUTS
+    if detectar:
+        with deteccao.medir("detectar_plano"):
+            detectado = detectar_plano(caminho_pdf, plano_da_pasta=plano)
+        if detectado and detectado != plano:
+            if plano in LAYOUTS:
+                logger.warning(f"{os.path.basename(caminho_pdf)} está na pasta do plano {plano}, mas não tem o layout dele:"
+                               f" extraído como {detectado}.")
+            plano = detectado
+
+    with contexto_log(caminho_pdf, plano):
+        logger.info(f"Processando arquivo {os.path.basename(caminho_pdf)} ({plano})")
+        extrator = ExtratorPDF(caminho_pdf, plano, executor=executor, intervalos=intervalos, tempo=tempo)
+        extrator.metricas.incorporar(deteccao)
+        if plano not in LAYOUTS:
+            logger.warning(f"Layout não reconhecido: {caminho_pdf}")
+            extrator.metricas.erro = "layout não reconhecido"
+            return TabelaRegistros(plano), extrator.metricas
+
+        with extrator.metricas.medir("total"):
+            dados = extrator.extrair_dados() or TabelaRegistros(plano)
+
+        if not len(dados) and not detectar:
+            # PDF colocado na pasta de outro plano: sem nenhum procedimento, confere o layout
+            with extrator.metricas.medir("detectar_plano"):
+                detectado = detectar_plano(caminho_pdf)
+            if detectado and detectado != plano:
+                logger.warning(f"{os.path.basename(caminho_pdf)} está na pasta do plano {plano}, mas nenhum procedimento"
+                               f" foi extraído com o layout dele: extraído como {detectado}.")
+                dados, metricas_arquivo = extrair_arquivo(caminho_pdf, detectado, executor, intervalos, tempo)
+                metricas_arquivo.incorporar(extrator.metricas)
+                return dados, metricas_arquivo
+
+    # Pico do processo que extraiu o arquivo (acumulado entre os arquivos do mesmo worker)
+    extrator.metricas.pico_memoria_mb = pico_memoria_mb()
+    return dados, extrator.metricas
+
+def concluir_extracao(caminho_pdf:str, plano:str, resultado:tuple = None, motivo:str = None):
+    """
+    Resultado final de um PDF: o par (dados, métricas) extraído ou, se a
+    extração falhou, o `motivo`. Os PDFs que falharam, os de layout não
+    reconhecido e os de um plano conhecido dos quais nenhum procedimento
+    foi extraído vão para a quarentena com o motivo, e ficam sem registros.
+
+    Returns:
+        tuple: (TabelaRegistros, MetricasArquivo) do PDF.
+    """
+
+    from utilitarios.quarentena import quarentenar_arquivo
+
+    if motivo is None:
+        dados, metricas_arquivo = resultado
+        if not len(dados) and (metricas_arquivo.plano in LAYOUTS or metricas_arquivo.erro):
+            motivo = "nenhum procedimento extraído"
+            if metricas_arquivo.erro:
+                motivo += f" ({metricas_arquivo.erro})"
     else:
-        logger.error("Formato inválido. Tente novamente.")
-        return
+        dados, metricas_arquivo = TabelaRegistros(plano), MetricasArquivo(caminho_pdf, plano)
+        metricas_arquivo.erro = motivo
+
+    if motivo:
+        metricas_arquivo.quarentena = motivo
+        quarentenar_arquivo(caminho_pdf, motivo, metricas_arquivo.plano)
+    return dados, metricas_arquivo
+
+def extrair_protegido(caminho_pdf:str, plano:str):
+    """extrair_arquivo no próprio processo, com quarentena dos PDFs que falham (ver concluir_extracao)."""
+
+    try:
+        resultado = extrair_arquivo(caminho_pdf, plano)
+    except Exception as e:
+        logger.error(f"Erro ao extrair {caminho_pdf}: {e}")
+        return concluir_extracao(caminho_pdf, plano, motivo=f"{type(e).__name__}: {e}")
+    return concluir_extracao(caminho_pdf, plano, resultado)
+
+def extrair_isolados(tarefas:list[tuple[str, str]], workers:int = NUM_WORKERS):
+    """
+    Extrai cada PDF em um processo próprio, com limites de tempo e memória
+    (ver utilitarios.isolamento), `workers` de cada vez. Os PDFs cujo
+    processo estourou um limite ou falhou em todas as tentativas vão para a
+    quarentena (ver concluir_extracao).
+
+    Returns:
+        list: Pares (TabelaRegistros, MetricasArquivo) de cada PDF, na mesma
+        ordem das tarefas.
+    """
+
+    from utilitarios.isolamento import executar_isolado
+
+    execucoes = executar_isolado(extrair_arquivo, tarefas, workers, descrever=lambda tarefa: os.path.basename(tarefa[0]))
+
+    resultados = []
+    for (caminho_pdf, plano), execucao in zip(tarefas, execucoes):
+        dados, metricas_arquivo = concluir_extracao(caminho_pdf, plano, execucao.resultado, execucao.motivo)
+        metricas_arquivo.tentativas = execucao.tentativas
+        metricas_arquivo.acumular("processo_isolado", execucao.segundos, 0.0)
+        resultados.append((dados, metricas_arquivo))
+    return resultados
+
+def extrair_no_pool(tarefas:list[tuple[str, str]], grandes:list[bool], workers:int, tempo:float = TEMPO_ARQUIVO,
+                    memoria_mb:int = MEMORIA_ARQUIVO_MB):
+    """
+    Extrai os PDFs em um pool de processos compartilhado; os marcados em
+    `grandes` têm as páginas contadas no pool e, se tiverem mais de um
+    intervalo, são divididos (ver utilitarios.paralelo).
+
+    Uma exceção só afeta o próprio PDF, que vai para a quarentena. Se um
+    processo do pool morre (BrokenProcessPool) ou um PDF, ou um intervalo
+    de páginas de um PDF dividido, passa de `tempo` segundos desde que
+    começou a rodar (ver utilitarios.isolamento.RelogioPool), o pool é
+    descartado: os `workers` primeiros PDFs pendentes,
+    os que podiam estar em andamento nele, são refeitos um a um em processos
+    isolados (extrair_isolados), que levam o culpado à quarentena, e os
+    demais seguem em um pool novo.
+
+    Returns:
+        list: Pares (TabelaRegistros, MetricasArquivo) de cada PDF, na mesma
+        ordem das tarefas.
+    """
+
+    from concurrent.futures.process import BrokenProcessPool
+    from utilitarios.isolamento import RelogioPool, encerrar_pool, iniciar_processo_pool
+    from utilitarios.paralelo import dividir_pdf
+
+    resultados = [None] * len(tarefas)
+    restantes = list(range(len(tarefas)))
+    while restantes:
+        # As mensagens dos processos vão para a fila do log do processo principal
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=iniciar_processo_pool,
+                                       initargs=(fila_log(), logger.level, memoria_mb))
+        relogio = RelogioPool(tempo)
+        falha = None
+        try:
+            # As páginas dos PDFs grandes são contadas pelo pool antes de tudo;
+            # os demais PDFs vão inteiros para o pool em seguida
+            contagens = {indice: executor.submit(dividir_pdf, *tarefas[indice]) for indice in restantes if grandes[indice]}
+            futuros = {indice: executor.submit(extrair_arquivo, *tarefas[indice]) for indice in restantes if not grandes[indice]}
+            relogio.acompanhar(*contagens.values(), *futuros.values())
+
+            # Os divididos são costurados aqui, com os intervalos na fila do mesmo pool
+            for indice in restantes:
+                caminho_pdf, plano = tarefas[indice]
+                try:
+                    if indice in contagens:
+                        intervalos = relogio.resultado(contagens[indice])
+                        if len(intervalos) > 1:
+                            resultados[indice] = concluir_extracao(caminho_pdf, plano,
+                                                                   extrair_arquivo(caminho_pdf, plano, executor, intervalos, tempo))
+                            continue
+                        futuros[indice] = executor.submit(extrair_arquivo, caminho_pdf, plano)
+                    resultado = relogio.resultado(futuros[indice])
+                except BrokenProcessPool as e:
+                    falha = str(e) or "processo do pool encerrado"
+                    break
+                except Exception as e:
+                    logger.error(f"Erro ao extrair {caminho_pdf}: {e}")
+                    resultados[indice] = concluir_extracao(caminho_pdf, plano, motivo=f"{type(e).__name__}: {e}")
+                else:
+                    resultados[indice] = concluir_extracao(caminho_pdf, plano, resultado)
+
+            if falha:
+                # Aproveita os PDFs que o pool terminou antes de ser descartado
+                for indice, futuro in futuros.items():
+                    if resultados[indice] is None and futuro.done() and not futuro.cancelled() and not futuro.exception():
+                        resultados[indice] = concluir_extracao(*tarefas[indice], futuro.result())
+        finally:
+            if falha:
+                encerrar_pool(executor)
+            else:
+                executor.shutdown()
+
+        restantes = [indice for indice in restantes if resultados[indice] is None]
+        if falha:
+            suspeitos, restantes = restantes[:workers], restantes[workers:]
+            logger.warning(f"Pool de processos descartado ({falha}); {len(suspeitos)} PDF(s) refeito(s) em processos isolados.")
+            for indice, resultado in zip(suspeitos, extrair_isolados([tarefas[indice] for indice in suspeitos], workers)):
+                resultados[indice] = resultado
+    return resultados
+
+def extrair_pdfs(tarefas:list[tuple[str, str]], workers:int = NUM_WORKERS, isolar:bool = ISOLAR):
+    """
+    Extrai os dados de vários PDFs, em paralelo quando workers > 1. Os PDFs
+    que falham, e os que não têm nenhum procedimento, vão para a quarentena
+    sem interromper os demais (ver concluir_extracao).
+
+    Com `isolar` (PDF_ISOLAR=1), cada PDF roda inteiro em um processo
+    próprio, com limites de tempo e memória (ver extrair_isolados).
+
+    Sem ele (o padrão), os PDFs com mais páginas que PAGINAS_POR_INTERVALO
+    (utilitarios.paralelo) são divididos em intervalos, processados pelo
+    mesmo pool que os demais arquivos, para que um único extrato grande não
+    domine o lote. As páginas só são contadas nos PDFs a partir de
+    TAMANHO_DIVISAO_KB, e nos próprios processos do pool. Os limites de
+    tempo e memória valem também no pool (ver extrair_no_pool).
+
+    Args:
+        tarefas (list): Pares (caminho_pdf, plano) a serem processados.
+        workers (int): Quantidade de processos do pool.
+
+    Returns:
+        list: Pares (TabelaRegistros, MetricasArquivo) de cada PDF, na mesma
+        ordem das tarefas.
+    """
+
+    if not tarefas:
+        return []
+
+    workers = max(1, workers)
+    if isolar:
+        return extrair_isolados(tarefas, workers)
+
+    # Só os PDFs grandes (pelo tamanho do arquivo) têm as páginas contadas
+    grandes = [False] * len(tarefas)
+    if workers > 1:
+        from utilitarios.paralelo import pode_dividir
+        grandes = [pode_dividir(caminho_pdf) for caminho_pdf, _ in tarefas]
+    if not any(grandes):
+        workers = min(workers, len(tarefas))
+    if workers == 1:
+        return [extrair_protegido(caminho_pdf, plano) for caminho_pdf, plano in tarefas]
+    return extrair_no_pool(tarefas, grandes, workers)
+
+def salvar_resultados(results:TabelaRegistros, plano:str, formatos:list[str] = None, relatorio:"RelatorioPlanilha" = None,
+                      metricas:RelatorioMetricas = None, arquivo_relatorio:str = ARQUIVO_RELATORIO,
+                      banco:BancoHistorico = None, origens:list[tuple[str, int]] = None):
+    """
+    Salva os dados extraídos de um plano no relatório: no `relatorio`
+    informado (RelatorioPlanilha ou RelatorioExistente), gravado depois por
+    quem o criou, ou acrescentando ao arquivo existente.
+    Cada formato em `formatos` gera também um arquivo <plano>_dados.<formato>
+    na pasta do relatório.
+
+    Com um BancoHistorico, os dados também são gravados no banco, cada linha
+    ligada ao PDF de origem: `origens` são os pares (caminho_pdf, linhas) na
+    ordem em que os dados de cada PDF aparecem em `results`.
+
+    Returns:
+        list: Trechos (planilha, primeira_linha, linhas) escritos no relatório,
+        ou None se nada foi salvo.
+    """
+
+    from utilitarios.normalizacao import normalizar_dados
+
+    metricas = metricas or RelatorioMetricas()
+    if len(results):
+        # Valores e datas tipados em lote antes de qualquer escrita
+        with metricas.medir(plano, "normalizacao"):
+            results = normalizar_dados(results, plano)
+
+        for formato in formatos or []:
+            try:
+                with metricas.medir(plano, f"salvar_{formato}"):
+                    salvar_dados(results, os.path.join(os.path.dirname(arquivo_relatorio), plano), formato)
+            except Exception as e:
+                logger.error(f"Erro ao exportar os dados de {plano} em {formato}: {e}")
+
+        if banco and origens:
+            try:
+                with metricas.medir(plano, "banco"):
+                    banco.gravar(results, plano, origens)
+            except Exception as e:
+                logger.error(f"Erro ao gravar os dados de {plano} no banco {banco.caminho}: {e}")
+
+        with metricas.medir(plano, "escrita_planilha"):
+            if relatorio:
+                return relatorio.adicionar(results, plano)
+            return salvar_dados_planilha(results, plano, arquivo_relatorio)
+
+def remover_duplicatas(tarefas:list[tuple[str, str]], resultados:list[TabelaRegistros], deduplicador:Deduplicador,
+                       metricas:RelatorioMetricas = None, metricas_arquivos:list = None):
+    """
+    Remove dos resultados de cada PDF os procedimentos que já constam em
+    outro PDF (ver utilitarios.deduplicacao) e relata as duplicatas.
+
+    Returns:
+        list: TabelaRegistros de cada PDF, na ordem das tarefas.
+    """
+
+    metricas = metricas or RelatorioMetricas()
+    with metricas.medir(None, "deduplicacao"):
+        lote, duplicatas = deduplicador.filtrar([
+            (caminho_pdf, plano, dados) for (caminho_pdf, plano), dados in zip(tarefas, resultados)
+        ])
+    deduplicador.relatar(duplicatas)
+
+    por_arquivo = Counter(duplicata.arquivo for duplicata in duplicatas)
+    for (caminho_pdf, _), metricas_arquivo in zip(tarefas, metricas_arquivos or []):
+        metricas_arquivo.duplicatas = por_arquivo[caminho_pdf]
+    return [dados for _, _, dados in lote]
+
+def processa_planos(caminho_pasta, planos:list[str], formatos:list[str] = None, workers:int = NUM_WORKERS,
+                    manifesto:Manifesto = None, relatorio:"RelatorioPlanilha" = None, metricas:RelatorioMetricas = None,
+                    arquivo_relatorio:str = ARQUIVO_RELATORIO, banco:BancoHistorico = None,
+                    deduplicador:Deduplicador = None):
+    """
+    Processa os PDFs de todos os planos com um único pool de processos,
+    salvando os resultados plano a plano, na ordem recebida. Com um
+    RelatorioPlanilha, o relatório é escrito e gravado em uma única passada;
+    sem ele, o relatório existente é carregado uma vez, recebe as remoções e
+    os dados de todos os planos e é gravado uma vez ao final (ver
+    utilitarios.relatorio.RelatorioExistente).
+
+    `caminho_pasta` é uma pasta com subpastas por plano ou uma lista de
+    entradas (pastas ou PDFs avulsos, ver coletar_pdfs).
+
+    Com um manifesto, apenas os PDFs novos ou alterados são extraídos; as
+    linhas antigas dos alterados (ou removidos) saem do relatório e as novas
+    são acrescentadas ao final, sem reescrever as demais.
+
+    Com um Deduplicador, os procedimentos que já constam em outro PDF (desta
+    ou de execuções anteriores) são relatados e não entram no relatório. Em
+    um relatório novo o índice de duplicatas recomeça; no incremental, saem
+    dele os PDFs removidos, alterados ou que não existem mais, e os PDFs que
+    tiveram procedimentos descartados como duplicatas deles são extraídos
+    de novo.
+
+    Cada PDF é salvo no plano identificado pelo layout (ver extrair_arquivo),
+    que pode não ser o da pasta em que ele está.
+
+    Os tempos de cada arquivo e etapa são acumulados em `metricas`. Com um
+    BancoHistorico, os dados de cada PDF também são gravados no banco.
+
+    Returns:
+        bool: False se o relatório não pôde ser gravado; o manifesto, nesse
+        caso, fica como estava, e os PDFs são reprocessados na próxima execução.
+    """
+
+    from utilitarios.relatorio import RelatorioExistente
+
+    metricas = metricas or RelatorioMetricas()
+    novo = relatorio is not None
+    if not novo:
+        relatorio = RelatorioExistente(arquivo_relatorio)
+    entradas = [caminho_pasta] if isinstance(caminho_pasta, str) else list(caminho_pasta)
+    arquivos_por_plano = coletar_pdfs(entradas, planos)
+
+    tarefas = []
+    todos_pdfs = []
+    for plano in planos:
+        arquivos_pdf = arquivos_por_plano.get(plano, [])
+        todos_pdfs.extend(arquivos_pdf)
+        if manifesto:
+            arquivos_pdf = [caminho_pdf for caminho_pdf in arquivos_pdf if not manifesto.inalterado(caminho_pdf)]
+        logger.info(f"{len(arquivos_pdf)} Arquivos encontrados para a plataforma {plano}.")
+        tarefas.extend((caminho_pdf, plano) for caminho_pdf in arquivos_pdf)
+
+    ausentes = []
+    if manifesto:
+        # Linhas de PDFs alterados ou removidos desde a última execução; só
+        # contam como removidos os PDFs das pastas varridas, não os avulsos
+        pastas_varridas = {
+            os.path.normpath(os.path.join(entrada, plano))
+            for entrada in entradas if os.path.isdir(entrada) for plano in planos
+        }
+        if PLANO_A_DETECTAR in planos:
+            pastas_varridas.update(os.path.normpath(entrada) for entrada in entradas if os.path.isdir(entrada))
+        # Um PDF é registrado no plano do layout, que pode não ser o da pasta
+        ausentes = [
+            caminho_pdf for caminho_pdf in manifesto.ausentes(todos_pdfs, list(dict.fromkeys(planos + list(LAYOUTS))))
+            if os.path.dirname(caminho_pdf) in pastas_varridas
+        ]
+
+    if deduplicador:
+        if novo:
+            # Relatório novo: o índice passa a ter só os PDFs desta execução
+            deduplicador.limpar()
+        else:
+            # PDFs removidos, renomeados, movidos ou alterados deixam de ser
+            # donos de procedimentos; os PDFs que tiveram procedimentos
+            # descartados como duplicatas deles são extraídos de novo, depois deles
+            dependentes = deduplicador.esquecer(ausentes + [caminho_pdf for caminho_pdf, _ in tarefas])
+            if manifesto:
+                extraidos = {os.path.normpath(caminho_pdf) for caminho_pdf, _ in tarefas}
+                for caminho_pdf in dependentes:
+                    entrada = manifesto.arquivos.get(caminho_pdf)
+                    if entrada and caminho_pdf not in extraidos:
+                        tarefas.append((caminho_pdf, entrada["plano"]))
+
+    if manifesto:
+        intervalos = []
+        for caminho_pdf in [caminho_pdf for caminho_pdf, _ in tarefas] + ausentes:
+            intervalos.extend(manifesto.remover(caminho_pdf))
+        if not novo:
+            relatorio.remover(intervalos)
+
+    logger.info(f"Extraindo {len(tarefas)} arquivos com {workers} processo(s).")
+    resultados = []
+    metricas_arquivos = []
+    for dados, metricas_arquivo in extrair_pdfs(tarefas, workers):
+        resultados.append(dados)
+        metricas_arquivos.append(metricas_arquivo)
+        metricas.adicionar_arquivo(metricas_arquivo)
+
+    # O plano de cada PDF passa a ser o identificado pelo layout
+    tarefas = [(caminho_pdf, metricas_arquivo.plano) for (caminho_pdf, _), metricas_arquivo in zip(tarefas, metricas_arquivos)]
+    planos = list(dict.fromkeys(planos + [plano for _, plano in tarefas]))
+
+    quarentenados = {
+        caminho_pdf for (caminho_pdf, _), metricas_arquivo in zip(tarefas, metricas_arquivos) if metricas_arquivo.quarentena
+    }
+
+    if deduplicador:
+        resultados = remover_duplicatas(tarefas, resultados, deduplicador, metricas, metricas_arquivos)
+
+    results_por_plano = {plano: TabelaRegistros(plano) for plano in planos}
+    for (_, plano), dados in zip(tarefas, resultados):
+        results_por_plano[plano].estender(dados)
+
+    for plano in planos:
+        logger.info(f"Salvando dados da plataforma {plano}")
+        origens = [
+            (caminho_pdf, len(dados))
+            for (caminho_pdf, plano_tarefa), dados in zip(tarefas, resultados) if plano_tarefa == plano
+        ]
+        trechos = salvar_resultados(results_por_plano[plano], plano, formatos, relatorio, metricas,
+                                    arquivo_relatorio, banco, origens)
+
+        # Sem os trechos (erro ao salvar) os PDFs são reprocessados na próxima execução
+        if manifesto and (trechos or not len(results_por_plano[plano])):
+            from utilitarios.relatorio import dividir_trechos
+
+            # Os dados de cada PDF ocupam linhas consecutivas, na ordem das tarefas
+            blocos = dividir_trechos(trechos or [], [linhas for _, linhas in origens])
+            for (caminho_pdf, _), trechos_pdf in zip(origens, blocos):
+                # Os PDFs em quarentena já saíram da pasta de entrada
+                if caminho_pdf not in quarentenados:
+                    manifesto.registrar(caminho_pdf, plano, trechos_pdf)
+
+    with metricas.medir(None, "salvar_relatorio"):
+        salvo = relatorio.salvar()
+
+    if manifesto and salvo:
+        manifesto.salvar()
+    return salvo
+
+def criar_parser(incremental:bool = True):
+    """
+    Argumentos da linha de comando. Sem `incremental`, fica de fora a opção
+    --incremental (o modo serviço sempre retoma pelo manifesto).
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Extrai os procedimentos dos demonstrativos em PDF e gera o relatório de produção mensal.",
+    )
+    parser.add_argument("entradas", nargs="*", default=[PASTA_PDFS],
+                        help=f"pastas com uma subpasta por plano, ou PDFs avulsos (padrão: {PASTA_PDFS})")
+    parser.add_argument("-p", "--planos", nargs="+", metavar="PLANO",
+                        help="planos a processar (padrão: todas as subpastas encontradas)")
+    parser.add_argument("-f", "--formatos", nargs="+", choices=FORMATOS, default=[], metavar="FORMATO",
+                        help=f"exporta também os dados de cada plano nesses formatos ({', '.join(FORMATOS)})")
+    parser.add_argument("-w", "--workers", type=int, default=NUM_WORKERS,
+                        help=f"processos usados na extração (padrão: {NUM_WORKERS}, ou PDF_WORKERS)")
+    parser.add_argument("-o", "--saida", default=ARQUIVO_RELATORIO,
+                        help=f"arquivo do relatório (padrão: {ARQUIVO_RELATORIO})")
+    if incremental:
+        parser.add_argument("-i", "--incremental", action="store_true", default=INCREMENTAL,
+                            help="processa apenas PDFs novos ou alterados (ou PDF_INCREMENTAL=1)")
+    parser.add_argument("--metricas", default=ARQUIVO_METRICAS, metavar="CAMINHO",
+                        help=f"caminho, sem extensão, do relatório de métricas (padrão: {ARQUIVO_METRICAS})")
+    parser.add_argument("--sem-deduplicacao", dest="deduplicar", action="store_false", default=DEDUPLICAR,
+                        help="mantém os procedimentos repetidos entre PDFs (ou PDF_DEDUPLICAR=0)")
+    parser.add_argument("--banco", default=CAMINHO_BANCO or None, metavar="CAMINHO",
+                        help="banco SQLite em que o histórico dos procedimentos é acumulado (ou PDF_BANCO)")
+    return parser
+
+def main(argumentos:list[str] = None):
+    args = criar_parser().parse_args(argumentos)
+
+    from utilitarios.relatorio import RelatorioPlanilha
+
+    arquivo_relatorio = args.saida
+    if os.path.dirname(arquivo_relatorio):
+        os.makedirs(os.path.dirname(arquivo_relatorio), exist_ok=True)
+    if args.formatos:
+        logger.info(f"Formatos escolhidos: {', '.join(args.formatos)}")
+
+    # O manifesto é sempre gravado; no modo incremental ele é reaproveitado
+    caminho_manifesto = Manifesto.caminho_para(arquivo_relatorio)
+    relatorio = None
+    manifesto = None
+    if args.incremental and os.path.exists(arquivo_relatorio) and os.path.exists(caminho_manifesto):
+        manifesto = Manifesto(caminho_manifesto).carregar()
+        if manifesto.compativel():
+            logger.info(f"Modo incremental: {len(manifesto.arquivos)} arquivos já processados.")
+        else:
+            logger.warning("Relatório no layout antigo (planilha única): gerando um relatório novo.")
+            manifesto = None
+
+    # Listando os planos e processando os PDFs
+    planos = args.planos or list(coletar_pdfs(args.entradas))
+    if not planos:
+        logger.error("Nenhum plano encontrado nas entradas informadas.")
+        return 1
+    if not args.planos and PLANO_A_DETECTAR not in planos:
+        # A caixa de entrada também foi varrida, mesmo vazia: os PDFs que
+        # saíram dela desde a última execução precisam sair do relatório
+        planos.append(PLANO_A_DETECTAR)
 
-    criar_planilha_inicial('Relatório Produção Mensal.xlsx')
+    if not manifesto:
+        # Relatório novo: escrito em uma única passada
+        relatorio = RelatorioPlanilha(arquivo_relatorio)
+        manifesto = Manifesto(caminho_manifesto)
 
-    # Listando subpastas e processando PDFs
-    subpastas = listar_subpastas(caminho_pasta)
-    for subpasta in subpastas:
-        processa_pdfs(caminho_pasta, subpasta, formato_arquivo)
+    metricas = RelatorioMetricas()
+    banco = BancoHistorico(args.banco) if args.banco else None
+    deduplicador = Deduplicador(Deduplicador.caminho_para(arquivo_relatorio)) if args.deduplicar else None
+    try:
+        salvo = processa_planos(args.entradas, planos, args.formatos, args.workers, manifesto, relatorio, metricas,
+                        arquivo_relatorio, banco, deduplicador)
+    finally:
+        if banco:
+            banco.fechar()
+        if deduplicador:
+            deduplicador.fechar()
 
+    metricas.salvar(args.metricas)
+    if not salvo:
+        logger.error(f"O relatório {arquivo_relatorio} não foi gravado.")
+        return 1
     logger.info("Processamento finalizado.")
+    return 0
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
@@ -0,0 +1,38 @@
+import os
+import sys
+import logging
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+from benchmarks.sinteticos import escrever_pdf, gerar_paginas
+from utilitarios.logger_config import logger
+
+@pytest.fixture(autouse=True)
+def pasta_teste(tmp_path, monkeypatch):
+    """Cada teste roda em uma pasta própria: cache, quarentena e relatórios ficam nela."""
+
+    monkeypatch.chdir(tmp_path)
+    nivel = logger.level
+    logger.setLevel(logging.WARNING)
+    yield tmp_path
+    logger.setLevel(nivel)
+
+@pytest.fixture
+def extrato(tmp_path):
+    """
+    Grava um extrato sintético do plano (benchmarks/sinteticos.py) no
+    caminho, relativo à pasta do teste, e devolve a quantidade de
+    procedimentos escritos nele.
+    """
+
+    def _extrato(caminho:str, plano:str, paginas:int = 2, semente:int = 0):
+        textos, procedimentos = gerar_paginas(plano, paginas, semente=semente)
+        destino = tmp_path / caminho
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        escrever_pdf(textos, str(destino))
+        return procedimentos
+    return _extrato
@@ -0,0 +1,30 @@
+import os
+import sys
+import shutil
+import subprocess
+
+from benchmarks.bench_adversarial import CASOS
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_paginas_adversariais_ficam_no_orcamento():
+    # Em outro processo: o orçamento é lido do ambiente na importação
+    execucao = subprocess.run([sys.executable, "-m", "benchmarks.bench_adversarial",
+                               "--orcamento", "0.2", "--folga", "0.25", "--teto", "1"],
+                              cwd=RAIZ, capture_output=True, text=True, timeout=300)
+    assert execucao.returncode == 0, execucao.stdout + execucao.stderr
+
+    linhas = execucao.stdout.splitlines()
+    pasta = linhas[-1].removeprefix("Trechos gravados em ")
+    try:
+        trechos = dict.fromkeys(CASOS, 0)
+        for linha in linhas[1:]:
+            if linha.split()[:1] and linha.split()[0] in CASOS:
+                trechos[linha.split()[0]] += int(linha.split()[-1])
+        # Amil e Rede Unna terminam antes do orçamento; o samp vai para a quarentena
+        assert trechos["amil"] == trechos["rede_unna"] == 0
+        assert trechos["samp"] >= 1
+        nomes = os.listdir(os.path.join(pasta, "trechos"))
+        assert nomes and all(nome.startswith("adversarial_samp.pdf") for nome in nomes)
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from utilitarios.agregacao import Agregador, valor_repasse
+from utilitarios.relatorio import formula_repasse
+
+def registros(*linhas:tuple):
+    return pd.DataFrame(linhas, columns=["Nome do Beneficiário", "Código Procedimento", "Nome Procedimento",
+                                         "Data de Realização", "Valor Processado", "Valor Glosa"])
+
+@pytest.mark.parametrize("pago, repasse", [(0.10, 0.04), (0.30, 0.11), (1.00, 0.35), (-0.10, -0.04), (None, 0.0)])
+def test_repasse_arredonda_a_metade_para_longe_do_zero(pago, repasse):
+    assert valor_repasse(pago, 35) == repasse
+    assert formula_repasse(5, 35) == "=ROUND(J5*35/100,2)"
+
+def test_repasse_das_dimensoes_soma_o_total():
+    # 0,10 * 35% = 0,035: somar antes de arredondar daria centavos a menos no total
+    agregador = Agregador(35)
+    agregador.adicionar(registros(*[
+        (f"PACIENTE {numero % 3}", "81000065", "CONSULTA", f"2026-0{numero % 2 + 8}-01", 0.10, 0.0)
+        for numero in range(7)
+    ]), "unimed")
+    agregador.adicionar(registros(("PACIENTE 0", "81000065", "CONSULTA", "2026-09-01", 0.10, 0.0)), "amil")
+
+    total = agregador.totais()["repasse"].iloc[0]
+    assert total == pytest.approx(8 * 0.04)
+    for dimensao in ("plano", "beneficiario", "procedimento", "mes"):
+        assert agregador.totais(dimensao)["repasse"].sum() == pytest.approx(total)
+
+def test_procedimento_agrupado_pelo_codigo():
+    agregador = Agregador(35)
+    agregador.adicionar(registros(
+        ("ANA", "81000065", "CONSULTA ODONTOLOGICA", "2026-09-01", 50.0, 0.0),
+        ("BIA", "81000065", "Consulta odontológica", "2026-09-02", 50.0, 0.0),
+        ("ANA", "85100196", "RESTAURACAO", "2026-09-03", 30.0, 5.0),
+    ), "unimed")
+
+    por_procedimento = agregador.totais("procedimento")
+    assert list(por_procedimento.index) == ["81000065", "85100196"]
+    assert list(por_procedimento["nome"]) == ["CONSULTA ODONTOLOGICA", "RESTAURACAO"]
+    assert list(por_procedimento["registros"]) == [2, 1]
+    assert list(por_procedimento["pago"]) == [100.0, 30.0]
+
+    resumo = agregador.resumo()
+    assert resumo["total"] == {"registros": 3, "pago": 130.0, "glosa": 5.0, "repasse": 45.5}
+    assert resumo["por_procedimento"][0]["nome"] == "CONSULTA ODONTOLOGICA"
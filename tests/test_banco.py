@@ -0,0 +1,54 @@
+import os
+
+import pytest
+from openpyxl import load_workbook
+
+from tests.test_main import executar
+from utilitarios.banco import BancoHistorico
+from utilitarios.relatorio import PRIMEIRA_LINHA, partes_relatorio
+
+def pagos_da_planilha(arquivo_relatorio:str):
+    """(plano, GTO, valor pago) de cada linha de dados do relatório."""
+
+    workbook = load_workbook(arquivo_relatorio)
+    pagos = []
+    for plano, planilha, ultima_linha in partes_relatorio(workbook):
+        for linha in workbook[planilha].iter_rows(min_row=PRIMEIRA_LINHA, max_row=ultima_linha, values_only=True):
+            pagos.append((plano, linha[7], round(linha[9], 2)))
+    return sorted(pagos)
+
+def test_banco_tem_os_procedimentos_do_relatorio(extrato):
+    procedimentos = {
+        "pdfs/unimed/a.pdf": extrato("pdfs/unimed/a.pdf", "unimed"),
+        "pdfs/unimed/b.pdf": extrato("pdfs/unimed/b.pdf", "unimed", semente=1),
+        "pdfs/amil/c.pdf": extrato("pdfs/amil/c.pdf", "amil", semente=2),
+    }
+    executar("--banco", "historico.db")
+
+    with BancoHistorico("historico.db") as banco:
+        arquivos = {os.path.relpath(linha["caminho"]).replace(os.sep, "/"): linha for linha in banco.consultar("SELECT * FROM arquivos")}
+        assert {caminho: linha["registros"] for caminho, linha in arquivos.items()} == procedimentos
+        for caminho, linha in arquivos.items():
+            assert linha["plano"] == caminho.split("/")[1]
+            assert linha["hash"]
+            [(gravados,)] = banco.consultar("SELECT COUNT(*) FROM procedimentos WHERE arquivo_id = ?", (linha["id"],))
+            assert gravados == procedimentos[caminho]
+
+        pagos = banco.consultar("SELECT plano, gto, valor_processado, data_realizacao FROM procedimentos")
+        assert sorted((plano, gto, round(valor, 2)) for plano, gto, valor, _ in pagos) == pagos_da_planilha("r.xlsx")
+        # Datas em ISO, para as consultas por período
+        datas = [data for *_, data in pagos if data is not None]
+        assert datas and all(len(data) == 10 and data[4] == data[7] == "-" for data in datas)
+
+def test_reprocessar_substitui_os_procedimentos_do_pdf(extrato):
+    procedimentos = extrato("pdfs/unimed/a.pdf", "unimed")
+    executar("--banco", "historico.db")
+    executar("--banco", "historico.db")
+
+    with BancoHistorico("historico.db") as banco:
+        assert [tuple(linha) for linha in banco.consultar("SELECT COUNT(*) FROM arquivos")] == [(1,)]
+        assert [tuple(linha) for linha in banco.consultar("SELECT COUNT(*) FROM procedimentos")] == [(procedimentos,)]
+
+def test_origens_precisam_somar_os_registros():
+    with BancoHistorico("historico.db") as banco, pytest.raises(ValueError):
+        banco.gravar([], "unimed", [("pdfs/unimed/a.pdf", 1)])
@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+from utilitarios.cache import CacheTexto
+
+def tamanho_em_disco(caminho:str):
+    return sum(os.path.getsize(os.path.join(raiz, nome)) for raiz, _, nomes in os.walk(caminho) for nome in nomes)
+
+def gravar(cache:CacheTexto, chave:str, paginas:list[str]):
+    assert list(cache.gravar(chave, paginas)) == paginas
+
+def test_tamanho_acompanha_o_disco():
+    cache = CacheTexto("cache")
+    gravar(cache, "aa01", ["página 1", "página 2"])
+    gravar(cache, "bb02", ["x" * 100])
+    gravar(cache, "aa01", ["página 1"])
+    assert cache.tamanho == tamanho_em_disco("cache")
+    assert CacheTexto("cache").tamanho == cache.tamanho
+    assert list(cache.ler("aa01")) == ["página 1"]
+
+def test_limite_remove_as_entradas_mais_antigas():
+    cache = CacheTexto("cache", tamanho_maximo=1000)
+    for numero in range(5):
+        chave = f"{numero:02d}ff"
+        gravar(cache, chave, ["x" * 300])
+        os.utime(cache._caminho_entrada(chave), (numero, numero))
+
+    # Na quarta gravação saem as duas mais antigas, até 90% do limite
+    assert cache.tamanho == tamanho_em_disco("cache") <= 1000
+    assert not cache.contem("00ff") and not cache.contem("01ff")
+    assert cache.contem("04ff")
+
+def test_limpar_zera_o_tamanho():
+    cache = CacheTexto("cache")
+    gravar(cache, "aa01", ["página"])
+    cache.limpar()
+    assert cache.tamanho == 0 == tamanho_em_disco("cache")
+
+def test_erro_da_origem_se_propaga_sem_gravar():
+    def paginas():
+        yield "página 1"
+        raise OSError("falha na leitura do PDF")
+
+    cache = CacheTexto("cache")
+    lidas = []
+    with pytest.raises(OSError, match="falha na leitura do PDF"):
+        for pagina in cache.gravar("aa01", paginas()):
+            lidas.append(pagina)
+
+    assert lidas == ["página 1"]
+    assert not cache.contem("aa01")
+    assert tamanho_em_disco("cache") == 0
+
+def test_pagina_que_nao_pode_ser_gravada_nao_interrompe_a_leitura():
+    # Mapas ToUnicode quebrados geram surrogates soltos, que o UTF-8 recusa
+    paginas = ["ok", "x\ud800y", "z"]
+    cache = CacheTexto("cache")
+    assert list(cache.gravar("ab12", iter(paginas))) == paginas
+    assert not cache.contem("ab12")
+    assert tamanho_em_disco("cache") == 0
@@ -0,0 +1,118 @@
+import os
+
+from utilitarios.deduplicacao import Deduplicador
+from utilitarios.registros import Procedimento, TabelaRegistros
+
+def tabela(*registros:dict, plano:str = "unimed"):
+    resultado = TabelaRegistros(plano)
+    resultado.estender(Procedimento(**registro) for registro in registros)
+    return resultado
+
+def procedimento(gto:str = "123", codigo:str = "81000065", **valores):
+    return {"gto": gto, "codigo_procedimento": codigo, "data_realizacao": "01/09/2026",
+            "valor_processado": "10,00", **valores}
+
+def pdf(caminho:str, conteudo:bytes = b""):
+    with open(caminho, "wb") as arquivo:
+        arquivo.write(conteudo)
+    return caminho
+
+def test_procedimento_de_outro_pdf_e_duplicata():
+    deduplicador = Deduplicador("r.duplicatas.db")
+    lote, duplicatas = deduplicador.filtrar([
+        (pdf("a.pdf"), "unimed", tabela(procedimento())),
+        (pdf("b.pdf"), "unimed", tabela(procedimento(), procedimento(gto="456"))),
+    ])
+    assert [len(tabela_pdf) for _, _, tabela_pdf in lote] == [1, 1]
+    assert [(duplicata.arquivo, duplicata.arquivo_original) for duplicata in duplicatas] == [("b.pdf", "a.pdf")]
+
+    # Na execução seguinte o índice em disco ainda aponta o primeiro PDF
+    _, duplicatas = Deduplicador("r.duplicatas.db").filtrar([(pdf("c.pdf"), "unimed", tabela(procedimento()))])
+    assert [duplicata.arquivo_original for duplicata in duplicatas] == ["a.pdf"]
+
+def test_repeticao_no_mesmo_pdf_e_mantida():
+    lote, duplicatas = Deduplicador("r.duplicatas.db").filtrar([
+        (pdf("a.pdf"), "unimed", tabela(procedimento(), procedimento())),
+    ])
+    assert len(lote[0][2]) == 2
+    assert not duplicatas
+
+def test_reprocessar_o_mesmo_pdf_nao_gera_duplicatas():
+    deduplicador = Deduplicador("r.duplicatas.db")
+    deduplicador.filtrar([(pdf("a.pdf"), "unimed", tabela(procedimento()))])
+    lote, duplicatas = deduplicador.filtrar([("a.pdf", "unimed", tabela(procedimento()))])
+    assert len(lote[0][2]) == 1
+    assert not duplicatas
+
+def test_registros_sem_paciente_de_pdfs_diferentes_nao_sao_duplicatas():
+    # Os extratos do odonto_empresas não trazem GTO nem beneficiário
+    registro = procedimento(gto=None)
+    lote, duplicatas = Deduplicador("r.duplicatas.db").filtrar([
+        (pdf("a.pdf", b"lote 1"), "odonto_empresas", tabela(registro, plano="odonto_empresas")),
+        (pdf("b.pdf", b"lote 2"), "odonto_empresas", tabela(registro, plano="odonto_empresas")),
+    ])
+    assert [len(tabela_pdf) for _, _, tabela_pdf in lote] == [1, 1]
+    assert not duplicatas
+
+def test_copia_de_pdf_sem_paciente_e_duplicata():
+    registro = procedimento(gto=None)
+    deduplicador = Deduplicador("r.duplicatas.db")
+    deduplicador.filtrar([(pdf("a.pdf", b"lote 1"), "odonto_empresas", tabela(registro, plano="odonto_empresas"))])
+
+    # Em outra execução, pelo índice em disco
+    lote, duplicatas = Deduplicador("r.duplicatas.db").filtrar([
+        (pdf("b.pdf", b"lote 1"), "odonto_empresas", tabela(registro, plano="odonto_empresas")),
+    ])
+    assert len(lote[0][2]) == 0
+    assert [duplicata.arquivo_original for duplicata in duplicatas] == ["a.pdf"]
+
+def test_pdf_renomeado_sai_do_indice():
+    deduplicador = Deduplicador("r.duplicatas.db")
+    deduplicador.filtrar([(pdf("a.pdf"), "unimed", tabela(procedimento()))])
+    os.rename("a.pdf", "b.pdf")
+
+    assert deduplicador.esquecer([]) == []
+    lote, duplicatas = deduplicador.filtrar([("b.pdf", "unimed", tabela(procedimento()))])
+    assert len(lote[0][2]) == 1
+    assert not duplicatas
+
+def test_limpar_esvazia_o_indice():
+    deduplicador = Deduplicador("r.duplicatas.db")
+    deduplicador.filtrar([(pdf("a.pdf"), "unimed", tabela(procedimento()))])
+    deduplicador.limpar()
+    _, duplicatas = deduplicador.filtrar([(pdf("b.pdf"), "unimed", tabela(procedimento()))])
+    assert not duplicatas
+
+def test_relatorio_novo_depois_de_apagar_o_pdf_original():
+    registro = procedimento(gto=None)
+    deduplicador = Deduplicador("r.duplicatas.db")
+    _, duplicatas = deduplicador.filtrar([
+        (pdf("a.pdf", b"lote 1"), "odonto_empresas", tabela(registro, plano="odonto_empresas")),
+        (pdf("b.pdf", b"lote 1"), "odonto_empresas", tabela(registro, plano="odonto_empresas")),
+    ])
+    assert [duplicata.arquivo_original for duplicata in duplicatas] == ["a.pdf"]
+    os.remove("a.pdf")
+
+    # O relatório novo não tem o PDF original: a cópia passa a valer
+    deduplicador.limpar()
+    lote, duplicatas = deduplicador.filtrar([
+        ("b.pdf", "odonto_empresas", tabela(registro, plano="odonto_empresas")),
+    ])
+    assert len(lote[0][2]) == 1
+    assert not duplicatas
+    assert deduplicador.esquecer([]) == []
+
+def test_esquecer_o_dono_devolve_os_pdfs_que_dependiam_dele():
+    deduplicador = Deduplicador("r.duplicatas.db")
+    deduplicador.filtrar([
+        (pdf("a.pdf"), "unimed", tabela(procedimento())),
+        (pdf("b.pdf"), "unimed", tabela(procedimento(), procedimento(gto="456"))),
+    ])
+    os.remove("a.pdf")
+
+    assert deduplicador.esquecer([]) == ["b.pdf"]
+    # Reextraído, o PDF dependente fica com todos os procedimentos
+    lote, duplicatas = deduplicador.filtrar([("b.pdf", "unimed", tabela(procedimento(), procedimento(gto="456")))])
+    assert len(lote[0][2]) == 2
+    assert not duplicatas
+    assert deduplicador.esquecer([]) == []
@@ -0,0 +1,54 @@
+import pytest
+
+from benchmarks.bench_prefiltro import montar_extrato
+from benchmarks.sinteticos import PLANOS, gerar_paginas
+from utilitarios.cache import CacheTexto
+from utilitarios.extratores import ExtratorPDF
+
+def extrair(plano:str, paginas:list[str], **opcoes):
+    extrator = ExtratorPDF(f"sintetico_{plano}.pdf", plano, cache=None, tokenizar=False)
+    return list(extrator.iterar_dados(iter(paginas), **opcoes))
+
+def recortar(paginas:list[str], tamanho:int):
+    texto = "".join(paginas)
+    return [texto[inicio:inicio + tamanho] for inicio in range(0, len(texto), tamanho)]
+
+@pytest.mark.parametrize("plano", PLANOS)
+@pytest.mark.parametrize("tamanho", [997, 4099])
+def test_registro_partido_entre_paginas(plano, tamanho):
+    # Páginas de tamanhos arbitrários cortam cabeçalhos e procedimentos ao meio
+    paginas, procedimentos = gerar_paginas(plano, 4)
+    registros = extrair(plano, paginas, prefiltro=False)
+    assert len(registros) == procedimentos
+    assert extrair(plano, recortar(paginas, tamanho), prefiltro=False) == registros
+
+@pytest.mark.parametrize("plano", PLANOS)
+def test_prefiltro_nao_muda_os_registros(plano):
+    # Blocos de capa e texto legal entre as páginas de procedimentos
+    paginas = montar_extrato(plano, 8, 40)
+    extrator = ExtratorPDF(f"sintetico_{plano}.pdf", plano, cache=None, tokenizar=False)
+    registros = list(extrator.iterar_dados(iter(paginas), prefiltro=True))
+
+    assert registros == extrair(plano, paginas, prefiltro=False)
+    # Só as páginas perto dos procedimentos (menos de uma janela) são varridas
+    assert extrator.metricas.paginas_ignoradas >= 20
+    assert extrair(plano, recortar(paginas, 997), prefiltro=True) == registros
+
+def test_cache_corrompido_e_refeito_a_partir_do_pdf(extrato):
+    procedimentos = extrato("extrato.pdf", "unimed", paginas=3)
+    cache = CacheTexto("cache")
+    extrator = ExtratorPDF("extrato.pdf", "unimed", cache=cache)
+    paginas = list(extrator.ler_paginas())
+    registros = list(extrator.extrair_dados())
+    assert len(registros) == procedimentos
+
+    # A entrada perde o fim no meio da segunda página
+    entrada = cache._caminho_entrada(cache.chave("extrato.pdf", extrator.leitor.versao))
+    with open(entrada, "r+", encoding="utf-8") as arquivo:
+        arquivo.truncate(len(arquivo.readline().encode()) + 10)
+
+    extrator = ExtratorPDF("extrato.pdf", "unimed", cache=cache)
+    assert list(extrator.extrair_dados()) == registros
+    assert extrator.metricas.erro is None
+    # A entrada foi regravada inteira a partir do PDF
+    assert list(cache.ler(cache.chave("extrato.pdf", extrator.leitor.versao))) == paginas
@@ -0,0 +1,43 @@
+import re
+import random
+
+import pytest
+
+from utilitarios.helper import IndiceCabecalhos, find_previous_gto
+
+GTO = re.compile(r"GTO: (\d{8}) - ([A-Z ]+)\n")
+
+def texto_com_cabecalhos(quantidade:int, semente:int):
+    aleatorio = random.Random(semente)
+    partes = []
+    for numero in range(quantidade):
+        partes.append(f"GTO: {numero:08d} - PACIENTE {'X' * aleatorio.randint(1, 5)}\n")
+        partes.append("81000065 PROCEDIMENTO 10,00\n" * aleatorio.randint(0, 3))
+    return "".join(partes)
+
+@pytest.mark.parametrize("semente", range(3))
+def test_indice_responde_como_a_busca_linear(semente):
+    texto = texto_com_cabecalhos(200, semente)
+    cabecalhos = list(GTO.finditer(texto))
+    indice = IndiceCabecalhos.de_ocorrencias(cabecalhos)
+
+    # Todas as posições, inclusive o fim exato de cada cabeçalho
+    for posicao in range(len(texto) + 1):
+        assert find_previous_gto(posicao, indice) == find_previous_gto(posicao, cabecalhos)
+
+def test_descartar_anteriores_mantem_as_respostas_seguintes():
+    texto = texto_com_cabecalhos(50, 0)
+    cabecalhos = list(GTO.finditer(texto))
+    indice = IndiceCabecalhos.de_ocorrencias(cabecalhos)
+
+    meio = len(texto) // 2
+    indice.descartar_anteriores(meio)
+    assert len(indice) < len(cabecalhos)
+    for posicao in range(meio, len(texto) + 1):
+        assert find_previous_gto(posicao, indice) == find_previous_gto(posicao, cabecalhos)
+
+def test_posicoes_fora_de_ordem():
+    indice = IndiceCabecalhos()
+    indice.adicionar(10, "a")
+    with pytest.raises(ValueError):
+        indice.adicionar(5, "b")
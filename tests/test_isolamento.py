@@ -0,0 +1,125 @@
+import os
+import time
+
+import pytest
+
+import main
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from benchmarks.sinteticos import escrever_pdf
+from utilitarios import paralelo
+from utilitarios.isolamento import RelogioPool, encerrar_pool, executar_isolado
+
+def tarefa(acao:str, valor:int = 0):
+    if acao == "erro":
+        raise ValueError("PDF corrompido")
+    if acao == "sair":
+        os._exit(3)
+    if acao == "dormir":
+        time.sleep(30)
+    if acao == "lambda":
+        return lambda: valor
+    return valor * 2
+
+def test_falhas_so_afetam_a_propria_tarefa():
+    execucoes = executar_isolado(tarefa, [("ok", 1), ("erro",), ("sair",), ("dormir",), ("lambda",), ("ok", 2)],
+                                 workers=3, tempo=2, memoria_mb=0, tentativas=1)
+
+    assert [execucao.resultado for execucao in execucoes] == [2, None, None, None, None, 4]
+    motivos = [execucao.motivo for execucao in execucoes]
+    assert motivos[0] is None and motivos[5] is None
+    assert motivos[1] == "ValueError: PDF corrompido"
+    assert motivos[2] == "processo encerrado sem resultado (3)"
+    assert motivos[3] == "tempo esgotado após 2s"
+    assert motivos[4].startswith("resultado não serializável")
+
+def test_tarefa_com_falha_e_repetida():
+    inicio = time.monotonic()
+    execucoes = executar_isolado(tarefa, [("erro",)], tempo=0, memoria_mb=0, tentativas=3, espera=0.1)
+
+    assert execucoes[0].tentativas == 3
+    assert execucoes[0].motivo == "ValueError: PDF corrompido"
+    # Esperas de 0,1s e 0,2s entre as tentativas
+    assert time.monotonic() - inicio >= 0.3
+
+_extrair_arquivo = main.extrair_arquivo
+
+def extrair_com_falhas(caminho_pdf:str, plano:str, *argumentos):
+    nome = os.path.basename(caminho_pdf)
+    if nome.startswith("derruba"):
+        os._exit(1)
+    if nome.startswith("erro"):
+        raise ValueError("PDF corrompido")
+    if nome.startswith("lento"):
+        time.sleep(2)
+    return _extrair_arquivo(caminho_pdf, plano, *argumentos)
+
+@pytest.fixture
+def tarefas(extrato, monkeypatch):
+    monkeypatch.setattr(main, "extrair_arquivo", extrair_com_falhas)
+    nomes = ["a", "derruba", "b", "erro", "c", "lento", "d"]
+    procedimentos = {nome: extrato(f"pdfs/unimed/{nome}.pdf", "unimed", semente=numero) for numero, nome in enumerate(nomes)}
+    return [(f"pdfs/unimed/{nome}.pdf", "unimed") for nome in nomes], procedimentos
+
+def test_pdf_que_derruba_o_pool_nao_interrompe_o_lote(tarefas):
+    tarefas, procedimentos = tarefas
+    resultados = main.extrair_no_pool(tarefas, [False] * len(tarefas), workers=2, tempo=1)
+
+    por_nome = {os.path.basename(caminho_pdf)[:-4]: resultado for (caminho_pdf, _), resultado in zip(tarefas, resultados)}
+    for nome in ("a", "b", "c", "d", "lento"):
+        dados, metricas_arquivo = por_nome[nome]
+        assert len(dados) == procedimentos[nome] and not metricas_arquivo.quarentena
+    assert por_nome["derruba"][1].quarentena.startswith("processo encerrado sem resultado")
+    assert por_nome["erro"][1].quarentena == "ValueError: PDF corrompido"
+    assert sorted(os.listdir("quarentena/arquivos/unimed")) == [
+        "derruba.pdf", "derruba.pdf.motivo.txt", "erro.pdf", "erro.pdf.motivo.txt",
+    ]
+
+def test_pdf_sem_procedimentos_vai_para_a_quarentena():
+    os.makedirs("pdfs/unimed")
+    escrever_pdf(["DEMONSTRATIVO ANALÍTICO DE PAGAMENTO DE PRESTADOR\nNenhum procedimento no período"], "pdfs/unimed/a.pdf")
+    [(dados, metricas_arquivo)] = main.extrair_pdfs([("pdfs/unimed/a.pdf", "unimed")], workers=1)
+    assert not len(dados)
+    assert metricas_arquivo.quarentena == "nenhum procedimento extraído"
+    assert not os.path.exists("pdfs/unimed/a.pdf")
+
+def test_prazo_conta_de_quando_a_tarefa_comecou():
+    executor = ProcessPoolExecutor(max_workers=2)
+    try:
+        relogio = RelogioPool(1)
+        curta, longa = executor.submit(time.sleep, 0.7), executor.submit(time.sleep, 30)
+        relogio.acompanhar(curta, longa)
+        relogio.resultado(curta)
+
+        # A longa começou junto com a curta: restam uns 0,3s do prazo dela
+        inicio = time.monotonic()
+        with pytest.raises(BrokenProcessPool, match="tempo esgotado após 1s"):
+            relogio.resultado(longa)
+        assert time.monotonic() - inicio < 0.7
+    finally:
+        encerrar_pool(executor)
+
+_varrer_intervalo = paralelo.varrer_intervalo
+
+def dividir_em_dois(caminho_pdf:str, plano:str = None):
+    return [(0, 1), (1, 2)]
+
+def varrer_ou_travar(caminho_pdf:str, plano:str, inicio:int, fim:int, *argumentos):
+    if os.path.basename(caminho_pdf).startswith("trava") and inicio:
+        time.sleep(30)
+    return _varrer_intervalo(caminho_pdf, plano, inicio, fim, *argumentos)
+
+def test_intervalo_travado_de_pdf_dividido_nao_prende_o_lote(extrato, monkeypatch):
+    monkeypatch.setattr(paralelo, "dividir_pdf", dividir_em_dois)
+    monkeypatch.setattr(paralelo, "varrer_intervalo", varrer_ou_travar)
+    nomes = ["a", "trava", "b"]
+    procedimentos = [extrato(f"pdfs/unimed/{nome}.pdf", "unimed", semente=numero) for numero, nome in enumerate(nomes)]
+    tarefas = [(f"pdfs/unimed/{nome}.pdf", "unimed") for nome in nomes]
+
+    inicio = time.monotonic()
+    resultados = main.extrair_no_pool(tarefas, [True] * len(tarefas), workers=2, tempo=1)
+
+    # Descartado o pool, o PDF é refeito inteiro em um processo isolado
+    assert time.monotonic() - inicio < 15
+    assert [len(dados) for dados, _ in resultados] == procedimentos
+    assert not any(metricas_arquivo.quarentena for _, metricas_arquivo in resultados)
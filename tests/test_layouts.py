@@ -0,0 +1,46 @@
+import pytest
+
+from benchmarks.sinteticos import PLANOS
+from utilitarios.layouts import detectar_plano, identificar_plano
+
+class LeitorFalso:
+    """Leitor (ver utilitarios.leitores) que devolve páginas de texto prontas."""
+
+    def __init__(self, *paginas:str):
+        self._paginas = paginas
+        self.lidas = 0
+
+    def abrir(self, caminho_pdf:str):
+        return self._paginas
+
+    def paginas(self, documento):
+        return len(documento)
+
+    def texto(self, documento, numero:int):
+        self.lidas += 1
+        return documento[numero]
+
+@pytest.mark.parametrize("plano", PLANOS)
+def test_extrato_de_cada_plano_e_reconhecido(extrato, plano):
+    extrato("a.pdf", plano)
+    assert detectar_plano("a.pdf") == plano
+
+def test_plano_da_pasta_e_mantido_se_a_impressao_dele_aparece():
+    # Um extrato da Unimed que cita a Amil não pode ir para o extrator da Amil
+    leitor = LeitorFalso("DEMONSTRATIVO ANALÍTICO DE PAGAMENTO DE PRESTADOR\nAmil\nNome do Beneficiário")
+    assert detectar_plano("a.pdf", leitor, plano_da_pasta="unimed") == "unimed"
+    assert detectar_plano("a.pdf", leitor) == "amil"
+
+def test_plano_da_pasta_sem_a_impressao_dele_e_trocado():
+    leitor = LeitorFalso("SAMP\nDR(A). FULANO")
+    assert detectar_plano("a.pdf", leitor, plano_da_pasta="unimed") == "samp"
+
+def test_leitura_para_no_primeiro_layout_completo():
+    leitor = LeitorFalso("SAMP\nDR(A). FULANO", "outra página")
+    assert detectar_plano("a.pdf", leitor) == "samp"
+    assert leitor.lidas == 1
+
+def test_layout_desconhecido_ou_ambiguo():
+    assert identificar_plano("um texto qualquer") is None
+    assert identificar_plano("Amil SAMP") is None
+    assert detectar_plano("nao_existe.pdf") is None
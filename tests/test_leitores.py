@@ -0,0 +1,34 @@
+import pytest
+
+from utilitarios import leitores
+from utilitarios.leitores import LEITOR_PADRAO, gravar_leitor_do_plano, leitor_do_plano
+
+def test_configuracao_lida_uma_vez(monkeypatch):
+    leituras = []
+    ler_configuracao = leitores.ler_configuracao
+    monkeypatch.setattr(leitores, "ler_configuracao", lambda caminho: leituras.append(caminho) or ler_configuracao(caminho))
+
+    for _ in range(3):
+        assert leitor_do_plano("unimed").nome == LEITOR_PADRAO
+    assert len(leituras) == 1
+
+class LeitorCalibrado(leitores.LeitorPyPDF2):
+    nome = "calibrado"
+
+def test_leitor_gravado_vale_na_proxima_consulta(monkeypatch):
+    monkeypatch.setitem(leitores.LEITORES, LeitorCalibrado.nome, LeitorCalibrado())
+    assert leitor_do_plano("unimed").nome == LEITOR_PADRAO
+    gravar_leitor_do_plano("unimed", LeitorCalibrado.nome)
+    assert leitor_do_plano("unimed").nome == LeitorCalibrado.nome
+    assert leitor_do_plano("amil").nome == LEITOR_PADRAO
+
+class LeitorIncompleto(leitores.LeitorTexto):
+    nome = "incompleto"
+    modulo = "PyPDF2"
+
+    def abrir(self, caminho_pdf:str):
+        return caminho_pdf
+
+def test_leitor_sem_texto_falha_ao_ser_registrado():
+    with pytest.raises(TypeError, match="texto"):
+        LeitorIncompleto()
@@ -0,0 +1,60 @@
+import os
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from utilitarios import logger_config
+from utilitarios.isolamento import executar_isolado
+from utilitarios.logger_config import configurar_processo, contexto_log, encerrar_logger, fila_log, setup_logger
+
+@pytest.fixture
+def log_json():
+    """Log em fila, no formato JSON, em ./app.log; devolve a leitura das linhas gravadas."""
+
+    original = logger_config._handlers[0].baseFilename
+    nivel = logging.getLogger("logger").level
+    logger = setup_logger("app.log", nivel="DEBUG", formato="json", em_fila=True)
+
+    def ler():
+        encerrar_logger()
+        with open("app.log", encoding="utf-8") as arquivo:
+            return [json.loads(linha) for linha in arquivo]
+
+    yield logger, ler
+    setup_logger(original)
+    logging.getLogger("logger").setLevel(nivel)
+
+def registrar(processo:int, mensagens:int = 50):
+    """Executado nos processos filhos."""
+
+    logger = logging.getLogger("logger")
+    with contexto_log(f"extrato_{processo}.pdf", "unimed", "extrair_texto"):
+        for indice in range(mensagens):
+            logger.debug("Página %d do processo %d", indice, processo)
+    return os.getpid()
+
+def test_mensagens_do_pool_chegam_ao_arquivo(log_json):
+    logger, ler = log_json
+    with ProcessPoolExecutor(2, initializer=configurar_processo, initargs=(fila_log(), logger.level)) as executor:
+        processos = set(executor.map(registrar, range(4)))
+
+    linhas = ler()
+    assert len(linhas) == 4 * 50
+    assert {linha["processo"] for linha in linhas} == processos
+    assert os.getpid() not in processos
+    # O contexto_log do processo filho vai junto com a mensagem
+    for processo in range(4):
+        paginas = [linha["mensagem"] for linha in linhas if linha["arquivo"] == f"extrato_{processo}.pdf"]
+        assert paginas == [f"Página {indice} do processo {processo}" for indice in range(50)]
+    assert {(linha["plano"], linha["etapa"]) for linha in linhas} == {("unimed", "extrair_texto")}
+
+def test_mensagens_dos_processos_isolados_chegam_ao_arquivo(log_json):
+    _, ler = log_json
+    execucoes = executar_isolado(registrar, [(0, 10), (1, 10)], workers=2, memoria_mb=0, tentativas=1)
+    processos = {execucao.resultado for execucao in execucoes}
+
+    linhas = [linha for linha in ler() if linha["etapa"] == "extrair_texto"]
+    assert len(linhas) == 20
+    assert {linha["processo"] for linha in linhas} == processos
@@ -0,0 +1,122 @@
+import os
+import sys
+import json
+import shutil
+import subprocess
+
+from openpyxl import Workbook, load_workbook
+
+import main
+from utilitarios.relatorio import PRIMEIRA_LINHA, formula_repasse, partes_relatorio
+
+def linhas_por_plano(arquivo_relatorio:str):
+    """Linhas de dados de cada plano no relatório gravado."""
+
+    linhas = {}
+    for plano, _, ultima_linha in partes_relatorio(load_workbook(arquivo_relatorio)):
+        linhas[plano] = linhas.get(plano, 0) + ultima_linha - PRIMEIRA_LINHA + 1
+    return linhas
+
+def executar(*argumentos:str):
+    assert main.main(["pdfs", "-o", "r.xlsx", "-w", "1", "--metricas", "metricas", *argumentos]) == 0
+    return linhas_por_plano("r.xlsx")
+
+def test_renomear_pdf_e_reprocessar_mantem_os_registros(extrato):
+    procedimentos = extrato("pdfs/unimed/a.pdf", "unimed")
+    assert executar() == {"unimed": procedimentos}
+
+    os.rename("pdfs/unimed/a.pdf", "pdfs/unimed/b.pdf")
+
+    # O índice de duplicatas não pode guardar o PDF que sumiu como dono dos procedimentos
+    assert executar() == {"unimed": procedimentos}
+
+def test_apagar_o_pdf_original_no_incremental_recupera_as_duplicatas(extrato):
+    procedimentos = extrato("pdfs/unimed/a.pdf", "unimed")
+    shutil.copy("pdfs/unimed/a.pdf", "pdfs/unimed/b.pdf")
+    assert executar("-i") == {"unimed": procedimentos}
+
+    # As linhas de b.pdf, descartadas como duplicatas de a.pdf, voltam ao relatório
+    os.remove("pdfs/unimed/a.pdf")
+    assert executar("-i") == {"unimed": procedimentos}
+    assert executar("-i") == {"unimed": procedimentos}
+
+def test_mover_da_caixa_de_entrada_para_a_pasta_no_incremental(extrato):
+    procedimentos = extrato("pdfs/a.pdf", "unimed")
+    extrato("pdfs/amil/b.pdf", "amil", semente=1)
+    linhas = executar("-i")
+    assert linhas["unimed"] == procedimentos
+
+    os.makedirs("pdfs/unimed")
+    os.rename("pdfs/a.pdf", "pdfs/unimed/a.pdf")
+    assert executar("-i") == linhas
+
+    with open("r.totais.json", encoding="utf-8") as arquivo:
+        assert json.load(arquivo)["total"]["registros"] == sum(linhas.values())
+
+def test_relatorio_bloqueado_no_incremental_nao_altera_o_manifesto(extrato, monkeypatch):
+    procedimentos = extrato("pdfs/unimed/a.pdf", "unimed")
+    executar("-i")
+    with open(main.Manifesto.caminho_para("r.xlsx"), encoding="utf-8") as arquivo:
+        anterior = arquivo.read()
+
+    # Relatório aberto no Excel: a gravação falha, sem derrubar a execução
+    novos = extrato("pdfs/unimed/b.pdf", "unimed", semente=1)
+    def bloqueado(self, arquivo):
+        raise PermissionError(f"[Errno 13] Permission denied: '{arquivo}'")
+    with monkeypatch.context() as contexto:
+        contexto.setattr(Workbook, "save", bloqueado)
+        assert main.main(["pdfs", "-o", "r.xlsx", "-w", "1", "--metricas", "metricas", "-i"]) == 1
+    with open(main.Manifesto.caminho_para("r.xlsx"), encoding="utf-8") as arquivo:
+        assert arquivo.read() == anterior
+
+    # Na execução seguinte, o PDF novo é processado
+    assert executar("-i") == {"unimed": procedimentos + novos}
+
+def test_pdf_da_caixa_de_entrada_vai_para_o_plano_do_layout(extrato):
+    procedimentos = extrato("pdfs/a.pdf", "samp")
+    dados, metricas = main.extrair_arquivo("pdfs/a.pdf", "entrada")
+    assert metricas.plano == "samp"
+    assert len(dados) == procedimentos
+
+def test_remover_pdf_no_incremental_reescreve_o_repasse_das_linhas_que_sobem(extrato):
+    extrato("pdfs/unimed/a.pdf", "unimed")
+    procedimentos = extrato("pdfs/unimed/b.pdf", "unimed", semente=1)
+    executar("-i")
+
+    os.remove("pdfs/unimed/a.pdf")
+    assert executar("-i") == {"unimed": procedimentos}
+
+    sheet = load_workbook("r.xlsx")["unimed"]
+    for linha in range(PRIMEIRA_LINHA, sheet.max_row + 1):
+        assert sheet.cell(row=linha, column=11).value == formula_repasse(linha)
+
+def test_pdf_na_pasta_de_outro_plano_e_extraido_pelo_layout(extrato):
+    procedimentos = extrato("pdfs/unimed/a.pdf", "amil")
+    dados, metricas = main.extrair_arquivo("pdfs/unimed/a.pdf", "unimed")
+    assert metricas.plano == "amil"
+    assert len(dados) == procedimentos
+
+def test_pdf_com_registros_nao_tem_o_layout_conferido(extrato, monkeypatch):
+    # Com procedimentos extraídos pelo plano da pasta, o layout nem é lido
+    monkeypatch.setattr(main, "detectar_plano", None)
+    procedimentos = extrato("pdfs/unimed/a.pdf", "unimed")
+    dados, metricas = main.extrair_arquivo("pdfs/unimed/a.pdf", "unimed")
+    assert metricas.plano == "unimed"
+    assert len(dados) == procedimentos
+
+def test_importar_main_nao_carrega_pandas():
+    codigo = "import sys, main; print(sorted({'pandas', 'numpy', 'openpyxl'} & set(sys.modules)))"
+    saida = subprocess.run([sys.executable, "-c", codigo], cwd=os.path.dirname(main.__file__),
+                           capture_output=True, text=True, check=True).stdout
+    assert saida.strip() == "[]"
+
+def test_metricas_sem_o_modulo_resource(extrato, monkeypatch):
+    # Windows: sem o módulo resource, o pico de memória fica vazio
+    monkeypatch.setitem(sys.modules, "resource", None)
+    procedimentos = extrato("pdfs/unimed/a.pdf", "unimed")
+    assert executar() == {"unimed": procedimentos}
+
+    with open("metricas.json", encoding="utf-8") as arquivo:
+        metricas = json.load(arquivo)
+    assert metricas["pico_memoria_mb"] is None
+    assert [item["pico_memoria_mb"] for item in metricas["arquivos"]] == [None]
@@ -0,0 +1,35 @@
+from utilitarios.manifesto import Manifesto
+
+def pdf(caminho:str, conteudo:bytes = b"%PDF"):
+    with open(caminho, "wb") as arquivo:
+        arquivo.write(conteudo)
+    return caminho
+
+def test_remover_sobe_os_trechos_abaixo_do_pdf():
+    manifesto = Manifesto("r.manifesto.json")
+    manifesto.registrar(pdf("a.pdf"), "unimed", [("unimed", 5, 10)])
+    manifesto.registrar(pdf("b.pdf"), "unimed", [("unimed", 15, 3)])
+    manifesto.registrar(pdf("c.pdf"), "amil", [("amil", 5, 2)])
+
+    assert manifesto.remover("a.pdf") == [("unimed", 5, 10)]
+    assert manifesto.arquivos["b.pdf"]["trechos"] == [["unimed", 5, 3]]
+    assert manifesto.arquivos["c.pdf"]["trechos"] == [["amil", 5, 2]]
+    assert manifesto.remover("a.pdf") == []
+
+def test_ausentes_so_dos_planos_informados():
+    manifesto = Manifesto("r.manifesto.json")
+    manifesto.registrar(pdf("a.pdf"), "unimed", [])
+    manifesto.registrar(pdf("b.pdf"), "unimed", [])
+    manifesto.registrar(pdf("c.pdf"), "amil", [])
+
+    assert manifesto.ausentes(["./b.pdf"], ["unimed"]) == ["a.pdf"]
+
+def test_inalterado_ate_o_conteudo_mudar():
+    manifesto = Manifesto("r.manifesto.json")
+    manifesto.registrar(pdf("a.pdf"), "unimed", [])
+    manifesto.salvar()
+
+    manifesto = Manifesto("r.manifesto.json").carregar()
+    assert manifesto.inalterado("a.pdf")
+    pdf("a.pdf", b"%PDF-2")
+    assert not manifesto.inalterado("a.pdf")
@@ -0,0 +1,23 @@
+import csv
+
+from utilitarios.metricas import MetricasArquivo, RelatorioMetricas
+
+def test_csv_tem_uma_linha_por_arquivo_com_o_erro():
+    metricas = RelatorioMetricas()
+    lido = MetricasArquivo("pdfs/unimed/a.pdf", "unimed")
+    with lido.medir("extrair_texto"):
+        pass
+    # Falhou antes de qualquer etapa medida
+    com_erro = MetricasArquivo("pdfs/unimed/b.pdf", "unimed")
+    com_erro.erro = "PDF corrompido"
+    metricas.adicionar_arquivo(lido)
+    metricas.adicionar_arquivo(com_erro)
+    metricas.salvar("metricas")
+
+    with open("metricas.csv", encoding="utf-8", newline="") as arquivo:
+        linhas = list(csv.DictReader(arquivo))
+    por_arquivo = {linha["arquivo"]: linha for linha in linhas if linha["arquivo"]}
+    assert por_arquivo["pdfs/unimed/a.pdf"]["etapa"] == "extrair_texto"
+    assert por_arquivo["pdfs/unimed/a.pdf"]["erro"] == ""
+    assert por_arquivo["pdfs/unimed/b.pdf"]["etapa"] == ""
+    assert por_arquivo["pdfs/unimed/b.pdf"]["erro"] == "PDF corrompido"
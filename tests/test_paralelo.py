@@ -0,0 +1,28 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from benchmarks.sinteticos import PLANOS
+from utilitarios.extratores import ExtratorPDF
+from utilitarios.paralelo import dividir_paginas, dividir_pdf
+
+@pytest.fixture
+def executor(pasta_teste):
+    # Por teste: os processos herdam a pasta do teste
+    with ProcessPoolExecutor(2) as executor:
+        yield executor
+
+@pytest.mark.parametrize("plano", PLANOS)
+def test_intervalos_extraem_o_mesmo_que_a_leitura_serial(plano, extrato, executor):
+    procedimentos = extrato(f"pdfs/{plano}/a.pdf", plano, paginas=12)
+    # Intervalos de 5 páginas: o último fica menor que os outros
+    intervalos = dividir_pdf(f"pdfs/{plano}/a.pdf", plano, paginas_por_intervalo=5)
+    assert intervalos == dividir_paginas(12, 5) == [(0, 5), (5, 10), (10, 12)]
+
+    serial = ExtratorPDF(f"pdfs/{plano}/a.pdf", plano, cache=None)
+    dividido = ExtratorPDF(f"pdfs/{plano}/a.pdf", plano, cache=None, executor=executor, intervalos=intervalos)
+    assert dividido.ler_paralelo() is not None
+
+    registros = list(serial.extrair_dados())
+    assert len(registros) == procedimentos
+    assert list(dividido.extrair_dados()) == registros
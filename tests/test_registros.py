@@ -0,0 +1,14 @@
+from benchmarks.bench_registros import gerar_registros
+from utilitarios.registros import TabelaRegistros
+
+def test_tabela_aceita_registros_depois_de_exportada():
+    tabela = TabelaRegistros("unimed")
+    tabela.estender(gerar_registros(10))
+    df = tabela.para_dataframe()
+
+    # O DataFrame vivo não prende os arrays de códigos da tabela
+    tabela.estender(gerar_registros(5, semente=1))
+    tabela.adicionar(tabela[0])
+    assert len(tabela) == 16
+    assert len(df) == 10
+    assert df["GTO"].tolist() == [registro.gto for registro in list(tabela)[:10]]
@@ -0,0 +1,173 @@
+from datetime import datetime
+
+import openpyxl
+import pytest
+from openpyxl import load_workbook
+from openpyxl.cell.cell import MergedCell
+
+from benchmarks.bench_registros import gerar_registros
+from utilitarios.normalizacao import normalizar_dados
+from utilitarios.registros import TabelaRegistros
+from utilitarios.agregacao import valor_repasse
+from utilitarios.relatorio import (
+    PLANILHA_RESUMO, PLANILHA_TOTAIS, PRIMEIRA_LINHA, RelatorioExistente, RelatorioPlanilha, estilo_coluna, formula_repasse,
+    linhas_cabecalho, linhas_relatorio, linhas_resumo, linhas_totais, nome_planilha, nome_total, partes_relatorio,
+)
+
+def dados(plano:str, quantidade:int, semente:int = 0):
+    tabela = TabelaRegistros(plano)
+    tabela.estender(gerar_registros(quantidade, semente=semente))
+    return normalizar_dados(tabela, plano)
+
+def test_nomes_das_planilhas_de_continuacao():
+    assert nome_planilha("unimed") == "unimed"
+    assert nome_planilha("unimed", 2) == "unimed (2)"
+    assert nome_planilha("odonto/empresas:[sp]") == "odonto_empresas__sp_"
+    # O Excel aceita até 31 caracteres: o sufixo corta o nome, não some
+    assert nome_planilha("a" * 40, 12) == "a" * 26 + " (12)"
+    assert nome_total("unimed (2)") == "repasse_unimed__2_"
+
+def test_plano_continua_em_novas_planilhas_ao_atingir_o_limite():
+    relatorio = RelatorioPlanilha("r.xlsx", linhas_por_planilha=7)
+    assert relatorio.adicionar(dados("unimed", 10), "unimed") == [("unimed", 5, 7), ("unimed (2)", 5, 3)]
+    # O mesmo plano em seguida continua a última planilha dele
+    assert relatorio.adicionar(dados("unimed", 10, semente=1), "unimed") == [("unimed (2)", 8, 4), ("unimed (3)", 5, 6)]
+    assert relatorio.adicionar(dados("amil", 2), "amil") == [("amil", 5, 2)]
+    relatorio.salvar()
+
+    workbook = load_workbook("r.xlsx")
+    assert workbook.sheetnames == [PLANILHA_RESUMO, PLANILHA_TOTAIS, "unimed", "unimed (2)", "unimed (3)", "amil"]
+    assert partes_relatorio(workbook) == [
+        ["unimed", "unimed", 11], ["unimed", "unimed (2)", 11], ["unimed", "unimed (3)", 10], ["amil", "amil", 6],
+    ]
+
+    # O total de cada planilha soma só as linhas escritas nela
+    for _, planilha, ultima_linha in partes_relatorio(workbook):
+        nome = nome_total(planilha)
+        assert workbook[planilha]["M3"].value == f"=SUM({nome})"
+        assert workbook.defined_names[nome].attr_text == f"'{planilha}'!$K$5:$K${ultima_linha}"
+
+    resumo = list(workbook[PLANILHA_RESUMO].iter_rows(min_row=2, values_only=True))
+    assert [linha[:3] for linha in resumo[:-1]] == [
+        ("unimed", "unimed", 7), ("unimed", "unimed (2)", 7), ("unimed", "unimed (3)", 6), ("amil", "amil", 2),
+    ]
+    assert resumo[-1][0] == "TOTAL"
+
+def test_relatorio_existente_carrega_e_grava_uma_vez(monkeypatch):
+    relatorio = RelatorioPlanilha("r.xlsx", linhas_por_planilha=7)
+    relatorio.adicionar(dados("unimed", 10), "unimed")
+    relatorio.adicionar(dados("amil", 3), "amil")
+    relatorio.salvar()
+
+    carregamentos = []
+    gravacoes = []
+    _carregar, _gravar = openpyxl.load_workbook, openpyxl.Workbook.save
+    monkeypatch.setattr(openpyxl, "load_workbook", lambda *args, **kwargs: carregamentos.append(args) or _carregar(*args, **kwargs))
+    monkeypatch.setattr(openpyxl.Workbook, "save", lambda self, *args: gravacoes.append(args) or _gravar(self, *args))
+
+    existente = RelatorioExistente("r.xlsx", linhas_por_planilha=7)
+    existente.remover([("unimed", 6, 2), ("amil", 5, 1)])
+    assert existente.adicionar(dados("unimed", 6, semente=1), "unimed") == [("unimed (2)", 8, 4), ("unimed (3)", 5, 2)]
+    assert existente.adicionar(dados("amil", 1, semente=1), "amil") == [("amil", 7, 1)]
+    existente.salvar()
+    assert len(carregamentos) == len(gravacoes) == 1
+
+    resumo = list(load_workbook("r.xlsx")[PLANILHA_RESUMO].iter_rows(min_row=2, values_only=True))
+    assert [linha[:3] for linha in resumo[:-1]] == [
+        ("unimed", "unimed", 5), ("unimed", "unimed (2)", 7), ("amil", "amil", 3), ("unimed", "unimed (3)", 2),
+    ]
+
+def test_adicao_com_erro_nao_deixa_linhas_no_relatorio():
+    relatorio = RelatorioPlanilha("r.xlsx", linhas_por_planilha=7)
+    relatorio.adicionar(dados("unimed", 5), "unimed")
+    relatorio.salvar()
+
+    existente = RelatorioExistente("r.xlsx", linhas_por_planilha=7)
+    # O caractere de controle só é recusado pelo openpyxl na quinta linha,
+    # já na planilha de continuação
+    registros = list(gerar_registros(5, semente=1))
+    registros[4].nome_beneficiario = "\x01"
+    com_erro = TabelaRegistros("unimed")
+    com_erro.estender(registros)
+    assert existente.adicionar(normalizar_dados(com_erro, "unimed"), "unimed") is None
+    assert existente.adicionar(dados("amil", 2), "amil") == [("amil", 5, 2)]
+    existente.salvar()
+
+    workbook = load_workbook("r.xlsx")
+    assert partes_relatorio(workbook) == [["unimed", "unimed", 9], ["amil", "amil", 6]]
+    assert "unimed (2)" not in workbook.sheetnames
+
+@pytest.mark.parametrize("manter_formulas", [True, False])
+def test_relatorio_existente_mantem_a_taxa_do_relatorio(manter_formulas):
+    relatorio = RelatorioPlanilha("r.xlsx", taxa_repasse=40, manter_formulas=manter_formulas)
+    relatorio.adicionar(dados("unimed", 5), "unimed")
+    relatorio.salvar()
+
+    existente = RelatorioExistente("r.xlsx", manter_formulas=manter_formulas)
+    existente.remover([("unimed", 5, 1)])
+    assert existente.adicionar(dados("unimed", 3, semente=1), "unimed") == [("unimed", 9, 3)]
+    existente.salvar()
+
+    workbook = load_workbook("r.xlsx")
+    sheet = workbook["unimed"]
+    pagos = []
+    for linha in range(PRIMEIRA_LINHA, sheet.max_row + 1):
+        pago = sheet.cell(row=linha, column=10).value
+        repasse = formula_repasse(linha, 40) if manter_formulas else valor_repasse(pago, 40)
+        assert sheet.cell(row=linha, column=11).value == repasse
+        pagos.append(pago)
+
+    totais = list(workbook[PLANILHA_TOTAIS].iter_rows(values_only=True))
+    assert totais[0][:2] == ("TAXA DE REPASSE (%)", 40)
+    assert totais[-1][0] == "TOTAL"
+    assert totais[-1][4] == pytest.approx(sum(valor_repasse(pago, 40) for pago in pagos))
+
+def celulas_esperadas(linhas:list, primeira_linha:int = 1):
+    """Valor e estilo de cada célula de linhas de (valor, estilo) ou None, por (linha, coluna)."""
+
+    return {
+        (numero, coluna): item
+        for numero, linha in enumerate(linhas, start=primeira_linha)
+        for coluna, item in enumerate(linha, start=1) if item
+    }
+
+@pytest.mark.parametrize("manter_formulas", [True, False])
+def test_arquivo_relido_tem_o_valor_e_o_estilo_de_cada_celula(manter_formulas):
+    tabela = dados("unimed", 30)
+    for campo in ("Nome do Beneficiário", "Data de Realização", "GTO"):
+        tabela[campo] = tabela[campo].astype(object)
+    especiais = [" COM ESPAÇOS ", "A & B <C>", "LINHA\r\nQUEBRADA", "=SOMA", "#N/A"]
+    for indice, texto in enumerate(especiais):
+        tabela.loc[indice, "Nome do Beneficiário"] = texto
+    tabela.loc[8, "Data de Realização"] = datetime(2024, 8, 13, 10, 30)
+    tabela.loc[9, "GTO"] = None
+    planos = {"unimed": tabela, "amil": dados("amil", 5)}
+
+    relatorio = RelatorioPlanilha("r.xlsx", manter_formulas=manter_formulas)
+    for plano, df in planos.items():
+        relatorio.adicionar(df, plano)
+    relatorio.salvar()
+
+    esperadas = {
+        PLANILHA_RESUMO: celulas_esperadas(linhas_resumo(relatorio.partes, None if manter_formulas else relatorio.somas)),
+        PLANILHA_TOTAIS: celulas_esperadas(linhas_totais(relatorio.agregador)),
+    }
+    for plano, df in planos.items():
+        linhas = []
+        for numero, valores in enumerate(linhas_relatorio(df, plano), start=PRIMEIRA_LINHA):
+            repasse = formula_repasse(numero) if manter_formulas else valor_repasse(valores[9])
+            linhas.append([(valor, estilo_coluna(coluna)) for coluna, valor in enumerate([*valores, repasse], start=1)])
+        esperadas[plano] = {**celulas_esperadas(linhas_cabecalho(plano)), **celulas_esperadas(linhas, PRIMEIRA_LINHA)}
+
+    workbook = load_workbook("r.xlsx")
+    assert workbook.sheetnames == list(esperadas)
+    for planilha, celulas in esperadas.items():
+        sheet = workbook[planilha]
+        # As células cobertas por uma mesclagem seguem a primeira dela
+        celulas = {posicao: item for posicao, item in celulas.items() if not isinstance(sheet.cell(*posicao), MergedCell)}
+        relidas = {
+            (celula.row, celula.column): (celula.value, celula.style)
+            for linha in sheet.iter_rows() for celula in linha
+            if not isinstance(celula, MergedCell) and (celula.value is not None or celula.has_style)
+        }
+        assert relidas == celulas, planilha
@@ -0,0 +1,56 @@
+import os
+import re
+
+import pytest
+
+from benchmarks.sinteticos import gerar_paginas
+from tests.test_extratores import recortar
+from utilitarios.extratores import ExtratorPDF
+from utilitarios.tokenizador import PLANOS_TOKENIZADOS, TOKENIZAR, Tokenizador
+
+def extrair(plano:str, paginas:list[str], tokenizar:bool = None):
+    extrator = ExtratorPDF(f"sintetico_{plano}.pdf", plano, cache=None, tokenizar=tokenizar)
+    return list(extrator.iterar_dados(iter(paginas), prefiltro=False))
+
+def quebrar_linhas(paginas:list[str]):
+    """Quebra a linha antes da data de cada procedimento, como nas descrições longas dos PDFs."""
+
+    return [re.sub(r" (\d{2}/\d{2}/\d{4} )", r"\n\1", pagina) for pagina in paginas]
+
+@pytest.mark.parametrize("plano", PLANOS_TOKENIZADOS)
+@pytest.mark.parametrize("tamanho", [None, 1000, 7919])
+def test_tokenizador_extrai_o_mesmo_que_os_padroes(plano, tamanho):
+    paginas, procedimentos = gerar_paginas(plano, 6)
+    # Recortadas, as páginas partem nomes e procedimentos na quebra
+    if tamanho:
+        paginas = recortar(paginas, tamanho)
+
+    registros = extrair(plano, paginas, tokenizar=False)
+    assert len(registros) == procedimentos
+    assert extrair(plano, paginas, tokenizar=True) == registros
+
+@pytest.mark.parametrize("plano", PLANOS_TOKENIZADOS)
+@pytest.mark.parametrize("tamanho", [None, 1000])
+def test_procedimento_em_duas_linhas(plano, tamanho):
+    paginas, procedimentos = gerar_paginas(plano, 3)
+    quebradas = quebrar_linhas(paginas)
+    assert quebradas != paginas
+    if tamanho:
+        quebradas = recortar(quebradas, tamanho)
+
+    registros = extrair(plano, quebradas, tokenizar=False)
+    assert len(registros) == procedimentos
+    assert extrair(plano, quebradas, tokenizar=True) == registros
+    # Pelo padrão de cada plano (tokenizador na Rede Unna, padrões na Amil)
+    assert extrair(plano, quebradas) == registros
+
+@pytest.mark.skipif("PDF_TOKENIZADOR" in os.environ, reason="PDF_TOKENIZADOR definido no ambiente")
+def test_amil_fica_nos_padroes_por_padrao():
+    assert TOKENIZAR == {"rede_unna"}
+
+def test_tokenizador_sem_linhas_nao_pode_ser_criado():
+    class Incompleto(Tokenizador):
+        pass
+
+    with pytest.raises(TypeError, match="linhas"):
+        Incompleto()
@@ -0,0 +1,162 @@
+import os
+import time
+import shutil
+import asyncio
+
+import pytest
+from openpyxl import Workbook
+
+import main as main_cli
+import vigia as vigia_modulo
+from main import extrair_arquivo
+from tests.test_main import linhas_por_plano
+from utilitarios.deduplicacao import Deduplicador
+from utilitarios.manifesto import Manifesto
+from utilitarios.relatorio import RelatorioExistente
+from vigia import VigiaPastas, main
+
+def processar(vigia:VigiaPastas):
+    """Uma rodada do serviço, sem o loop de eventos: varre, extrai e grava o lote."""
+
+    vigia.varrer(agora=0)
+    for caminho_pdf, plano in vigia.varrer(agora=vigia.estabilidade):
+        dados, metricas_arquivo = extrair_arquivo(caminho_pdf, plano)
+        vigia._pendentes.append((caminho_pdf, metricas_arquivo.plano, dados))
+    vigia.gravar_lote()
+    return linhas_por_plano(vigia.arquivo_relatorio)
+
+def test_pdf_renomeado_troca_as_linhas_sem_duplicar(extrato):
+    procedimentos = extrato("pdfs/unimed/a.pdf", "unimed")
+    extrato("pdfs/amil/b.pdf", "amil", semente=1)
+    vigia = VigiaPastas(["pdfs"], "r.xlsx", deduplicador=Deduplicador("r.duplicatas.db"))
+    vigia._preparar_relatorio()
+    linhas = processar(vigia)
+    assert linhas["unimed"] == procedimentos
+
+    os.rename("pdfs/unimed/a.pdf", "pdfs/unimed/c.pdf")
+    assert processar(vigia) == linhas
+    assert sorted(vigia.manifesto.arquivos) == [os.path.normpath("pdfs/amil/b.pdf"), os.path.normpath("pdfs/unimed/c.pdf")]
+    assert not os.path.exists("r.duplicatas.csv")
+
+def test_pdf_inalterado_nao_volta_para_a_fila(extrato):
+    extrato("pdfs/unimed/a.pdf", "unimed")
+    vigia = VigiaPastas(["pdfs"], "r.xlsx")
+    vigia._preparar_relatorio()
+    processar(vigia)
+
+    # Reiniciado, o serviço retoma pelo manifesto
+    vigia = VigiaPastas(["pdfs"], "r.xlsx")
+    vigia._preparar_relatorio()
+    vigia.varrer(agora=0)
+    assert vigia.varrer(agora=vigia.estabilidade) == []
+
+def test_modo_servico_nao_aceita_incremental():
+    with pytest.raises(SystemExit):
+        main(["pdfs", "-i"])
+
+_extrair_arquivo = main_cli.extrair_arquivo
+
+def extrair_ou_derrubar(caminho_pdf:str, plano:str, *argumentos):
+    if "derruba" in os.path.basename(caminho_pdf):
+        os._exit(1)
+    return _extrair_arquivo(caminho_pdf, plano, *argumentos)
+
+async def executar_ate(vigia:VigiaPastas, condicao, limite:float = 60):
+    servico = asyncio.create_task(vigia.executar())
+    inicio = time.monotonic()
+    while not condicao() and time.monotonic() - inicio < limite:
+        await asyncio.sleep(0.1)
+    vigia.parar()
+    await servico
+
+def test_pool_recriado_quando_um_processo_morre(extrato, monkeypatch):
+    monkeypatch.setattr(vigia_modulo, "extrair_arquivo", extrair_ou_derrubar)
+    monkeypatch.setattr(main_cli, "extrair_arquivo", extrair_ou_derrubar)
+    extrato("pdfs/unimed/a_derruba.pdf", "unimed")
+    procedimentos = extrato("pdfs/unimed/b.pdf", "unimed", semente=1)
+
+    vigia = VigiaPastas(["pdfs"], "r.xlsx", workers=1, intervalo=0.1, estabilidade=0, tamanho_lote=1, isolar=False)
+    asyncio.run(executar_ate(vigia, lambda: os.path.exists("quarentena/arquivos/unimed/a_derruba.pdf")
+                             and os.path.normpath("pdfs/unimed/b.pdf") in vigia.manifesto.arquivos))
+
+    assert linhas_por_plano("r.xlsx") == {"unimed": procedimentos}
+    assert os.path.exists("quarentena/arquivos/unimed/a_derruba.pdf")
+
+def extrair_com_falhas(caminho_pdf:str, plano:str, *argumentos):
+    nome = os.path.basename(caminho_pdf)
+    if nome.startswith("erro"):
+        raise ValueError("PDF corrompido")
+    if nome.startswith("trava"):
+        time.sleep(3)
+    return _extrair_arquivo(caminho_pdf, plano, *argumentos)
+
+def test_pdf_com_erro_vai_para_a_quarentena_e_o_travado_e_refeito_isolado(extrato, monkeypatch):
+    monkeypatch.setattr(vigia_modulo, "extrair_arquivo", extrair_com_falhas)
+    monkeypatch.setattr(main_cli, "extrair_arquivo", extrair_com_falhas)
+    extrato("pdfs/unimed/erro.pdf", "unimed")
+    trava = extrato("pdfs/unimed/trava.pdf", "unimed", semente=1)
+    procedimentos = extrato("pdfs/unimed/b.pdf", "unimed", semente=2)
+
+    vigia = VigiaPastas(["pdfs"], "r.xlsx", workers=2, intervalo=0.1, estabilidade=0, tamanho_lote=1, isolar=False, tempo=1)
+    asyncio.run(executar_ate(vigia, lambda: vigia.manifesto is not None and len(vigia.manifesto.arquivos) == 2))
+
+    assert os.path.exists("quarentena/arquivos/unimed/erro.pdf")
+    assert "pdfs/unimed/erro.pdf" not in vigia._em_andamento
+    assert linhas_por_plano("r.xlsx") == {"unimed": procedimentos + trava}
+    [metricas_trava] = [metricas for metricas in vigia.metricas.arquivos if metricas.arquivo.endswith("trava.pdf")]
+    assert metricas_trava.tentativas == 1
+
+def salvar_falhando_uma_vez(monkeypatch):
+    """Relatório aberto no Excel: a primeira gravação falha."""
+
+    _salvar = Workbook.save
+    falhas = []
+    def salvar(self, arquivo):
+        if not falhas:
+            falhas.append(arquivo)
+            raise PermissionError(f"[Errno 13] Permission denied: '{arquivo}'")
+        return _salvar(self, arquivo)
+    monkeypatch.setattr(Workbook, "save", salvar)
+    return falhas
+
+def test_lote_nao_gravado_volta_para_os_pendentes(extrato, monkeypatch):
+    procedimentos = extrato("pdfs/unimed/a.pdf", "unimed")
+    shutil.copy("pdfs/unimed/a.pdf", "pdfs/unimed/b.pdf")
+    vigia = VigiaPastas(["pdfs"], "r.xlsx", deduplicador=Deduplicador("r.duplicatas.db"))
+    vigia._preparar_relatorio()
+    linhas = processar(vigia)
+    with open(Manifesto.caminho_para("r.xlsx"), encoding="utf-8") as arquivo:
+        anterior = arquivo.read()
+
+    # Saem as linhas de a.pdf; as de b.pdf, descartadas como duplicatas delas, voltariam
+    os.remove("pdfs/unimed/a.pdf")
+    novos = extrato("pdfs/unimed/c.pdf", "unimed", semente=1)
+    falhas = salvar_falhando_uma_vez(monkeypatch)
+    assert processar(vigia) == linhas
+    assert falhas
+    assert [os.path.normpath(caminho_pdf) for caminho_pdf, _, _ in vigia._pendentes] == [os.path.normpath("pdfs/unimed/c.pdf")]
+    assert sorted(vigia.manifesto.arquivos) == [os.path.normpath("pdfs/unimed/a.pdf"), os.path.normpath("pdfs/unimed/b.pdf")]
+    with open(Manifesto.caminho_para("r.xlsx"), encoding="utf-8") as arquivo:
+        assert arquivo.read() == anterior
+
+    # Na nova tentativa o lote é gravado e b.pdf volta à fila
+    processar(vigia)
+    assert processar(vigia) == {"unimed": procedimentos + novos}
+    assert sorted(vigia.manifesto.arquivos) == [os.path.normpath("pdfs/unimed/b.pdf"), os.path.normpath("pdfs/unimed/c.pdf")]
+
+def test_gravador_continua_depois_de_um_lote_nao_gravado(extrato, monkeypatch):
+    procedimentos = extrato("pdfs/unimed/a.pdf", "unimed")
+    _salvar = RelatorioExistente.salvar
+    falhas = []
+    def salvar(self):
+        if not falhas:
+            falhas.append(self.arquivo)
+            return False
+        return _salvar(self)
+    monkeypatch.setattr(RelatorioExistente, "salvar", salvar)
+
+    vigia = VigiaPastas(["pdfs"], "r.xlsx", workers=1, intervalo=0.1, estabilidade=0, tamanho_lote=1, intervalo_lote=0.2)
+    asyncio.run(executar_ate(vigia, lambda: vigia.manifesto is not None and len(vigia.manifesto.arquivos) == 1))
+
+    assert falhas
+    assert linhas_por_plano("r.xlsx") == {"unimed": procedimentos}
@@ -0,0 +1,195 @@
+import os
+import json
+
+import numpy as np
+import pandas as pd
+
+from utilitarios.logger_config import logger
+from utilitarios.registros import como_dataframe
+
+# Percentual do valor pago repassado ao dentista (coluna REPASSE DENTISTA)
+TAXA_REPASSE = float(os.environ.get("PDF_TAXA_REPASSE", 35))
+
+# Mantém no relatório as fórmulas do repasse de cada linha e as somas do
+# resumo ("0" grava os valores já calculados); a planilha de totais e o
+# JSON trazem sempre os valores
+MANTER_FORMULAS = os.environ.get("PDF_FORMULAS", "1") == "1"
+
+# Dimensões dos totais e o campo dos registros de cada uma (o plano vem de quem adiciona)
+DIMENSOES = {
+    "plano": None,
+    "beneficiario": "Nome do Beneficiário",
+    "procedimento": "Código Procedimento",
+    "mes": "Data de Realização",
+}
+
+# Campo que dá nome aos valores de uma dimensão: o procedimento é agrupado
+# pelo código, que não varia com a grafia do nome entre os extratos
+ROTULOS = {"procedimento": "Nome Procedimento"}
+
+# Somas parciais guardadas antes de serem consolidadas em uma só
+MAXIMO_PARCIAIS = 64
+
+def centavos(serie:pd.Series):
+    """Valores em reais (já normalizados) em centavos inteiros, com 0 onde não há valor."""
+
+    return (pd.to_numeric(serie, errors="coerce") * 100).round().fillna(0).astype("int64")
+
+def centavos_repasse(centavos_pago, taxa_repasse:float = TAXA_REPASSE):
+    """
+    Repasse em centavos de cada valor pago em centavos, arredondado como o
+    ARRED do Excel (a metade para longe do zero), o mesmo da fórmula de
+    relatorio.formula_repasse.
+    """
+
+    bruto = np.asarray(centavos_pago, dtype="float64") * taxa_repasse / 100
+    return (np.sign(bruto) * np.floor(np.abs(bruto) + 0.5)).astype("int64")
+
+def valor_repasse(valor_pago, taxa_repasse:float = TAXA_REPASSE):
+    """Repasse de uma linha, em reais, o mesmo valor da fórmula de relatorio.formula_repasse."""
+
+    return int(centavos_repasse(round((valor_pago or 0) * 100), taxa_repasse)) / 100
+
+class Agregador:
+    """
+    Totais de valor pago, glosa e repasse dos registros por plano,
+    beneficiário, procedimento e mês, calculados em centavos com operações
+    vetorizadas do pandas, sem depender do Excel para calcular as fórmulas.
+
+    O repasse de cada registro é arredondado em centavos antes das somas,
+    como na coluna de repasse do relatório: os totais por dimensão somam o
+    total geral. Os procedimentos são agrupados pelo código, com o primeiro
+    nome encontrado para ele.
+
+    Cada chamada de adicionar é reduzida logo às somas por (plano,
+    beneficiário, procedimento, mês): a memória depende da quantidade dessas
+    combinações, não da de registros.
+
+    Uso:
+        agregador = Agregador()
+        agregador.adicionar(dados, "unimed")
+        agregador.totais("mes")  # DataFrame com registros, pago, glosa e repasse (em reais)
+        agregador.salvar_json(Agregador.caminho_para(arquivo_relatorio))
+    """
+
+    def __init__(self, taxa_repasse:float = TAXA_REPASSE):
+        self.taxa_repasse = taxa_repasse
+        self._parciais = []
+        self._rotulos = {dimensao: {} for dimensao in ROTULOS}
+
+    @staticmethod
+    def caminho_para(arquivo_relatorio:str):
+        """Caminho do resumo em JSON associado a um relatório."""
+
+        return f"{os.path.splitext(arquivo_relatorio)[0]}.totais.json"
+
+    def adicionar(self, dados, plano:str):
+        """Soma os registros de um plano (TabelaRegistros, DataFrame ou lista de registros, já normalizados)."""
+
+        df = como_dataframe(dados)
+        if not len(df):
+            return
+
+        def _coluna(campo:str):
+            if campo in df:
+                return df[campo]
+            return pd.Series(None, index=df.index, dtype=object)
+
+        datas = _coluna(DIMENSOES["mes"])
+        if not pd.api.types.is_datetime64_any_dtype(datas):
+            datas = pd.to_datetime(datas, errors="coerce")
+
+        for dimensao, campo in ROTULOS.items():
+            chave = DIMENSOES[dimensao]
+            if chave in df and campo in df:
+                pares = df[[chave, campo]].dropna().drop_duplicates(chave)
+                rotulos = self._rotulos[dimensao]
+                for valor, rotulo in zip(pares[chave], pares[campo]):
+                    rotulos.setdefault(valor, rotulo)
+
+        pago = centavos(_coluna("Valor Processado"))
+
+        # Nomes continuam categóricos (como vêm de TabelaRegistros) e o mês é
+        # o primeiro dia dele: nenhuma coluna é convertida valor a valor
+        parcial = pd.DataFrame({
+            "plano": plano,
+            "beneficiario": _coluna(DIMENSOES["beneficiario"]),
+            "procedimento": _coluna(DIMENSOES["procedimento"]),
+            "mes": datas.to_numpy(dtype="datetime64[ns]").astype("datetime64[M]"),
+            "registros": 1,
+            "pago": pago,
+            "glosa": centavos(_coluna("Valor Glosa")),
+            "repasse": centavos_repasse(pago, self.taxa_repasse),
+        })
+        self._parciais.append(parcial.groupby(list(DIMENSOES), dropna=False, observed=True, sort=False).sum())
+        if len(self._parciais) >= MAXIMO_PARCIAIS:
+            self._consolidar()
+
+    def _consolidar(self):
+        if len(self._parciais) > 1:
+            tabela = pd.concat(self._parciais)
+            self._parciais = [tabela.groupby(level=list(DIMENSOES), dropna=False, observed=True, sort=False).sum()]
+        return self._parciais[0] if self._parciais else None
+
+    def totais(self, dimensao:str = None):
+        """
+        Totais por uma das DIMENSOES (ou gerais, sem dimensão), com as colunas
+        registros, pago, glosa e repasse, estas em reais (e, nas dimensões
+        de ROTULOS, o nome de cada valor). Os meses e planos ficam na ordem,
+        e beneficiários e procedimentos do maior valor pago para o menor.
+
+        Returns:
+            pd.DataFrame: Uma linha por valor da dimensão (uma só, sem dimensão).
+        """
+
+        tabela = self._consolidar()
+        if tabela is None:
+            tabela = pd.DataFrame({"registros": [], "pago": [], "glosa": [], "repasse": []}, dtype="int64")
+        if dimensao is None:
+            tabela = tabela.sum().to_frame().T
+        elif len(tabela):
+            tabela = tabela.groupby(level=dimensao, dropna=False, observed=True, sort=dimensao == "mes").sum()
+            if dimensao in ("beneficiario", "procedimento"):
+                tabela = tabela.sort_values("pago", ascending=False, kind="stable")
+
+        totais = pd.DataFrame({"registros": tabela["registros"].astype("int64")}, index=tabela.index)
+        for coluna in ("pago", "glosa", "repasse"):
+            totais[coluna] = tabela[coluna] / 100
+        if dimensao is not None:
+            totais.index = [
+                None if pd.isna(valor) else valor.strftime("%Y-%m") if dimensao == "mes" else valor
+                for valor in totais.index
+            ]
+            totais.index.name = dimensao
+            if dimensao in ROTULOS:
+                totais.insert(0, "nome", [self._rotulos[dimensao].get(valor) for valor in totais.index])
+        return totais
+
+    def resumo(self):
+        """Totais gerais e por dimensão, prontos para serializar."""
+
+        def _linhas(totais:pd.DataFrame, dimensao:str):
+            return [
+                {dimensao: chave, **({"nome": linha.nome} if "nome" in totais else {}),
+                 "registros": int(linha.registros), "pago": round(linha.pago, 2),
+                 "glosa": round(linha.glosa, 2), "repasse": round(linha.repasse, 2)}
+                for chave, linha in zip(totais.index, totais.itertuples(index=False))
+            ]
+
+        geral = _linhas(self.totais(), "total")[0]
+        del geral["total"]
+        resumo = {"taxa_repasse": self.taxa_repasse, "total": geral}
+        for dimensao in DIMENSOES:
+            resumo[f"por_{dimensao}"] = _linhas(self.totais(dimensao), dimensao)
+        return resumo
+
+    def salvar_json(self, caminho:str):
+        """Grava o resumo em JSON."""
+
+        try:
+            with open(caminho, "w", encoding="utf-8") as arquivo:
+                json.dump(self.resumo(), arquivo, ensure_ascii=False, indent=2)
+        except OSError as e:
+            logger.error(f"Erro ao salvar os totais em {caminho}: {e}")
+            return
+        logger.info(f"Totais salvos em {caminho}")
@@ -0,0 +1,184 @@
+import os
+import sqlite3
+from datetime import datetime
+
+from utilitarios.logger_config import logger
+from utilitarios.cache import calcular_hash_arquivo
+from utilitarios.registros import CAMPOS, como_dataframe
+
+# Banco SQLite com o histórico dos procedimentos extraídos (vazio = desativado)
+CAMINHO_BANCO = os.environ.get("PDF_BANCO", "")
+
+# Colunas gravadas de cada procedimento, na ordem da tabela
+COLUNAS_PROCEDIMENTO = ["plano", *CAMPOS]
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS arquivos (
+    id INTEGER PRIMARY KEY,
+    caminho TEXT NOT NULL UNIQUE,
+    plano TEXT NOT NULL,
+    hash TEXT,
+    processado_em TEXT NOT NULL,
+    registros INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS procedimentos (
+    id INTEGER PRIMARY KEY,
+    arquivo_id INTEGER NOT NULL REFERENCES arquivos(id) ON DELETE CASCADE,
+    plano TEXT NOT NULL,
+    gto TEXT,
+    nome_beneficiario TEXT,
+    codigo_procedimento TEXT,
+    nome_procedimento TEXT,
+    dente_regiao TEXT,
+    face TEXT,
+    regiao TEXT,
+    status TEXT,
+    valor_apresentado REAL,
+    valor_glosa REAL,
+    valor_processado REAL,
+    data_realizacao TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_procedimentos_arquivo ON procedimentos(arquivo_id);
+CREATE INDEX IF NOT EXISTS idx_procedimentos_plano ON procedimentos(plano, data_realizacao);
+CREATE INDEX IF NOT EXISTS idx_procedimentos_gto ON procedimentos(gto);
+CREATE INDEX IF NOT EXISTS idx_procedimentos_beneficiario ON procedimentos(nome_beneficiario, data_realizacao);
+CREATE INDEX IF NOT EXISTS idx_procedimentos_codigo ON procedimentos(codigo_procedimento, data_realizacao);
+CREATE INDEX IF NOT EXISTS idx_procedimentos_data ON procedimentos(data_realizacao);
+"""
+
+def _coluna(df, coluna:str):
+    """Valores de uma coluna do DataFrame prontos para o SQLite (None nos vazios, datas em ISO)."""
+
+    import pandas as pd
+
+    if coluna not in df:
+        return [None] * len(df)
+
+    serie = df[coluna]
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        serie = serie.dt.strftime("%Y-%m-%d")
+    serie = serie.astype(object)
+    return serie.where(serie.notna(), None).tolist()
+
+class BancoHistorico:
+    """
+    Histórico dos procedimentos extraídos em um banco SQLite local.
+
+    Cada PDF processado fica na tabela `arquivos` (caminho, hash, data do
+    processamento) e cada procedimento na tabela `procedimentos`, ligado ao
+    arquivo de origem. Os índices por plano, GTO, beneficiário, código do
+    procedimento e data permitem consultar vários meses sem reabrir as
+    planilhas. Reprocessar um PDF substitui os procedimentos dele.
+
+    Uso:
+        with BancoHistorico("historico.db") as banco:
+            banco.gravar(df_normalizado, "unimed", [("pdfs/unimed/a.pdf", 120), ("pdfs/unimed/b.pdf", 80)])
+            glosas = banco.glosas("MARIA DA SILVA", ano=2024)
+    """
+
+    def __init__(self, caminho:str = CAMINHO_BANCO):
+        self.caminho = caminho
+        self._conexao = None
+
+    def __enter__(self):
+        return self.conectar()
+
+    def __exit__(self, *_):
+        self.fechar()
+
+    @property
+    def conexao(self):
+        return self.conectar()._conexao
+
+    def conectar(self):
+        """Abre o banco, criando as tabelas e os índices que ainda não existem."""
+
+        if self._conexao is None:
+            if os.path.dirname(self.caminho):
+                os.makedirs(os.path.dirname(self.caminho), exist_ok=True)
+            # O vigia grava os lotes em uma thread do executor padrão
+            self._conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+            self._conexao.row_factory = sqlite3.Row
+            self._conexao.execute("PRAGMA foreign_keys = ON")
+            self._conexao.execute("PRAGMA journal_mode = WAL")
+            self._conexao.execute("PRAGMA synchronous = NORMAL")
+            self._conexao.executescript(ESQUEMA)
+        return self
+
+    def fechar(self):
+        if self._conexao is not None:
+            self._conexao.close()
+            self._conexao = None
+
+    def gravar(self, dados, plano:str, origens:list[tuple[str, int]]):
+        """
+        Grava os procedimentos de um plano em uma única transação.
+
+        Args:
+            dados: Registros já normalizados (ver utilitarios.normalizacao),
+                como DataFrame, TabelaRegistros ou lista de registros.
+            plano (str): Nome do plano.
+            origens (list): Pares (caminho_pdf, linhas): os dados de cada PDF
+                ocupam linhas consecutivas, na ordem das origens.
+
+        Returns:
+            int: Quantidade de procedimentos gravados.
+        """
+
+        df = como_dataframe(dados)
+        colunas = [_coluna(df, coluna) for coluna in CAMPOS.values()]
+        linhas = list(zip(*colunas))
+        if sum(quantidade for _, quantidade in origens) != len(linhas):
+            raise ValueError(f"As origens somam {sum(quantidade for _, quantidade in origens)} linhas, mas há {len(linhas)} registros.")
+
+        agora = datetime.now().isoformat(timespec="seconds")
+        inicio = 0
+        with self.conexao as conexao:
+            for caminho_pdf, quantidade in origens:
+                caminho = os.path.abspath(caminho_pdf)
+                try:
+                    hash_arquivo = calcular_hash_arquivo(caminho_pdf)
+                except OSError:
+                    hash_arquivo = None
+
+                # Reprocessamento: os procedimentos antigos saem em cascata
+                conexao.execute("DELETE FROM arquivos WHERE caminho = ?", (caminho,))
+                arquivo_id = conexao.execute(
+                    "INSERT INTO arquivos (caminho, plano, hash, processado_em, registros) VALUES (?, ?, ?, ?, ?)",
+                    (caminho, plano, hash_arquivo, agora, quantidade),
+                ).lastrowid
+                conexao.executemany(
+                    f"INSERT INTO procedimentos (arquivo_id, {', '.join(COLUNAS_PROCEDIMENTO)})"
+                    f" VALUES (?, ?, {', '.join('?' * len(CAMPOS))})",
+                    ((arquivo_id, plano, *linha) for linha in linhas[inicio:inicio + quantidade]),
+                )
+                inicio += quantidade
+
+        logger.info(f"{len(linhas)} procedimentos do plano {plano} gravados em {self.caminho}")
+        return len(linhas)
+
+    def consultar(self, sql:str, parametros = ()):
+        """Executa uma consulta e retorna as linhas (sqlite3.Row)."""
+
+        return self.conexao.execute(sql, parametros).fetchall()
+
+    def glosas(self, beneficiario:str, ano:int = None, plano:str = None):
+        """
+        Procedimentos glosados de um beneficiário, com o PDF de origem,
+        opcionalmente filtrados pelo ano de realização e pelo plano.
+        """
+
+        condicoes = ["p.nome_beneficiario = ?", "p.valor_glosa > 0"]
+        parametros = [beneficiario]
+        if ano is not None:
+            condicoes.append("p.data_realizacao BETWEEN ? AND ?")
+            parametros += [f"{ano:04d}-01-01", f"{ano:04d}-12-31"]
+        if plano is not None:
+            condicoes.append("p.plano = ?")
+            parametros.append(plano)
+
+        return self.consultar(
+            "SELECT p.*, a.caminho AS arquivo FROM procedimentos p JOIN arquivos a ON a.id = p.arquivo_id"
+            f" WHERE {' AND '.join(condicoes)} ORDER BY p.data_realizacao",
+            parametros,
+        )
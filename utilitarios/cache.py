@@ -0,0 +1,225 @@
+import os
+import json
+import hashlib
+import tempfile
+
+from utilitarios.logger_config import logger
+
+# Diretório padrão do cache e limite de tamanho (em bytes)
+CAMINHO_CACHE = os.environ.get("PDF_CACHE_DIR", "./.cache/textos")
+TAMANHO_MAXIMO_CACHE = int(os.environ.get("PDF_CACHE_MAX_MB", 512)) * 1024 * 1024
+
+# Ao passar do limite, as entradas mais antigas saem até o cache ocupar essa
+# fração dele, para que a varredura do diretório não se repita a cada gravação
+FRACAO_APOS_LIMPEZA = 0.9
+
+class EntradaInvalida(Exception):
+    """Entrada do cache corrompida ou truncada, encontrada durante a leitura."""
+
+def calcular_hash_arquivo(caminho_arquivo:str, tamanho_bloco:int = 1024 * 1024):
+    """Calcula o hash SHA-256 do conteúdo de um arquivo."""
+
+    sha256 = hashlib.sha256()
+    with open(caminho_arquivo, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(tamanho_bloco), b""):
+            sha256.update(bloco)
+    return sha256.hexdigest()
+
+class CacheTexto:
+    """
+    Cache em disco do texto extraído de PDFs, endereçado pelo conteúdo.
+
+    Cada entrada guarda o texto das páginas (uma por linha, em JSON) em um
+    arquivo cujo nome é derivado do hash do PDF e da versão do extrator, de
+    modo que mudar o extrator (ou o arquivo) invalida a entrada automaticamente.
+
+    O espaço ocupado é lido do disco uma vez e depois acompanhado a cada
+    gravação e remoção; o diretório só é varrido de novo quando o total
+    passa do limite (outros processos também gravam nele).
+    """
+
+    def __init__(self, caminho:str = CAMINHO_CACHE, tamanho_maximo:int = TAMANHO_MAXIMO_CACHE):
+        self.caminho = caminho
+        self.tamanho_maximo = tamanho_maximo
+        self._tamanho = None
+
+    @property
+    def tamanho(self):
+        """Espaço ocupado pelas entradas, em bytes (varrido do disco na primeira consulta)."""
+
+        if self._tamanho is None:
+            self._tamanho = sum(tamanho for _, tamanho, _ in self._entradas())
+        return self._tamanho
+
+    def _caminho_entrada(self, chave:str):
+        return os.path.join(self.caminho, chave[:2], f"{chave}.jsonl")
+
+    def chave(self, caminho_pdf:str, versao:str):
+        """Monta a chave da entrada a partir do hash do PDF e da versão do extrator."""
+
+        return hashlib.sha256(f"{calcular_hash_arquivo(caminho_pdf)}:{versao}".encode()).hexdigest()
+
+    def contem(self, chave:str):
+        """Indica se há uma entrada para a chave, sem lê-la."""
+
+        return os.path.exists(self._caminho_entrada(chave))
+
+    def ler(self, chave:str):
+        """
+        Retorna um gerador com o texto de cada página, ou None se não estiver
+        em cache. As páginas são lidas do disco uma a uma; uma entrada que não
+        pode ser lida até o fim levanta EntradaInvalida no meio do fluxo.
+        """
+
+        caminho_entrada = self._caminho_entrada(chave)
+        try:
+            arquivo = open(caminho_entrada, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+        # Atualiza o horário de acesso, usado na remoção das entradas mais antigas
+        os.utime(caminho_entrada)
+        return self._ler_paginas(arquivo, caminho_entrada)
+
+    def _ler_paginas(self, arquivo, caminho_entrada:str):
+        with arquivo:
+            try:
+                for linha in arquivo:
+                    yield json.loads(linha)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Entrada de cache inválida {caminho_entrada}: {e}")
+                raise EntradaInvalida(caminho_entrada) from e
+
+    def gravar(self, chave:str, paginas):
+        """
+        Grava o texto das páginas enquanto elas são repassadas adiante.
+
+        Gera cada página recebida, escrevendo-a em um arquivo temporário (uma
+        página por linha). A entrada só é publicada, de forma atômica, quando
+        todas as páginas forem consumidas.
+        """
+
+        caminho_entrada = self._caminho_entrada(chave)
+        try:
+            os.makedirs(os.path.dirname(caminho_entrada), exist_ok=True)
+            descritor, caminho_temporario = tempfile.mkstemp(dir=os.path.dirname(caminho_entrada), suffix=".tmp")
+            arquivo = os.fdopen(descritor, "w", encoding="utf-8")
+        except OSError as e:
+            logger.warning(f"Erro ao gravar o cache {caminho_entrada}: {e}")
+            yield from paginas
+            return
+
+        # Só as falhas de E/S do próprio cache são contidas; um erro vindo de
+        # `paginas` interrompe a leitura e se propaga normalmente.
+        concluido = False
+        try:
+            for pagina in paginas:
+                if arquivo is not None:
+                    try:
+                        arquivo.write(json.dumps(pagina, ensure_ascii=False) + "\n")
+                    except (OSError, ValueError) as e:
+                        # ValueError: UnicodeEncodeError de um surrogate solto no texto da página
+                        logger.warning(f"Erro ao gravar o cache {caminho_entrada}: {e}")
+                        self._fechar(arquivo)
+                        arquivo = None
+                yield pagina
+
+            if arquivo is not None:
+                try:
+                    arquivo.close()
+                    anterior = self._tamanho_entrada(caminho_entrada)
+                    os.replace(caminho_temporario, caminho_entrada)
+                    concluido = True
+                    if self._tamanho is not None:
+                        self._tamanho += self._tamanho_entrada(caminho_entrada) - anterior
+                except OSError as e:
+                    logger.warning(f"Erro ao gravar o cache {caminho_entrada}: {e}")
+        finally:
+            if arquivo is not None:
+                self._fechar(arquivo)
+            if not concluido:
+                self._remover(caminho_temporario)
+
+        if concluido:
+            self.aplicar_limite()
+
+    @staticmethod
+    def _fechar(arquivo):
+        try:
+            arquivo.close()
+        except OSError:
+            pass
+
+    def _entradas(self):
+        """Lista as entradas do cache como tuplas (ultimo_acesso, tamanho, caminho)."""
+
+        entradas = []
+        for raiz, _, arquivos in os.walk(self.caminho):
+            for nome in arquivos:
+                if not nome.endswith(".jsonl"):
+                    continue
+                caminho_entrada = os.path.join(raiz, nome)
+                try:
+                    info = os.stat(caminho_entrada)
+                except FileNotFoundError:
+                    continue
+                entradas.append((info.st_mtime, info.st_size, caminho_entrada))
+        return entradas
+
+    def aplicar_limite(self):
+        """
+        Se o cache passou do limite, remove as entradas acessadas há mais
+        tempo até ele ocupar FRACAO_APOS_LIMPEZA do limite.
+        """
+
+        if self.tamanho <= self.tamanho_maximo:
+            return
+
+        # O total acompanhado não inclui o que outros processos gravaram: confere no disco
+        entradas = self._entradas()
+        tamanho_total = sum(tamanho for _, tamanho, _ in entradas)
+        if tamanho_total > self.tamanho_maximo:
+            alvo = self.tamanho_maximo * FRACAO_APOS_LIMPEZA
+            for _, tamanho, caminho_entrada in sorted(entradas):
+                if tamanho_total <= alvo:
+                    break
+                self._remover(caminho_entrada)
+                tamanho_total -= tamanho
+                logger.debug("Entrada removida do cache: %s", caminho_entrada)
+        self._tamanho = tamanho_total
+
+    def invalidar(self, caminho_pdf:str, versao:str):
+        """Remove a entrada de um PDF específico."""
+
+        caminho_entrada = self._caminho_entrada(self.chave(caminho_pdf, versao))
+        tamanho = self._tamanho_entrada(caminho_entrada)
+        self._remover(caminho_entrada)
+        if self._tamanho is not None:
+            self._tamanho -= tamanho
+
+    def limpar(self):
+        """Remove todas as entradas do cache."""
+
+        for _, _, caminho_entrada in self._entradas():
+            self._remover(caminho_entrada)
+        self._tamanho = 0
+        logger.info(f"Cache de textos limpo: {self.caminho}")
+
+    @staticmethod
+    def _tamanho_entrada(caminho_entrada:str):
+        try:
+            return os.path.getsize(caminho_entrada)
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _remover(caminho:str):
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
+
+if __name__ == "__main__":
+
+    # Invalida todo o cache de textos
+    CacheTexto().limpar()
@@ -0,0 +1,346 @@
+import os
+import csv
+import sqlite3
+import hashlib
+from contextlib import nullcontext
+from decimal import Decimal, InvalidOperation
+
+from utilitarios.logger_config import logger
+from utilitarios.cache import calcular_hash_arquivo
+from utilitarios.layouts import SEPARADOR_DECIMAL
+from utilitarios.registros import CAMPOS, TabelaRegistros
+
+# Desduplicação dos procedimentos entre PDFs e execuções ("0" desativa)
+DEDUPLICAR = os.environ.get("PDF_DEDUPLICAR", "1") == "1"
+
+# Campos da impressão digital de um procedimento, além do plano. O GTO
+# identifica o atendimento; sem ele, vale o nome do beneficiário. Registros
+# sem nenhum dos dois (os do Odonto Empresas) não têm impressão: pacientes
+# diferentes teriam o mesmo procedimento, dente, data e valor. Esses só são
+# duplicatas quando o PDF inteiro é cópia de outro (mesmo hash do conteúdo)
+CAMPOS_IMPRESSAO = ["codigo_procedimento", "dente_regiao", "face", "data_realizacao"]
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS impressoes (
+    impressao BLOB PRIMARY KEY,
+    arquivo TEXT NOT NULL,
+    plano TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_impressoes_arquivo ON impressoes(arquivo);
+CREATE TABLE IF NOT EXISTS conteudos (
+    arquivo TEXT PRIMARY KEY,
+    conteudo TEXT NOT NULL,
+    plano TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_conteudos_conteudo ON conteudos(conteudo);
+CREATE TABLE IF NOT EXISTS dependentes (
+    dono TEXT NOT NULL,
+    arquivo TEXT NOT NULL,
+    PRIMARY KEY (dono, arquivo)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_dependentes_arquivo ON dependentes(arquivo);
+"""
+
+# Impressões consultadas no índice por comando (abaixo do limite de parâmetros do SQLite)
+LOTE_CONSULTA = 500
+
+def _texto(valor):
+    """Texto sem diferenças de espaços e maiúsculas."""
+
+    return " ".join(str(valor).split()).upper() if valor is not None else ""
+
+def _centavos(valor, separador_decimal:str):
+    """Valor monetário em centavos ("1.234,56" -> "123456"); o texto original se não for um número."""
+
+    if valor is None:
+        return ""
+    separador_milhar = "." if separador_decimal == "," else ","
+    texto = str(valor).replace("R$", "").strip().replace(separador_milhar, "").replace(separador_decimal, ".")
+    try:
+        return str(int((Decimal(texto) * 100).to_integral_value()))
+    except InvalidOperation:
+        return _texto(valor)
+
+def impressoes(tabela:TabelaRegistros, plano:str):
+    """
+    Impressão digital (16 bytes) de cada registro da tabela: plano, GTO (ou
+    beneficiário), código do procedimento, dente, face, data e valor, com
+    espaços, maiúsculas e formato dos valores normalizados. Registros sem
+    GTO nem beneficiário ficam com None: sem o paciente, não há como saber
+    se dois deles são o mesmo procedimento.
+
+    Cada valor distinto de uma coluna é normalizado uma única vez, pelas
+    categorias da tabela, e cada linha custa apenas a montagem e o hash.
+    """
+
+    separador_decimal = SEPARADOR_DECIMAL.get(plano, ",")
+
+    colunas = []
+    codigos = []
+    for campo in ("gto", "nome_beneficiario", *CAMPOS_IMPRESSAO, "valor_processado", "valor_apresentado"):
+        normalizar = (lambda valor: _centavos(valor, separador_decimal)) if campo.startswith("valor_") else _texto
+        categorias, codigos_campo = tabela.coluna(campo)
+        # O código -1 (vazio) cai no "" acrescentado ao final
+        colunas.append([normalizar(valor) for valor in categorias] + [""])
+        codigos.append(codigos_campo)
+
+    resultado = []
+    for linha in zip(*codigos):
+        gto, beneficiario, *demais, processado, apresentado = (coluna[codigo] for coluna, codigo in zip(colunas, linha))
+        if not gto and not beneficiario:
+            resultado.append(None)
+            continue
+        chave = "\x1f".join([plano, gto or beneficiario, *demais, processado or apresentado])
+        resultado.append(hashlib.blake2b(chave.encode(), digest_size=16).digest())
+    return resultado
+
+class Duplicata:
+    """Procedimento descartado por já constar em outro PDF."""
+
+    __slots__ = ("arquivo", "plano", "registro", "arquivo_original")
+
+    def __init__(self, arquivo:str, plano:str, registro, arquivo_original:str):
+        self.arquivo = arquivo
+        self.plano = plano
+        self.registro = registro
+        self.arquivo_original = arquivo_original
+
+class Deduplicador:
+    """
+    Remove os procedimentos que já constam em outro PDF: extratos colocados
+    duas vezes na pasta ou reemitidos com procedimentos de um anterior.
+
+    As impressões digitais (ver impressoes) do lote ficam em um dicionário
+    em memória e as das execuções anteriores em um índice SQLite em disco,
+    consultado pela chave primária; o custo por registro é constante. Um
+    procedimento só é duplicata se a impressão for de outro PDF: registros
+    iguais no mesmo extrato são mantidos, e reprocessar um PDF substitui as
+    impressões dele. Registros sem impressão (sem paciente) só são
+    descartados quando o PDF tem o mesmo conteúdo de outro.
+
+    O índice também guarda de qual PDF (dono) cada arquivo teve
+    procedimentos descartados: quando o dono sai do relatório ou muda, os
+    dependentes precisam ser extraídos de novo (ver esquecer).
+
+    Uso:
+        deduplicador = Deduplicador(Deduplicador.caminho_para(arquivo_relatorio))
+        lote, duplicatas = deduplicador.filtrar([(caminho_pdf, plano, tabela), ...])
+    """
+
+    def __init__(self, caminho:str = None):
+        self.caminho = caminho
+        self._conexao = None
+
+    @staticmethod
+    def caminho_para(arquivo_relatorio:str):
+        """Caminho do índice de impressões associado a um relatório."""
+
+        return f"{os.path.splitext(arquivo_relatorio)[0]}.duplicatas.db"
+
+    @property
+    def arquivo_duplicatas(self):
+        """CSV com as duplicatas encontradas, ao lado do índice."""
+
+        return f"{os.path.splitext(self.caminho)[0]}.csv" if self.caminho else None
+
+    @property
+    def conexao(self):
+        if self._conexao is None and self.caminho:
+            # O vigia filtra os lotes em uma thread do executor padrão
+            self._conexao = sqlite3.connect(self.caminho, check_same_thread=False)
+            self._conexao.execute("PRAGMA journal_mode = WAL")
+            self._conexao.execute("PRAGMA synchronous = NORMAL")
+            self._conexao.executescript(ESQUEMA)
+        return self._conexao
+
+    def fechar(self):
+        if self._conexao is not None:
+            self._conexao.close()
+            self._conexao = None
+
+    def limpar(self):
+        """
+        Esvazia o índice: um relatório novo só desduplica contra os PDFs da
+        própria execução. Os conteúdos e dependências saem junto com as
+        impressões; senão, um PDF sem paciente seria descartado como cópia de
+        outro que não está no relatório novo (e talvez nem exista mais).
+        """
+
+        conexao = self.conexao
+        if conexao:
+            with conexao:
+                conexao.execute("DELETE FROM impressoes")
+                conexao.execute("DELETE FROM conteudos")
+                conexao.execute("DELETE FROM dependentes")
+
+    def esquecer(self, caminhos_pdf:list[str]):
+        """
+        Remove do índice as impressões dos PDFs informados e as dos PDFs
+        registrados que não existem mais (renomeados, movidos ou apagados),
+        para que os procedimentos deles não sejam tomados como duplicatas
+        de um arquivo que saiu do relatório.
+
+        Os PDFs que tiveram procedimentos descartados como duplicatas dos
+        esquecidos ficariam sem eles no relatório: são devolvidos para que
+        sejam extraídos de novo.
+
+        Returns:
+            list: PDFs (existentes) que dependiam dos esquecidos.
+        """
+
+        conexao = self.conexao
+        if not conexao:
+            return []
+        registrados = {arquivo for (arquivo,) in conexao.execute(
+            "SELECT arquivo FROM impressoes UNION SELECT arquivo FROM conteudos"
+            " UNION SELECT dono FROM dependentes UNION SELECT arquivo FROM dependentes"
+        )}
+        informados = {os.path.normpath(caminho) for caminho in caminhos_pdf}
+        esquecidos = sorted(arquivo for arquivo in registrados if arquivo in informados or not os.path.exists(arquivo))
+        if not esquecidos:
+            return []
+
+        parametros = [(arquivo,) for arquivo in esquecidos]
+        dependentes = []
+        for inicio in range(0, len(esquecidos), LOTE_CONSULTA):
+            parte = esquecidos[inicio:inicio + LOTE_CONSULTA]
+            dependentes.extend(arquivo for (arquivo,) in conexao.execute(
+                f"SELECT DISTINCT arquivo FROM dependentes WHERE dono IN ({', '.join('?' * len(parte))})", parte,
+            ))
+        dependentes = sorted(set(dependentes) - set(esquecidos))
+
+        with conexao:
+            conexao.executemany("DELETE FROM impressoes WHERE arquivo = ?", parametros)
+            conexao.executemany("DELETE FROM conteudos WHERE arquivo = ?", parametros)
+            conexao.executemany("DELETE FROM dependentes WHERE dono = ? OR arquivo = ?",
+                                [(arquivo, arquivo) for arquivo in esquecidos])
+            # Os dependentes voltam a ser filtrados do zero quando reprocessados
+            conexao.executemany("DELETE FROM dependentes WHERE arquivo = ?", [(arquivo,) for arquivo in dependentes])
+        logger.info(f"{len(esquecidos)} PDF(s) removido(s) do índice de duplicatas.")
+        if dependentes:
+            logger.info(f"{len(dependentes)} PDF(s) com procedimentos descartados como duplicatas deles serão"
+                        f" extraídos de novo.")
+        return dependentes
+
+    def _donos(self, conexao, chaves:list[bytes]):
+        """PDF de origem de cada impressão já registrada no índice."""
+
+        donos = {}
+        for inicio in range(0, len(chaves), LOTE_CONSULTA):
+            parte = chaves[inicio:inicio + LOTE_CONSULTA]
+            donos.update(conexao.execute(
+                f"SELECT impressao, arquivo FROM impressoes WHERE impressao IN ({', '.join('?' * len(parte))})", parte,
+            ))
+        return donos
+
+    def _dono_conteudo(self, conexao, conteudo:str, caminho:str):
+        """PDF registrado no índice com o mesmo conteúdo, que não seja o próprio."""
+
+        linha = conexao.execute(
+            "SELECT arquivo FROM conteudos WHERE conteudo = ? AND arquivo != ? LIMIT 1", (conteudo, caminho),
+        ).fetchone()
+        return linha[0] if linha else None
+
+    def filtrar(self, lote:list[tuple[str, str, TabelaRegistros]]):
+        """
+        Remove as duplicatas de um lote de PDFs e registra as impressões dos
+        demais procedimentos no índice, assim como o PDF de que cada arquivo
+        teve procedimentos descartados.
+
+        Args:
+            lote (list): Triplas (caminho_pdf, plano, TabelaRegistros), na ordem
+                de processamento: em caso de repetição, vale o primeiro PDF.
+
+        Returns:
+            tuple: (lote com as tabelas sem as duplicatas, lista de Duplicata)
+        """
+
+        conexao = self.conexao
+        caminhos = {os.path.normpath(caminho_pdf) for caminho_pdf, _, _ in lote}
+        vistos = {}
+        vistos_conteudo = {}
+        filtrado = []
+        duplicatas = []
+        novas = []
+        novos_conteudos = []
+        dependencias = set()
+        with conexao or nullcontext():
+            if conexao:
+                # PDFs reprocessados: as impressões antigas dão lugar às novas
+                parametros = [(caminho,) for caminho in caminhos]
+                conexao.executemany("DELETE FROM impressoes WHERE arquivo = ?", parametros)
+                conexao.executemany("DELETE FROM conteudos WHERE arquivo = ?", parametros)
+                conexao.executemany("DELETE FROM dependentes WHERE arquivo = ?", parametros)
+
+            for caminho_pdf, plano, tabela in lote:
+                caminho = os.path.normpath(caminho_pdf)
+                chaves = impressoes(tabela, plano)
+                donos = self._donos(conexao, list(set(chaves) - {None})) if conexao else {}
+
+                # Sem impressão, só a cópia de um PDF inteiro é reconhecida
+                dono_conteudo = None
+                if None in chaves and os.path.exists(caminho_pdf):
+                    conteudo = calcular_hash_arquivo(caminho_pdf)
+                    dono_conteudo = vistos_conteudo.get(conteudo)
+                    if not dono_conteudo and conexao:
+                        dono_conteudo = self._dono_conteudo(conexao, conteudo, caminho)
+                    if not dono_conteudo or dono_conteudo == caminho:
+                        dono_conteudo = None
+                        vistos_conteudo.setdefault(conteudo, caminho)
+                        novos_conteudos.append((caminho, conteudo, plano))
+
+                manter = []
+                for linha, chave in enumerate(chaves):
+                    dono = dono_conteudo if chave is None else vistos.get(chave) or donos.get(chave)
+                    if dono and dono != caminho:
+                        duplicatas.append(Duplicata(caminho_pdf, plano, tabela[linha], dono))
+                        dependencias.add((dono, caminho))
+                        continue
+                    manter.append(linha)
+                    if chave is not None and chave not in vistos:
+                        vistos[chave] = caminho
+                        novas.append((chave, caminho, plano))
+
+                if len(manter) < len(chaves):
+                    logger.warning(f"{len(chaves) - len(manter)} procedimentos de {os.path.basename(caminho_pdf)}"
+                                   f" já constam em outro PDF e não foram incluídos.")
+                    tabela = tabela.selecionar(manter)
+                filtrado.append((caminho_pdf, plano, tabela))
+
+            if conexao:
+                conexao.executemany("INSERT OR REPLACE INTO impressoes (impressao, arquivo, plano) VALUES (?, ?, ?)", novas)
+                conexao.executemany("INSERT OR REPLACE INTO conteudos (arquivo, conteudo, plano) VALUES (?, ?, ?)",
+                                    novos_conteudos)
+                conexao.executemany("INSERT OR IGNORE INTO dependentes (dono, arquivo) VALUES (?, ?)", dependencias)
+
+        return filtrado, duplicatas
+
+    def relatar(self, duplicatas:list[Duplicata], acrescentar:bool = False):
+        """
+        Grava as duplicatas em arquivo_duplicatas: substituindo o CSV da
+        execução anterior ou, com `acrescentar`, ao final dele (modo serviço).
+        """
+
+        if not self.arquivo_duplicatas:
+            return
+        if duplicatas:
+            gravar_duplicatas(self.arquivo_duplicatas, duplicatas, acrescentar)
+        elif not acrescentar and os.path.exists(self.arquivo_duplicatas):
+            os.remove(self.arquivo_duplicatas)
+
+def gravar_duplicatas(caminho:str, duplicatas:list[Duplicata], acrescentar:bool = False):
+    """
+    Grava as duplicatas em CSV (PDF, PDF original, plano e campos do
+    procedimento), para conferência.
+    """
+
+    novo = not acrescentar or not os.path.exists(caminho)
+    with open(caminho, "w" if not acrescentar else "a", newline="", encoding="utf-8-sig" if novo else "utf-8") as arquivo:
+        escritor = csv.writer(arquivo, delimiter=";")
+        if novo:
+            escritor.writerow(["Arquivo", "Arquivo Original", "Plano", *CAMPOS.values()])
+        for duplicata in duplicatas:
+            registro = duplicata.registro
+            escritor.writerow([duplicata.arquivo, duplicata.arquivo_original, duplicata.plano,
+                               *(getattr(registro, campo) for campo in CAMPOS)])
+    logger.info(f"{len(duplicatas)} procedimentos duplicados registrados em {caminho}")
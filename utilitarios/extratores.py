@@ -1,271 +1,498 @@
-import re
-from PyPDF2 import PdfReader
+import os
+from itertools import islice
 
 from utilitarios.logger_config import logger
 from utilitarios.helper import *
+from utilitarios.cache import CacheTexto, EntradaInvalida
+from utilitarios.leitores import LeitorTexto, leitor_do_plano, obter_leitor
+from utilitarios.fluxo import ORCAMENTO_REGEX, TempoEsgotado, VarredorFluxo, orcamento_tempo, quarentenar_estouro, varrer_paginas
+from utilitarios.layouts import LAYOUTS
+from utilitarios.metricas import MetricasArquivo
+from utilitarios.padroes import ANCORAS, PADROES, preparar_texto
+from utilitarios.prefiltro import MODO_PREFILTRO, comparar_registros, filtrar_paginas
+from utilitarios.isolamento import TEMPO_ARQUIVO
+from utilitarios.paralelo import LeituraParalela
+from utilitarios.registros import Procedimento, TabelaRegistros
+from utilitarios.tokenizador import TOKENIZADORES, TOKENIZAR
+
+# Cache compartilhado por padrão (desativado com PDF_CACHE=0)
+CACHE_PADRAO = CacheTexto() if os.environ.get("PDF_CACHE", "1") != "0" else None
+
+# Planos que buscam os procedimentos bloco a bloco (entre dois beneficiários);
+# na leitura em paralelo, só a extração do texto é dividida entre os processos
+PLANOS_EM_BLOCOS = {"rede_unna"}
 
 class ExtratorPDF:
-    """Classe centralizada para extração de dados de PDFs."""
-
-    def __init__(self, caminho_pdf, plano):
+    """
+    Classe centralizada para extração de dados de PDFs.
+
+    O texto é lido página a página e cada método de extração consome esse
+    fluxo, emitindo os registros à medida que são encontrados. Os tempos de
+    cada etapa e as ocorrências dos padrões ficam em self.metricas.
+
+    Com um executor e mais de um intervalo de páginas (ver
+    utilitarios.paralelo.dividir_pdf), o texto e os padrões de cada intervalo
+    são processados em paralelo e costurados de volta, com o mesmo resultado
+    da leitura sequencial. Cada intervalo tem até `tempo` segundos no pool
+    (ver LeituraParalela).
+
+    O texto vem do leitor informado (nome ou LeitorTexto) ou, sem ele, do
+    configurado para o plano (ver utilitarios.leitores).
+
+    Com `tokenizar` (por padrão, nos planos de TOKENIZAR), os planos com um
+    tokenizador de linhas (ver utilitarios.tokenizador) são extraídos em
+    passada única por ele, em vez dos padrões sobre o texto inteiro.
+    """
+
+    def __init__(self, caminho_pdf, plano, cache:CacheTexto = CACHE_PADRAO, executor = None,
+                 intervalos:list[tuple[int, int]] = None, leitor:str | LeitorTexto = None,
+                 tokenizar:bool = None, tempo:float = TEMPO_ARQUIVO):
         self.caminho_pdf = caminho_pdf
         self.plano = plano
-        self.dados = self.ler_pdf()
-
-    def ler_pdf(self):
-        """Faz a leitura inicial do PDF."""
+        if isinstance(leitor, str):
+            leitor = obter_leitor(leitor)
+        self.leitor = leitor or leitor_do_plano(plano)
+        self.cache = cache
+        self.executor = executor
+        self.intervalos = intervalos
+        self.tempo = tempo
+        if tokenizar is None:
+            tokenizar = plano in TOKENIZAR
+        self.tokenizar = tokenizar and plano in TOKENIZADORES
+        self.metricas = MetricasArquivo(caminho_pdf, plano)
+
+    def ler_paginas(self):
+        """
+        Gera o texto de cada página do PDF, reaproveitando o cache quando
+        possível. Uma entrada de cache que falha no meio da leitura é
+        invalidada e o PDF é lido de novo, a partir da página em que ela parou.
+        """
         try:
-            logger.debug(f"Lendo PDF: {self.caminho_pdf}")
-            reader = PdfReader(self.caminho_pdf)
-            texto = ""
-            for pagina in reader.pages:
-                texto += pagina.extract_text() or ""
-            return {"conteudo": texto}
+            chave = None
+            # Páginas já entregues a partir do cache
+            entregues = 0
+            if self.cache:
+                chave = self.cache.chave(self.caminho_pdf, self.leitor.versao)
+                paginas = self.cache.ler(chave)
+                if paginas is not None:
+                    logger.debug("Texto do PDF obtido do cache: %s", self.caminho_pdf)
+                    try:
+                        for pagina in self.metricas.medir_fluxo("ler_cache", paginas):
+                            yield pagina
+                            entregues += 1
+                        return
+                    except EntradaInvalida:
+                        logger.warning(f"Cache de {self.caminho_pdf} inválido após {entregues} página(s);"
+                                       f" o texto será lido do PDF.")
+                        self.cache.invalidar(self.caminho_pdf, self.leitor.versao)
+
+            logger.debug("Lendo PDF com %s: %s", self.leitor.nome, self.caminho_pdf)
+            with self.metricas.medir("abrir_pdf"):
+                documento = self.leitor.abrir(self.caminho_pdf)
+            paginas = self.metricas.medir_fluxo("extrair_texto", (
+                self.leitor.texto(documento, numero) for numero in range(self.leitor.paginas(documento))
+            ))
+
+            if self.cache:
+                paginas = self.cache.gravar(chave, paginas)
+            # As páginas que vieram do cache são lidas de novo só para regravar a entrada inteira
+            yield from islice(paginas, entregues, None)
+        except MemoryError:
+            raise
         except Exception as e:
             logger.error(f"Erro ao ler o PDF {self.caminho_pdf}: {e}")
-            return {}
+            self.metricas.erro = f"{type(e).__name__}: {e}"
 
-    def extrair_dados(self):
-        """Chama o método de extração baseado no plano."""
+    def ler_paralelo(self):
+        """
+        Inicia a leitura do PDF em paralelo, por intervalos de páginas.
 
-        if self.plano == 'odonto_empresas':
-            return self._extrair_dados_odonto_empresas()
+        Returns:
+            LeituraParalela: Ou None quando não há executor, o PDF cabe em um
+            intervalo ou o texto já está no cache.
+        """
 
-        elif self.plano == 'unimed':
-            return self._extrair_dados_unimed()
+        if not self.executor or not self.intervalos or len(self.intervalos) < 2 or self.plano not in PADROES:
+            return None
 
-        elif self.plano == 'rede_unna':
-            return self._extrair_dados_rede_unna()
+        chave = None
+        if self.cache:
+            try:
+                chave = self.cache.chave(self.caminho_pdf, self.leitor.versao)
+            except OSError as e:
+                logger.error(f"Erro ao ler o PDF {self.caminho_pdf}: {e}")
+                return None
+            if self.cache.contem(chave):
+                return None
 
-        elif self.plano == 'amil':
-            return self._extrair_dados_amil()
+        logger.debug("Lendo PDF em %d intervalos de páginas: %s", len(self.intervalos), self.caminho_pdf)
+        return LeituraParalela(self.caminho_pdf, self.plano, self.intervalos, self.executor, self.metricas,
+                               buscar=self.plano not in PLANOS_EM_BLOCOS and not self.tokenizar, cache=self.cache, chave=chave,
+                               leitor=self.leitor.nome, tempo=self.tempo)
+
+    def ler_pdf(self):
+        """Faz a leitura completa do PDF, concatenando o texto das páginas."""
 
-        elif self.plano == 'samp':
-            return self._extrair_dados_samp()
+        return {"conteudo": "".join(self.ler_paginas())}
 
+    def extrair_dados(self):
+        """Chama o método de extração do layout do plano e retorna os registros em uma TabelaRegistros."""
+
+        if MODO_PREFILTRO == "verificar":
+            registros = self.verificar_prefiltro()
         else:
+            registros = self.iterar_dados(prefiltro=MODO_PREFILTRO != "0")
+        if registros is None:
+            return None
+
+        tabela = TabelaRegistros(self.plano)
+        tabela.estender(registros)
+        self.metricas.procedimentos = len(tabela)
+        if self.metricas.paginas_ignoradas:
+            logger.info(f"{self.metricas.paginas_ignoradas} página(s) sem registros ignorada(s) pelo pré-filtro.")
+        return tabela
+
+    def iterar_dados(self, paginas=None, prefiltro:bool = True):
+        """
+        Retorna um gerador com os registros do plano, consumindo as páginas
+        uma a uma (por padrão, as do próprio PDF).
+
+        Com `prefiltro`, as páginas sem âncoras de registros do plano (capas,
+        resumos, glossários) não passam pelos padrões; a quantidade fica em
+        self.metricas.paginas_ignoradas. Na leitura em paralelo o filtro não
+        é aplicado.
+        """
+
+        if paginas is None:
+            paginas = self.ler_paralelo() or self.ler_paginas()
+
+        if prefiltro and self.plano in ANCORAS and not isinstance(paginas, LeituraParalela):
+            paginas = filtrar_paginas(paginas, ANCORAS[self.plano], self.metricas)
+
+        if self.tokenizar:
+            return self._tokenizar(paginas)
+
+        # Método de extração registrado para o layout do plano (ver utilitarios.layouts)
+        layout = LAYOUTS.get(self.plano)
+        if layout is None:
             logger.error(f"Plano de saúde desconhecido: {self.plano}")
+            return None
+        return getattr(self, layout.extracao)(paginas)
 
-    def _extrair_dados_odonto_empresas(self):
+    def verificar_prefiltro(self):
+        """
+        Extrai os registros com e sem o pré-filtro de páginas e registra as
+        diferenças (em self.metricas.divergencias_prefiltro e no log).
+
+        Returns:
+            list: Os registros extraídos sem o filtro, ou None se o plano for desconhecido.
+        """
+
+        paginas = list(self.ler_paginas())
+        registros = self.iterar_dados(iter(paginas), prefiltro=False)
+        if registros is None:
+            return None
+        registros = list(registros)
+
+        filtrado = ExtratorPDF(self.caminho_pdf, self.plano, cache=None, leitor=self.leitor, tokenizar=self.tokenizar)
+        registros_filtrados = list(filtrado.iterar_dados(iter(paginas), prefiltro=True))
+        self.metricas.paginas_ignoradas = filtrado.metricas.paginas_ignoradas
+
+        faltando, sobrando = comparar_registros(registros, registros_filtrados)
+        self.metricas.divergencias_prefiltro = len(faltando) + len(sobrando)
+        if faltando or sobrando:
+            logger.warning(
+                f"Pré-filtro divergente em {self.caminho_pdf}: {len(faltando)} registro(s) a menos e "
+                f"{len(sobrando)} a mais com {filtrado.metricas.paginas_ignoradas} página(s) ignorada(s)."
+            )
+            for registro in faltando[:5]:
+                logger.warning(f"  - {registro}")
+            for registro in sobrando[:5]:
+                logger.warning(f"  + {registro}")
+        elif registros != registros_filtrados:
+            self.metricas.divergencias_prefiltro = 1
+            logger.warning(f"Pré-filtro divergente em {self.caminho_pdf}: mesmos registros em outra ordem.")
+        else:
+            logger.info(f"Pré-filtro conferido em {self.caminho_pdf}: {filtrado.metricas.paginas_ignoradas} página(s) ignorada(s), mesmos registros.")
+        return registros
+
+    def _varrer(self, paginas, padroes:dict):
+        """Varre as páginas com os padrões do plano (ver fluxo.varrer_paginas)."""
+
+        if isinstance(paginas, LeituraParalela):
+            return paginas.varrer(padroes)
+        paginas = (preparar_texto(self.plano, pagina) for pagina in paginas)
+        return varrer_paginas(paginas, padroes, metricas=self.metricas)
+
+    def _tokenizar(self, paginas):
+        """Extrai os dados do plano com o tokenizador de linhas dele."""
+
+        logger.info(f"Extraindo dados do {self.plano} (tokenizador de linhas)...")
+        total = 0
+
+        tokenizador = TOKENIZADORES[self.plano](self.caminho_pdf, self.metricas)
+        for registro in tokenizador.tokenizar(paginas):
+            total += 1
+            yield registro
+
+        logger.info(f"{total} procedimentos extraidos.")
+
+    def _extrair_dados_odonto_empresas(self, paginas):
         """Extrai dados específicos do plano Odonto Empresas."""
 
         logger.info("Extraindo dados do Odonto Empresas...")
-        conteudo = self.dados.get("conteudo", "")
-        results = []
-
-        pattern = r"(\d{2}/\d{2}/\d{4})\s+(\d{6,8})\s+([\d.,]+)\s+([\d.,]+)\s+([\d.,]+)\s+([\d.,]+)\s+(\d{6,8})"
-        for procedure in re.finditer(pattern, conteudo):
-            data, codigo_procedimento, valor_informado, valor_processado, valor_liberado, valor_glosa, numero_lote = procedure.groups()
-            results.append({
-                "Código Procedimento" : codigo_procedimento,
-                "Valor Processado": valor_processado,
-                "Valor Glosa": valor_glosa,
-                "Data de Realização": data
-            })
-
-        logger.info(f"{len(results)} procedimentos extraidos.")
-        return results
-
-    def _extrair_dados_unimed(self):
+        total = 0
+
+        for ocorrencias in self._varrer(paginas, PADROES["odonto_empresas"]):
+            for _, _, _, procedure in ocorrencias:
+                data, codigo_procedimento, valor_informado, valor_processado, valor_liberado, valor_glosa, numero_lote = procedure.groups()
+                total += 1
+                yield Procedimento(
+                    codigo_procedimento=codigo_procedimento,
+                    valor_processado=valor_processado,
+                    valor_glosa=valor_glosa,
+                    data_realizacao=data
+                )
+
+        logger.info(f"{total} procedimentos extraidos.")
+
+    def _extrair_dados_unimed(self, paginas):
         """Extrai dados específicos do plano Unimed."""
 
         logger.info("Extraindo dados do Unimed...")
-        conteudo = self.dados.get("conteudo", "")
-        results = []
-
-        # Padrões das expressões regulares
-        procedure_pattern = r"(\d{8}) ([A-ZÀ-Üà-ü :]+) (Pago|Não autorizado) (?:([A-Z]{1,5})\s)?(\d{1,2},\d{2}) (\d{1,2},\d{2}) (\d{1,2},\d{2})(?: (\d{2}/\d{2}/\d{4}))? ([A-ZÀ-Ü0-9]+)?"
-        gto_pattern = r"GTO: CÓDIGO E NOME DO BENEFICIÁRIO: (\d{8}) \d{17} - ([A-Z ]+)"
-
-        # Encontra os resultados dos GTOs e dos PROCEDIMENTOS   
-        gto_matches = list(re.finditer(gto_pattern, conteudo))
-        procedure_matches = list(re.finditer(procedure_pattern, conteudo))
-
-        # Itera sobre os procedimentos e associa ao GTO correspondente
-        for procedure in procedure_matches:
-            gto_codigo, gto_nome = find_previous_gto(procedure.start(), gto_matches)
-            if not gto_codigo:
-                continue 
-
-            # Extrair dados do procedimento
-            procedure_data = procedure.groups()
-            codigo_procedimento = procedure_data[0]
-            nome_procedimento = procedure_data[1].strip()
-            status = procedure_data[2]
-            face = procedure_data[3] if procedure_data[3] else None
-            valor_apresentado = procedure_data[4]
-            valor_glosado = procedure_data[5]
-            valor_pago = procedure_data[6]
-            data_atendimento = procedure_data[7] if procedure_data[7] else None
-            dt_area = procedure_data[8] if procedure_data[8] else None
-
-            # Adicionar ao conjunto de dados
-            results.append({
-                "GTO": gto_codigo,
-                "Nome do Beneficiário": gto_nome,
-                "Código Procedimento": codigo_procedimento,
-                "Nome Procedimento": nome_procedimento,
-                "Dente/Região": dt_area,
-                "Face": face,
-                "Status": status,
-                "Valor Apresentado Conta": valor_apresentado,
-                "Valor Glosa": valor_glosado,
-                "Valor Processado": valor_pago,
-                "Data de Realização": data_atendimento
-            })
-
-        logger.info(f"{len(results)} procedimentos extraidos.")
-        return results
-
-    def _extrair_dados_rede_unna(self):
+        total = 0
+
+        # Posição final de cada GTO, para associar os procedimentos
+        indice_gtos = IndiceCabecalhos()
+
+        # Encontra os GTOs e os PROCEDIMENTOS, em ordem, página a página
+        for ocorrencias in self._varrer(paginas, PADROES["unimed"]):
+            for inicio, fim, nome, procedure in ocorrencias:
+                if nome == "gto":
+                    indice_gtos.adicionar(fim, procedure.groups())
+                    continue
+
+                # Associa o procedimento ao último GTO que termina antes dele
+                gto_codigo, gto_nome = find_previous_gto(inicio, indice_gtos)
+                if not gto_codigo:
+                    continue
+
+                # Extrair dados do procedimento
+                procedure_data = procedure.groups()
+                codigo_procedimento = procedure_data[0]
+                nome_procedimento = procedure_data[1].strip()
+                status = procedure_data[2]
+                face = procedure_data[3] if procedure_data[3] else None
+                valor_apresentado = procedure_data[4]
+                valor_glosado = procedure_data[5]
+                valor_pago = procedure_data[6]
+                data_atendimento = procedure_data[7] if procedure_data[7] else None
+                dt_area = procedure_data[8] if procedure_data[8] else None
+
+                # Adicionar ao conjunto de dados
+                total += 1
+                yield Procedimento(
+                    gto=gto_codigo,
+                    nome_beneficiario=gto_nome,
+                    codigo_procedimento=codigo_procedimento,
+                    nome_procedimento=nome_procedimento,
+                    dente_regiao=dt_area,
+                    face=face,
+                    status=status,
+                    valor_apresentado=valor_apresentado,
+                    valor_glosa=valor_glosado,
+                    valor_processado=valor_pago,
+                    data_realizacao=data_atendimento
+                )
+
+            if ocorrencias:
+                indice_gtos.descartar_anteriores(ocorrencias[-1][0])
+
+        logger.info(f"{total} procedimentos extraidos.")
+
+    def _extrair_dados_rede_unna(self, paginas):
         """Extrai dados específicos do plano Rede Unna."""
 
         logger.info("Extraindo dados do Rede Unna...")
-        conteudo = self.dados.get("conteudo", "")
-        results = []
-
-        # Padrão para capturar o nome do beneficiário e os procedimentos
-        beneficiario_pattern = r"(?P<nome_beneficiario>[A-Za-zÀ-ÿ\s]+?)12 - Nome Civil"
-        procedure_pattern = r"""
-            (?P<tabela>\d{2})\s+
-            (?P<codigo_procedimento>\d{2}\.\d{3}\.\d{3})\s+
-            (?P<nome_procedimento>(?:[A-Za-zÀ-ÿ0-9()./\s-]+?(?=\s(?:\d+|\b[A-Z]{2,}\b))))\s+
-            (?P<dente_regiao>[A-Z]{2,}|\d+)\s+
-            (?P<face>\w+)?\s*
-            (?P<data>\d{2}/\d{2}/\d{4})\s+
-            (?P<quantidade>\d{1,2})\s+
-            (?P<valor_informado>\d+\.\d{2})\s+
-            (?P<valor_processado>\d+\.\d{2})\s+
-            (?P<valor_glosa>\d+\.\d{2})\s+
-            (?P<valor_franquia>\d+\.\d{2})\s+
-            (?P<valor_liberado>\d+\.\d{2})
-        """
+        total = 0
+
+        beneficiario_regex = PADROES["rede_unna"]["beneficiario"]
+        procedure_regex = PADROES["rede_unna"]["procedimento"]
+
+        def _procedimentos(nome_beneficiario, texto, start, end):
+            # Procedimentos entre o fim de um beneficiário e o início do próximo
+            try:
+                with self.metricas.medir("regex:procedimento"), orcamento_tempo(ORCAMENTO_REGEX):
+                    matches = list(procedure_regex.finditer(texto, start, end))
+            except TempoEsgotado:
+                quarentenar_estouro(self.caminho_pdf, f"{inicio_pendente + start}.procedimento", texto[start:end],
+                                    ORCAMENTO_REGEX, self.metricas)
+                return
+            for match in matches:
+                self.metricas.ocorrencia("procedimento", inicio_pendente + match.start())
+                yield Procedimento(
+                    nome_beneficiario=nome_beneficiario,
+                    codigo_procedimento=match.group('codigo_procedimento'),
+                    nome_procedimento=match.group('nome_procedimento'),
+                    dente_regiao=match.group('dente_regiao'),
+                    face=match.group('face'),
+                    valor_processado=match.group('valor_processado'),
+                    valor_glosa=match.group('valor_glosa'),
+                    data_realizacao=match.group('data')
+                )
+
+        # Texto mantido a partir da posição absoluta inicio_pendente: o bloco do
+        # beneficiário atual só é processado quando o próximo é encontrado
+        varredor = VarredorFluxo(beneficiario_regex)
+        partes = []
+        inicio_pendente = 0
+        beneficiario_atual = None
+        numero_pagina = 0
+
+        paginas = iter(paginas)
+        while True:
+            pagina = next(paginas, None)
+            if pagina is not None:
+                numero_pagina += 1
+                self.metricas.pagina(len(pagina))
+                partes.append(pagina)
+
+            try:
+                with self.metricas.medir("regex:beneficiario"):
+                    if pagina is None:
+                        ocorrencias = varredor.finalizar(ORCAMENTO_REGEX)
+                    else:
+                        ocorrencias = varredor.alimentar(pagina, ORCAMENTO_REGEX)
+            except TempoEsgotado:
+                # Os procedimentos do trecho descartado ficam com o beneficiário atual
+                quarentenar_estouro(self.caminho_pdf, f"p{numero_pagina}.beneficiario", varredor.descartado,
+                                    ORCAMENTO_REGEX, self.metricas)
+                ocorrencias = []
+
+            beneficiarios = [
+                (varredor.base + match.start(), varredor.base + match.end(), match.group("nome_beneficiario").strip())
+                for match in ocorrencias
+            ]
+            for inicio, _, _ in beneficiarios:
+                self.metricas.ocorrencia("beneficiario", inicio)
+
+            if beneficiarios or pagina is None:
+                texto = "".join(partes)
+                for start, end, nome_beneficiario in beneficiarios:
+                    if beneficiario_atual:
+                        nome_anterior, fim_anterior = beneficiario_atual
+                        for registro in _procedimentos(nome_anterior, texto, fim_anterior - inicio_pendente, start - inicio_pendente):
+                            total += 1
+                            yield registro
+                    beneficiario_atual = (nome_beneficiario, end)
+
+                if pagina is None:
+                    if beneficiario_atual:
+                        nome_anterior, fim_anterior = beneficiario_atual
+                        for registro in _procedimentos(nome_anterior, texto, fim_anterior - inicio_pendente, len(texto)):
+                            total += 1
+                            yield registro
+                    break
+
+                # Descarta o texto anterior ao fim do beneficiário atual
+                partes = [texto[beneficiario_atual[1] - inicio_pendente:]]
+                inicio_pendente = beneficiario_atual[1]
 
-        # Compilar os padrões
-        beneficiario_regex = re.compile(beneficiario_pattern)
-        procedure_regex = re.compile(procedure_pattern, re.VERBOSE)
-
-        # Encontrar todos os beneficiários no conteúdo
-        beneficiario_matches = list(beneficiario_regex.finditer(conteudo))
-
-        # Iterar sobre os beneficiários e procedimentos
-        for i, beneficiario_match in enumerate(beneficiario_matches):
-            nome_beneficiario = beneficiario_match.group("nome_beneficiario").strip()
-            start = beneficiario_match.end()
-            end = beneficiario_matches[i + 1].start() if i + 1 < len(beneficiario_matches) else len(conteudo)
-
-            # Extrair procedimentos associados a esse beneficiário
-            procedimentos_texto = conteudo[start:end]
-            procedure_matches = procedure_regex.finditer(procedimentos_texto)
-
-            for match in procedure_matches:
-                results.append({
-                    "Nome do Beneficiário": nome_beneficiario,
-                    "Código Procedimento": match.group('codigo_procedimento'),
-                    "Nome Procedimento": match.group('nome_procedimento'),
-                    "Dente/Região": match.group('dente_regiao'),
-                    "Face": match.group('face'),
-                    "Valor Processado": match.group('valor_processado'),
-                    "Valor Glosa": match.group('valor_glosa'),
-                    "Data de Realização": match.group('data')
-                })
-
-        logger.info(f"{len(results)} procedimentos extraidos.")
-        return results
-
-    def _extrair_dados_samp(self):
+            elif not beneficiario_atual and varredor.posicao > inicio_pendente:
+                # Antes do primeiro beneficiário só interessa o texto ainda não varrido
+                texto = "".join(partes)
+                partes = [texto[varredor.posicao - inicio_pendente:]]
+                inicio_pendente = varredor.posicao
+
+        logger.info(f"{total} procedimentos extraidos.")
+
+    def _extrair_dados_samp(self, paginas):
         """Extrai dados específicos do plano SAMP."""
 
         logger.info("Extraindo dados do SAMP...")
-        conteudo = self.dados.get("conteudo", "").replace('\n', ' ')
-        procedure_pattern = r"(\d{2}/\d{2}/\d{4})DR\(A\)\.\s+([A-ZÀ-Ú]+(?:\s+[A-ZÀ-Ú]+)+)(\d{8,9})\s*-\s*([A-ZÀ-Ú]+(?:\s+[A-ZÀ-Ú]+)*)[^\w]*([A-ZÀ-Ú]+(?:\s+[A-ZÀ-Ú]+)*)\s*(\d{8})\s*-([A-ZÀ-Ú0-9À-Ú\s\-:,.()]+)\s*\[([^\]]+)\].*?R\$\s*([\d.,]+)"
-        results = []
-
-        for procedure in re.finditer(procedure_pattern, conteudo):
-            data = procedure.group(1)
-            # doutor = procedure.group(2)
-            # id_paciente = procedure.group(3)
-            first_name = procedure.group(4)
-            last_name = procedure.group(5)
-            codigo_procedimento = procedure.group(6)
-            descricao = procedure.group(7)
-            gto_codigo = procedure.group(8)
-            valor = procedure.group(9)
-
-            results.append({
-                "GTO": gto_codigo.split('O')[-1].strip(),
-                "Nome do Beneficiário": first_name + " " + last_name,
-                "Código Procedimento": codigo_procedimento,
-                "Nome Procedimento": descricao.split('(', -1)[0].strip(),
-                "Face": obter_conteudo_parenteses(descricao),
-                "Valor Processado": valor,
-                "Valor Glosa": None,
-                "Data de Realização": data
-            })
-
-        logger.info(f"{len(results)} procedimentos extraidos.")
-        return results
-
-    def _extrair_dados_amil(self):
+        total = 0
+
+        for ocorrencias in self._varrer(paginas, PADROES["samp"]):
+            for _, _, _, procedure in ocorrencias:
+                data = procedure.group(1)
+                # doutor = procedure.group(2)
+                # id_paciente = procedure.group(3)
+                first_name = procedure.group(4)
+                last_name = procedure.group(5)
+                codigo_procedimento = procedure.group(6)
+                descricao = procedure.group(7)
+                gto_codigo = procedure.group(8)
+                valor = procedure.group(9)
+
+                total += 1
+                yield Procedimento(
+                    gto=gto_codigo.split('O')[-1].strip(),
+                    nome_beneficiario=first_name + " " + last_name,
+                    codigo_procedimento=codigo_procedimento,
+                    nome_procedimento=descricao.split('(', -1)[0].strip(),
+                    face=obter_conteudo_parenteses(descricao),
+                    valor_processado=valor,
+                    valor_glosa=None,
+                    data_realizacao=data
+                )
+
+        logger.info(f"{total} procedimentos extraidos.")
+
+    def _extrair_dados_amil(self, paginas):
         """Extrai dados específicos do plano Amil."""
 
         logger.info("Extraindo dados do Amil...")
-        conteudo = self.dados.get("conteudo", "")
-        results = []
-
-        # Padrões regex
-        beneficiary_pattern = r"Nome do Beneficiário\s*([A-ZÀ-Ü\s]+)"
-        procedure_pattern = r"([A-ZÀ-Ü0-9()/ ]+(?: [A-ZÀ-Ü0-9()/ ]+)*?)\s+(\d{2}/\d{2}/\d{4})\s*([A-ZÀ-Ü()/\-]+)?\s+([\d.,]+)\s+([A-Z\d]+)\s+(\d{1,2})\s+(\d{8})\s+([\d.,]{1,5})\s*([\d.,]{1,4})\s+([\d.,]+)\s*([\d.,]+)"
-
-        # Encontra os resultados dos beneficiários e procedimentos
-        beneficiary_matches = list(re.finditer(beneficiary_pattern, conteudo))
-        procedure_matches = list(re.finditer(procedure_pattern, conteudo))
-
-        for procedure in procedure_matches:
-            procedure_start = procedure.start()
-            
-            # Encontrar o Nome do Beneficiário anterior
-            matching_beneficiary = None
-            for beneficiary in beneficiary_matches:
-                if beneficiary.start() < procedure_start:
-                    matching_beneficiary = beneficiary.group(1).split('\n')[0].strip()
-                else:
-                    break
-            
-            if not matching_beneficiary:
-                continue
-            
-            # Extrair os campos do procedimento
-            descricao = procedure.group(1).strip()
-            data_realizacao = procedure.group(2)
-            face = procedure.group(3)
-            dente_regiao = procedure.group(5)
-            codigo_procedimento = procedure.group(7)
-            valor_glosa_estorno = procedure.group(9)
-            valor_processado = procedure.group(10)
-
-            # valor_informado = procedure.group(4)
-            # quantidade = procedure.group(6)
-            # valor_liberado = procedure.group(8)
-            # Separar Valor Franquia e Tabela
-            # franquia_tabela = procedure.group(11).replace(",", ".")
-            # valor_franquia = franquia_tabela[:-2]
-            # tabela = franquia_tabela[-2:]
-            
-            results.append({
-                "Nome do Beneficiário": matching_beneficiary,
-                "Código Procedimento": codigo_procedimento,
-                "Nome Procedimento": descricao,
-                "Dente/Região": dente_regiao,
-                "Face": face,
-                "Valor Processado": valor_processado,
-                "Valor Glosa": valor_glosa_estorno,
-                "Data de Realização": data_realizacao
-            })
-
-        logger.info(f"{len(results)} procedimentos extraidos.")
-        return results
-    
+        total = 0
+
+        # Posição inicial de cada beneficiário, para associar os procedimentos
+        indice_beneficiarios = IndiceCabecalhos()
+
+        # Encontra os beneficiários e procedimentos, em ordem, página a página
+        for ocorrencias in self._varrer(paginas, PADROES["amil"]):
+            for inicio, _, nome, procedure in ocorrencias:
+                if nome == "beneficiario":
+                    indice_beneficiarios.adicionar(inicio, procedure.group(1).split('\n')[0].strip())
+                    continue
+
+                # Encontrar o Nome do Beneficiário anterior
+                matching_beneficiary = indice_beneficiarios.anterior(inicio)
+                if not matching_beneficiary:
+                    continue
+
+                # Extrair os campos do procedimento
+                descricao = procedure.group(1).strip()
+                data_realizacao = procedure.group(2)
+                face = procedure.group(3)
+                dente_regiao = procedure.group(5)
+                codigo_procedimento = procedure.group(7)
+                valor_glosa_estorno = procedure.group(9)
+                valor_processado = procedure.group(10)
+
+                # valor_informado = procedure.group(4)
+                # quantidade = procedure.group(6)
+                # valor_liberado = procedure.group(8)
+                # Separar Valor Franquia e Tabela
+                # franquia_tabela = procedure.group(11).replace(",", ".")
+                # valor_franquia = franquia_tabela[:-2]
+                # tabela = franquia_tabela[-2:]
+
+                total += 1
+                yield Procedimento(
+                    nome_beneficiario=matching_beneficiary,
+                    codigo_procedimento=codigo_procedimento,
+                    nome_procedimento=descricao,
+                    dente_regiao=dente_regiao,
+                    face=face,
+                    valor_processado=valor_processado,
+                    valor_glosa=valor_glosa_estorno,
+                    data_realizacao=data_realizacao
+                )
+
+            if ocorrencias:
+                indice_beneficiarios.descartar_anteriores(ocorrencias[-1][0])
+
+        logger.info(f"{total} procedimentos extraidos.")
+
 if __name__ == "__main__":
 
     # Exemplo de uso
@@ -0,0 +1,241 @@
+import os
+import re
+import signal
+import threading
+from contextlib import contextmanager
+
+from utilitarios.logger_config import logger
+from utilitarios.quarentena import quarentenar_trecho
+
+# Quantidade de caracteres mantida entre uma página e outra. Um registro (ou
+# cabeçalho) precisa ser menor que a janela para ser reconhecido mesmo quando
+# atravessa a quebra de página.
+JANELA_CARRY = 5000
+
+# Tempo máximo, em segundos, de cada padrão sobre uma página (0 = sem limite)
+ORCAMENTO_REGEX = float(os.environ.get("PDF_ORCAMENTO_REGEX", 5))
+
+class TempoEsgotado(Exception):
+    """A busca de um padrão passou do tempo permitido."""
+
+_orcamento_ativo = False
+
+def _estourar(signum, frame):
+    if _orcamento_ativo:
+        raise TempoEsgotado()
+
+def _pode_interromper():
+    # O re verifica sinais durante a busca, mas só a thread principal os recebe
+    return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+@contextmanager
+def orcamento_tempo(segundos:float):
+    """
+    Interrompe o bloco com TempoEsgotado se ele passar de `segundos`.
+
+    Usa SIGALRM, que o mecanismo de expressões regulares atende mesmo no meio
+    de uma busca com backtracking. Fora da thread principal (ou no Windows)
+    o bloco roda sem limite.
+    """
+
+    global _orcamento_ativo
+
+    if not segundos or _orcamento_ativo or not _pode_interromper():
+        yield
+        return
+
+    if signal.getsignal(signal.SIGALRM) is not _estourar:
+        signal.signal(signal.SIGALRM, _estourar)
+
+    _orcamento_ativo = True
+    signal.setitimer(signal.ITIMER_REAL, segundos)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        _orcamento_ativo = False
+
+def quarentenar_estouro(arquivo:str, descricao:str, texto:str, orcamento:float, metricas = None):
+    """Registra e guarda em quarentena um trecho cuja busca estourou o orçamento."""
+
+    logger.warning(f"Busca interrompida após {orcamento}s em {arquivo or 'texto'} ({descricao}); trecho ignorado.")
+    if metricas:
+        metricas.trechos_em_quarentena += 1
+    quarentenar_trecho(arquivo, descricao, texto, f"busca interrompida após {orcamento}s")
+
+class Ocorrencia:
+    """
+    Cópia serializável de um re.Match (posições e grupos), para devolver as
+    ocorrências encontradas nos processos do pool.
+    """
+
+    __slots__ = ("_inicio", "_fim", "_texto", "_grupos", "_nomes")
+
+    def __init__(self, match:re.Match):
+        self._inicio, self._fim = match.span()
+        self._texto = match.group(0)
+        self._grupos = match.groups()
+        # O mesmo dicionário para todas as ocorrências do padrão; o pickle o envia uma vez
+        self._nomes = _nomes_grupos(match.re)
+
+    def deslocar(self, deslocamento:int):
+        """Soma `deslocamento` às posições (de relativas a um trecho para absolutas)."""
+
+        self._inicio += deslocamento
+        self._fim += deslocamento
+
+    def start(self):
+        return self._inicio
+
+    def end(self):
+        return self._fim
+
+    def span(self):
+        return self._inicio, self._fim
+
+    def groups(self):
+        return self._grupos
+
+    def groupdict(self):
+        return {nome: self._grupos[indice - 1] for nome, indice in self._nomes.items()}
+
+    def group(self, *grupos):
+        valores = tuple(self._grupo(grupo) for grupo in grupos or (0,))
+        return valores[0] if len(valores) == 1 else valores
+
+    def _grupo(self, grupo):
+        if isinstance(grupo, str):
+            grupo = self._nomes[grupo]
+        return self._texto if grupo == 0 else self._grupos[grupo - 1]
+
+_cache_nomes_grupos = {}
+
+def _nomes_grupos(padrao:re.Pattern):
+    nomes = _cache_nomes_grupos.get(padrao)
+    if nomes is None:
+        nomes = _cache_nomes_grupos[padrao] = dict(padrao.groupindex)
+    return nomes
+
+class VarredorFluxo:
+    """
+    Aplica um padrão compilado sobre um texto que chega em partes (páginas).
+
+    Mantém apenas a janela final do texto já recebido. Uma ocorrência só é
+    emitida quando começa antes do limite ``len(buffer) - janela``, garantindo
+    que ela não mudaria com a chegada de mais texto; o restante fica para a
+    próxima parte. O resultado é o mesmo de ``finditer`` sobre o texto inteiro,
+    desde que as ocorrências sejam menores que a janela.
+    """
+
+    def __init__(self, padrao:re.Pattern, janela:int = JANELA_CARRY):
+        self.padrao = padrao
+        self.janela = janela
+        self.buffer = ""
+        self.base = 0
+        self.cursor = 0
+        # Texto descartado na última busca interrompida
+        self.descartado = ""
+
+    @property
+    def posicao(self):
+        """Posição absoluta a partir da qual ainda podem surgir ocorrências."""
+
+        return self.base + self.cursor
+
+    def alimentar(self, texto:str, orcamento:float = None):
+        """
+        Recebe mais uma parte do texto e devolve as ocorrências já estáveis.
+
+        Com `orcamento` (segundos), a busca é interrompida se passar desse
+        tempo: o texto pendente é descartado e TempoEsgotado é lançada.
+        """
+
+        self.buffer = self.buffer[self.cursor:] + texto
+        self.base += self.cursor
+        self.cursor = 0
+
+        limite = len(self.buffer) - self.janela
+        if limite <= 0:
+            return []
+
+        ocorrencias = self._buscar(orcamento, limite)
+        if ocorrencias:
+            self.cursor = ocorrencias[-1].end()
+
+        # Nenhuma ocorrência começa entre o cursor e o limite
+        self.cursor = max(self.cursor, limite)
+        return ocorrencias
+
+    def finalizar(self, orcamento:float = None):
+        """Devolve as ocorrências restantes ao fim do texto."""
+
+        ocorrencias = self._buscar(orcamento)
+        # As posições das ocorrências continuam relativas a self.base
+        self.cursor = len(self.buffer)
+        return ocorrencias
+
+    def _buscar(self, orcamento:float, limite:int = None):
+        ocorrencias = []
+        try:
+            with orcamento_tempo(orcamento):
+                for ocorrencia in self.padrao.finditer(self.buffer, self.cursor):
+                    if limite is not None and ocorrencia.start() >= limite:
+                        break
+                    ocorrencias.append(ocorrencia)
+        except TempoEsgotado:
+            self.descartado = self.buffer[self.cursor:]
+            self.base += len(self.buffer)
+            self.buffer = ""
+            self.cursor = 0
+            raise
+        return ocorrencias
+
+def varrer_paginas(paginas, padroes:dict[str, re.Pattern], janela:int = JANELA_CARRY, metricas = None,
+                   orcamento:float = ORCAMENTO_REGEX):
+    """
+    Varre um fluxo de páginas com vários padrões ao mesmo tempo.
+
+    Gera, a cada página, uma lista com as ocorrências estáveis de todos os
+    padrões como tuplas (inicio, fim, nome_padrao, ocorrencia), ordenada pela
+    posição absoluta de início no texto concatenado.
+
+    Cada padrão tem até `orcamento` segundos por página; quando estoura, o
+    texto pendente daquele padrão vai para a quarentena e a varredura segue
+    na página seguinte.
+
+    Com um MetricasArquivo (utilitarios.metricas), registra as páginas, o
+    tempo de cada padrão (etapa "regex:<nome>") e as ocorrências encontradas.
+    """
+
+    varredores = {nome: VarredorFluxo(padrao, janela) for nome, padrao in padroes.items()}
+    numero_pagina = 0
+
+    def _buscar(nome, varredor, metodo):
+        try:
+            if metricas:
+                with metricas.medir(f"regex:{nome}"):
+                    return metodo(varredor)
+            return metodo(varredor)
+        except TempoEsgotado:
+            arquivo = metricas.arquivo if metricas else None
+            quarentenar_estouro(arquivo, f"p{numero_pagina}.{nome}", varredor.descartado, orcamento, metricas)
+            return []
+
+    def _coletar(metodo):
+        ocorrencias = []
+        for nome, varredor in varredores.items():
+            for ocorrencia in _buscar(nome, varredor, metodo):
+                inicio = varredor.base + ocorrencia.start()
+                if metricas:
+                    metricas.ocorrencia(nome, inicio)
+                ocorrencias.append((inicio, varredor.base + ocorrencia.end(), nome, ocorrencia))
+        ocorrencias.sort(key=lambda item: item[0])
+        return ocorrencias
+
+    for pagina in paginas:
+        numero_pagina += 1
+        if metricas:
+            metricas.pagina(len(pagina))
+        yield _coletar(lambda varredor: varredor.alimentar(pagina, orcamento))
+
+    yield _coletar(lambda varredor: varredor.finalizar(orcamento))
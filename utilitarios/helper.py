@@ -1,15 +1,16 @@
 import os 
 import re
-import openpyxl
-import pandas as pd
-import configparser
+from bisect import bisect_left
 from utilitarios.logger_config import logger
 
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+# pandas, openpyxl e os escritores do relatório são importados dentro das
+# funções que os usam: importar este módulo (ou os extratores) fica rápido
 
 def ler_configuracao(caminho_config:str):
     """Lê o arquivo de configuração."""
 
+    import configparser
+
     config = configparser.ConfigParser()
     config.read(caminho_config)
     return config
@@ -24,6 +25,9 @@ def listar_subpastas(caminho_pasta:str):
 
 def ler_arquivo_excel(caminho_excel:str):
     """Lê o arquivo Excel especificado."""
+
+    import pandas as pd
+
     try:
         df = pd.read_excel(caminho_excel)
         return df
@@ -31,17 +35,19 @@ def ler_arquivo_excel(caminho_excel:str):
         logger.error(f"Erro ao ler o arquivo Excel: {e}")
         return None
 
-def salvar_dados(dados: list[dict], empresa: str, tipo_arquivo: str):
+def salvar_dados(dados, empresa: str, tipo_arquivo: str):
     """
     Salva os dados no formato desejado.
 
     Args:
-        df (pd.DataFrame): DataFrame com os dados a serem salvos.
+        dados: TabelaRegistros, DataFrame ou lista de registros a serem salvos.
         empresa (str): Nome da empresa.
         tipo_arquivo (str): Formato de arquivo desejado (csv, xlsx).
     """
 
-    df = pd.DataFrame(dados)
+    from utilitarios.registros import como_dataframe
+
+    df = como_dataframe(dados)
 
     if tipo_arquivo == "csv":
         df.to_csv(f"{empresa}_dados.csv", index=False)
@@ -50,14 +56,76 @@ def salvar_dados(dados: list[dict], empresa: str, tipo_arquivo: str):
     elif tipo_arquivo == "json":
         df.to_json(f"{empresa}_dados.json", orient="records")
     elif tipo_arquivo == "xml":
-        df.to_xml(f"{empresa}_dados.xml", root_name="dados")
+        # Nomes de tags XML não podem ter espaços nem barras
+        df.rename(columns=lambda coluna: re.sub(r"\W+", "_", coluna)).to_xml(f"{empresa}_dados.xml", root_name="dados")
     elif tipo_arquivo == "html":
         df.to_html(f"{empresa}_dados.html", index=False)
 
     else:
         logger.error(f"Formato de arquivo inválido: {tipo_arquivo}")
 
+class IndiceCabecalhos:
+    """
+    Índice ordenado das posições dos cabeçalhos (GTO, beneficiário) de um texto.
+
+    Responde em O(log n), com bisect, qual é o último cabeçalho anterior a uma
+    posição. As posições devem ser adicionadas em ordem crescente, como saem
+    do finditer ou da varredura por páginas.
+    """
+
+    def __init__(self):
+        self.posicoes = []
+        self.valores = []
+
+    def __len__(self):
+        return len(self.posicoes)
+
+    @classmethod
+    def de_ocorrencias(cls, ocorrencias, usar_fim:bool = True):
+        """Monta o índice a partir de matches, pela posição final (ou inicial) de cada um."""
+
+        indice = cls()
+        for ocorrencia in ocorrencias:
+            indice.adicionar(ocorrencia.end() if usar_fim else ocorrencia.start(), ocorrencia.groups())
+        return indice
+
+    def adicionar(self, posicao:int, valor):
+        """Adiciona um cabeçalho; a posição não pode ser menor que a anterior."""
+
+        if self.posicoes and posicao < self.posicoes[-1]:
+            raise ValueError(f"Posição fora de ordem: {posicao} < {self.posicoes[-1]}")
+        self.posicoes.append(posicao)
+        self.valores.append(valor)
+
+    def anterior(self, posicao:int, padrao=None):
+        """Retorna o valor do último cabeçalho com posição estritamente menor que a informada."""
+
+        indice = bisect_left(self.posicoes, posicao)
+        return self.valores[indice - 1] if indice else padrao
+
+    def descartar_anteriores(self, posicao:int):
+        """
+        Descarta os cabeçalhos que não podem mais ser a resposta de consultas
+        em posições maiores ou iguais à informada, mantendo o índice pequeno
+        durante a varredura por páginas.
+        """
+
+        indice = bisect_left(self.posicoes, posicao) - 1
+        if indice > 0:
+            del self.posicoes[:indice]
+            del self.valores[:indice]
+
 def find_previous_gto(procedure_start, gto_matches):
+    """
+    Retorna (código, nome) do último GTO que termina antes do procedimento.
+
+    Aceita a lista de matches (busca linear) ou um IndiceCabecalhos montado
+    com IndiceCabecalhos.de_ocorrencias(gto_matches) (busca binária).
+    """
+
+    if isinstance(gto_matches, IndiceCabecalhos):
+        return gto_matches.anterior(procedure_start, (None, None))
+
     for gto in reversed(gto_matches):
         if gto.end() < procedure_start:
             return gto.groups()
@@ -70,160 +138,64 @@ def obter_conteudo_parenteses(texto):
 
 def criar_planilha_inicial(arquivo: str):
     """
-    Cria a planilha inicial com o cabeçalho formatado e bordas.
+    Cria a planilha inicial, apenas com o resumo e os totais; as planilhas dos planos
+    são criadas, com o cabeçalho formatado, ao salvar os primeiros dados.
 
     Args:
         arquivo (str): Caminho e nome do arquivo de planilha.
     """
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    sheet.title = "Plano"
-
-    # Configuração da borda padrão
-    borda = Border(
-        left=Side(border_style="thin", color="000000"),
-        right=Side(border_style="thin", color="000000"),
-        top=Side(border_style="thin", color="000000"),
-        bottom=Side(border_style="thin", color="000000"),
-    )
-
-    # Configuração do cabeçalho principal (linha 1)
-    sheet.merge_cells("A1:D1")
-    sheet.merge_cells("E1:K1")
-
-    celula_nome_dentista = sheet["A1"]
-    celula_nome_dentista.value = "NOME DO DENTISTA: COLOCA SEU NOME"
-    celula_nome_dentista.font = Font(bold=True, color="000000")
-    celula_nome_dentista.alignment = Alignment(horizontal="center", vertical="center")
-    celula_nome_dentista.fill = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-
-    celula_mes_referencia = sheet["E1"]
-    celula_mes_referencia.value = "MÊS DE REFERENCIA: JANEIRO ( COLOCA MÊS DE REFERENCIA )"
-    celula_mes_referencia.font = Font(bold=True, color="000000")
-    celula_mes_referencia.alignment = Alignment(horizontal="center", vertical="center")
-    celula_mes_referencia.fill = PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid")
-
-    for row in sheet["A1:D1"]:
-        for cell in row:
-            cell.font = Font(bold=True, color="FF0000")
-            cell.border = borda
-
-    for row in sheet["E1:K1"]:
-        for cell in row:
-            cell.font = Font(bold=True, color="FF0000")
-            cell.border = borda
-
-    sheet.row_dimensions[1].height = 15
-    sheet.row_dimensions[1].height *= 3
-
-    # Configuração do cabeçalho (linha 2)
-    cabecalho = [
-        "DATA",
-        "NOME DO PACIENTE",
-        "PLANO",
-        "PROCEDIMENTO REALIZADO",
-        "DENTE",
-        "FACE",
-        "REGIÃO",
-        "NUMERO DA GTO",
-        "PAGO / GLOSADO",
-        "VALOR PAGO",
-        "REPASSE DENTISTA",
-    ]
 
-    for col_num, texto in enumerate(cabecalho, start=1):
-        celula = sheet.cell(row=2, column=col_num)
-        celula.value = texto
-        celula.font = Font(bold=True)
-        celula.alignment = Alignment(horizontal="center", vertical="center")
-        celula.border = borda
-
-    # Configuração da célula de total (coluna M)
-    sheet["M2"].value = "TOTAL"
-    sheet["M2"].font = Font(bold=True)
-    sheet["M2"].alignment = Alignment(horizontal="center", vertical="center")
-    sheet["M2"].fill = PatternFill(start_color="FAC090", end_color="FAC090", fill_type="solid")
-    sheet["M2"].border = borda
-
-    sheet.merge_cells("M3:M4")
-    total_cell = sheet["M3"]
-    total_cell.value = "=SUM(K3:K1002)"
-    total_cell.number_format = "R$ #,##0.00"
-    total_cell.alignment = Alignment(horizontal="center", vertical="center")
-    total_cell.fill = PatternFill(start_color="00B0F0", end_color="00B0F0", fill_type="solid")
-    total_cell.border = borda
-
-    sheet.row_dimensions[2].height = 15
-    sheet.row_dimensions[2].height *= 2
-
-    # Salvar o arquivo
-    workbook.save(arquivo)
-
-def salvar_dados_planilha(dados: list[dict], plano: str, arquivo: str):
+    from utilitarios.relatorio import RelatorioPlanilha
+
+    RelatorioPlanilha(arquivo).salvar()
+
+def salvar_dados_planilha(dados, plano: str, arquivo: str, linhas_por_planilha:int = None):
     """
-    Salva os dados na planilha especificada, aplicando bordas nas novas linhas.
+    Salva os dados na planilha do plano, aplicando bordas nas novas linhas.
+
+    Usado para acrescentar as linhas de um único plano a um relatório já
+    existente; para vários planos, use RelatorioExistente, que carrega e
+    grava o arquivo uma vez só, e para gerar o relatório inteiro,
+    RelatorioPlanilha. Os dados continuam na última planilha do plano,
+    passando para uma nova ao atingir o limite de linhas, e o resumo e os
+    totais são atualizados.
 
     Args:
-        dados (list): Dados a serem salvos.
+        dados: TabelaRegistros, DataFrame ou lista de registros a serem salvos.
         plano (str): Nome do plano.
         arquivo (str): Caminho e nome do arquivo de planilha.
+        linhas_por_planilha (int): Linhas de dados por planilha (padrão:
+            relatorio.LINHAS_POR_PLANILHA).
+
+    Returns:
+        list: Trechos (planilha, primeira_linha, linhas) escritos, ou None em caso de erro.
     """
 
+    from utilitarios.relatorio import LINHAS_POR_PLANILHA, RelatorioExistente
+
     try:
-        # Carregar o arquivo de planilha
-        workbook = openpyxl.load_workbook(arquivo)
-        sheet = workbook.active
-
-        borda = Border(
-            left=Side(border_style="thin", color="000000"),
-            right=Side(border_style="thin", color="000000"),
-            top=Side(border_style="thin", color="000000"),
-            bottom=Side(border_style="thin", color="000000"),
-        )
-
-        colunas = {
-            'Data de Realização': 'DATA',
-            'Nome do Beneficiário': 'NOME DO PACIENTE',
-            'Plano': 'PLANO',
-            'Nome Procedimento': 'PROCEDIMENTO REALIZADO',
-            'Dente/Região': 'DENTE',
-            'Face': 'FACE',
-            'Regiao': 'REGIÃO',
-            'GTO': 'NUMERO DA GTO',
-            'Valor Glosa': 'PAGO / GLOSADO',
-            'Valor Processado': 'VALOR PAGO',
-        }
-
-        # Identificar a próxima linha vazia para inserir os dados
-        ultima_linha = sheet.max_row
-        proxima_linha = ultima_linha + 1
-
-        # Adicionar os dados na planilha
-        for dado in dados:
-            dado['Plano'] = plano
-            if dado['Valor Processado']:
-                dado['Valor Processado'] = dado['Valor Processado'].replace('.', ',')
-            if dado['Valor Glosa']:
-               dado['Valor Glosa'] = dado['Valor Glosa'].replace('.', ',')
-            nova_linha = [dado.get(key, None) for key in colunas.keys()]
-            for col_index, valor in enumerate(nova_linha, start=1):
-                cell = sheet.cell(row=proxima_linha, column=col_index, value=valor)
-                cell.alignment = Alignment(horizontal="center")
-                cell.border = borda
-
-            # Fórmulas e estilos específicos
-            sheet.cell(row=proxima_linha, column=11).value = f"=J{proxima_linha}*35/100"
-            sheet.cell(row=proxima_linha, column=11).border = borda
-            sheet.cell(row=proxima_linha, column=9).fill = PatternFill(start_color="FF8669", end_color="FF8669", fill_type="solid")
-            sheet.cell(row=proxima_linha, column=10).fill = PatternFill(start_color="C2F3B7", end_color="C2F3B7", fill_type="solid")
-            sheet.cell(row=proxima_linha, column=11).fill = PatternFill(start_color="00B0F0", end_color="00B0F0", fill_type="solid")
-
-            proxima_linha += 1
-
-        # Salvar o arquivo atualizado
-        workbook.save(arquivo)
-        logger.info(f"Relatório salvo com sucesso em {arquivo}")
+        relatorio = RelatorioExistente(arquivo, linhas_por_planilha or LINHAS_POR_PLANILHA)
+        trechos = relatorio.adicionar(dados, plano)
+        if trechos is not None and not relatorio.salvar():
+            return None
+        return trechos
 
     except Exception as e:
         logger.error(f"Erro ao salvar relatório: {e}")
 
+def remover_linhas_planilha(arquivo: str, intervalos: list[tuple[str, int, int]]):
+    """
+    Remove blocos de linhas de dados do relatório, subindo as linhas seguintes
+    de cada planilha, e atualiza o resumo e os totais (ver RelatorioExistente.remover).
+
+    Args:
+        arquivo (str): Caminho e nome do arquivo de planilha.
+        intervalos (list): Trechos (planilha, linha_inicial, quantidade),
+            aplicados em ordem; cada um já considera as remoções anteriores.
+    """
+
+    from utilitarios.relatorio import RelatorioExistente
+
+    relatorio = RelatorioExistente(arquivo)
+    relatorio.remover(intervalos)
+    relatorio.salvar()
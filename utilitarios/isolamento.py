@@ -0,0 +1,311 @@
+import os
+import time
+import heapq
+import signal
+import multiprocessing
+from concurrent.futures import wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.connection import wait as aguardar_conexoes
+from multiprocessing.reduction import ForkingPickler
+
+from utilitarios.logger_config import configurar_processo, logger, repassar_registro
+
+# "1" extrai cada PDF em um processo próprio, com os limites abaixo. Por
+# padrão os PDFs usam o pool compartilhado, cujos processos têm o mesmo
+# limite de memória, e os grandes são divididos em intervalos de páginas;
+# um PDF que derruba o pool ou passa do tempo é refeito isolado (ver
+# main.extrair_pdfs)
+ISOLAR = os.environ.get("PDF_ISOLAR", "0") == "1"
+
+# Tempo máximo, em segundos, de cada PDF (0 = sem limite)
+TEMPO_ARQUIVO = float(os.environ.get("PDF_TEMPO_ARQUIVO", 300))
+
+# Memória que o processo de cada PDF pode alocar além da que herda, em MB (0 = sem limite)
+MEMORIA_ARQUIVO_MB = int(os.environ.get("PDF_MEMORIA_ARQUIVO", 2048))
+
+# Tentativas de cada PDF antes da quarentena e espera antes da segunda, em
+# segundos, dobrada a cada nova tentativa
+TENTATIVAS = int(os.environ.get("PDF_TENTATIVAS", 2))
+ESPERA_TENTATIVA = float(os.environ.get("PDF_ESPERA_TENTATIVA", 1.0))
+
+def _contexto_processos():
+    # fork: o processo nasce com os módulos já importados
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+def _limitar_memoria(memoria_mb:int):
+    """Limita o espaço de endereçamento do processo ao atual mais `memoria_mb`."""
+
+    try:
+        import resource
+    except ImportError:
+        # Windows: sem limite de memória
+        return
+
+    atual = 0
+    try:
+        with open("/proc/self/statm") as statm:
+            atual = int(statm.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pass
+    limite = atual + memoria_mb * 2**20
+    _, maximo = resource.getrlimit(resource.RLIMIT_AS)
+    if maximo != resource.RLIM_INFINITY:
+        limite = min(limite, maximo)
+    resource.setrlimit(resource.RLIMIT_AS, (limite, maximo))
+
+def iniciar_processo_pool(fila = None, nivel:str | int = None, memoria_mb:int = MEMORIA_ARQUIVO_MB):
+    """
+    Inicializador dos processos de um pool compartilhado: configura o log
+    (ver configurar_processo) e limita a memória de cada processo como a de
+    um processo isolado, para que um PDF que esgota a memória falhe sozinho
+    em vez de levar a máquina junto.
+    """
+
+    configurar_processo(fila, nivel)
+    if memoria_mb:
+        _limitar_memoria(memoria_mb)
+
+def encerrar_pool(executor, esperar:bool = True):
+    """
+    Encerra à força os processos de um ProcessPoolExecutor (ex.: um deles
+    travado) e descarta as tarefas na fila. Sem `esperar`, não aguarda o
+    fim do executor (ex.: no loop de eventos do vigia).
+    """
+
+    for processo in list((getattr(executor, "_processes", None) or {}).values()):
+        processo.kill()
+    executor.shutdown(wait=esperar, cancel_futures=True)
+
+class RelogioPool:
+    """
+    Prazo das tarefas de um ProcessPoolExecutor: cada uma tem `tempo`
+    segundos contados de quando começa a rodar, e não de quando foi
+    enviada, para que as que esperam na fila do pool não gastem o prazo.
+
+    O início é o primeiro momento em que o futuro é visto em execução
+    (running()): enquanto se espera por um deles, todos os acompanhados são
+    conferidos a cada `intervalo` segundos. O pool marca como em execução
+    uma tarefa a mais que os processos, já na fila deles, de modo que o
+    prazo dela pode começar um pouco antes.
+
+    Uso:
+        relogio = RelogioPool(TEMPO_ARQUIVO)
+        relogio.acompanhar(*futuros)
+        resultado = relogio.resultado(futuros[0])  # BrokenProcessPool se passar do tempo
+    """
+
+    def __init__(self, tempo:float = TEMPO_ARQUIVO, intervalo:float = 0.1):
+        self.tempo = tempo
+        self.intervalo = intervalo
+        self._futuros = []
+        self._inicios = {}
+
+    def acompanhar(self, *futuros):
+        self._futuros.extend(futuros)
+
+    def _conferir(self):
+        agora = time.monotonic()
+        pendentes = []
+        for futuro in self._futuros:
+            if futuro.done():
+                continue
+            if futuro not in self._inicios and futuro.running():
+                self._inicios[futuro] = agora
+            pendentes.append(futuro)
+        self._futuros = pendentes
+
+    def resultado(self, futuro):
+        """futuro.result(), ou BrokenProcessPool se a tarefa passar de `tempo` segundos em execução."""
+
+        if not self.tempo:
+            return futuro.result()
+        if futuro not in self._inicios and futuro not in self._futuros:
+            self._futuros.append(futuro)
+
+        while True:
+            self._conferir()
+            if futuro.done():
+                self._inicios.pop(futuro, None)
+                return futuro.result()
+            espera = self.intervalo
+            inicio = self._inicios.get(futuro)
+            if inicio is not None:
+                restante = inicio + self.tempo - time.monotonic()
+                if restante <= 0:
+                    raise BrokenProcessPool(f"tempo esgotado após {self.tempo:g}s")
+                espera = min(espera, restante)
+            wait([futuro], timeout=espera)
+
+def _executar_filho(conexao, funcao, argumentos:tuple, memoria_mb:int, conexao_log, nivel):
+    """Executado no processo de cada tarefa: devolve ("ok", resultado) ou ("erro", descrição)."""
+
+    # As mensagens vão por uma conexão só deste processo, que pode ser encerrado à força
+    configurar_processo(conexao_log, nivel)
+    try:
+        if memoria_mb:
+            _limitar_memoria(memoria_mb)
+        resposta = ("ok", funcao(*argumentos))
+    except MemoryError:
+        resposta = ("erro", f"memória esgotada (limite de {memoria_mb} MB)")
+    except BaseException as e:
+        resposta = ("erro", f"{type(e).__name__}: {e}")
+
+    # Serializa antes de escrever: uma falha aqui não deixa metade da
+    # mensagem na conexão
+    try:
+        dados = ForkingPickler.dumps(resposta)
+    except MemoryError:
+        resposta = None
+        dados = ForkingPickler.dumps(("erro", f"memória esgotada ao devolver o resultado (limite de {memoria_mb} MB)"))
+    except Exception as e:
+        dados = ForkingPickler.dumps(("erro", f"resultado não serializável: {type(e).__name__}: {e}"))
+
+    try:
+        conexao.send_bytes(dados)
+        conexao.close()
+    except BaseException:
+        # Envio interrompido: o processo pai relata a falha pelo código de saída
+        os._exit(1)
+
+class Execucao:
+    """Resultado de uma tarefa isolada: o valor devolvido ou o motivo da falha."""
+
+    __slots__ = ("resultado", "motivo", "tentativas", "segundos")
+
+    def __init__(self, resultado = None, motivo:str = None, tentativas:int = 0, segundos:float = 0.0):
+        self.resultado = resultado
+        self.motivo = motivo
+        self.tentativas = tentativas
+        self.segundos = segundos
+
+class _Ativa:
+    __slots__ = ("indice", "tentativa", "processo", "conexao", "log", "inicio", "prazo")
+
+    def __init__(self, indice, tentativa, processo, conexao, log, inicio, prazo):
+        self.indice = indice
+        self.tentativa = tentativa
+        self.processo = processo
+        self.conexao = conexao
+        self.log = log
+        self.inicio = inicio
+        self.prazo = prazo
+
+def executar_isolado(funcao, tarefas:list[tuple], workers:int = 1, tempo:float = TEMPO_ARQUIVO,
+                     memoria_mb:int = MEMORIA_ARQUIVO_MB, tentativas:int = TENTATIVAS,
+                     espera:float = ESPERA_TENTATIVA, descrever = None):
+    """
+    Executa funcao(*argumentos) de cada tarefa em um processo próprio, com
+    até `workers` processos ao mesmo tempo.
+
+    Cada processo tem `tempo` segundos de relógio e pode alocar `memoria_mb`
+    além do que herda; quem passa do tempo é encerrado. Uma exceção, a
+    memória esgotada, o encerramento do processo (ex.: falha de
+    segmentação) ou o tempo esgotado só afetam a própria tarefa, que é
+    repetida até `tentativas` vezes: a primeira repetição espera `espera`
+    segundos e cada uma das seguintes espera o dobro da anterior, enquanto
+    as demais tarefas seguem.
+
+    Args:
+        descrever: Função que recebe os argumentos de uma tarefa e devolve o
+            nome usado no log (por padrão, o primeiro argumento).
+
+    Returns:
+        list: Uma Execucao por tarefa, na mesma ordem.
+    """
+
+    contexto = _contexto_processos()
+    descrever = descrever or (lambda argumentos: argumentos[0])
+    nivel = logger.level
+    workers = max(1, workers)
+    tentativas = max(1, tentativas)
+
+    execucoes = [Execucao() for _ in tarefas]
+    # (momento em que pode começar, índice, tentativa)
+    pendentes = [(0.0, indice, 1) for indice in range(len(tarefas))]
+    ativas = []
+
+    def _iniciar(indice, tentativa):
+        receptor, emissor = contexto.Pipe(duplex=False)
+        receptor_log, emissor_log = contexto.Pipe(duplex=False)
+        processo = contexto.Process(
+            target=_executar_filho, args=(emissor, funcao, tarefas[indice], memoria_mb, emissor_log, nivel),
+            name=f"isolado-{indice}", daemon=True,
+        )
+        processo.start()
+        emissor.close()
+        emissor_log.close()
+        inicio = time.monotonic()
+        ativas.append(_Ativa(indice, tentativa, processo, receptor, receptor_log, inicio, inicio + tempo if tempo else None))
+
+    def _repassar_log(ativa:_Ativa):
+        try:
+            while ativa.log.poll():
+                repassar_registro(ativa.log.recv())
+        except (EOFError, OSError):
+            pass
+
+    def _concluir(ativa:_Ativa, resultado = None, motivo:str = None):
+        _repassar_log(ativa)
+        ativa.log.close()
+        ativa.conexao.close()
+        ativa.processo.join(5)
+        if ativa.processo.is_alive():
+            ativa.processo.kill()
+            ativa.processo.join()
+        ativas.remove(ativa)
+
+        execucao = execucoes[ativa.indice]
+        execucao.tentativas = ativa.tentativa
+        execucao.segundos += time.monotonic() - ativa.inicio
+        if motivo is None:
+            execucao.resultado = resultado
+            execucao.motivo = None
+            return
+
+        execucao.motivo = motivo
+        if ativa.tentativa < tentativas:
+            atraso = espera * 2 ** (ativa.tentativa - 1)
+            logger.warning(f"Falha em {descrever(tarefas[ativa.indice])} ({motivo}); nova tentativa em {atraso:.1f}s.")
+            heapq.heappush(pendentes, (time.monotonic() + atraso, ativa.indice, ativa.tentativa + 1))
+        else:
+            logger.error(f"Falha em {descrever(tarefas[ativa.indice])} após {ativa.tentativa} tentativa(s): {motivo}")
+
+    heapq.heapify(pendentes)
+    while pendentes or ativas:
+        agora = time.monotonic()
+        while pendentes and len(ativas) < workers and pendentes[0][0] <= agora:
+            _, indice, tentativa = heapq.heappop(pendentes)
+            _iniciar(indice, tentativa)
+
+        momentos = [ativa.prazo for ativa in ativas if ativa.prazo is not None]
+        if pendentes and len(ativas) < workers:
+            momentos.append(pendentes[0][0])
+        limite = max(0.0, min(momentos) - time.monotonic()) if momentos else None
+        prontos = set(aguardar_conexoes([objeto for ativa in ativas for objeto in (ativa.conexao, ativa.log, ativa.processo.sentinel)], limite))
+
+        agora = time.monotonic()
+        for ativa in list(ativas):
+            if ativa.log in prontos:
+                _repassar_log(ativa)
+            if ativa.conexao in prontos or ativa.processo.sentinel in prontos:
+                try:
+                    situacao, valor = ativa.conexao.recv()
+                except (EOFError, OSError):
+                    ativa.processo.join(5)
+                    codigo = ativa.processo.exitcode
+                    if codigo is not None and codigo < 0:
+                        codigo = signal.Signals(-codigo).name
+                    _concluir(ativa, motivo=f"processo encerrado sem resultado ({codigo})")
+                    continue
+                if situacao == "ok":
+                    _concluir(ativa, resultado=valor)
+                else:
+                    _concluir(ativa, motivo=valor)
+            elif ativa.prazo is not None and agora >= ativa.prazo:
+                ativa.processo.kill()
+                _concluir(ativa, motivo=f"tempo esgotado após {tempo:g}s")
+
+    return execucoes
+
@@ -0,0 +1,117 @@
+import os
+import re
+
+from utilitarios.logger_config import logger
+from utilitarios.leitores import leitor_do_plano
+from utilitarios.padroes import ANCORAS, PADROES
+
+# O plano é identificado pelo layout das primeiras páginas nos PDFs de pastas
+# que não são de um plano, como a caixa de entrada, e nos das pastas dos
+# planos dos quais nenhum procedimento foi extraído (ver main.extrair_arquivo).
+# "1" confere antes de extrair também os das pastas dos planos, trocando o
+# plano da pasta apenas quando nenhum padrão da impressão digital dele
+# aparece no PDF
+DETECTAR_PLANO = os.environ.get("PDF_DETECTAR_PLANO", "0") == "1"
+
+# Páginas lidas, no máximo, para identificar o layout
+PAGINAS_DETECCAO = int(os.environ.get("PDF_PAGINAS_DETECCAO", 2))
+
+# "Plano" dos PDFs soltos na raiz de uma pasta de entrada, identificados
+# pelo layout (ver main.coletar_pdfs)
+PLANO_A_DETECTAR = "entrada"
+
+# Separador decimal usado por cada plano nos valores extraídos (padrão: vírgula)
+SEPARADOR_DECIMAL = {
+    "rede_unna": ".",
+}
+
+class Layout:
+    """
+    Layout do extrato de um plano: os padrões de extração e as âncoras do
+    pré-filtro (utilitarios.padroes), a impressão digital que identifica o
+    layout nas primeiras páginas e o método do ExtratorPDF que o extrai.
+    """
+
+    __slots__ = ("plano", "padroes", "ancora", "impressao", "extracao")
+
+    def __init__(self, plano:str, impressao:tuple[re.Pattern, ...], extracao:str):
+        self.plano = plano
+        self.padroes = PADROES[plano]
+        self.ancora = ANCORAS.get(plano)
+        self.impressao = impressao
+        self.extracao = extracao
+
+    def pontuar(self, texto:str):
+        """Quantidade de padrões da impressão digital presentes no texto."""
+
+        return sum(1 for padrao in self.impressao if padrao.search(texto))
+
+# Registro dos layouts conhecidos, por plano
+LAYOUTS = {}
+
+def registrar_layout(plano:str, *impressao:str | re.Pattern, extracao:str = None):
+    """
+    Registra o layout de um plano, com as expressões (compiladas aqui, uma
+    única vez) da impressão digital: títulos e rótulos fixos do extrato, que
+    não aparecem nos dos outros planos, ou padrões já compilados.
+    """
+
+    LAYOUTS[plano] = Layout(plano, tuple(re.compile(padrao) for padrao in impressao), extracao or f"_extrair_dados_{plano}")
+    return LAYOUTS[plano]
+
+registrar_layout("odonto_empresas", r"ODONTO EMPRESAS", PADROES["odonto_empresas"]["procedimento"])
+registrar_layout("unimed", r"DEMONSTRATIVO ANALÍTICO DE PAGAMENTO DE PRESTADOR", r"GTO: CÓDIGO E NOME DO BENEFICIÁRIO: ")
+registrar_layout("rede_unna", r"DEMONSTRATIVO DE PAGAMENTO - TRATAMENTO ODONTOLÓGICO", r"12 - Nome Civil")
+registrar_layout("amil", r"\bAmil\b", r"Nome do Beneficiário")
+registrar_layout("samp", r"\bSAMP\b", r"DR\(A\)\.")
+
+def identificar_plano(texto:str):
+    """
+    Plano cujo layout tem mais padrões da impressão digital no texto, ou
+    None se nenhum tiver (ou se houver empate).
+    """
+
+    pontos = sorted(((layout.pontuar(texto), layout.plano) for layout in LAYOUTS.values()), reverse=True)
+    if not pontos or not pontos[0][0]:
+        return None
+    if len(pontos) > 1 and pontos[1][0] == pontos[0][0]:
+        logger.debug("Layout ambíguo entre %s e %s.", pontos[0][1], pontos[1][1])
+        return None
+    return pontos[0][1]
+
+def detectar_plano(caminho_pdf:str, leitor = None, paginas:int = PAGINAS_DETECCAO, plano_da_pasta:str = None):
+    """
+    Identifica o plano de um PDF pela impressão digital das primeiras
+    `paginas` páginas, sem ler o restante do arquivo. A leitura para assim
+    que um layout tem todos os padrões presentes.
+
+    Com `plano_da_pasta` (um plano conhecido), ele é mantido se qualquer
+    padrão da impressão digital dele aparecer nas páginas lidas: as
+    impressões são poucas expressões, e um falso positivo de outro layout
+    mandaria o arquivo inteiro para o extrator errado.
+
+    Returns:
+        str: O plano, ou None se o layout não for reconhecido (ou o PDF não
+        puder ser lido).
+    """
+
+    leitor = leitor or leitor_do_plano(PLANO_A_DETECTAR)
+    da_pasta = LAYOUTS.get(plano_da_pasta)
+    texto = ""
+    try:
+        documento = leitor.abrir(caminho_pdf)
+        for numero in range(min(paginas, leitor.paginas(documento))):
+            texto += leitor.texto(documento, numero)
+            if da_pasta:
+                if da_pasta.pontuar(texto):
+                    return da_pasta.plano
+                continue
+            completos = [layout.plano for layout in LAYOUTS.values() if layout.pontuar(texto) == len(layout.impressao)]
+            if len(completos) == 1:
+                return completos[0]
+    except MemoryError:
+        raise
+    except Exception as e:
+        logger.debug("Layout de %s não identificado: %s", caminho_pdf, e)
+        return None
+    return identificar_plano(texto)
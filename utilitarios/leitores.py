@@ -0,0 +1,200 @@
+import os
+import inspect
+import importlib
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+from utilitarios.logger_config import logger
+from utilitarios.helper import ler_configuracao
+
+# Arquivo de configuração; a seção [leitores] escolhe o leitor de cada plano:
+#   [leitores]
+#   padrao = pypdf2
+#   unimed = pymupdf
+CAMINHO_CONFIG = os.environ.get("PDF_CONFIG", "config.ini")
+SECAO_LEITORES = "leitores"
+
+LEITOR_PADRAO = "pypdf2"
+
+class LeitorTexto(ABC):
+    """
+    Leitor do texto das páginas de um PDF. Os leitores implementam abrir()
+    e texto().
+
+    As bibliotecas são importadas apenas quando o leitor é usado, e um leitor
+    cuja biblioteca não está instalada fica indisponível. A versão entra na
+    chave do cache de textos: trocar de leitor (ou de versão) não reaproveita
+    o texto extraído por outro.
+    """
+
+    nome = None
+    modulo = None
+
+    def _importar(self):
+        try:
+            return importlib.import_module(self.modulo)
+        except ImportError:
+            return None
+
+    def disponivel(self):
+        return self._importar() is not None
+
+    @property
+    def versao(self):
+        modulo = self._importar()
+        return f"{self.nome}-{getattr(modulo, '__version__', '?')}"
+
+    @abstractmethod
+    def abrir(self, caminho_pdf:str):
+        """Abre o PDF e devolve o documento usado em paginas() e texto()."""
+
+    def paginas(self, documento):
+        """Quantidade de páginas do documento."""
+
+        return len(documento)
+
+    @abstractmethod
+    def texto(self, documento, numero:int):
+        """Texto da página `numero` (a partir de 0)."""
+
+class LeitorPyPDF2(LeitorTexto):
+    """PdfReader.extract_text do PyPDF2 (leitor padrão)."""
+
+    nome = "pypdf2"
+    modulo = "PyPDF2"
+
+    @property
+    def versao(self):
+        # Mesma versão usada antes dos leitores configuráveis, para manter o cache
+        return f"pypdf2-{self._importar().__version__}-1"
+
+    def abrir(self, caminho_pdf:str):
+        return self._importar().PdfReader(caminho_pdf)
+
+    def paginas(self, documento):
+        return len(documento.pages)
+
+    def texto(self, documento, numero:int):
+        return documento.pages[numero].extract_text() or ""
+
+class LeitorLayout(LeitorPyPDF2):
+    """
+    Modo de extração "layout" do pypdf (sucessor do PyPDF2, a partir da 3.7),
+    que preserva as colunas da página com espaços.
+    """
+
+    nome = "pypdf2_layout"
+
+    def _importar(self):
+        for modulo in ("pypdf", "PyPDF2"):
+            try:
+                modulo = importlib.import_module(modulo)
+            except ImportError:
+                continue
+            if "extraction_mode" in inspect.signature(modulo.PageObject.extract_text).parameters:
+                return modulo
+        return None
+
+    @property
+    def versao(self):
+        modulo = self._importar()
+        return f"{self.nome}-{modulo.__name__}-{modulo.__version__}"
+
+    def texto(self, documento, numero:int):
+        return documento.pages[numero].extract_text(extraction_mode="layout") or ""
+
+class LeitorPyMuPDF(LeitorTexto):
+    """PyMuPDF (fitz), baseado no MuPDF."""
+
+    nome = "pymupdf"
+    modulo = "fitz"
+
+    @property
+    def versao(self):
+        modulo = self._importar()
+        return f"{self.nome}-{getattr(modulo, 'VersionBind', '?')}"
+
+    def abrir(self, caminho_pdf:str):
+        return self._importar().open(caminho_pdf)
+
+    def texto(self, documento, numero:int):
+        return documento[numero].get_text() or ""
+
+class LeitorPdfium(LeitorTexto):
+    """pypdfium2, baseado no PDFium."""
+
+    nome = "pypdfium2"
+    modulo = "pypdfium2"
+
+    def abrir(self, caminho_pdf:str):
+        return self._importar().PdfDocument(caminho_pdf)
+
+    def texto(self, documento, numero:int):
+        pagina = documento[numero]
+        try:
+            texto = pagina.get_textpage()
+            try:
+                return texto.get_text_range() or ""
+            finally:
+                texto.close()
+        finally:
+            pagina.close()
+
+# Leitores conhecidos, por nome
+LEITORES = {leitor.nome: leitor for leitor in (LeitorPyPDF2(), LeitorLayout(), LeitorPyMuPDF(), LeitorPdfium())}
+
+def leitores_disponiveis():
+    """Leitores cuja biblioteca está instalada."""
+
+    return [leitor for leitor in LEITORES.values() if leitor.disponivel()]
+
+def obter_leitor(nome:str = None):
+    """
+    Retorna o leitor pelo nome; sem nome, o padrão.
+
+    Raises:
+        ValueError: Se o leitor não existir ou não estiver disponível.
+    """
+
+    leitor = LEITORES.get(nome or LEITOR_PADRAO)
+    if leitor is None:
+        raise ValueError(f"Leitor de PDF desconhecido: {nome} (conhecidos: {', '.join(LEITORES)})")
+    if not leitor.disponivel():
+        raise ValueError(f"Leitor de PDF indisponível: {nome} (biblioteca {leitor.modulo} não instalada)")
+    return leitor
+
+@lru_cache(maxsize=None)
+def _leitores_configurados(caminho_config:str):
+    """Seção [leitores] do arquivo de configuração, lida uma vez por processo."""
+
+    config = ler_configuracao(caminho_config)
+    return dict(config.items(SECAO_LEITORES)) if config.has_section(SECAO_LEITORES) else {}
+
+def leitor_do_plano(plano:str, caminho_config:str = CAMINHO_CONFIG):
+    """
+    Leitor configurado para o plano na seção [leitores] (ou a opção
+    `padrao` dela). Um leitor inválido ou indisponível é trocado pelo padrão.
+    """
+
+    leitores = _leitores_configurados(os.path.abspath(caminho_config))
+    nome = leitores.get(plano) or leitores.get("padrao") or LEITOR_PADRAO
+    try:
+        return obter_leitor(nome)
+    except ValueError as e:
+        logger.warning(f"{e}; usando {LEITOR_PADRAO} para o plano {plano}.")
+        return obter_leitor(LEITOR_PADRAO)
+
+def gravar_leitor_do_plano(plano:str, nome:str, caminho_config:str = CAMINHO_CONFIG):
+    """Grava na seção [leitores] o leitor escolhido para o plano."""
+
+    config = ler_configuracao(caminho_config)
+    if not config.has_section(SECAO_LEITORES):
+        config.add_section(SECAO_LEITORES)
+    config.set(SECAO_LEITORES, plano, nome)
+    try:
+        with open(caminho_config, "w", encoding="utf-8") as arquivo:
+            config.write(arquivo)
+    except OSError as e:
+        logger.error(f"Erro ao gravar a configuração {caminho_config}: {e}")
+    finally:
+        _leitores_configurados.cache_clear()
@@ -1,30 +1,85 @@
+import os
+import json
+import queue
+import atexit
 import logging
+import multiprocessing
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
 import colorlog
 
-def setup_logger(log_file="app.log"):
+# Nível mínimo das mensagens (DEBUG, INFO, WARNING, ...). Abaixo dele, a
+# chamada volta na primeira verificação do logger, sem formatar a mensagem
+NIVEL_LOG = os.environ.get("PDF_LOG_NIVEL", "DEBUG").upper()
+
+# Formato do arquivo de log: "texto" ou "json" (um objeto por linha, com os
+# campos de contexto_log)
+FORMATO_LOG = os.environ.get("PDF_LOG_FORMATO", "texto")
+
+# Arquivo de log
+ARQUIVO_LOG = os.environ.get("PDF_LOG", "app.log")
+
+# Gravação em uma thread do processo principal, alimentada por uma fila
+# compartilhada com os processos do pool ("0" grava direto nos handlers)
+LOG_EM_FILA = os.environ.get("PDF_LOG_FILA", "1") == "1"
+
+# Arquivo, plano e etapa em andamento, acrescentados a cada mensagem
+_contexto = ContextVar("contexto_log", default=(None, None, None))
+
+@contextmanager
+def contexto_log(arquivo:str = None, plano:str = None, etapa:str = None):
     """
-    Configura o logger para registrar logs coloridos no console
-    e em um arquivo de log.
+    Associa as mensagens registradas dentro do bloco a um arquivo, plano ou
+    etapa; os campos não informados continuam os do bloco externo.
     """
-    
-    logger = logging.getLogger("logger")
-    logger.setLevel(logging.DEBUG)
 
-    # Evita duplicação de logs ao remover handlers existentes
-    if logger.hasHandlers():
-        logger.handlers.clear()
+    atual = _contexto.get()
+    token = _contexto.set((arquivo or atual[0], plano or atual[1], etapa or atual[2]))
+    try:
+        yield
+    finally:
+        _contexto.reset(token)
 
-    # Evita propagação para o root logger
-    logger.propagate = False
+class FiltroContexto(logging.Filter):
+    """Copia o contexto_log para os atributos arquivo, plano e etapa da mensagem."""
+
+    def filter(self, record):
+        record.arquivo, record.plano, record.etapa = _contexto.get()
+        return True
+
+class FormatadorJSON(logging.Formatter):
+    """Uma linha JSON por mensagem, com o contexto e o processo de origem."""
+
+    def format(self, record):
+        dados = {
+            "momento": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "nivel": record.levelname,
+            "mensagem": record.getMessage(),
+            "arquivo": getattr(record, "arquivo", None),
+            "plano": getattr(record, "plano", None),
+            "etapa": getattr(record, "etapa", None),
+            "processo": record.process,
+        }
+        if record.exc_info:
+            dados["excecao"] = self.formatException(record.exc_info)
+        return json.dumps(dados, ensure_ascii=False)
+
+def criar_handlers(log_file:str = ARQUIVO_LOG, formato:str = FORMATO_LOG):
+    """Handlers de arquivo e console (com cores), que fazem a gravação de fato."""
 
     # Cria um handler para registrar em arquivo (sem cores)
     file_handler = logging.FileHandler(log_file)
     file_handler.setLevel(logging.DEBUG)
 
-    file_formatter = logging.Formatter(
-        '%(asctime)s - %(levelname)s - %(message)s',
-        datefmt='%d/%m/%Y %H:%M:%S'
-    )
+    if formato == "json":
+        file_formatter = FormatadorJSON()
+    else:
+        file_formatter = logging.Formatter(
+            '%(asctime)s - %(levelname)s - %(message)s',
+            datefmt='%d/%m/%Y %H:%M:%S'
+        )
 
     file_handler.setFormatter(file_formatter)
 
@@ -46,10 +101,147 @@ def setup_logger(log_file="app.log"):
     )
     console_handler.setFormatter(color_formatter)
 
-    # Adiciona os handlers ao logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    return [file_handler, console_handler]
+
+class HandlerFilaInterna(QueueHandler):
+    """QueueHandler para uma fila do próprio processo: a mensagem é formatada só na gravação."""
+
+    def prepare(self, record):
+        return record
+
+class HandlerConexao(QueueHandler):
+    """
+    QueueHandler que envia as mensagens por uma multiprocessing.Connection
+    exclusiva do processo, lidas no principal com repassar_registro.
+    Encerrar o processo à força não afeta a fila dos demais.
+    """
+
+    def enqueue(self, record):
+        self.queue.send(record)
+
+def repassar_registro(record):
+    """Grava, pelos handlers do processo principal, uma mensagem recebida de outro processo."""
+
+    for handler in logging.getLogger("logger").handlers:
+        if record.levelno >= handler.level:
+            handler.handle(record)
+
+_fila = None
+_ouvinte = None
+_handlers = []
+_fila_processos = None
+_ouvinte_processos = None
+
+def setup_logger(log_file=ARQUIVO_LOG, nivel:str = NIVEL_LOG, formato:str = FORMATO_LOG, em_fila:bool = LOG_EM_FILA):
+    """
+    Configura o logger para registrar logs coloridos no console
+    e em um arquivo de log.
+
+    Com `em_fila`, o logger só coloca as mensagens em uma fila, e um
+    QueueListener grava no arquivo e no console em uma thread própria: as
+    chamadas não esperam pela escrita. Os processos do pool usam outra fila,
+    de multiprocessing (ver fila_log), lida pelos mesmos handlers, e não
+    disputam nem intercalam linhas do arquivo.
+    """
+
+    global _fila, _ouvinte, _handlers
+
+    logger = logging.getLogger("logger")
+    logger.setLevel(nivel)
+
+    # Evita duplicação de logs ao remover handlers existentes
+    if logger.hasHandlers():
+        logger.handlers.clear()
+    encerrar_logger()
+    for handler in _handlers:
+        handler.close()
 
+    # Evita propagação para o root logger
+    logger.propagate = False
+
+    if not any(isinstance(filtro, FiltroContexto) for filtro in logger.filters):
+        logger.addFilter(FiltroContexto())
+
+    _handlers = criar_handlers(log_file, formato)
+    # Um processo filho iniciado do zero (spawn) grava direto até receber a
+    # fila do principal em configurar_processo
+    if not em_fila or multiprocessing.parent_process() is not None:
+        # Adiciona os handlers ao logger
+        for handler in _handlers:
+            logger.addHandler(handler)
+        return logger
+
+    # Dentro do processo a fila não precisa serializar as mensagens
+    _fila = queue.SimpleQueue()
+    _ouvinte = QueueListener(_fila, *_handlers, respect_handler_level=True)
+    _ouvinte.start()
+    logger.addHandler(HandlerFilaInterna(_fila))
     return logger
 
-logger = setup_logger()
\ No newline at end of file
+def fila_log():
+    """
+    Fila de multiprocessing para as mensagens dos processos do pool, lida
+    no processo principal (None quando o log não está em fila). Deve ser
+    obtida antes de criar o pool.
+    """
+
+    global _fila_processos, _ouvinte_processos
+
+    if _ouvinte is None:
+        return None
+    if _fila_processos is None:
+        _fila_processos = multiprocessing.Queue()
+        _ouvinte_processos = QueueListener(_fila_processos, *_handlers, respect_handler_level=True)
+        _ouvinte_processos.start()
+    return _fila_processos
+
+def configurar_processo(fila = None, nivel:str | int = None):
+    """
+    Inicializador dos processos do pool: as mensagens vão para a fila do
+    processo principal (ou para uma Connection, ver HandlerConexao) em vez
+    de serem gravadas pelo próprio processo.
+
+    Uso:
+        ProcessPoolExecutor(workers, initializer=configurar_processo, initargs=(fila_log(), logger.level))
+    """
+
+    if fila is None:
+        return
+    logger = logging.getLogger("logger")
+    if nivel is not None:
+        logger.setLevel(nivel)
+    logger.handlers.clear()
+    logger.addHandler(QueueHandler(fila) if hasattr(fila, "put_nowait") else HandlerConexao(fila))
+
+def _apos_fork():
+    # A fila interna não é lida no processo filho: sem configurar_processo,
+    # ele usa a fila dos processos ou, sem ela, grava direto
+    global _fila, _ouvinte, _ouvinte_processos
+
+    logger = logging.getLogger("logger")
+    if _fila is not None and any(getattr(handler, "queue", None) is _fila for handler in logger.handlers):
+        logger.handlers.clear()
+        if _fila_processos is not None:
+            logger.addHandler(QueueHandler(_fila_processos))
+        else:
+            for handler in _handlers:
+                logger.addHandler(handler)
+    _fila = _ouvinte = _ouvinte_processos = None
+
+def encerrar_logger():
+    """Grava as mensagens ainda nas filas e para os QueueListener."""
+
+    global _fila, _ouvinte, _fila_processos, _ouvinte_processos
+
+    if _ouvinte_processos:
+        _ouvinte_processos.stop()
+        _fila_processos.close()
+    if _ouvinte:
+        _ouvinte.stop()
+    _fila = _ouvinte = _fila_processos = _ouvinte_processos = None
+
+atexit.register(encerrar_logger)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_apos_fork)
+
+logger = setup_logger()
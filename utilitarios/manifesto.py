@@ -0,0 +1,130 @@
+import os
+import json
+
+from utilitarios.logger_config import logger
+from utilitarios.cache import calcular_hash_arquivo
+
+class Manifesto:
+    """
+    Registro dos PDFs já processados em execuções anteriores.
+
+    Para cada arquivo guarda tamanho, data de modificação e hash do conteúdo,
+    além dos trechos (planilha, linha inicial, quantidade de linhas) que ele
+    ocupa no relatório. Isso permite pular arquivos inalterados e substituir
+    apenas as linhas dos arquivos que mudaram.
+    """
+
+    def __init__(self, caminho:str):
+        self.caminho = caminho
+        self.arquivos = {}
+
+    @staticmethod
+    def caminho_para(arquivo_relatorio:str):
+        """Caminho do manifesto associado a um relatório."""
+
+        return f"{os.path.splitext(arquivo_relatorio)[0]}.manifesto.json"
+
+    def carregar(self):
+        """Carrega o manifesto do disco, se existir."""
+
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as arquivo:
+                self.arquivos = json.load(arquivo)
+        except FileNotFoundError:
+            self.arquivos = {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Manifesto inválido {self.caminho}, ignorando: {e}")
+            self.arquivos = {}
+        return self
+
+    def salvar(self, arquivos:dict = None):
+        """
+        Grava o manifesto de forma atômica. `arquivos` é uma cópia das
+        entradas, para gravar em outra thread enquanto o manifesto muda.
+        """
+
+        caminho_temporario = f"{self.caminho}.tmp"
+        with open(caminho_temporario, "w", encoding="utf-8") as arquivo:
+            json.dump(self.arquivos if arquivos is None else arquivos, arquivo, ensure_ascii=False, indent=2)
+        os.replace(caminho_temporario, self.caminho)
+
+    def compativel(self):
+        """
+        Indica se o manifesto é do layout atual do relatório (uma planilha por
+        plano). Manifestos antigos guardam só a linha inicial na planilha única.
+        """
+
+        return all("trechos" in entrada for entrada in self.arquivos.values())
+
+    @staticmethod
+    def _chave(caminho_pdf:str):
+        return os.path.normpath(caminho_pdf)
+
+    def inalterado(self, caminho_pdf:str):
+        """Indica se o PDF já foi processado e não mudou desde então."""
+
+        entrada = self.arquivos.get(self._chave(caminho_pdf))
+        if not entrada:
+            return False
+
+        info = os.stat(caminho_pdf)
+        if info.st_size == entrada["tamanho"] and info.st_mtime == entrada["mtime"]:
+            return True
+
+        # Data de modificação diferente: confere o conteúdo antes de reprocessar
+        if info.st_size == entrada["tamanho"] and calcular_hash_arquivo(caminho_pdf) == entrada["hash"]:
+            entrada["mtime"] = info.st_mtime
+            return True
+        return False
+
+    @staticmethod
+    def descrever(caminho_pdf:str, plano:str, trechos:list[tuple[str, int, int]]):
+        """Entrada de um PDF no manifesto (lê o arquivo para o hash; não altera o manifesto)."""
+
+        info = os.stat(caminho_pdf)
+        return {
+            "plano": plano,
+            "tamanho": info.st_size,
+            "mtime": info.st_mtime,
+            "hash": calcular_hash_arquivo(caminho_pdf),
+            "trechos": [list(trecho) for trecho in trechos],
+        }
+
+    def registrar(self, caminho_pdf:str, plano:str, trechos:list[tuple[str, int, int]], entrada:dict = None):
+        """
+        Registra um PDF processado e os trechos (planilha, linha_inicial,
+        linhas) que ele ocupa no relatório, ou a `entrada` já descrita (ver
+        descrever).
+        """
+
+        self.arquivos[self._chave(caminho_pdf)] = entrada or self.descrever(caminho_pdf, plano, trechos)
+
+    def remover(self, caminho_pdf:str):
+        """
+        Remove um PDF do manifesto, ajustando a linha inicial dos trechos
+        que estavam abaixo dele na mesma planilha.
+
+        Returns:
+            list: Trechos (planilha, linha_inicial, linhas) ocupados pelo arquivo removido.
+        """
+
+        entrada = self.arquivos.pop(self._chave(caminho_pdf), None)
+        if not entrada:
+            return []
+
+        trechos = [tuple(trecho) for trecho in entrada["trechos"] if trecho[2]]
+        for planilha, linha_inicial, linhas in trechos:
+            for outra in self.arquivos.values():
+                for trecho in outra["trechos"]:
+                    if trecho[0] == planilha and trecho[1] > linha_inicial:
+                        trecho[1] -= linhas
+        return trechos
+
+    def ausentes(self, caminhos_pdf:list[str], planos:list[str]):
+        """Lista os PDFs registrados para os planos que não estão mais entre os informados."""
+
+        presentes = {self._chave(caminho) for caminho in caminhos_pdf}
+        return [
+            caminho for caminho, entrada in self.arquivos.items()
+            if entrada["plano"] in planos and caminho not in presentes
+        ]
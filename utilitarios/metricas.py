@@ -0,0 +1,244 @@
+import csv
+import sys
+import json
+import time
+from bisect import bisect_right
+from contextlib import contextmanager
+from datetime import datetime
+
+from utilitarios.logger_config import contexto_log, logger
+
+def pico_memoria_mb():
+    """Pico de memória residente do processo atual, em MB (None se não disponível)."""
+
+    try:
+        import resource
+    except ImportError:
+        # Windows: sem o pico de memória
+        return None
+
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / 2**20 if sys.platform == "darwin" else pico / 1024, 1)
+
+class MetricasArquivo:
+    """
+    Métricas do processamento de um PDF (ou de uma etapa de um plano).
+
+    Acumula tempo de relógio e de CPU por etapa (abrir_pdf, extrair_texto,
+    regex:<padrão>, ...), a quantidade de páginas varridas (sem as ignoradas
+    pelo pré-filtro) e de ocorrências de cada padrão e quais páginas tiveram
+    pelo menos uma ocorrência. É simples de serializar, para voltar dos
+    processos do pool junto com os registros.
+    """
+
+    def __init__(self, arquivo:str = None, plano:str = None):
+        self.arquivo = arquivo
+        self.plano = plano
+        self.etapas = {}
+        self.ocorrencias = {}
+        self.paginas = 0
+        self.procedimentos = 0
+        self.pico_memoria_mb = None
+        # Trechos cuja busca estourou o orçamento de tempo (ver utilitarios.fluxo)
+        self.trechos_em_quarentena = 0
+        # Páginas sem registros ignoradas pelo pré-filtro e, no modo de
+        # verificação, registros que diferem sem ele (ver utilitarios.prefiltro)
+        self.paginas_ignoradas = 0
+        self.divergencias_prefiltro = 0
+        # Procedimentos descartados por já constarem em outro PDF (ver utilitarios.deduplicacao)
+        self.duplicatas = 0
+        # Erro na leitura do PDF, tentativas do processo isolado e motivo da
+        # quarentena do arquivo (ver utilitarios.isolamento)
+        self.erro = None
+        self.tentativas = 0
+        self.quarentena = None
+        self._inicios_paginas = []
+        self._tamanho_texto = 0
+        self._paginas_com_ocorrencia = set()
+
+    def acumular(self, etapa:str, segundos:float, cpu:float):
+        """Soma uma medição ao total da etapa."""
+
+        total = self.etapas.setdefault(etapa, {"segundos": 0.0, "cpu": 0.0, "chamadas": 0})
+        total["segundos"] += segundos
+        total["cpu"] += cpu
+        total["chamadas"] += 1
+
+    @contextmanager
+    def medir(self, etapa:str):
+        """Mede o bloco e acumula o tempo na etapa, que também vai para o contexto do log."""
+
+        inicio, inicio_cpu = time.perf_counter(), time.process_time()
+        try:
+            with contexto_log(self.arquivo, self.plano, etapa):
+                yield
+        finally:
+            self.acumular(etapa, time.perf_counter() - inicio, time.process_time() - inicio_cpu)
+
+    def incorporar(self, outras:"MetricasArquivo"):
+        """Soma as etapas e os trechos em quarentena de outra medição (de um processo do pool)."""
+
+        for etapa, total in outras.etapas.items():
+            atual = self.etapas.setdefault(etapa, {"segundos": 0.0, "cpu": 0.0, "chamadas": 0})
+            for chave in atual:
+                atual[chave] += total[chave]
+        self.trechos_em_quarentena += outras.trechos_em_quarentena
+
+    def medir_fluxo(self, etapa:str, itens):
+        """Gera os itens de um iterador, medindo apenas o tempo gasto para produzi-los."""
+
+        itens = iter(itens)
+        while True:
+            inicio, inicio_cpu = time.perf_counter(), time.process_time()
+            item = next(itens, None)
+            if item is None:
+                return
+            self.acumular(etapa, time.perf_counter() - inicio, time.process_time() - inicio_cpu)
+            yield item
+
+    def pagina(self, tamanho:int):
+        """Registra uma página de `tamanho` caracteres no texto concatenado."""
+
+        self._inicios_paginas.append(self._tamanho_texto)
+        self._tamanho_texto += tamanho
+        self.paginas += 1
+
+    def ocorrencia(self, padrao:str, posicao:int):
+        """Registra uma ocorrência de um padrão na posição absoluta do texto."""
+
+        self.ocorrencias[padrao] = self.ocorrencias.get(padrao, 0) + 1
+        if self._inicios_paginas:
+            self._paginas_com_ocorrencia.add(bisect_right(self._inicios_paginas, posicao) - 1)
+
+    @property
+    def paginas_sem_ocorrencias(self):
+        return self.paginas - len(self._paginas_com_ocorrencia)
+
+    def como_dict(self):
+        return {
+            "arquivo": self.arquivo,
+            "plano": self.plano,
+            "paginas": self.paginas,
+            "paginas_sem_ocorrencias": self.paginas_sem_ocorrencias,
+            "procedimentos": self.procedimentos,
+            "trechos_em_quarentena": self.trechos_em_quarentena,
+            "paginas_ignoradas": self.paginas_ignoradas,
+            "divergencias_prefiltro": self.divergencias_prefiltro,
+            "duplicatas": self.duplicatas,
+            "erro": self.erro,
+            "tentativas": self.tentativas,
+            "quarentena": self.quarentena,
+            "ocorrencias": dict(self.ocorrencias),
+            "pico_memoria_mb": self.pico_memoria_mb,
+            "etapas": {
+                etapa: {"segundos": round(total["segundos"], 6), "cpu": round(total["cpu"], 6), "chamadas": total["chamadas"]}
+                for etapa, total in self.etapas.items()
+            },
+        }
+
+class RelatorioMetricas:
+    """
+    Reúne as métricas de uma execução (por arquivo e por plano) e as grava
+    em JSON e CSV ao final.
+
+    Uso:
+        metricas = RelatorioMetricas()
+        metricas.adicionar_arquivo(metricas_arquivo)
+        with metricas.medir("unimed", "normalizacao"):
+            ...
+        with metricas.medir(None, "salvar_relatorio"):  # etapa da execução toda
+            ...
+        metricas.salvar("metricas_execucao")
+    """
+
+    def __init__(self):
+        self.inicio = datetime.now()
+        self._inicio_relogio = time.perf_counter()
+        self._inicio_cpu = time.process_time()
+        self.arquivos = []
+        self.planos = {}
+        self.geral = MetricasArquivo()
+
+    def adicionar_arquivo(self, metricas:MetricasArquivo):
+        self.arquivos.append(metricas)
+
+    def plano(self, plano:str):
+        """Métricas das etapas feitas por plano (normalização, escrita); sem plano, as da execução."""
+
+        if plano is None:
+            return self.geral
+        if plano not in self.planos:
+            self.planos[plano] = MetricasArquivo(plano=plano)
+        return self.planos[plano]
+
+    def medir(self, plano:str, etapa:str):
+        return self.plano(plano).medir(etapa)
+
+    def como_dict(self):
+        return {
+            "inicio": self.inicio.isoformat(timespec="seconds"),
+            "segundos": round(time.perf_counter() - self._inicio_relogio, 3),
+            "cpu": round(time.process_time() - self._inicio_cpu, 3),
+            "pico_memoria_mb": pico_memoria_mb(),
+            "etapas": self.geral.como_dict()["etapas"],
+            "arquivos": [metricas.como_dict() for metricas in self.arquivos],
+            "planos": {plano: metricas.como_dict() for plano, metricas in self.planos.items()},
+        }
+
+    def _linhas_csv(self, dados:dict):
+        """
+        Uma linha por arquivo (ou plano) e etapa. Um arquivo sem nenhuma etapa
+        medida (erro logo ao abrir, por exemplo) tem uma linha sem etapa.
+        """
+
+        geral = self.geral.como_dict()
+        for item in dados["arquivos"] + list(dados["planos"].values()) + [geral]:
+            etapas = list(item["etapas"].items())
+            if not etapas and item["arquivo"]:
+                etapas = [(None, {"segundos": None, "cpu": None, "chamadas": None})]
+            for etapa, total in etapas:
+                padrao = etapa.split(":", 1)[1] if etapa and etapa.startswith("regex:") else None
+                yield {
+                    "arquivo": item["arquivo"],
+                    "plano": item["plano"],
+                    "etapa": etapa,
+                    "segundos": total["segundos"],
+                    "cpu": total["cpu"],
+                    "chamadas": total["chamadas"],
+                    "ocorrencias": item["ocorrencias"].get(padrao) if padrao else None,
+                    "paginas": item["paginas"],
+                    "paginas_sem_ocorrencias": item["paginas_sem_ocorrencias"],
+                    "procedimentos": item["procedimentos"],
+                    "trechos_em_quarentena": item["trechos_em_quarentena"],
+                    "paginas_ignoradas": item["paginas_ignoradas"],
+                    "divergencias_prefiltro": item["divergencias_prefiltro"],
+                    "duplicatas": item["duplicatas"],
+                    "erro": item["erro"],
+                    "tentativas": item["tentativas"],
+                    "quarentena": item["quarentena"],
+                    "pico_memoria_mb": item["pico_memoria_mb"],
+                }
+
+    def salvar(self, caminho_base:str):
+        """Grava <caminho_base>.json (completo) e <caminho_base>.csv (uma linha por etapa)."""
+
+        dados = self.como_dict()
+        try:
+            with open(f"{caminho_base}.json", "w", encoding="utf-8") as arquivo:
+                json.dump(dados, arquivo, ensure_ascii=False, indent=2)
+
+            linhas = list(self._linhas_csv(dados))
+            with open(f"{caminho_base}.csv", "w", encoding="utf-8", newline="") as arquivo:
+                escritor = csv.DictWriter(arquivo, fieldnames=[
+                    "arquivo", "plano", "etapa", "segundos", "cpu", "chamadas", "ocorrencias",
+                    "paginas", "paginas_sem_ocorrencias", "procedimentos", "trechos_em_quarentena",
+                    "paginas_ignoradas", "divergencias_prefiltro", "duplicatas", "erro", "tentativas", "quarentena", "pico_memoria_mb",
+                ])
+                escritor.writeheader()
+                escritor.writerows(linhas)
+        except OSError as e:
+            logger.error(f"Erro ao salvar as métricas em {caminho_base}: {e}")
+            return
+
+        logger.info(f"Métricas da execução salvas em {caminho_base}.json e {caminho_base}.csv")
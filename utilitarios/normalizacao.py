@@ -0,0 +1,83 @@
+import pandas as pd
+
+from utilitarios.logger_config import logger
+from utilitarios.layouts import SEPARADOR_DECIMAL
+from utilitarios.registros import como_dataframe
+
+# Campos monetários e de data dos registros extraídos
+CAMPOS_VALOR = ["Valor Processado", "Valor Glosa", "Valor Apresentado Conta"]
+CAMPOS_DATA = ["Data de Realização"]
+
+def valores_em_centavos(serie:pd.Series, separador_decimal:str = ","):
+    """
+    Converte uma coluna de valores em texto ("1.234,56", "12.50", "R$ 3,00")
+    em centavos inteiros, de forma vetorizada.
+
+    Returns:
+        pd.Series: Coluna Int64 (centavos), com <NA> onde o valor não existe
+        ou não pôde ser interpretado.
+    """
+
+    separador_milhar = "." if separador_decimal == "," else ","
+    texto = (
+        serie.astype("string")
+        .str.replace("R$", "", regex=False)
+        .str.strip()
+        .str.replace(separador_milhar, "", regex=False)
+        .str.replace(separador_decimal, ".", regex=False)
+    )
+    valores = pd.to_numeric(texto, errors="coerce")
+    return (valores * 100).round().astype("Int64")
+
+def datas(serie:pd.Series):
+    """Converte uma coluna de datas dd/mm/aaaa em datas reais (NaT quando inválida)."""
+
+    return pd.to_datetime(serie, format="%d/%m/%Y", errors="coerce")
+
+def _por_categoria(serie:pd.Series, conversao):
+    """
+    Aplica a conversão apenas aos valores distintos de uma coluna categórica
+    (como as de TabelaRegistros) e expande o resultado pelos códigos.
+    """
+
+    if not isinstance(serie.dtype, pd.CategoricalDtype):
+        return conversao(serie)
+
+    convertidos = conversao(pd.Series(serie.cat.categories, dtype=object)).array
+    return pd.Series(convertidos.take(serie.cat.codes.to_numpy(), allow_fill=True), index=serie.index)
+
+def normalizar_dataframe(df:pd.DataFrame, plano:str):
+    """
+    Tipa as colunas de valores e datas de um DataFrame de registros extraídos.
+
+    Os valores passam a ser float em reais, calculados a partir dos centavos
+    inteiros (sem resíduos de arredondamento da leitura do texto), e as datas
+    passam a ser datetime64.
+    """
+
+    separador_decimal = SEPARADOR_DECIMAL.get(plano, ",")
+    df = df.copy(deep=False)
+
+    for campo in CAMPOS_VALOR:
+        if campo not in df:
+            continue
+        centavos = _por_categoria(df[campo], lambda serie: valores_em_centavos(serie, separador_decimal))
+        invalidos = int((centavos.isna() & df[campo].notna()).sum())
+        if invalidos:
+            logger.warning(f"{invalidos} valores inválidos em '{campo}' ({plano}).")
+        df[campo] = centavos.astype("Float64") / 100
+
+    for campo in CAMPOS_DATA:
+        if campo not in df:
+            continue
+        df[campo] = _por_categoria(df[campo], datas)
+
+    return df
+
+def normalizar_dados(dados, plano:str):
+    """
+    Normaliza em lote os registros de um plano (TabelaRegistros, DataFrame ou
+    lista de registros) e os devolve como DataFrame tipado.
+    """
+
+    return normalizar_dataframe(como_dataframe(dados), plano)
@@ -0,0 +1,71 @@
+import re
+
+# Registro das expressões regulares de extração de cada plano, compiladas uma
+# única vez na importação e compartilhadas por todos os ExtratorPDF (e pelos
+# processos do pool, que importam o módulo uma vez cada).
+PADROES = {
+    "odonto_empresas": {
+        "procedimento": re.compile(r"(\d{2}/\d{2}/\d{4})\s+(\d{6,8})\s+([\d.,]+)\s+([\d.,]+)\s+([\d.,]+)\s+([\d.,]+)\s+(\d{6,8})"),
+    },
+
+    "unimed": {
+        "gto": re.compile(r"GTO: CÓDIGO E NOME DO BENEFICIÁRIO: (\d{8}) \d{17} - ([A-Z ]+)"),
+        "procedimento": re.compile(r"(\d{8}) ([A-ZÀ-Üà-ü :]+) (Pago|Não autorizado) (?:([A-Z]{1,5})\s)?(\d{1,2},\d{2}) (\d{1,2},\d{2}) (\d{1,2},\d{2})(?: (\d{2}/\d{2}/\d{4}))? ([A-ZÀ-Ü0-9]+)?"),
+    },
+
+    "rede_unna": {
+        "beneficiario": re.compile(r"(?P<nome_beneficiario>[A-Za-zÀ-ÿ\s]+?)12 - Nome Civil"),
+        "procedimento": re.compile(r"""
+            (?P<tabela>\d{2})\s+
+            (?P<codigo_procedimento>\d{2}\.\d{3}\.\d{3})\s+
+            (?P<nome_procedimento>(?:[A-Za-zÀ-ÿ0-9()./\s-]+?(?=\s(?:\d+|\b[A-Z]{2,}\b))))\s+
+            (?P<dente_regiao>[A-Z]{2,}|\d+)\s+
+            (?P<face>\w+)?\s*
+            (?P<data>\d{2}/\d{2}/\d{4})\s+
+            (?P<quantidade>\d{1,2})\s+
+            (?P<valor_informado>\d+\.\d{2})\s+
+            (?P<valor_processado>\d+\.\d{2})\s+
+            (?P<valor_glosa>\d+\.\d{2})\s+
+            (?P<valor_franquia>\d+\.\d{2})\s+
+            (?P<valor_liberado>\d+\.\d{2})
+        """, re.VERBOSE),
+    },
+
+    "amil": {
+        "beneficiario": re.compile(r"Nome do Beneficiário\s*([A-ZÀ-Ü\s]+)"),
+        # A descrição era ([...]+(?: [...]+)*?): como o espaço já faz parte da
+        # classe, as repetições aninhadas reconhecem as mesmas descrições, na
+        # mesma ordem de tentativa, mas com backtracking exponencial quando a
+        # linha não fecha (ex.: "A A A ... 01/08/2024" sem os valores)
+        "procedimento": re.compile(r"([A-ZÀ-Ü0-9()/ ]+)\s+(\d{2}/\d{2}/\d{4})\s*([A-ZÀ-Ü()/\-]+)?\s+([\d.,]+)\s+([A-Z\d]+)\s+(\d{1,2})\s+(\d{8})\s+([\d.,]{1,5})\s*([\d.,]{1,4})\s+([\d.,]+)\s*([\d.,]+)"),
+    },
+
+    "samp": {
+        "procedimento": re.compile(r"(\d{2}/\d{2}/\d{4})DR\(A\)\.\s+([A-ZÀ-Ú]+(?:\s+[A-ZÀ-Ú]+)+)(\d{8,9})\s*-\s*([A-ZÀ-Ú]+(?:\s+[A-ZÀ-Ú]+)*)[^\w]*([A-ZÀ-Ú]+(?:\s+[A-ZÀ-Ú]+)*)\s*(\d{8})\s*-([A-ZÀ-Ú0-9À-Ú\s\-:,.()]+)\s*\[([^\]]+)\].*?R\$\s*([\d.,]+)"),
+    },
+}
+
+# Âncoras baratas de cada plano para o pré-filtro de páginas (ver
+# utilitarios.prefiltro): todo registro ou cabeçalho reconhecido pelos
+# padrões acima contém uma delas, então uma página sem nenhuma (nem perto
+# dela) não tem o que extrair
+ANCORAS = {
+    # Data do atendimento
+    "odonto_empresas": re.compile(r"\d{2}/\d{2}/\d{4}"),
+    # Cabeçalho do GTO ou status do procedimento
+    "unimed": re.compile(r"GTO: CÓDIGO E NOME DO BENEFICIÁRIO: |Pago |Não autorizado "),
+    # Fim do nome do beneficiário ou código do procedimento
+    "rede_unna": re.compile(r"12 - Nome Civil|\d{2}\.\d{3}\.\d{3}"),
+    # Cabeçalho do beneficiário ou data do procedimento
+    "amil": re.compile(r"Nome do Beneficiário|\d{2}/\d{2}/\d{4}"),
+    # Início do procedimento (texto já sem quebras de linha)
+    "samp": re.compile(r"DR\(A\)\."),
+}
+
+def preparar_texto(plano:str, texto:str):
+    """Ajusta o texto (de uma página ou mais) antes da busca dos padrões do plano."""
+
+    if plano == "samp":
+        # No SAMP os campos de um procedimento quebram linha no meio
+        return texto.replace("\n", " ")
+    return texto
@@ -0,0 +1,243 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+from utilitarios.logger_config import logger
+from utilitarios.isolamento import TEMPO_ARQUIVO, RelogioPool
+from utilitarios.fluxo import JANELA_CARRY, ORCAMENTO_REGEX, Ocorrencia, TempoEsgotado, orcamento_tempo, quarentenar_estouro
+from utilitarios.leitores import LEITOR_PADRAO, leitor_do_plano, obter_leitor
+from utilitarios.metricas import MetricasArquivo
+from utilitarios.padroes import PADROES, preparar_texto
+
+# Páginas de cada intervalo enviado ao pool; PDFs com mais páginas que isso
+# são divididos entre os processos (ver main.extrair_pdfs)
+PAGINAS_POR_INTERVALO = int(os.environ.get("PDF_PAGINAS_INTERVALO", 100))
+
+# Só os PDFs a partir desse tamanho, em KB, têm as páginas contadas para a
+# divisão: os extratos ocupam 2 KB ou mais por página, e os menores não
+# chegam a PAGINAS_POR_INTERVALO páginas
+TAMANHO_DIVISAO_KB = int(os.environ.get("PDF_TAMANHO_DIVISAO", 256))
+
+def dividir_paginas(total:int, paginas_por_intervalo:int = PAGINAS_POR_INTERVALO):
+    """Divide `total` páginas em intervalos [inicio, fim) de até `paginas_por_intervalo` páginas."""
+
+    tamanho = max(1, paginas_por_intervalo)
+    return [(inicio, min(inicio + tamanho, total)) for inicio in range(0, total, tamanho)]
+
+def pode_dividir(caminho_pdf:str, tamanho_kb:int = TAMANHO_DIVISAO_KB):
+    """Indica se o PDF é grande o bastante para ter as páginas contadas (sem abri-lo)."""
+
+    try:
+        return os.path.getsize(caminho_pdf) >= tamanho_kb * 1024
+    except OSError:
+        return False
+
+def dividir_pdf(caminho_pdf:str, plano:str = None, paginas_por_intervalo:int = PAGINAS_POR_INTERVALO):
+    """
+    Conta as páginas do PDF, com o leitor configurado para o plano (ver
+    utilitarios.leitores), e o divide em intervalos. Executado dentro dos
+    processos do pool (ver main.extrair_pdfs).
+
+    Returns:
+        list: Intervalos (inicio, fim) de páginas; vazia se o PDF não puder ser lido.
+    """
+
+    leitor = leitor_do_plano(plano)
+    try:
+        total = leitor.paginas(leitor.abrir(caminho_pdf))
+    except Exception as e:
+        logger.warning(f"Erro ao contar as páginas de {caminho_pdf}: {e}")
+        return []
+    return dividir_paginas(total, paginas_por_intervalo)
+
+class ResultadoIntervalo:
+    """Texto e ocorrências de um intervalo de páginas, devolvidos pelo processo do pool."""
+
+    __slots__ = ("paginas", "continuacao", "ocorrencias", "metricas")
+
+    def __init__(self, paginas:list[str], continuacao:str, ocorrencias:dict[str, list[Ocorrencia]], metricas:MetricasArquivo):
+        self.paginas = paginas
+        self.continuacao = continuacao
+        self.ocorrencias = ocorrencias
+        self.metricas = metricas
+
+def varrer_intervalo(caminho_pdf:str, plano:str, inicio:int, fim:int, buscar:bool = True, leitor:str = LEITOR_PADRAO,
+                     janela:int = JANELA_CARRY, orcamento:float = ORCAMENTO_REGEX):
+    """
+    Extrai o texto das páginas [inicio, fim) e busca nele os padrões do plano.
+    Executado dentro dos processos do pool.
+
+    A busca segue pelo texto das páginas seguintes (ao menos `janela`
+    caracteres, como o VarredorFluxo) para reconhecer os registros que
+    atravessam o fim do intervalo, mas só são devolvidas as ocorrências que
+    começam dentro dele, com posições relativas ao início do intervalo.
+    """
+
+    leitor = obter_leitor(leitor)
+    metricas = MetricasArquivo(caminho_pdf, plano)
+    with metricas.medir("abrir_pdf"):
+        documento = leitor.abrir(caminho_pdf)
+        total = leitor.paginas(documento)
+
+    def _textos(numeros):
+        return metricas.medir_fluxo("extrair_texto", (leitor.texto(documento, numero) for numero in numeros))
+
+    paginas = list(_textos(range(inicio, fim)))
+
+    ocorrencias = {}
+    if not buscar:
+        return ResultadoIntervalo(paginas, "", ocorrencias, metricas)
+
+    continuacao = []
+    tamanho_continuacao = 0
+    for pagina in _textos(range(fim, total)):
+        continuacao.append(pagina)
+        tamanho_continuacao += len(pagina)
+        if tamanho_continuacao >= janela:
+            break
+    continuacao = "".join(continuacao)
+
+    texto = preparar_texto(plano, "".join(paginas) + continuacao)
+    limite = len(texto) - len(continuacao)
+    for nome, padrao in PADROES[plano].items():
+        encontradas = ocorrencias[nome] = []
+        try:
+            with metricas.medir(f"regex:{nome}"), orcamento_tempo(orcamento * max(1, len(paginas))):
+                for match in padrao.finditer(texto):
+                    if match.start() >= limite:
+                        break
+                    encontradas.append(Ocorrencia(match))
+        except TempoEsgotado:
+            inicio_pendente = encontradas[-1].end() if encontradas else 0
+            quarentenar_estouro(caminho_pdf, f"p{inicio + 1}-{fim}.{nome}", texto[inicio_pendente:limite],
+                                orcamento * max(1, len(paginas)), metricas)
+
+    return ResultadoIntervalo(paginas, continuacao, ocorrencias, metricas)
+
+class LeituraParalela:
+    """
+    Leitura de um PDF dividido em intervalos de páginas, processados em
+    paralelo pelos processos de um executor.
+
+    Iterar sobre a leitura gera o texto das páginas, em ordem. varrer()
+    gera as ocorrências dos padrões já costuradas entre os intervalos, no
+    mesmo formato e ordem de fluxo.varrer_paginas sobre o documento inteiro,
+    de modo que a associação dos procedimentos aos cabeçalhos (GTO,
+    beneficiário) de intervalos anteriores continua a mesma.
+
+    Cada intervalo tem `tempo` segundos a partir de quando começa a rodar no
+    pool (ver utilitarios.isolamento.RelogioPool); um que passe disso
+    interrompe a leitura com BrokenProcessPool, como um processo morto, para
+    que quem criou o pool o descarte e refaça o PDF isolado.
+
+    Uso:
+        leitura = LeituraParalela(caminho_pdf, "unimed", dividir_pdf(caminho_pdf, "unimed"), executor, metricas)
+        for ocorrencias in leitura.varrer(PADROES["unimed"]):
+            ...
+    """
+
+    def __init__(self, caminho_pdf:str, plano:str, intervalos:list[tuple[int, int]], executor, metricas:MetricasArquivo,
+                 buscar:bool = True, cache = None, chave:str = None, leitor:str = LEITOR_PADRAO,
+                 tempo:float = TEMPO_ARQUIVO):
+        self.caminho_pdf = caminho_pdf
+        self.plano = plano
+        self.metricas = metricas
+        self.cache = cache
+        self.chave = chave
+        self._futuros = [
+            executor.submit(varrer_intervalo, caminho_pdf, plano, inicio, fim, buscar, leitor)
+            for inicio, fim in intervalos
+        ]
+        self._relogio = RelogioPool(tempo)
+        self._relogio.acompanhar(*self._futuros)
+
+    def _resultados(self):
+        """Gera os resultados dos intervalos em ordem, gravando o texto no cache ao final."""
+
+        paginas_cache = [] if self.cache and self.chave else None
+        for futuro in self._futuros:
+            try:
+                resultado = self._relogio.resultado(futuro)
+            except BrokenProcessPool:
+                # O pool morreu ou o intervalo passou do tempo: quem criou o
+                # pool refaz o PDF (ver main.extrair_no_pool)
+                for pendente in self._futuros:
+                    pendente.cancel()
+                raise
+            except Exception as e:
+                logger.error(f"Erro ao ler o PDF {self.caminho_pdf}: {e}")
+                self.metricas.erro = f"{type(e).__name__}: {e}"
+                for pendente in self._futuros:
+                    pendente.cancel()
+                return
+
+            self.metricas.incorporar(resultado.metricas)
+            if paginas_cache is not None:
+                paginas_cache.extend(resultado.paginas)
+            yield resultado
+
+        if paginas_cache is not None:
+            for _ in self.cache.gravar(self.chave, paginas_cache):
+                pass
+
+    def __iter__(self):
+        for resultado in self._resultados():
+            yield from resultado.paginas
+
+    def varrer(self, padroes:dict):
+        """
+        Gera, a cada intervalo, a lista de ocorrências (inicio, fim,
+        nome_padrao, ocorrencia) com posições absolutas, ordenada pelo início.
+        """
+
+        # Fim da última ocorrência aceita de cada padrão
+        fins = {nome: 0 for nome in padroes}
+        base = 0
+        for resultado in self._resultados():
+            texto = None
+            tamanho = 0
+            for pagina in resultado.paginas:
+                self.metricas.pagina(len(pagina))
+                tamanho += len(pagina)
+
+            lote = []
+            with self.metricas.medir("costura"):
+                for nome, padrao in padroes.items():
+                    ocorrencias = resultado.ocorrencias.get(nome, [])
+                    if fins[nome] > base:
+                        # A última ocorrência do intervalo anterior termina dentro
+                        # deste: a busca contínua recomeçaria do fim dela
+                        if texto is None:
+                            texto = preparar_texto(self.plano, "".join(resultado.paginas) + resultado.continuacao)
+                        ocorrencias = self._ressincronizar(nome, padrao, texto, fins[nome] - base, tamanho, ocorrencias)
+
+                    for ocorrencia in ocorrencias:
+                        ocorrencia.deslocar(base)
+                        self.metricas.ocorrencia(nome, ocorrencia.start())
+                        lote.append((ocorrencia.start(), ocorrencia.end(), nome, ocorrencia))
+                    if ocorrencias:
+                        fins[nome] = ocorrencias[-1].end()
+
+                lote.sort(key=lambda item: item[0])
+            yield lote
+            base += tamanho
+
+    def _ressincronizar(self, nome:str, padrao, texto:str, inicio:int, limite:int, ocorrencias:list[Ocorrencia]):
+        """
+        Refaz a busca de um intervalo a partir de `inicio` até reencontrar uma
+        ocorrência do processo do pool; dali em diante as duas buscas coincidem.
+        """
+
+        posicoes = {ocorrencia.span(): indice for indice, ocorrencia in enumerate(ocorrencias)}
+        refeitas = []
+        try:
+            with orcamento_tempo(ORCAMENTO_REGEX):
+                for match in padrao.finditer(texto, inicio):
+                    if match.start() >= limite:
+                        break
+                    indice = posicoes.get(match.span())
+                    if indice is not None:
+                        return refeitas + ocorrencias[indice:]
+                    refeitas.append(Ocorrencia(match))
+        except TempoEsgotado:
+            quarentenar_estouro(self.caminho_pdf, f"{nome}.costura", texto[inicio:limite], ORCAMENTO_REGEX, self.metricas)
+        return refeitas
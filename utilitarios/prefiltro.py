@@ -0,0 +1,97 @@
+import os
+import re
+from collections import Counter, deque
+
+from utilitarios.fluxo import JANELA_CARRY
+
+# Pré-filtro de páginas: "1" (padrão) ignora as páginas sem registros, "0"
+# desativa e "verificar" extrai pelos dois caminhos e registra as diferenças
+MODO_PREFILTRO = os.environ.get("PDF_PREFILTRO", "1")
+
+# Caracteres do fim da página anterior incluídos na busca das âncoras, para
+# reconhecer uma âncora quebrada entre duas páginas
+CAUDA_ANCORA = 64
+
+def filtrar_paginas(paginas, ancora:re.Pattern, metricas = None, janela:int = JANELA_CARRY):
+    """
+    Gera apenas as páginas que podem conter registros: as que ficam a menos de
+    `janela` caracteres de alguma âncora do plano (utilitarios.padroes.ANCORAS).
+    Capas, resumos, glossários e textos legais ficam de fora.
+
+    Todo registro contém uma âncora e, como no VarredorFluxo, é menor que a
+    janela, então as páginas que ele ocupa nunca são ignoradas; o resultado
+    é o mesmo da varredura de todas as páginas.
+
+    Com um MetricasArquivo, conta as páginas ignoradas e mede o tempo do
+    filtro (etapa "prefiltro").
+    """
+
+    # Páginas ainda sem decisão (se não há âncora perto antes, depende das
+    # próximas): [pagina, posição final, True/False/None]
+    pendentes = deque()
+    ultima_ancora = None
+    posicao = 0
+    cauda = ""
+    for pagina in paginas:
+        inicio, posicao = posicao, posicao + len(pagina)
+        if metricas:
+            with metricas.medir("prefiltro"):
+                ancoras = [inicio - len(cauda) + m.start() for m in ancora.finditer(cauda + pagina)]
+        else:
+            ancoras = [inicio - len(cauda) + m.start() for m in ancora.finditer(cauda + pagina)]
+        cauda = pagina[-CAUDA_ANCORA:]
+
+        for pendente in pendentes:
+            if pendente[2] is not None:
+                continue
+            if ancoras and ancoras[0] < pendente[1] + janela:
+                pendente[2] = True
+            elif posicao >= pendente[1] + janela:
+                pendente[2] = False
+            else:
+                break
+
+        if ancoras:
+            ultima_ancora = ancoras[-1]
+        perto = ultima_ancora is not None and ultima_ancora >= inicio - janela
+        pendentes.append([pagina, posicao, True if perto else None])
+
+        while pendentes and pendentes[0][2] is not None:
+            yield from _decidir(pendentes.popleft(), metricas)
+
+    # Sem mais texto, as páginas ainda sem decisão não têm âncora por perto
+    while pendentes:
+        yield from _decidir(pendentes.popleft(), metricas)
+
+def _decidir(pendente, metricas):
+    if pendente[2]:
+        yield pendente[0]
+    elif metricas:
+        metricas.paginas_ignoradas += 1
+
+def comparar_registros(esperados:list, obtidos:list):
+    """
+    Compara duas listas de registros (Procedimento).
+
+    Returns:
+        tuple: (registros que faltam em `obtidos`, registros que sobram nele)
+    """
+
+    def _chave(registro):
+        return tuple(getattr(registro, campo) for campo in registro.__slots__)
+
+    def _excedentes(registros, contagem):
+        excedentes = []
+        for registro in registros:
+            chave = _chave(registro)
+            if contagem[chave] > 0:
+                contagem[chave] -= 1
+                excedentes.append(registro)
+        return excedentes
+
+    contagem_esperados = Counter(map(_chave, esperados))
+    contagem_obtidos = Counter(map(_chave, obtidos))
+    return (
+        _excedentes(esperados, contagem_esperados - contagem_obtidos),
+        _excedentes(obtidos, contagem_obtidos - contagem_esperados),
+    )
@@ -0,0 +1,66 @@
+import os
+import re
+import shutil
+from datetime import datetime
+
+from utilitarios.logger_config import logger
+
+# Pasta onde ficam os trechos (e arquivos) que não puderam ser processados
+CAMINHO_QUARENTENA = os.environ.get("PDF_QUARENTENA", "./quarentena")
+
+def quarentenar_trecho(arquivo:str, descricao:str, texto:str, motivo:str):
+    """
+    Guarda um trecho de texto que não pôde ser processado (por exemplo, uma
+    página que estourou o tempo das expressões regulares) para análise.
+
+    Returns:
+        str: Caminho do arquivo gravado, ou None em caso de erro.
+    """
+
+    nome = re.sub(r"[^\w.-]+", "_", f"{os.path.basename(arquivo or 'texto')}.{descricao}")
+    caminho = os.path.join(CAMINHO_QUARENTENA, "trechos", f"{nome}.txt")
+    try:
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        with open(caminho, "w", encoding="utf-8") as destino:
+            destino.write(f"# {arquivo}\n# {motivo}\n")
+            destino.write(texto)
+    except OSError as e:
+        logger.error(f"Erro ao gravar o trecho em quarentena {caminho}: {e}")
+        return None
+
+    logger.warning(f"Trecho em quarentena ({motivo}): {caminho}")
+    return caminho
+
+def quarentenar_arquivo(caminho_pdf:str, motivo:str, plano:str = None):
+    """
+    Move para a quarentena um PDF que não pôde ser processado (tempo ou
+    memória esgotados, falha do processo ou nenhum procedimento), com um
+    arquivo <nome>.motivo.txt ao lado explicando o motivo. Fora da pasta de
+    entrada, ele não é tentado de novo nas próximas execuções.
+
+    Returns:
+        str: Novo caminho do PDF, ou None se não foi possível movê-lo.
+    """
+
+    pasta = os.path.join(CAMINHO_QUARENTENA, "arquivos", plano or "")
+    nome, extensao = os.path.splitext(os.path.basename(caminho_pdf))
+    destino = os.path.join(pasta, nome + extensao)
+    copia = 1
+    while os.path.exists(destino):
+        copia += 1
+        destino = os.path.join(pasta, f"{nome} ({copia}){extensao}")
+
+    try:
+        os.makedirs(pasta, exist_ok=True)
+        shutil.move(caminho_pdf, destino)
+        with open(f"{destino}.motivo.txt", "w", encoding="utf-8") as arquivo_motivo:
+            arquivo_motivo.write(f"arquivo: {os.path.abspath(caminho_pdf)}\n")
+            arquivo_motivo.write(f"plano: {plano or ''}\n")
+            arquivo_motivo.write(f"data: {datetime.now().isoformat(timespec='seconds')}\n")
+            arquivo_motivo.write(f"motivo: {motivo}\n")
+    except OSError as e:
+        logger.error(f"Erro ao mover {caminho_pdf} para a quarentena: {e}")
+        return None
+
+    logger.warning(f"Arquivo em quarentena ({motivo}): {destino}")
+    return destino
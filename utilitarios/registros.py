@@ -0,0 +1,173 @@
+from array import array
+
+# Atributos do registro -> nomes das colunas usados nos relatórios e exportações
+CAMPOS = {
+    "gto": "GTO",
+    "nome_beneficiario": "Nome do Beneficiário",
+    "codigo_procedimento": "Código Procedimento",
+    "nome_procedimento": "Nome Procedimento",
+    "dente_regiao": "Dente/Região",
+    "face": "Face",
+    "regiao": "Regiao",
+    "status": "Status",
+    "valor_apresentado": "Valor Apresentado Conta",
+    "valor_glosa": "Valor Glosa",
+    "valor_processado": "Valor Processado",
+    "data_realizacao": "Data de Realização",
+}
+
+class Procedimento:
+    """Procedimento extraído de um PDF. Usa __slots__ para ocupar pouca memória."""
+
+    __slots__ = tuple(CAMPOS)
+
+    def __init__(self, **valores):
+        for campo in self.__slots__:
+            setattr(self, campo, valores.pop(campo, None))
+        if valores:
+            raise TypeError(f"Campos desconhecidos: {', '.join(valores)}")
+
+    def __eq__(self, outro):
+        if not isinstance(outro, Procedimento):
+            return NotImplemented
+        return all(getattr(self, campo) == getattr(outro, campo) for campo in self.__slots__)
+
+    def __repr__(self):
+        valores = ", ".join(f"{campo}={getattr(self, campo)!r}" for campo in self.__slots__ if getattr(self, campo) is not None)
+        return f"Procedimento({valores})"
+
+    def como_dict(self):
+        """Retorna o registro como dicionário, com os nomes das colunas do relatório."""
+
+        return {coluna: getattr(self, campo) for campo, coluna in CAMPOS.items()}
+
+# Tipos dos arrays de códigos e o limite de categorias de cada um; os mesmos
+# que o pandas escolhe para os códigos de um Categorical
+TIPOS_CODIGO = [("b", 127), ("h", 32767), ("i", 2**31 - 1)]
+
+class TabelaRegistros:
+    """
+    Registros de procedimentos armazenados por coluna.
+
+    Cada coluna é codificada por dicionário: os valores distintos ficam uma
+    única vez em uma lista e cada linha guarda apenas o código (-1 para vazio)
+    em um array de inteiros do menor tamanho possível. Nomes de beneficiários,
+    procedimentos e valores se repetem muito, então a tabela ocupa uma fração
+    de uma lista de dicionários, e os códigos viram pd.Categorical em
+    para_dataframe com uma única cópia de cada array.
+    """
+
+    def __init__(self, plano:str = None):
+        self.plano = plano
+        self._codigos = {campo: array(TIPOS_CODIGO[0][0]) for campo in CAMPOS}
+        self._categorias = {campo: [] for campo in CAMPOS}
+        self._indices = {campo: {} for campo in CAMPOS}
+
+    def __len__(self):
+        return len(self._codigos["gto"])
+
+    def __iter__(self):
+        for linha in range(len(self)):
+            yield self[linha]
+
+    def __getitem__(self, linha:int):
+        valores = {}
+        for campo in CAMPOS:
+            codigo = self._codigos[campo][linha]
+            valores[campo] = self._categorias[campo][codigo] if codigo >= 0 else None
+        return Procedimento(**valores)
+
+    def _codigo(self, campo:str, valor):
+        if valor is None:
+            return -1
+        indice = self._indices[campo]
+        codigo = indice.get(valor)
+        if codigo is None:
+            codigo = indice[valor] = len(self._categorias[campo])
+            self._categorias[campo].append(valor)
+            self._ajustar_tipo(campo)
+        return codigo
+
+    def _ajustar_tipo(self, campo:str):
+        """Troca o array de códigos por um tipo maior quando as categorias não cabem mais."""
+
+        quantidade = len(self._categorias[campo])
+        tipo = next(tipo for tipo, limite in TIPOS_CODIGO if quantidade < limite)
+        if tipo != self._codigos[campo].typecode:
+            self._codigos[campo] = array(tipo, self._codigos[campo])
+
+    def adicionar(self, registro:Procedimento):
+        """Acrescenta um registro ao final da tabela."""
+
+        for campo in CAMPOS:
+            # O código vem antes: _codigo pode trocar o array por um tipo maior
+            codigo = self._codigo(campo, getattr(registro, campo))
+            self._codigos[campo].append(codigo)
+
+    def estender(self, registros):
+        """Acrescenta vários registros (Procedimento ou outra TabelaRegistros)."""
+
+        if isinstance(registros, TabelaRegistros):
+            for campo in CAMPOS:
+                # Recodifica os códigos da outra tabela para os desta
+                mapa = array("i", (self._codigo(campo, valor) for valor in registros._categorias[campo]))
+                self._codigos[campo].extend(mapa[codigo] if codigo >= 0 else -1 for codigo in registros._codigos[campo])
+            return
+
+        for registro in registros:
+            self.adicionar(registro)
+
+    def coluna(self, campo:str):
+        """
+        Valores distintos e códigos (-1 para vazio) de uma coluna, para
+        processar cada valor distinto uma única vez.
+
+        Returns:
+            tuple: (lista de categorias, array de códigos de cada linha)
+        """
+
+        return self._categorias[campo], self._codigos[campo]
+
+    def selecionar(self, linhas):
+        """Nova tabela apenas com as linhas informadas (índices, na ordem desejada)."""
+
+        tabela = TabelaRegistros(self.plano)
+        for campo in CAMPOS:
+            codigos = self._codigos[campo]
+            tabela._codigos[campo] = array(codigos.typecode, (codigos[linha] for linha in linhas))
+            tabela._categorias[campo] = list(self._categorias[campo])
+            tabela._indices[campo] = dict(self._indices[campo])
+        return tabela
+
+    def para_dataframe(self):
+        """
+        Converte a tabela em um DataFrame de colunas categóricas, nomeadas
+        como no relatório. Os códigos são copiados: um DataFrame apontando
+        para os arrays da tabela impediria que eles crescessem (BufferError
+        em adicionar e estender) enquanto estivesse vivo.
+        """
+
+        import numpy as np
+        import pandas as pd
+
+        colunas = {}
+        for campo, coluna in CAMPOS.items():
+            codigos = self._codigos[campo]
+            codigos = np.array(codigos, dtype=codigos.typecode)
+            tipo = pd.CategoricalDtype(pd.Index(self._categorias[campo], dtype=object))
+            colunas[coluna] = pd.Series(pd.Categorical.from_codes(codigos, dtype=tipo, validate=False), copy=False)
+        return pd.DataFrame(colunas, copy=False)
+
+def como_dataframe(dados):
+    """Aceita TabelaRegistros, DataFrame, lista de Procedimento ou de dicionários."""
+
+    import pandas as pd
+
+    if isinstance(dados, pd.DataFrame):
+        return dados
+    if isinstance(dados, TabelaRegistros):
+        return dados.para_dataframe()
+    return pd.DataFrame([
+        dado.como_dict() if isinstance(dado, Procedimento) else dado
+        for dado in dados
+    ])
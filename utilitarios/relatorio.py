@@ -0,0 +1,654 @@
+import os
+import re
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import quote_sheetname
+from openpyxl.workbook.defined_name import DefinedName
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
+from openpyxl.worksheet.cell_range import CellRange
+
+from utilitarios.logger_config import logger
+from utilitarios.agregacao import MANTER_FORMULAS, TAXA_REPASSE, Agregador, centavos, centavos_repasse, valor_repasse
+from utilitarios.registros import como_dataframe
+
+# Cabeçalho das colunas (linha 2 do relatório)
+CABECALHO = [
+    "DATA",
+    "NOME DO PACIENTE",
+    "PLANO",
+    "PROCEDIMENTO REALIZADO",
+    "DENTE",
+    "FACE",
+    "REGIÃO",
+    "NUMERO DA GTO",
+    "PAGO / GLOSADO",
+    "VALOR PAGO",
+    "REPASSE DENTISTA",
+]
+
+# Campos dos registros extraídos -> colunas do relatório (A a J)
+COLUNAS = {
+    'Data de Realização': 'DATA',
+    'Nome do Beneficiário': 'NOME DO PACIENTE',
+    'Plano': 'PLANO',
+    'Nome Procedimento': 'PROCEDIMENTO REALIZADO',
+    'Dente/Região': 'DENTE',
+    'Face': 'FACE',
+    'Regiao': 'REGIÃO',
+    'GTO': 'NUMERO DA GTO',
+    'Valor Glosa': 'PAGO / GLOSADO',
+    'Valor Processado': 'VALOR PAGO',
+}
+
+# Formato numérico das colunas de valores
+FORMATO_VALOR = "#,##0.00"
+
+# Primeira linha de dados das planilhas dos planos (as linhas 1 a 4 são o cabeçalho)
+PRIMEIRA_LINHA = 5
+
+# Limite de linhas de uma planilha do Excel
+LIMITE_LINHAS_EXCEL = 1048576
+
+# Linhas de dados por planilha; ao atingir o limite o plano continua em
+# "<plano> (2)", "<plano> (3)", ...
+LINHAS_POR_PLANILHA = min(int(os.environ.get("PDF_LINHAS_PLANILHA", 1000000)), LIMITE_LINHAS_EXCEL - PRIMEIRA_LINHA + 1)
+
+# Planilha de resumo, a primeira do relatório: uma linha por planilha de plano e o total geral
+PLANILHA_RESUMO = "Resumo"
+CABECALHO_RESUMO = ["PLANO", "PLANILHA", "LINHAS", "VALOR PAGO", "REPASSE DENTISTA"]
+
+# Planilha com os totais já calculados (ver utilitarios.agregacao), logo após
+# o resumo: uma tabela por dimensão, com o título da primeira coluna
+PLANILHA_TOTAIS = "Totais"
+TITULOS_TOTAIS = {
+    "plano": "PLANO",
+    "mes": "MÊS",
+    "procedimento": "PROCEDIMENTO REALIZADO",
+    "beneficiario": "NOME DO PACIENTE",
+}
+CABECALHO_TOTAIS = ["REGISTROS", "VALOR PAGO", "GLOSA", "REPASSE DENTISTA"]
+
+# Células mescladas do cabeçalho das planilhas dos planos
+MESCLAGENS = ("A1:D1", "E1:K1", "M3:M4")
+
+def _borda():
+    lado = Side(border_style="thin", color="000000")
+    return Border(left=lado, right=lado, top=lado, bottom=lado)
+
+def _preenchimento(cor:str):
+    return PatternFill(start_color=cor, end_color=cor, fill_type="solid")
+
+def _estilos():
+    """Estilos nomeados do relatório, registrados uma única vez por workbook."""
+
+    centro = Alignment(horizontal="center", vertical="center")
+    return [
+        NamedStyle(name="relatorio_titulo", font=Font(bold=True, color="FF0000"), alignment=centro, fill=_preenchimento("FFFFFF"), border=_borda()),
+        NamedStyle(name="relatorio_titulo_borda", font=Font(bold=True, color="FF0000"), border=_borda()),
+        NamedStyle(name="relatorio_coluna", font=Font(bold=True), alignment=centro, border=_borda()),
+        NamedStyle(name="relatorio_total_titulo", font=Font(bold=True), alignment=centro, fill=_preenchimento("FAC090"), border=_borda()),
+        NamedStyle(name="relatorio_total", number_format="R$ #,##0.00", alignment=centro, fill=_preenchimento("00B0F0"), border=_borda()),
+        NamedStyle(name="relatorio_dado", alignment=Alignment(horizontal="center"), border=_borda()),
+        NamedStyle(name="relatorio_data", number_format="DD/MM/YYYY", alignment=Alignment(horizontal="center"), border=_borda()),
+        NamedStyle(name="relatorio_glosa", number_format=FORMATO_VALOR, alignment=Alignment(horizontal="center"), fill=_preenchimento("FF8669"), border=_borda()),
+        NamedStyle(name="relatorio_valor", number_format=FORMATO_VALOR, alignment=Alignment(horizontal="center"), fill=_preenchimento("C2F3B7"), border=_borda()),
+        NamedStyle(name="relatorio_repasse", number_format=FORMATO_VALOR, fill=_preenchimento("00B0F0"), border=_borda()),
+    ]
+
+def registrar_estilos(workbook):
+    """Registra no workbook os estilos nomeados que ainda não existem."""
+
+    for estilo in _estilos():
+        if estilo.name not in workbook.style_names:
+            workbook.add_named_style(estilo)
+
+def estilo_coluna(coluna:int):
+    """Nome do estilo de uma célula de dados pela coluna (1 = A)."""
+
+    return {1: "relatorio_data", 9: "relatorio_glosa", 10: "relatorio_valor", 11: "relatorio_repasse"}.get(coluna, "relatorio_dado")
+
+def linhas_relatorio(dados, plano:str):
+    """
+    Gera os valores das colunas A a J para cada registro já normalizado
+    (valores numéricos e datas, ver utilitarios.normalizacao), convertendo
+    coluna a coluna e com None nos campos vazios.
+    """
+
+    df = como_dataframe(dados)
+    colunas = []
+    for campo in COLUNAS:
+        if campo == 'Plano':
+            colunas.append([plano] * len(df))
+        elif campo in df:
+            serie = df[campo].astype(object)
+            colunas.append(serie.where(serie.notna(), None).tolist())
+        else:
+            colunas.append([None] * len(df))
+    return zip(*colunas)
+
+def formula_repasse(linha:int, taxa_repasse:float = TAXA_REPASSE):
+    """Fórmula do repasse do dentista para uma linha de dados, arredondado em centavos."""
+
+    return f"=ROUND(J{linha}*{taxa_repasse:g}/100,2)"
+
+def dados_planilha(sheet, ultima_linha:int):
+    """Colunas A a J das linhas de dados de uma planilha de plano, com os nomes dos campos (COLUNAS)."""
+
+    import pandas as pd
+
+    linhas = sheet.iter_rows(min_row=PRIMEIRA_LINHA, max_row=ultima_linha, max_col=len(COLUNAS), values_only=True)
+    return pd.DataFrame(list(linhas), columns=list(COLUNAS))
+
+def nome_planilha(plano:str, parte:int = 1):
+    """Nome da planilha de um plano; as continuações recebem " (2)", " (3)", ..."""
+
+    nome = re.sub(r"[\[\]:*?/\\]", "_", plano)
+    if parte == 1:
+        return nome[:31]
+    sufixo = f" ({parte})"
+    return nome[:31 - len(sufixo)] + sufixo
+
+def nome_total(planilha:str):
+    """Nome definido do intervalo de repasses de uma planilha, somado na célula de total."""
+
+    return "repasse_" + re.sub(r"\W", "_", planilha)
+
+def intervalo_dados(planilha:str, coluna:str, ultima_linha:int):
+    """Intervalo absoluto de uma coluna de dados da planilha, até a última linha escrita."""
+
+    ultima_linha = max(ultima_linha, PRIMEIRA_LINHA)
+    return f"{quote_sheetname(planilha)}!${coluna}${PRIMEIRA_LINHA}:${coluna}${ultima_linha}"
+
+def linhas_cabecalho(planilha:str):
+    """
+    Linhas 1 a 4 de uma planilha de plano, como listas de (valor, estilo) ou
+    None. O total (M3) soma o nome definido de nome_total(planilha), que
+    definir_totais ajusta às linhas escritas.
+    """
+
+    return [
+        # Linha 1: nome do dentista (A1:D1) e mês de referência (E1:K1)
+        [("NOME DO DENTISTA: COLOCA SEU NOME", "relatorio_titulo")]
+        + [(None, "relatorio_titulo_borda")] * 3
+        + [("MÊS DE REFERENCIA: JANEIRO ( COLOCA MÊS DE REFERENCIA )", "relatorio_titulo")]
+        + [(None, "relatorio_titulo_borda")] * 6,
+        # Linha 2: cabeçalho das colunas e título do total (coluna M)
+        [(texto, "relatorio_coluna") for texto in CABECALHO] + [None, ("TOTAL", "relatorio_total_titulo")],
+        # Linhas 3 e 4: célula de total mesclada
+        [None] * 12 + [(f"=SUM({nome_total(planilha)})", "relatorio_total")],
+        [],
+    ]
+
+def linhas_resumo(partes:list, somas:dict = None):
+    """
+    Linhas da planilha de resumo, como listas de (valor, estilo): uma por
+    planilha de plano, com as somas de valor pago e repasse nos intervalos
+    exatos de dados, e o total geral.
+
+    Args:
+        partes (list): [plano, planilha, ultima_linha] de cada planilha, na ordem do relatório.
+        somas (dict): Valor pago e repasse, em centavos, de cada planilha;
+            com ele as somas são gravadas já calculadas, em vez das fórmulas.
+    """
+
+    linhas = [[(texto, "relatorio_coluna") for texto in CABECALHO_RESUMO]]
+    for plano, planilha, ultima_linha in partes:
+        if somas is None:
+            valores = (f"=SUM({intervalo_dados(planilha, 'J', ultima_linha)})", f"=SUM({intervalo_dados(planilha, 'K', ultima_linha)})")
+        else:
+            valores = [centavos_planilha / 100 for centavos_planilha in somas.get(planilha, (0, 0))]
+        linhas.append([
+            (plano, "relatorio_dado"),
+            (planilha, "relatorio_dado"),
+            (ultima_linha - PRIMEIRA_LINHA + 1, "relatorio_dado"),
+            (valores[0], "relatorio_valor"),
+            (valores[1], "relatorio_repasse"),
+        ])
+
+    ultima = len(linhas)
+    if somas is None:
+        totais = [f"=SUM({coluna}2:{coluna}{ultima})" if partes else 0 for coluna in "CDE"]
+    else:
+        totais = [sum(ultima_linha - PRIMEIRA_LINHA + 1 for _, _, ultima_linha in partes)] + [
+            sum(somas.get(planilha, (0, 0))[indice] for _, planilha, _ in partes) / 100 for indice in (0, 1)
+        ]
+    linhas.append([("TOTAL", "relatorio_total_titulo"), None] + [(total, "relatorio_total") for total in totais])
+    return linhas
+
+def linhas_totais(agregador:Agregador):
+    """
+    Linhas da planilha de totais, como listas de (valor, estilo): a taxa de
+    repasse e, para cada dimensão de TITULOS_TOTAIS, os registros, valor
+    pago, glosa e repasse de cada valor e o total, já calculados.
+    """
+
+    geral = agregador.totais().iloc[0]
+    linhas = [[("TAXA DE REPASSE (%)", "relatorio_total_titulo"), (agregador.taxa_repasse, "relatorio_dado")]]
+    for dimensao, titulo in TITULOS_TOTAIS.items():
+        totais = agregador.totais(dimensao)
+        linhas.append([])
+        linhas.append([(texto, "relatorio_coluna") for texto in [titulo] + CABECALHO_TOTAIS])
+        for chave, linha in zip(totais.index, totais.itertuples(index=False)):
+            rotulo = "(não informado)" if chave is None else chave
+            if getattr(linha, "nome", None):
+                rotulo = f"{rotulo} - {linha.nome}"
+            linhas.append([
+                (rotulo, "relatorio_dado"),
+                (int(linha.registros), "relatorio_dado"),
+                (float(linha.pago), "relatorio_valor"),
+                (float(linha.glosa), "relatorio_glosa"),
+                (float(linha.repasse), "relatorio_repasse"),
+            ])
+        linhas.append([("TOTAL", "relatorio_total_titulo"), (int(geral.registros), "relatorio_dado")] + [
+            (float(geral[coluna]), "relatorio_total") for coluna in ("pago", "glosa", "repasse")
+        ])
+    return linhas
+
+def definir_totais(workbook, partes:list):
+    """Ajusta os nomes definidos somados no total de cada planilha às linhas escritas."""
+
+    for _, planilha, ultima_linha in partes:
+        nome = nome_total(planilha)
+        workbook.defined_names[nome] = DefinedName(nome, attr_text=intervalo_dados(planilha, "K", ultima_linha))
+
+def _escrever_linhas(sheet, linhas:list, primeira_linha:int = 1):
+    """Escreve linhas de (valor, estilo) em uma planilha comum (não write-only)."""
+
+    for numero, linha in enumerate(linhas, start=primeira_linha):
+        for coluna, item in enumerate(linha, start=1):
+            if item is None:
+                continue
+            celula = sheet.cell(row=numero, column=coluna, value=item[0])
+            celula.style = item[1]
+
+def _formatar_planilha(sheet):
+    sheet.row_dimensions[1].height = 15 * 3
+    sheet.row_dimensions[2].height = 15 * 2
+    for intervalo in MESCLAGENS:
+        sheet.merged_cells.add(CellRange(intervalo))
+
+def criar_planilha_plano(workbook, plano:str, parte:int = 1):
+    """Cria, em um workbook carregado, a planilha de um plano com o cabeçalho."""
+
+    sheet = workbook.create_sheet(nome_planilha(plano, parte))
+    _escrever_linhas(sheet, linhas_cabecalho(sheet.title))
+    _formatar_planilha(sheet)
+    return sheet
+
+def partes_relatorio(workbook):
+    """
+    Planilhas de plano de um relatório já gravado, lidas do resumo.
+
+    Returns:
+        list: [plano, planilha, ultima_linha] de cada planilha, na ordem do resumo.
+    """
+
+    if PLANILHA_RESUMO not in workbook.sheetnames:
+        return []
+
+    partes = []
+    for plano, planilha, *_ in workbook[PLANILHA_RESUMO].iter_rows(min_row=2, values_only=True):
+        if plano == "TOTAL" or planilha not in workbook.sheetnames:
+            continue
+        partes.append([plano, planilha, max(workbook[planilha].max_row, PRIMEIRA_LINHA - 1)])
+    return partes
+
+def taxa_relatorio(workbook):
+    """
+    Taxa de repasse de um relatório já gravado, lida da planilha de totais,
+    ou TAXA_REPASSE se ela não estiver lá.
+    """
+
+    if PLANILHA_TOTAIS in workbook.sheetnames:
+        titulo, taxa = next(workbook[PLANILHA_TOTAIS].iter_rows(max_row=1, max_col=2, values_only=True), (None, None))
+        if titulo == "TAXA DE REPASSE (%)" and isinstance(taxa, (int, float)):
+            return taxa
+    return TAXA_REPASSE
+
+def atualizar_resumo(workbook, partes:list, manter_formulas:bool = MANTER_FORMULAS, taxa_repasse:float = TAXA_REPASSE):
+    """
+    Reescreve as planilhas de resumo e de totais e os totais de um workbook
+    carregado, com os totais calculados a partir das linhas das planilhas e
+    o repasse à taxa informada.
+
+    Returns:
+        Agregador: Os totais, para gravar o resumo em JSON (Agregador.salvar_json).
+    """
+
+    agregador = Agregador(taxa_repasse)
+    somas = {}
+    for plano, planilha, ultima_linha in partes:
+        dados = dados_planilha(workbook[planilha], ultima_linha)
+        agregador.adicionar(dados, plano)
+        pagos = centavos(dados["Valor Processado"])
+        somas[planilha] = (int(pagos.sum()), int(centavos_repasse(pagos, agregador.taxa_repasse).sum()))
+
+    for planilha in (PLANILHA_RESUMO, PLANILHA_TOTAIS):
+        if planilha in workbook.sheetnames:
+            del workbook[planilha]
+    sheet = workbook.create_sheet(PLANILHA_RESUMO, 0)
+    _escrever_linhas(sheet, linhas_resumo(partes, None if manter_formulas else somas))
+    _escrever_linhas(workbook.create_sheet(PLANILHA_TOTAIS, 1), linhas_totais(agregador))
+    definir_totais(workbook, partes)
+    workbook.active = 0
+    return agregador
+
+def dividir_trechos(trechos:list, quantidades:list[int]):
+    """
+    Distribui os trechos escritos no relatório entre blocos consecutivos de
+    linhas (os dados de cada PDF), seguindo a virada de planilha.
+
+    Args:
+        trechos (list): (planilha, primeira_linha, linhas), como devolvidos por adicionar.
+        quantidades (list): Linhas de cada bloco, na ordem em que foram escritas.
+
+    Returns:
+        list: Para cada bloco, a lista dos trechos que ele ocupa.
+    """
+
+    restantes = [list(trecho) for trecho in trechos]
+    blocos = []
+    for quantidade in quantidades:
+        bloco = []
+        while quantidade:
+            planilha, linha, linhas = restantes[0]
+            usadas = min(linhas, quantidade)
+            bloco.append((planilha, linha, usadas))
+            quantidade -= usadas
+            if usadas == linhas:
+                restantes.pop(0)
+            else:
+                restantes[0] = [planilha, linha + usadas, linhas - usadas]
+        blocos.append(bloco)
+    return blocos
+
+class RelatorioPlanilha:
+    """
+    Escreve o relatório mensal em uma única passada, no modo write-only do
+    openpyxl: as linhas vão direto para o arquivo, com memória limitada, e os
+    estilos são nomeados e registrados uma vez, em vez de criados célula a célula.
+
+    Cada plano vai para a sua planilha; ao atingir `linhas_por_planilha`, o
+    plano continua em uma planilha "<plano> (2)". Os totais somam apenas as
+    linhas escritas e a planilha de resumo, criada ao salvar, fica em primeiro.
+
+    Os totais por plano, beneficiário, procedimento e mês são calculados à
+    medida que os dados chegam (ver utilitarios.agregacao) e gravados, ao
+    salvar, na planilha de totais e em JSON. Sem `manter_formulas`, o repasse
+    de cada linha e as somas do resumo também são gravados já calculados.
+
+    Uso:
+        relatorio = RelatorioPlanilha(arquivo)
+        relatorio.adicionar(dados, plano)
+        relatorio.salvar()
+    """
+
+    def __init__(self, arquivo:str, linhas_por_planilha:int = LINHAS_POR_PLANILHA, taxa_repasse:float = TAXA_REPASSE,
+                 manter_formulas:bool = MANTER_FORMULAS):
+        self.arquivo = arquivo
+        self.taxa_repasse = taxa_repasse
+        self.manter_formulas = manter_formulas
+        self.agregador = Agregador(taxa_repasse)
+        # Valor pago e repasse, em centavos, de cada planilha (resumo sem fórmulas)
+        self.somas = {}
+        self.linhas_por_planilha = max(1, min(linhas_por_planilha, LIMITE_LINHAS_EXCEL - PRIMEIRA_LINHA + 1))
+        self.workbook = openpyxl.Workbook(write_only=True)
+        registrar_estilos(self.workbook)
+        self.sheet = None
+        self._modelo = None
+        # [plano, planilha, ultima_linha] de cada planilha criada
+        self.partes = []
+
+    def _celula(self, valor=None, estilo:str = None, sheet = None):
+        celula = WriteOnlyCell(sheet or self.sheet, value=valor)
+        if estilo:
+            celula.style = estilo
+        return celula
+
+    def _append(self, sheet, linhas:list):
+        for linha in linhas:
+            sheet.append([item and self._celula(*item, sheet=sheet) for item in linha])
+
+    def _nova_planilha(self, plano:str):
+        parte = 1 + sum(1 for plano_parte, _, _ in self.partes if plano_parte == plano)
+        self.sheet = self.workbook.create_sheet(nome_planilha(plano, parte))
+        _formatar_planilha(self.sheet)
+        self._append(self.sheet, linhas_cabecalho(self.sheet.title))
+
+        # Células já estilizadas das colunas A a K, reaproveitadas em todas as
+        # linhas: no modo write-only cada linha é gravada assim que acrescentada,
+        # e criar e estilizar uma célula nova por valor domina o tempo de escrita
+        self._modelo = [self._celula(estilo=estilo_coluna(coluna)) for coluna in range(1, 12)]
+        self.partes.append([plano, self.sheet.title, PRIMEIRA_LINHA - 1])
+        return self.partes[-1]
+
+    def adicionar(self, dados, plano:str):
+        """
+        Acrescenta os dados de um plano ao relatório (TabelaRegistros, DataFrame
+        ou lista de registros).
+
+        Returns:
+            list: Trechos (planilha, primeira_linha, linhas) escritos, em ordem.
+        """
+
+        dados = como_dataframe(dados)
+        self.agregador.adicionar(dados, plano)
+
+        parte = self.partes[-1] if self.partes and self.partes[-1][0] == plano else None
+        limite = PRIMEIRA_LINHA - 1 + self.linhas_por_planilha
+        trechos = []
+        for valores in linhas_relatorio(dados, plano):
+            if parte is None or parte[2] >= limite:
+                parte = self._nova_planilha(plano)
+                trechos.append([parte[1], PRIMEIRA_LINHA, 0])
+            elif not trechos:
+                trechos.append([parte[1], parte[2] + 1, 0])
+
+            parte[2] += 1
+            trechos[-1][2] += 1
+            for celula, valor in zip(self._modelo, valores):
+                celula.value = valor
+            if self.manter_formulas:
+                self._modelo[10].value = formula_repasse(parte[2], self.taxa_repasse)
+            else:
+                self._modelo[10].value = valor_repasse(valores[9], self.taxa_repasse)
+            self.sheet.append(self._modelo)
+
+        if not self.manter_formulas and trechos and "Valor Processado" in dados:
+            pagos = centavos(dados["Valor Processado"]).to_numpy()
+            repasses = centavos_repasse(pagos, self.taxa_repasse)
+            inicio = 0
+            for planilha, _, linhas in trechos:
+                pago, repasse = self.somas.get(planilha, (0, 0))
+                self.somas[planilha] = (pago + int(pagos[inicio:inicio + linhas].sum()),
+                                        repasse + int(repasses[inicio:inicio + linhas].sum()))
+                inicio += linhas
+
+        logger.info(f"{sum(linhas for _, _, linhas in trechos)} linhas do plano {plano} adicionadas ao relatório.")
+        return [tuple(trecho) for trecho in trechos]
+
+    def salvar(self):
+        """
+        Finaliza e grava o arquivo. O relatório não aceita novas linhas depois disso.
+
+        Returns:
+            bool: False se o arquivo não pôde ser gravado (o erro é registrado no log).
+        """
+
+        try:
+            definir_totais(self.workbook, self.partes)
+            resumo = self.workbook.create_sheet(PLANILHA_RESUMO, 0)
+            self._append(resumo, linhas_resumo(self.partes, None if self.manter_formulas else self.somas))
+            self._append(self.workbook.create_sheet(PLANILHA_TOTAIS, 1), linhas_totais(self.agregador))
+            self.workbook.save(self.arquivo)
+        except Exception as e:
+            logger.error(f"Erro ao salvar relatório: {e}")
+            return False
+
+        logger.info(f"Relatório salvo com sucesso em {self.arquivo}")
+        self.agregador.salvar_json(Agregador.caminho_para(self.arquivo))
+        return True
+
+class RelatorioExistente:
+    """
+    Acrescenta linhas a um relatório já gravado (modo incremental e modo
+    serviço), com o mesmo uso de RelatorioPlanilha. O workbook é carregado
+    uma vez, recebe as remoções e os dados de todos os planos, e o resumo e
+    os totais são refeitos, a partir das linhas das planilhas, só ao salvar.
+
+    Os dados continuam na última planilha do plano, passando para uma nova
+    ao atingir `linhas_por_planilha`. O arquivo só é lido na primeira
+    remoção ou adição: sem nenhuma, salvar() não faz nada.
+
+    Sem `taxa_repasse`, o repasse segue a taxa gravada na planilha de totais
+    do relatório (ver taxa_relatorio).
+
+    Uso:
+        relatorio = RelatorioExistente(arquivo)
+        relatorio.remover(intervalos)
+        relatorio.adicionar(dados, plano)
+        relatorio.salvar()
+    """
+
+    def __init__(self, arquivo:str, linhas_por_planilha:int = LINHAS_POR_PLANILHA, taxa_repasse:float = None,
+                 manter_formulas:bool = MANTER_FORMULAS):
+        self.arquivo = arquivo
+        self.taxa_repasse = taxa_repasse
+        self.manter_formulas = manter_formulas
+        self.linhas_por_planilha = max(1, min(linhas_por_planilha, LIMITE_LINHAS_EXCEL - PRIMEIRA_LINHA + 1))
+        self._workbook = None
+        # [plano, planilha, ultima_linha] de cada planilha
+        self.partes = None
+
+    @property
+    def workbook(self):
+        if self._workbook is None:
+            self._workbook = openpyxl.load_workbook(self.arquivo)
+            registrar_estilos(self._workbook)
+            self.partes = partes_relatorio(self._workbook)
+            if self.taxa_repasse is None:
+                self.taxa_repasse = taxa_relatorio(self._workbook)
+        return self._workbook
+
+    def _repasse(self, sheet, linha:int):
+        if self.manter_formulas:
+            return formula_repasse(linha, self.taxa_repasse)
+        return valor_repasse(sheet.cell(row=linha, column=10).value, self.taxa_repasse)
+
+    def remover(self, intervalos:list[tuple[str, int, int]]):
+        """
+        Remove blocos de linhas de dados, subindo as linhas seguintes de cada
+        planilha.
+
+        Args:
+            intervalos (list): Trechos (planilha, linha_inicial, quantidade),
+                aplicados em ordem; cada um já considera as remoções anteriores.
+        """
+
+        if not intervalos:
+            return
+
+        workbook = self.workbook
+        primeiras_linhas = {}
+        for planilha, linha_inicial, linhas in intervalos:
+            if planilha not in workbook.sheetnames:
+                logger.warning(f"Planilha {planilha} não encontrada em {self.arquivo}.")
+                continue
+            workbook[planilha].delete_rows(linha_inicial, linhas)
+            primeiras_linhas[planilha] = min(linha_inicial, primeiras_linhas.get(planilha, linha_inicial))
+
+        # delete_rows não ajusta as fórmulas de repasse das linhas que subiram:
+        # a coluna K delas é reescrita
+        for planilha, primeira_linha in primeiras_linhas.items():
+            sheet = workbook[planilha]
+            for linha in range(primeira_linha, sheet.max_row + 1):
+                sheet.cell(row=linha, column=11).value = self._repasse(sheet, linha)
+
+        for parte in self.partes:
+            if parte[1] in primeiras_linhas:
+                parte[2] = max(workbook[parte[1]].max_row, PRIMEIRA_LINHA - 1)
+        logger.info(f"{sum(linhas for _, _, linhas in intervalos)} linhas antigas removidas de {self.arquivo}")
+
+    def adicionar(self, dados, plano:str):
+        """
+        Acrescenta os dados de um plano ao relatório (TabelaRegistros, DataFrame
+        ou lista de registros), com os estilos das colunas.
+
+        Returns:
+            list: Trechos (planilha, primeira_linha, linhas) escritos, em ordem,
+            ou None em caso de erro, quando nenhuma linha dos dados fica no relatório.
+        """
+
+        limite = PRIMEIRA_LINHA - 1 + self.linhas_por_planilha
+        trechos = []
+        criadas = []
+        try:
+            workbook = self.workbook
+            partes = self.partes
+            parte = next((parte for parte in reversed(partes) if parte[0] == plano), None)
+            sheet = workbook[parte[1]] if parte else None
+
+            for valores in linhas_relatorio(dados, plano):
+                if parte is None or parte[2] >= limite:
+                    numero = 1 + sum(1 for plano_parte, _, _ in partes if plano_parte == plano)
+                    sheet = criar_planilha_plano(workbook, plano, numero)
+                    parte = [plano, sheet.title, PRIMEIRA_LINHA - 1]
+                    partes.append(parte)
+                    criadas.append(parte)
+                    trechos.append([parte[1], PRIMEIRA_LINHA, 0])
+                elif not trechos:
+                    trechos.append([parte[1], parte[2] + 1, 0])
+
+                linha = parte[2] + 1
+                for coluna, valor in enumerate(valores, start=1):
+                    celula = sheet.cell(row=linha, column=coluna, value=valor)
+                    celula.style = estilo_coluna(coluna)
+
+                # Fórmula (ou valor) do repasse
+                repasse = self._repasse(sheet, linha)
+                celula = sheet.cell(row=linha, column=11, value=repasse)
+                celula.style = estilo_coluna(11)
+                parte[2] = linha
+                trechos[-1][2] += 1
+        except Exception as e:
+            logger.error(f"Erro ao salvar relatório: {e}")
+            self._desfazer(trechos, criadas)
+            return None
+
+        logger.info(f"{sum(linhas for _, _, linhas in trechos)} linhas do plano {plano} adicionadas ao relatório.")
+        return [tuple(trecho) for trecho in trechos]
+
+    def _desfazer(self, trechos:list, criadas:list):
+        """Tira do workbook as linhas de uma adição interrompida por um erro, e as planilhas criadas por ela."""
+
+        for planilha, primeira_linha, _ in trechos:
+            parte = next(parte for parte in self.partes if parte[1] == planilha)
+            if parte in criadas:
+                del self._workbook[planilha]
+                self.partes.remove(parte)
+                continue
+            sheet = self._workbook[planilha]
+            sheet.delete_rows(primeira_linha, sheet.max_row - primeira_linha + 1)
+            parte[2] = primeira_linha - 1
+
+    def salvar(self):
+        """
+        Refaz o resumo e os totais e grava o arquivo, se ele foi alterado.
+
+        Returns:
+            bool: False se o arquivo não pôde ser gravado (o erro é registrado no log).
+        """
+
+        if self._workbook is None:
+            return True
+        try:
+            agregador = atualizar_resumo(self._workbook, self.partes, self.manter_formulas, self.taxa_repasse)
+            self._workbook.save(self.arquivo)
+        except Exception as e:
+            logger.error(f"Erro ao salvar relatório: {e}")
+            return False
+
+        logger.info(f"Relatório salvo com sucesso em {self.arquivo}")
+        agregador.salvar_json(Agregador.caminho_para(self.arquivo))
+        return True
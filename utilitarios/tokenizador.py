@@ -0,0 +1,338 @@
+import os
+import re
+from abc import ABC, abstractmethod
+
+from utilitarios.fluxo import JANELA_CARRY, ORCAMENTO_REGEX, TempoEsgotado, orcamento_tempo, quarentenar_estouro
+from utilitarios.metricas import MetricasArquivo
+from utilitarios.padroes import PADROES
+from utilitarios.registros import Procedimento
+
+# Rótulo que fecha o nome do beneficiário na Rede Unna e abre o da Amil
+ROTULO_REDE_UNNA = "12 - Nome Civil"
+ROTULO_AMIL = "Nome do Beneficiário"
+
+def _letra_nome(caractere:str):
+    """Caractere de [A-Za-zÀ-ÿ\\s], a classe do nome do beneficiário da Rede Unna."""
+
+    return ("A" <= caractere <= "Z" or "a" <= caractere <= "z" or "À" <= caractere <= "ÿ"
+            or caractere.isspace())
+
+class Tokenizador(ABC):
+    """
+    Extração em passada única, linha a linha, para os leiautes em que cada
+    procedimento começa em uma linha e o beneficiário vem em um cabeçalho
+    antes dos procedimentos dele.
+
+    As páginas são acrescentadas a um único texto, do qual só se guarda a
+    janela anterior à primeira linha ainda não processada. As linhas
+    completas são passadas a self.linhas por posições (início e fim no
+    texto), sem cópias, assim que houver pelo menos `janela` caracteres
+    depois delas (ou no fim do texto), e a subclasse as percorre mantendo o
+    beneficiário atual e emitindo os registros na hora. Os procedimentos
+    são os dos padrões de utilitarios.padroes que começam nessas linhas
+    (ver buscar), e podem continuar nas seguintes, como uma descrição que
+    termina na linha anterior à da data e dos valores: o resultado é o
+    mesmo da busca no texto inteiro sempre que cada procedimento é menor
+    que a janela (como em utilitarios.fluxo.VarredorFluxo).
+
+    Uso:
+        for registro in TokenizadorAmil(caminho_pdf, metricas).tokenizar(paginas):
+            ...
+    """
+
+    def __init__(self, caminho_pdf:str = None, metricas:MetricasArquivo = None, janela:int = JANELA_CARRY):
+        self.caminho_pdf = caminho_pdf
+        self.metricas = metricas or MetricasArquivo(caminho_pdf)
+        self.janela = janela
+        self.texto = ""
+        # Posição absoluta de self.texto[0] e início da linha pendente em self.texto
+        self.base = 0
+        self.inicio = 0
+        self.final = False
+        self.registros = []
+        # Posição absoluta em que a busca dos procedimentos continua (fim do último)
+        self.posicao = 0
+        # Próxima ocorrência já buscada, para não varrer as mesmas linhas de novo (ver buscar)
+        self._seguinte = None
+
+    def tokenizar(self, paginas):
+        """Gera os registros das páginas, à medida que cada página é lida."""
+
+        numero_pagina = 0
+        for pagina in paginas:
+            numero_pagina += 1
+            self.metricas.pagina(len(pagina))
+            yield from self._processar(pagina, numero_pagina)
+        yield from self._processar(None, numero_pagina)
+
+    def _manter(self):
+        """Posição de self.texto a partir da qual o texto precisa ser mantido."""
+
+        return self.inicio - self.janela
+
+    def _processar(self, pagina:str | None, numero_pagina:int):
+        """Acrescenta a página (None ao final) e processa as linhas completas."""
+
+        if pagina is not None:
+            corte = max(0, self._manter())
+            self.texto = self.texto[corte:] + pagina
+            self.base += corte
+            self.inicio -= corte
+        self.final = pagina is None
+
+        self.registros = []
+        try:
+            with self.metricas.medir("tokenizador"), orcamento_tempo(ORCAMENTO_REGEX):
+                self.preparar()
+                self._linhas()
+        except TempoEsgotado:
+            # O restante do texto já recebido é descartado; o beneficiário atual continua
+            quarentenar_estouro(self.caminho_pdf, f"p{numero_pagina}.tokenizador", self.texto[self.inicio:],
+                                ORCAMENTO_REGEX, self.metricas)
+            self.inicio = len(self.texto)
+        return self.registros
+
+    def _linhas(self):
+        texto = self.texto
+        if self.final:
+            if self.inicio < len(texto):
+                self.linhas(self.inicio, len(texto))
+                self.inicio = len(texto)
+            return
+
+        # Um procedimento que começa na última linha termina antes de `janela` caracteres depois dela
+        ultima = len(texto) - self.janela
+        fim = texto.rfind("\n", self.inicio, ultima + 1) if ultima >= self.inicio else -1
+        if fim >= 0:
+            self.linhas(self.inicio, fim)
+            self.inicio = fim + 1
+
+    def buscar(self, padrao:re.Pattern, pos:int, ate:int, endpos:int = None):
+        """
+        Gera as ocorrências de `padrao` em finditer(self.texto, pos, endpos)
+        que começam antes de `ate`, como tuplas (início absoluto, fim
+        absoluto, match), e avança self.posicao para o fim de cada uma. Sem
+        `endpos`, a busca vai até o fim do texto recebido.
+
+        A primeira ocorrência depois de `ate` fica guardada, e as linhas
+        seguintes só voltam a varrer o texto depois dela. Sem `endpos`, só
+        se guarda o que começa uma janela antes do fim do texto, que não
+        muda com a chegada de mais texto.
+        """
+
+        texto = self.texto
+        limite = len(texto) if endpos is None else endpos
+        estavel = len(texto) if self.final or endpos is not None else len(texto) - self.janela
+        endpos_absoluto = None if endpos is None else self.base + endpos
+        while pos < ate:
+            seguinte = self._seguinte
+            match = None
+            if (seguinte and seguinte[0] is padrao and seguinte[1] == endpos_absoluto
+                    and seguinte[2] <= self.base + pos <= seguinte[3]):
+                _, _, _, inicio, fim, match = seguinte
+                if match is None:
+                    # Nenhuma ocorrência antes de `inicio`: a busca continua dali
+                    pos = inicio - self.base
+                    if pos >= ate:
+                        return
+            if match is None:
+                match = padrao.search(texto, pos, limite)
+                if match and match.start() <= estavel:
+                    inicio, fim = self.base + match.start(), self.base + match.end()
+                else:
+                    # Nenhuma ocorrência começa antes de `estavel`
+                    match = None
+                    inicio, fim = self.base + max(pos, estavel), None
+                self._seguinte = (padrao, endpos_absoluto, self.base + pos, inicio, fim, match)
+
+            if match is None or inicio >= self.base + ate:
+                return
+            self._seguinte = None
+            self.posicao = fim
+            yield inicio, fim, match
+            pos = fim - self.base
+
+    def preparar(self):
+        """Chamado a cada página, antes das linhas novas."""
+
+    @abstractmethod
+    def linhas(self, inicio:int, fim:int):
+        """Processa as linhas completas de self.texto[inicio:fim]."""
+
+class TokenizadorRedeUnna(Tokenizador):
+    """
+    Rede Unna: o nome do beneficiário é a sequência de letras e espaços
+    imediatamente anterior a ROTULO_REDE_UNNA (como no padrão
+    "beneficiario"), encontrada voltando a partir do rótulo; os
+    procedimentos seguintes, até o início do próximo nome, são dele.
+    """
+
+    def __init__(self, caminho_pdf:str = None, metricas:MetricasArquivo = None, janela:int = JANELA_CARRY):
+        super().__init__(caminho_pdf, metricas, janela)
+        self.procedimento = PADROES["rede_unna"]["procedimento"]
+        self.beneficiario = None
+        # Posição absoluta do fim do último rótulo: o nome seguinte não volta além dela
+        self.limite = 0
+        # Posição absoluta do próximo rótulo (None: nenhum até self._buscado)
+        self._rotulo = None
+        self._buscado = 0
+        # Próximo beneficiário já encontrado: (início do nome, rótulo), em posições absolutas
+        self._beneficiario = None
+
+    def _proximo_rotulo(self, pos:int):
+        """Posição do primeiro ROTULO_REDE_UNNA a partir de `pos` no texto recebido, ou -1."""
+
+        if self._rotulo is not None and self._rotulo >= self.base + pos:
+            return self._rotulo - self.base
+        rotulo = self.texto.find(ROTULO_REDE_UNNA, max(pos, self._buscado - self.base))
+        if rotulo < 0:
+            # O rótulo pode estar partido no fim do texto recebido
+            self._rotulo = None
+            self._buscado = self.base + max(pos, len(self.texto) - len(ROTULO_REDE_UNNA) + 1)
+            return -1
+        self._rotulo = self.base + rotulo
+        return rotulo
+
+    def _proximo_beneficiario(self, pos:int):
+        """(início do nome, rótulo) do próximo beneficiário a partir de `pos`, ou None se não houver no texto recebido."""
+
+        # O mesmo rótulo vale para todas as linhas até ele
+        if self._beneficiario and self._beneficiario[1] >= self.base + pos:
+            return self._beneficiario[0] - self.base, self._beneficiario[1] - self.base
+
+        texto = self.texto
+        limite = max(self.limite - self.base, 0)
+        rotulo = self._proximo_rotulo(pos)
+        while rotulo >= 0:
+            comeco = rotulo
+            while comeco > limite and _letra_nome(texto[comeco - 1]):
+                comeco -= 1
+            if comeco < rotulo:
+                self._beneficiario = (self.base + comeco, self.base + rotulo)
+                return comeco, rotulo
+            # Rótulo sem nome antes dele: não é um beneficiário
+            rotulo = self._proximo_rotulo(rotulo + len(ROTULO_REDE_UNNA))
+        return None
+
+    def linhas(self, inicio:int, fim:int):
+        texto = self.texto
+        pos = max(inicio, self.posicao - self.base)
+        while pos < fim:
+            proximo = self._proximo_beneficiario(pos)
+            if proximo is None:
+                self._procedimentos(pos, fim)
+                return
+
+            # Os procedimentos do beneficiário atual terminam antes do nome seguinte
+            comeco, rotulo = proximo
+            self._procedimentos(pos, min(fim, comeco), comeco)
+            if comeco >= fim:
+                return
+
+            self.beneficiario = texto[comeco:rotulo].strip()
+            self.metricas.ocorrencia("beneficiario", self.base + comeco)
+            pos = rotulo + len(ROTULO_REDE_UNNA)
+            self.limite = self.posicao = self.base + pos
+            self._beneficiario = None
+
+    def _procedimentos(self, inicio:int, fim:int, endpos:int = None):
+        if self.beneficiario is None or inicio >= fim:
+            return
+        for posicao, _, match in self.buscar(self.procedimento, inicio, fim, endpos):
+            self.metricas.ocorrencia("procedimento", posicao)
+            self.registros.append(Procedimento(
+                nome_beneficiario=self.beneficiario,
+                codigo_procedimento=match.group('codigo_procedimento'),
+                nome_procedimento=match.group('nome_procedimento'),
+                dente_regiao=match.group('dente_regiao'),
+                face=match.group('face'),
+                valor_processado=match.group('valor_processado'),
+                valor_glosa=match.group('valor_glosa'),
+                data_realizacao=match.group('data')
+            ))
+
+class TokenizadorAmil(Tokenizador):
+    """
+    Amil: cada ROTULO_AMIL abre um beneficiário, com o nome na primeira
+    linha do padrão "beneficiario"; os procedimentos que começam depois do
+    rótulo são dele. Um nome vazio descarta os procedimentos até o próximo.
+    """
+
+    def __init__(self, caminho_pdf:str = None, metricas:MetricasArquivo = None, janela:int = JANELA_CARRY):
+        super().__init__(caminho_pdf, metricas, janela)
+        self.cabecalho = PADROES["amil"]["beneficiario"]
+        self.procedimento = PADROES["amil"]["procedimento"]
+        self.beneficiario = None
+        # Posição absoluta do fim do último cabeçalho: rótulos antes dela fazem parte dele
+        self.fim_cabecalho = 0
+        # Cabeçalho que chega ao fim do texto recebido e ainda pode continuar na próxima página
+        self.pendente = None
+
+    def _manter(self):
+        if self.pendente is not None:
+            return min(self.inicio - self.janela, self.pendente - self.base)
+        return super()._manter()
+
+    def preparar(self):
+        if self.pendente is not None:
+            rotulo, self.pendente = self.pendente - self.base, None
+            self._cabecalho(rotulo)
+
+    def _cabecalho(self, rotulo:int):
+        if self.base + rotulo < self.fim_cabecalho:
+            return
+        match = self.cabecalho.match(self.texto, rotulo)
+        if match is None:
+            return
+        if match.end() == len(self.texto) and not self.final:
+            # Até o fim do texto só há letras e espaços: nenhum procedimento antes da próxima página
+            self.pendente = self.base + rotulo
+            return
+        self.beneficiario = match.group(1).split('\n')[0].strip()
+        self.fim_cabecalho = self.base + match.end()
+        self.metricas.ocorrencia("beneficiario", self.base + rotulo)
+
+    def linhas(self, inicio:int, fim:int):
+        texto = self.texto
+        rotulo = texto.find(ROTULO_AMIL, inicio, fim)
+        for posicao, _, match in self.buscar(self.procedimento, max(inicio, self.posicao - self.base), fim):
+            # Os cabeçalhos que começam antes do procedimento valem para ele
+            while 0 <= rotulo < posicao - self.base:
+                self._cabecalho(rotulo)
+                rotulo = texto.find(ROTULO_AMIL, rotulo + 1, fim)
+            if not self.beneficiario:
+                continue
+
+            self.metricas.ocorrencia("procedimento", posicao)
+            self.registros.append(Procedimento(
+                nome_beneficiario=self.beneficiario,
+                codigo_procedimento=match.group(7),
+                nome_procedimento=match.group(1).strip(),
+                dente_regiao=match.group(5),
+                face=match.group(3),
+                valor_processado=match.group(10),
+                valor_glosa=match.group(9),
+                data_realizacao=match.group(2)
+            ))
+
+        while rotulo >= 0:
+            self._cabecalho(rotulo)
+            rotulo = texto.find(ROTULO_AMIL, rotulo + 1, fim)
+
+# Tokenizador de cada plano
+TOKENIZADORES = {
+    "rede_unna": TokenizadorRedeUnna,
+    "amil": TokenizadorAmil,
+}
+PLANOS_TOKENIZADOS = set(TOKENIZADORES)
+
+# Planos extraídos pelo tokenizador de linhas, separados por vírgula ("1"
+# para todos os de PLANOS_TOKENIZADOS, "0" para nenhum: padrões do texto
+# inteiro, ver utilitarios.extratores). Por padrão, só a Rede Unna: na Amil
+# o tokenizador não é mais rápido que os padrões (ver bench_tokenizador)
+_TOKENIZAR = os.environ.get("PDF_TOKENIZADOR", "rede_unna")
+TOKENIZAR = (
+    PLANOS_TOKENIZADOS if _TOKENIZAR == "1"
+    else set() if _TOKENIZAR == "0"
+    else {plano.strip() for plano in _TOKENIZAR.split(",")} & PLANOS_TOKENIZADOS
+)
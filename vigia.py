@@ -0,0 +1,477 @@
+"""
+Modo serviço: vigia as pastas dos planos e processa os PDFs à medida que chegam.
+
+A cada intervalo as pastas são varridas (como em main.coletar_pdfs). Um PDF
+só entra na fila depois de ficar com tamanho e data de modificação estáveis
+por alguns segundos, para não ler arquivos ainda sendo copiados. A extração
+roda com concorrência limitada, em um pool de processos (ou cada PDF em um
+processo próprio com limites de tempo e memória, com PDF_ISOLAR=1), e os
+resultados são gravados no relatório em lotes, junto com o manifesto, de
+modo que, depois de reiniciado, o serviço continua de onde parou: PDFs já
+registrados no manifesto e inalterados não são processados de novo.
+
+Uso:
+    python vigia.py [pastas ...] [-o relatorio.xlsx] [-w 2] [--intervalo 5]
+"""
+import os
+import sys
+import copy
+import time
+import signal
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from main import NUM_WORKERS, coletar_pdfs, concluir_extracao, criar_parser, extrair_arquivo, extrair_isolados, salvar_resultados
+from utilitarios.logger_config import fila_log, logger
+from utilitarios.banco import BancoHistorico
+from utilitarios.deduplicacao import Deduplicador
+from utilitarios.helper import criar_planilha_inicial
+from utilitarios.isolamento import ISOLAR, TEMPO_ARQUIVO, encerrar_pool, iniciar_processo_pool
+from utilitarios.manifesto import Manifesto
+from utilitarios.metricas import RelatorioMetricas
+from utilitarios.registros import TabelaRegistros
+from utilitarios.relatorio import RelatorioExistente, dividir_trechos
+
+# Intervalo entre as varreduras das pastas, em segundos
+INTERVALO_VARREDURA = float(os.environ.get("PDF_VIGIA_INTERVALO", 5))
+
+# Tempo que um PDF precisa ficar sem mudar de tamanho/data para ser processado
+TEMPO_ESTABILIDADE = float(os.environ.get("PDF_VIGIA_ESTABILIDADE", 2))
+
+# Um lote é gravado ao juntar essa quantidade de PDFs ou após esse tempo
+TAMANHO_LOTE = int(os.environ.get("PDF_VIGIA_LOTE", 20))
+INTERVALO_LOTE = float(os.environ.get("PDF_VIGIA_INTERVALO_LOTE", 30))
+
+class VigiaPastas:
+    """
+    Serviço assíncrono que vigia as pastas de entrada e alimenta o relatório.
+
+    Como em main.extrair_pdfs, os PDFs que falham ou dos quais nenhum
+    procedimento é extraído vão para a quarentena, e um PDF que derruba o
+    pool ou passa de `tempo` segundos faz o pool ser descartado e é refeito
+    isolado.
+
+    Uso:
+        vigia = VigiaPastas(["./pdfs"], "Relatório Produção Mensal.xlsx")
+        asyncio.run(vigia.executar())  # até vigia.parar() (ou SIGINT/SIGTERM)
+    """
+
+    def __init__(self, entradas:list[str], arquivo_relatorio:str, planos:list[str] = None, formatos:list[str] = None,
+                 workers:int = NUM_WORKERS, intervalo:float = INTERVALO_VARREDURA,
+                 estabilidade:float = TEMPO_ESTABILIDADE, tamanho_lote:int = TAMANHO_LOTE,
+                 intervalo_lote:float = INTERVALO_LOTE, banco:BancoHistorico = None,
+                 deduplicador:Deduplicador = None, isolar:bool = ISOLAR, tempo:float = TEMPO_ARQUIVO):
+        self.entradas = entradas
+        self.arquivo_relatorio = arquivo_relatorio
+        self.planos = planos
+        self.formatos = formatos
+        self.workers = max(1, workers)
+        self.intervalo = intervalo
+        self.estabilidade = estabilidade
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_lote = intervalo_lote
+        self.banco = banco
+        self.deduplicador = deduplicador
+        self.isolar = isolar
+        self.tempo = tempo
+        self.metricas = RelatorioMetricas()
+
+        self.manifesto = None
+        self._executor = None
+        self._parar = None
+        self._fila = None
+        # caminho -> (tamanho, mtime, instante em que foi visto assim pela primeira vez)
+        self._observados = {}
+        # (tamanho, mtime) dos PDFs na fila ou em extração, para não enfileirar de novo
+        self._em_andamento = {}
+        # PDFs em extração quando o pool de processos morreu ou foi descartado: refeitos isolados
+        self._suspeitos = set()
+        # Resultados extraídos aguardando gravação: (caminho, plano, dados)
+        self._pendentes = []
+        self._inicio_lote = None
+        # Depois de um lote que não pôde ser gravado, só se tenta de novo a partir deste instante
+        self._proxima_gravacao = 0
+        # Dependentes de um lote não gravado que ainda precisam sair do
+        # manifesto e voltar à fila na próxima tentativa
+        self._reprocessar = set()
+
+    def parar(self):
+        """Pede o encerramento: termina as extrações em andamento e grava o último lote."""
+
+        if self._parar and not self._parar.is_set():
+            logger.info("Encerrando o serviço...")
+            self._parar.set()
+
+    def _preparar_relatorio(self):
+        caminho_manifesto = Manifesto.caminho_para(self.arquivo_relatorio)
+        if os.path.exists(self.arquivo_relatorio) and os.path.exists(caminho_manifesto):
+            self.manifesto = Manifesto(caminho_manifesto).carregar()
+            if self.manifesto.compativel():
+                logger.info(f"Retomando: {len(self.manifesto.arquivos)} arquivos já processados.")
+                return
+            logger.warning("Relatório no layout antigo (planilha única): começando um relatório novo.")
+
+        if os.path.dirname(self.arquivo_relatorio):
+            os.makedirs(os.path.dirname(self.arquivo_relatorio), exist_ok=True)
+        criar_planilha_inicial(self.arquivo_relatorio)
+        if self.deduplicador:
+            self.deduplicador.limpar()
+        self.manifesto = Manifesto(caminho_manifesto)
+        self.manifesto.salvar()
+
+    def varrer(self, agora:float = None):
+        """
+        Varre as entradas e devolve os PDFs prontos para processar: novos ou
+        alterados, e estáveis há pelo menos `estabilidade` segundos.
+
+        Returns:
+            list: Pares (caminho_pdf, plano).
+        """
+
+        agora = time.monotonic() if agora is None else agora
+        try:
+            arquivos_por_plano = coletar_pdfs(self.entradas, self.planos)
+        except OSError as e:
+            logger.warning(f"Erro ao varrer as pastas de entrada: {e}")
+            return []
+
+        prontos = []
+        vistos = set()
+        for plano, arquivos_pdf in arquivos_por_plano.items():
+            for caminho_pdf in arquivos_pdf:
+                vistos.add(caminho_pdf)
+                try:
+                    info = os.stat(caminho_pdf)
+                except OSError:
+                    continue
+
+                assinatura = (info.st_size, info.st_mtime)
+                if self._em_andamento.get(caminho_pdf) == assinatura:
+                    continue
+
+                anterior = self._observados.get(caminho_pdf)
+                if not anterior or anterior[:2] != assinatura:
+                    # Novo ou ainda sendo escrito: espera estabilizar
+                    self._observados[caminho_pdf] = (*assinatura, agora)
+                    continue
+                if agora - anterior[2] < self.estabilidade:
+                    continue
+
+                del self._observados[caminho_pdf]
+                self._em_andamento[caminho_pdf] = assinatura
+                if not self.manifesto.inalterado(caminho_pdf):
+                    prontos.append((caminho_pdf, plano))
+
+        # Esquece os arquivos que sumiram das pastas
+        for caminho_pdf in list(self._observados):
+            if caminho_pdf not in vistos:
+                del self._observados[caminho_pdf]
+        return prontos
+
+    async def _varredor(self):
+        while not self._parar.is_set():
+            for tarefa in self.varrer():
+                logger.info(f"Novo arquivo na fila: {tarefa[0]}")
+                await self._fila.put(tarefa)
+            try:
+                await asyncio.wait_for(self._parar.wait(), self.intervalo)
+            except asyncio.TimeoutError:
+                pass
+
+    def _criar_executor(self):
+        if self.isolar:
+            return ThreadPoolExecutor(max_workers=self.workers)
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=iniciar_processo_pool,
+                                   initargs=(fila_log(), logger.level))
+
+    def _recriar_executor(self, quebrado:ProcessPoolExecutor):
+        """
+        Troca o pool que morreu, ou que tem um processo travado, por um novo
+        (uma vez só, mesmo com vários extratores esperando por ele). Os
+        processos do antigo são encerrados à força.
+        """
+
+        if self._executor is quebrado:
+            self._executor = self._criar_executor()
+            encerrar_pool(quebrado, esperar=False)
+
+    async def _extrator(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            caminho_pdf, plano = await self._fila.get()
+            executor = self._executor
+            try:
+                try:
+                    if self.isolar or caminho_pdf in self._suspeitos:
+                        # Uma thread espera pelo processo isolado do PDF
+                        [(dados, metricas_arquivo)] = await loop.run_in_executor(
+                            executor if self.isolar else None, extrair_isolados, [(caminho_pdf, plano)], 1,
+                        )
+                        self._suspeitos.discard(caminho_pdf)
+                    else:
+                        # O pool tem um processo por extrator, e cada extrator
+                        # um PDF nele: o tempo conta do envio
+                        try:
+                            resultado = await asyncio.wait_for(
+                                loop.run_in_executor(executor, extrair_arquivo, caminho_pdf, plano), self.tempo or None,
+                            )
+                        except asyncio.TimeoutError:
+                            raise BrokenProcessPool(f"tempo esgotado após {self.tempo:g}s")
+                        dados, metricas_arquivo = concluir_extracao(caminho_pdf, plano, resultado)
+                except BrokenProcessPool as e:
+                    # Um processo do pool morreu ou travou, talvez com este PDF:
+                    # o pool é recriado e o PDF volta para a fila, para ser
+                    # refeito isolado
+                    logger.warning(f"Pool de processos descartado durante {caminho_pdf}"
+                                   f" ({e or 'processo do pool encerrado'}); recriando o pool.")
+                    self._recriar_executor(executor)
+                    self._suspeitos.add(caminho_pdf)
+                    await self._fila.put((caminho_pdf, plano))
+                    continue
+                except Exception as e:
+                    logger.error(f"Erro ao extrair {caminho_pdf}: {e}")
+                    dados, metricas_arquivo = concluir_extracao(caminho_pdf, plano, motivo=f"{type(e).__name__}: {e}")
+
+                self.metricas.adicionar_arquivo(metricas_arquivo)
+                if metricas_arquivo.quarentena:
+                    # Já saiu da pasta de entrada; não entra no relatório nem no manifesto
+                    self._em_andamento.pop(caminho_pdf, None)
+                    continue
+                if not self._pendentes:
+                    self._inicio_lote = time.monotonic()
+                # No plano identificado pelo layout, que pode não ser o da pasta
+                self._pendentes.append((caminho_pdf, metricas_arquivo.plano, dados))
+            finally:
+                self._fila.task_done()
+
+    def _retirar_lote(self):
+        """
+        Retira os resultados pendentes e tira do manifesto os PDFs do lote,
+        os registrados que não existem mais (renomeados, movidos ou
+        apagados) e os que tiveram procedimentos descartados como
+        duplicatas deles, que voltam a ser enfileirados pela varredura. Só
+        mexe no estado do serviço: roda no loop de eventos.
+
+        Returns:
+            tuple: (lote, trechos a remover do relatório, estado para
+            _devolver_lote), ou None se não há nada pendente.
+        """
+
+        lote, self._pendentes = self._pendentes, []
+        if not lote:
+            return None
+
+        anterior = copy.deepcopy(self.manifesto.arquivos)
+        sumidos = [caminho_pdf for caminho_pdf in self.manifesto.arquivos if not os.path.exists(caminho_pdf)]
+        removidos = [caminho_pdf for caminho_pdf, _, _ in lote] + sumidos
+        dependentes, self._reprocessar = self._reprocessar, set()
+        if self.deduplicador:
+            # Os PDFs que tiveram procedimentos descartados como duplicatas
+            # dos que saíram ou mudaram saem do manifesto e voltam à fila
+            dependentes.update(self.deduplicador.esquecer(removidos))
+        dependentes = {caminho_pdf for caminho_pdf in dependentes if caminho_pdf in self.manifesto.arquivos}
+        removidos.extend(sorted(dependentes))
+        for caminho_pdf in list(self._em_andamento):
+            if os.path.normpath(caminho_pdf) in dependentes:
+                del self._em_andamento[caminho_pdf]
+
+        intervalos = []
+        for caminho_pdf in removidos:
+            intervalos.extend(self.manifesto.remover(caminho_pdf))
+        return lote, intervalos, (anterior, dependentes)
+
+    def _devolver_lote(self, lote:list[tuple], estado:tuple):
+        """
+        Desfaz _retirar_lote depois de um lote que não pôde ser gravado: o
+        manifesto volta a descrever o relatório, que ficou como estava, e o
+        lote volta para o início dos pendentes, para uma nova tentativa
+        depois de `intervalo_lote`. Roda no loop de eventos.
+        """
+
+        anterior, dependentes = estado
+        self.manifesto.arquivos = anterior
+        self._pendentes = lote + self._pendentes
+        self._inicio_lote = time.monotonic()
+        self._proxima_gravacao = self._inicio_lote + self.intervalo_lote
+        # O índice de duplicatas já os esqueceu: os que a varredura ainda não
+        # enfileirou de novo saem do manifesto na próxima tentativa
+        em_andamento = {os.path.normpath(caminho_pdf) for caminho_pdf in self._em_andamento}
+        self._reprocessar.update(caminho_pdf for caminho_pdf in dependentes if caminho_pdf not in em_andamento)
+        logger.warning(f"Lote de {len(lote)} arquivo(s) não gravado em {self.arquivo_relatorio};"
+                       f" nova tentativa em {self.intervalo_lote:g}s.")
+
+    def _escrever_lote(self, lote:list[tuple], intervalos:list[tuple[str, int, int]]):
+        """
+        Escreve um lote no relatório (e no banco e no índice de duplicatas),
+        removendo antes as linhas antigas, com o arquivo carregado e gravado
+        uma vez só (ver RelatorioExistente). Não mexe no manifesto nem nas
+        filas do serviço, e por isso pode rodar em outra thread.
+
+        Returns:
+            list: Pares (caminho_pdf, entrada do manifesto), com None no
+            lugar da entrada dos PDFs que não foram salvos, ou None se o
+            relatório não pôde ser gravado.
+        """
+
+        try:
+            return self._escrever_relatorio(lote, intervalos)
+        except Exception as e:
+            logger.error(f"Erro ao gravar o lote em {self.arquivo_relatorio}: {e}")
+            return None
+
+    def _escrever_relatorio(self, lote:list[tuple], intervalos:list[tuple[str, int, int]]):
+        relatorio = RelatorioExistente(self.arquivo_relatorio)
+        relatorio.remover(intervalos)
+
+        if self.deduplicador:
+            with self.metricas.medir(None, "deduplicacao"):
+                lote, duplicatas = self.deduplicador.filtrar(lote)
+            self.deduplicador.relatar(duplicatas, acrescentar=True)
+
+        entradas = []
+        planos = list(dict.fromkeys(plano for _, plano, _ in lote))
+        for plano in planos:
+            results = TabelaRegistros(plano)
+            for _, plano_pdf, dados in lote:
+                if plano_pdf == plano:
+                    results.estender(dados)
+
+            origens = [(caminho_pdf, len(dados)) for caminho_pdf, plano_pdf, dados in lote if plano_pdf == plano]
+            trechos = salvar_resultados(results, plano, self.formatos, relatorio, self.metricas,
+                                        self.arquivo_relatorio, self.banco, origens)
+
+            # Sem os trechos (erro ao salvar) os PDFs são reprocessados depois
+            if trechos or not len(results):
+                blocos = dividir_trechos(trechos or [], [linhas for _, linhas in origens])
+                for (caminho_pdf, _), trechos_pdf in zip(origens, blocos):
+                    entradas.append((caminho_pdf, Manifesto.descrever(caminho_pdf, plano, trechos_pdf)))
+            else:
+                entradas.extend((caminho_pdf, None) for caminho_pdf, _ in origens)
+
+        with self.metricas.medir(None, "salvar_relatorio"):
+            if not relatorio.salvar():
+                return None
+        return entradas
+
+    def _registrar_lote(self, entradas:list[tuple[str, dict]]):
+        """Registra no manifesto os PDFs salvos e libera os demais para nova tentativa. Roda no loop de eventos."""
+
+        for caminho_pdf, entrada in entradas:
+            if entrada is None:
+                self._em_andamento.pop(caminho_pdf, None)
+            else:
+                self.manifesto.registrar(caminho_pdf, entrada["plano"], entrada["trechos"], entrada)
+
+    def gravar_lote(self):
+        """
+        Grava no relatório os resultados pendentes e registra os PDFs no
+        manifesto. As linhas antigas de PDFs reprocessados, e as dos PDFs
+        registrados que não existem mais (renomeados, movidos ou apagados),
+        são removidas antes.
+        """
+
+        retirado = self._retirar_lote()
+        if not retirado:
+            return
+        lote, intervalos, estado = retirado
+        entradas = self._escrever_lote(lote, intervalos)
+        if entradas is None:
+            self._devolver_lote(lote, estado)
+            return
+        self._registrar_lote(entradas)
+        self.manifesto.salvar()
+        logger.info(f"Lote de {len(lote)} arquivo(s) gravado em {self.arquivo_relatorio}")
+
+    async def _gravador(self):
+        loop = asyncio.get_running_loop()
+        while not self._parar.is_set():
+            agora = time.monotonic()
+            cheio = len(self._pendentes) >= self.tamanho_lote
+            vencido = self._pendentes and agora - self._inicio_lote >= self.intervalo_lote
+            retirado = self._retirar_lote() if (cheio or vencido) and agora >= self._proxima_gravacao else None
+            if retirado:
+                # Só a escrita, que bloqueia, roda em uma thread; o manifesto e
+                # as filas, compartilhados com a varredura e os extratores,
+                # mudam apenas aqui no loop
+                lote, intervalos, estado = retirado
+                entradas = await loop.run_in_executor(None, self._escrever_lote, lote, intervalos)
+                if entradas is None:
+                    self._devolver_lote(lote, estado)
+                else:
+                    self._registrar_lote(entradas)
+                    await loop.run_in_executor(None, self.manifesto.salvar, copy.deepcopy(self.manifesto.arquivos))
+                    logger.info(f"Lote de {len(lote)} arquivo(s) gravado em {self.arquivo_relatorio}")
+            try:
+                await asyncio.wait_for(self._parar.wait(), min(1.0, self.intervalo_lote))
+            except asyncio.TimeoutError:
+                pass
+
+    async def executar(self):
+        """Executa o serviço até parar() ser chamado (ou SIGINT/SIGTERM)."""
+
+        loop = asyncio.get_running_loop()
+        self._parar = asyncio.Event()
+        self._fila = asyncio.Queue()
+        for sinal in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sinal, self.parar)
+            except (NotImplementedError, RuntimeError):
+                # Windows, ou fora da thread principal
+                pass
+
+        self._preparar_relatorio()
+        logger.info(f"Vigiando {', '.join(self.entradas)} a cada {self.intervalo}s com {self.workers} processo(s).")
+
+        self._executor = self._criar_executor()
+        try:
+            extratores = [asyncio.create_task(self._extrator()) for _ in range(self.workers)]
+            gravador = asyncio.create_task(self._gravador())
+            await self._varredor()
+
+            # Encerramento: os PDFs ainda na fila ficam para a próxima execução
+            while not self._fila.empty():
+                caminho_pdf, _ = self._fila.get_nowait()
+                self._em_andamento.pop(caminho_pdf, None)
+                self._fila.task_done()
+            await self._fila.join()
+            for tarefa in extratores:
+                tarefa.cancel()
+            await asyncio.gather(*extratores, gravador, return_exceptions=True)
+        finally:
+            self._executor.shutdown()
+
+        self.gravar_lote()
+        logger.info("Serviço encerrado.")
+
+def main(argumentos:list[str] = None):
+    parser = criar_parser(incremental=False)
+    parser.description = "Vigia as pastas dos planos e processa os PDFs novos ou alterados à medida que chegam."
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_VARREDURA,
+                        help=f"segundos entre as varreduras das pastas (padrão: {INTERVALO_VARREDURA})")
+    parser.add_argument("--estabilidade", type=float, default=TEMPO_ESTABILIDADE,
+                        help=f"segundos sem mudanças antes de processar um PDF (padrão: {TEMPO_ESTABILIDADE})")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE,
+                        help=f"PDFs por lote gravado no relatório (padrão: {TAMANHO_LOTE})")
+    parser.add_argument("--intervalo-lote", type=float, default=INTERVALO_LOTE,
+                        help=f"segundos máximos até gravar um lote incompleto (padrão: {INTERVALO_LOTE})")
+    args = parser.parse_args(argumentos)
+
+    vigia = VigiaPastas(
+        args.entradas, args.saida, planos=args.planos, formatos=args.formatos, workers=args.workers,
+        intervalo=args.intervalo, estabilidade=args.estabilidade, tamanho_lote=args.lote,
+        intervalo_lote=args.intervalo_lote, banco=BancoHistorico(args.banco) if args.banco else None,
+        deduplicador=Deduplicador(Deduplicador.caminho_para(args.saida)) if args.deduplicar else None,
+    )
+    try:
+        asyncio.run(vigia.executar())
+    finally:
+        if vigia.banco:
+            vigia.banco.fechar()
+        if vigia.deduplicador:
+            vigia.deduplicador.fechar()
+    vigia.metricas.salvar(args.metricas)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())